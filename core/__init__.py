@@ -15,6 +15,10 @@ from .llm_client import (
     get_default_model,
     call_llm,
     call_llm_with_image,
+    acall_llm,
+    acall_llm_with_image,
+    generate_with_images,
+    agenerate_with_images,
 )
 from .json_utils import (
     parse_llm_json,
@@ -24,6 +28,7 @@ from .json_utils import (
     get_timeline,
     make_hashable,
 )
+from .json_stream import StreamingJSONParser, JSONShapeError
 from .provenance import ProvenanceTracker, ProvenanceSource
 from .pdf_utils import (
     extract_text_from_pages,
@@ -31,6 +36,38 @@ from .pdf_utils import (
     render_page_to_image,
     render_pages_to_images,
 )
+from .pdf_document import (
+    ProtocolDocument,
+    get_protocol_document,
+    close_protocol_documents,
+    configure_pdf_workers,
+)
+from .page_images import (
+    PageImage,
+    load_page_image,
+    render_page_images,
+    summarize_page_images,
+)
+from .page_classifier import (
+    PageClassifier,
+    PageFeatures,
+    page_classifier,
+    register_section_patterns,
+    register_section_keywords,
+)
+from .pdf_cache import (
+    PageTextCache,
+    configure_pdf_cache,
+    get_pdf_cache_stats,
+)
+from .llm_cache import (
+    LLMCacheMissError,
+    LLMBatchPendingError,
+    configure_llm_cache,
+    get_llm_cache_stats,
+)
+from .model_router import configure_model_routing, record_route_validation
+from .prompt_compaction import compact_messages, configure_prompt_compaction, count_tokens
 from .constants import (
     USDM_VERSION,
     SYSTEM_NAME,
@@ -70,6 +107,10 @@ __all__ = [
     "get_default_model",
     "call_llm",
     "call_llm_with_image",
+    "acall_llm",
+    "acall_llm_with_image",
+    "generate_with_images",
+    "agenerate_with_images",
     "LLMConfig",
     "LLMResponse",
     # JSON Utilities
@@ -79,6 +120,8 @@ __all__ = [
     "clean_json_response",
     "get_timeline",
     "make_hashable",
+    "StreamingJSONParser",
+    "JSONShapeError",
     # Provenance
     "ProvenanceTracker",
     "ProvenanceSource",
@@ -87,6 +130,31 @@ __all__ = [
     "get_page_count",
     "render_page_to_image",
     "render_pages_to_images",
+    "ProtocolDocument",
+    "get_protocol_document",
+    "close_protocol_documents",
+    "configure_pdf_workers",
+    "PageImage",
+    "load_page_image",
+    "render_page_images",
+    "summarize_page_images",
+    "PageClassifier",
+    "PageFeatures",
+    "page_classifier",
+    "register_section_patterns",
+    "register_section_keywords",
+    "PageTextCache",
+    "configure_pdf_cache",
+    "get_pdf_cache_stats",
+    "LLMCacheMissError",
+    "LLMBatchPendingError",
+    "configure_llm_cache",
+    "get_llm_cache_stats",
+    "configure_model_routing",
+    "compact_messages",
+    "configure_prompt_compaction",
+    "count_tokens",
+    "record_route_validation",
     # Constants
     "USDM_VERSION",
     "SYSTEM_NAME",
@@ -0,0 +1,321 @@
+"""
+Incremental JSON parsing for streamed LLM responses.
+
+Providers feed response text to a StreamingJSONParser as it arrives. The
+parser tracks the JSON structure in a single pass, so it can:
+
+- reject a wrong top-level shape (e.g. an array, or an object wrapped in
+  "study") as soon as it appears, letting the call be aborted and retried
+- tell whether the response was truncated (unclosed containers at the end)
+- return the parsed value, or a best-effort value for a truncated response
+
+Text is accumulated as a list of chunks (no quadratic string building).
+
+Usage:
+    from core.json_stream import StreamingJSONParser, JSONShapeError
+
+    parser = StreamingJSONParser(root="object", forbidden_keys=["study"])
+    for chunk in stream:
+        parser.feed(chunk)          # raises JSONShapeError early
+    data = parser.value() if parser.complete else parser.partial_value()
+"""
+
+import json
+import re
+from typing import Any, Iterable, List, Optional, Tuple
+
+# Characters that can change the parser state; everything else is skipped
+_STRUCTURAL = re.compile(r'[{}\[\]",\\]')
+
+_CLOSERS = {'{': '}', '[': ']'}
+
+
+class JSONShapeError(ValueError):
+    """Streamed JSON does not have the expected top-level shape."""
+
+    def __init__(self, message: str, partial_text: str = ""):
+        super().__init__(message)
+        self.partial_text = partial_text
+
+
+class StreamingJSONParser:
+    """
+    Single-pass structural JSON scanner fed incrementally.
+
+    Leading prose or markdown fences before the first '{' or '[' are
+    skipped; anything after the root value closes is ignored.
+
+    Args:
+        root: Expected top-level type, "object" or "array" (None: either)
+        forbidden_keys: Top-level object keys that indicate a wrong shape
+    """
+
+    def __init__(self, root: Optional[str] = None, forbidden_keys: Iterable[str] = ()):
+        if root not in (None, "object", "array"):
+            raise ValueError(f"root must be 'object', 'array' or None, got {root!r}")
+        self.root = root
+        self.forbidden_keys = frozenset(forbidden_keys)
+        self.top_level_keys: List[str] = []
+
+        self._chunks: List[str] = []
+        self._length = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._start: Optional[int] = None
+        self._end: Optional[int] = None
+
+        # Top-level key capture (only at depth 1 of an object root)
+        self._expect_key = False
+        self._key_start: Optional[int] = None
+
+        # Last offset where the text can be closed into valid JSON
+        self._safe_end: Optional[int] = None
+        self._safe_stack: Tuple[str, ...] = ()
+
+    @property
+    def started(self) -> bool:
+        """True once the root value has begun."""
+        return self._start is not None
+
+    @property
+    def complete(self) -> bool:
+        """True once the root value has been closed."""
+        return self._end is not None
+
+    @property
+    def truncated(self) -> bool:
+        """True if the root value began but was never closed."""
+        return self.started and not self.complete
+
+    @property
+    def depth(self) -> int:
+        """Current container nesting depth."""
+        return len(self._stack)
+
+    @property
+    def text(self) -> str:
+        """All text fed so far."""
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
+
+    def json_text(self) -> str:
+        """Text of the root value (up to the end of input if not complete)."""
+        if self._start is None:
+            return ""
+        return self.text[self._start:self._end]
+
+    def feed(self, chunk: str) -> None:
+        """
+        Consume the next piece of response text.
+
+        Raises:
+            JSONShapeError: If the root type or a top-level key is not allowed
+        """
+        if not chunk:
+            return
+        offset = self._length
+        self._chunks.append(chunk)
+        self._length += len(chunk)
+        if self._end is not None:
+            return
+
+        skip_to = 0
+        if self._escape:
+            # Escaped character split across chunks
+            skip_to = 1
+            self._escape = False
+
+        for match in _STRUCTURAL.finditer(chunk):
+            i = match.start()
+            if i < skip_to:
+                continue
+            ch = match.group()
+            pos = offset + i
+
+            if self._in_string:
+                if ch == '\\':
+                    if i + 1 < len(chunk):
+                        skip_to = i + 2
+                    else:
+                        self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._key_start is not None:
+                        self._end_key(pos)
+                continue
+
+            if self._start is None:
+                if ch in '{[':
+                    self._begin_root(ch, pos)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._expect_key and self._stack == ['{']:
+                    self._expect_key = False
+                    self._key_start = pos + 1
+            elif ch in '{[':
+                self._stack.append(ch)
+                # An open array can be closed empty; an object needs a member first
+                if ch == '[':
+                    self._mark_safe(pos + 1)
+            elif ch in '}]':
+                if self._stack:
+                    self._stack.pop()
+                self._mark_safe(pos + 1)
+                if not self._stack:
+                    self._end = pos + 1
+                    return
+            elif ch == ',':
+                self._mark_safe(pos)
+                if self._stack == ['{']:
+                    self._expect_key = True
+
+    def value(self) -> Optional[Any]:
+        """Parsed root value, or None if incomplete or invalid."""
+        if not self.complete:
+            return None
+        try:
+            return json.loads(self.json_text())
+        except json.JSONDecodeError:
+            return None
+
+    def partial_value(self) -> Optional[Any]:
+        """
+        Best-effort value for a truncated response.
+
+        Cuts the text back to the last complete element and closes the open
+        containers, e.g. '{"a": [1, 2, {"b": 3' -> {"a": [1, 2]}.
+        """
+        if self.complete:
+            return self.value()
+        if self._safe_end is None:
+            return None
+        closing = "".join(_CLOSERS[c] for c in reversed(self._safe_stack))
+        try:
+            return json.loads(self.text[self._start:self._safe_end] + closing)
+        except json.JSONDecodeError:
+            return None
+
+    def _begin_root(self, ch: str, pos: int) -> None:
+        kind = "object" if ch == '{' else "array"
+        if self.root is not None and kind != self.root:
+            raise JSONShapeError(
+                f"Expected a JSON {self.root} but response starts a JSON {kind}",
+                self.text,
+            )
+        self._start = pos
+        self._stack.append(ch)
+        self._expect_key = ch == '{'
+        self._mark_safe(pos + 1)
+
+    def _end_key(self, pos: int) -> None:
+        key = self.text[self._key_start:pos]
+        self._key_start = None
+        self.top_level_keys.append(key)
+        if key in self.forbidden_keys:
+            raise JSONShapeError(
+                f"Response has unexpected top-level key '{key}'",
+                self.text,
+            )
+
+    def _mark_safe(self, end: int) -> None:
+        self._safe_end = end
+        self._safe_stack = tuple(self._stack)
+
+
+def merge_json_values(base: Any, extra: Any) -> Any:
+    """
+    Structurally merge two JSON values from the same response.
+
+    Objects are merged key by key; arrays are concatenated, skipping items
+    already present, and objects with the same 'id' are merged into one;
+    scalars from extra win unless empty.
+    """
+    if isinstance(base, dict) and isinstance(extra, dict):
+        merged = dict(base)
+        for key, value in extra.items():
+            merged[key] = merge_json_values(merged[key], value) if key in merged else value
+        return merged
+    if isinstance(base, list) and isinstance(extra, list):
+        merged = list(base)
+        index_by_id = {
+            item['id']: i for i, item in enumerate(merged) if isinstance(item, dict) and item.get('id')
+        }
+        for item in extra:
+            item_id = item.get('id') if isinstance(item, dict) else None
+            if item_id and item_id in index_by_id:
+                # Same element again (often completing a cut-off one)
+                i = index_by_id[item_id]
+                merged[i] = merge_json_values(merged[i], item)
+            elif item_id or item not in merged:
+                if item_id:
+                    index_by_id[item_id] = len(merged)
+                merged.append(item)
+        return merged
+    return base if extra in (None, "", [], {}) else extra
+
+
+def join_json_continuation(previous: str, continuation: str, min_overlap: int = 8) -> str:
+    """
+    Join a truncated JSON response with the model's continuation of it.
+
+    Handles the three ways models continue:
+
+    - exactly from the cut-off point (plain concatenation)
+    - repeating the last few characters first (the overlap is dropped)
+    - restarting with a new complete document, which JSON modes force on
+      OpenAI and Gemini (merged structurally with the truncated part)
+
+    Returns:
+        JSON text; still unclosed if the joined response is itself truncated
+    """
+    fragment = _strip_fences(continuation)
+    if not fragment.strip():
+        return previous
+
+    # Restarted document: merge its value into what was already received
+    restarted = StreamingJSONParser()
+    restarted.feed(fragment)
+    if restarted.complete and restarted.json_text() == fragment.strip():
+        head = StreamingJSONParser()
+        head.feed(previous)
+        base = head.partial_value()
+        value = restarted.value()
+        if base is not None and value is not None and type(base) is type(value):
+            return json.dumps(merge_json_values(base, value), ensure_ascii=False)
+
+    exact = previous + fragment
+    head_text, tail_text = previous.rstrip(), fragment.lstrip()
+    candidates = [exact]
+    for size in range(min(len(head_text), len(tail_text), 2000), min_overlap - 1, -1):
+        if head_text.endswith(tail_text[:size]):
+            # Repeated tail: prefer dropping it over plain concatenation
+            candidates.insert(0, head_text + tail_text[size:])
+            break
+    candidates.append(head_text + tail_text)
+
+    parsers = []
+    for text in candidates:
+        parser = StreamingJSONParser()
+        parser.feed(text)
+        if parser.complete and parser.value() is not None:
+            return text
+        parsers.append((text, parser))
+    for text, parser in parsers:
+        if parser.truncated and parser.partial_value() is not None:
+            return text
+    return exact
+
+
+def _strip_fences(text: str) -> str:
+    """Remove a markdown code fence around a response fragment."""
+    stripped = text.strip()
+    if not stripped.startswith("```"):
+        return text
+    stripped = stripped.split("\n", 1)[1] if "\n" in stripped else ""
+    if stripped.endswith("```"):
+        stripped = stripped[:-3]
+    return stripped
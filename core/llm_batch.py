@@ -0,0 +1,762 @@
+"""
+Provider Batch Mode for Bulk Corpus Runs.
+
+Re-running the whole trial corpus online pays full price and competes with
+interactive rate limits. Batch mode instead runs each protocol in rounds
+against the LLM response cache (core.llm_cache):
+
+1. Collect round: main_v3.py --llm-cache collect --llm-batch-queue FILE
+   serves every call already in the cache and appends each miss to the
+   queue file. The phase that missed stops; independent phases keep going,
+   so one round queues the prompts of all phases that do not depend on
+   missing results (metadata, eligibility, objectives, narrative, ...).
+2. The queued requests are submitted to the provider batch endpoint
+   (OpenAI Batch API, Anthropic Message Batches, Gemini/Vertex AI batch
+   prediction) with the cache key as the request id.
+3. When a batch ends, its responses are stored in the cache under those
+   keys and the protocol's next round picks them up.
+4. A protocol is finished when a round queues nothing.
+
+scripts/run_all_trials.py --batch drives the rounds for a whole corpus.
+LocalBatchServer is a stand-in batch endpoint for tests and dry runs.
+
+Usage:
+    from core.llm_batch import BATCH_DONE, BatchQueue, store_batch_results, submit_batches
+
+    jobs = submit_batches(BatchQueue(queue_path).load())
+    ...
+    for job in jobs:
+        if job.backend.status(job) == BATCH_DONE:
+            store_batch_results(cache, job.backend.results(job))
+"""
+
+import base64
+import json
+import logging
+import os
+import threading
+import urllib.request
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from llm_providers import (
+    ImageData, LLMConfig, LLMProviderFactory, LLMResponse, MimeType, image_inputs, provider_pool,
+)
+
+logger = logging.getLogger(__name__)
+
+# Batch job states reported by BatchBackend.status()
+BATCH_PENDING = "pending"
+BATCH_DONE = "done"
+BATCH_FAILED = "failed"
+
+# Vertex AI batch prediction reads and writes JSONL under this GCS prefix
+VERTEX_BATCH_GCS_ENV = "VERTEX_BATCH_GCS_URI"
+
+
+@dataclass
+class BatchRequest:
+    """
+    One queued LLM call, keyed by its response cache key.
+
+    Text calls carry messages; image calls carry prompt, image (base64)
+    and mime_type, or lists of them for multi-image calls.
+    """
+    key: str
+    model: str
+    messages: Optional[List[Dict[str, Any]]] = None
+    config: Dict[str, Any] = field(default_factory=dict)
+    prompt: Optional[str] = None
+    image: Optional[Union[str, List[str]]] = None
+    mime_type: Optional[Union[str, List[str]]] = None
+
+    @classmethod
+    def for_text(
+        cls, key: str, model: str, messages: List[Dict[str, Any]], config: Optional[LLMConfig] = None
+    ) -> "BatchRequest":
+        """Request for a generate() call."""
+        return cls(key=key, model=model, messages=messages, config=(config or LLMConfig()).to_dict())
+
+    @classmethod
+    def for_image(
+        cls,
+        key: str,
+        model: str,
+        prompt: str,
+        image_data: ImageData,
+        mime_type: MimeType = "image/png",
+        config: Optional[LLMConfig] = None,
+    ) -> "BatchRequest":
+        """Request for a generate_with_image() call."""
+        images = image_inputs(image_data, mime_type)
+        encoded = [base64.b64encode(data).decode("ascii") for data, _ in images]
+        single = isinstance(image_data, (bytes, bytearray, memoryview))
+        return cls(
+            key=key,
+            model=model,
+            config=(config or LLMConfig()).to_dict(),
+            prompt=prompt,
+            image=encoded[0] if single else encoded,
+            mime_type=images[0][1] if single else [image_mime_type for _, image_mime_type in images],
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "BatchRequest":
+        return cls(**data)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @property
+    def is_image(self) -> bool:
+        return self.image is not None
+
+    @property
+    def provider(self) -> str:
+        """Provider name ('openai', 'gemini' or 'claude')."""
+        return LLMProviderFactory.detect_provider(self.model)
+
+    @property
+    def image_data(self) -> Optional[ImageData]:
+        if self.image is None:
+            return None
+        if isinstance(self.image, str):
+            return base64.b64decode(self.image)
+        return [base64.b64decode(image) for image in self.image]
+
+    def llm_config(self) -> LLMConfig:
+        return LLMConfig(**self.config)
+
+    def run(self) -> LLMResponse:
+        """Execute the request online (used by the local batch server)."""
+        provider = provider_pool.get(self.model)
+        if self.is_image:
+            return provider.generate_with_image(self.prompt, self.image_data, self.mime_type, self.llm_config())
+        return provider.generate(self.messages, self.llm_config())
+
+
+class BatchQueue:
+    """
+    Append-only JSONL file of pending requests, deduplicated by key.
+
+    Shared by all threads of a collect run.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._keys = {request.key for request in self.load()}
+
+    def add(self, request: BatchRequest) -> bool:
+        """Queue a request; returns False if its key is already queued."""
+        with self._lock:
+            if request.key in self._keys:
+                return False
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(request.to_dict(), ensure_ascii=False) + "\n")
+            self._keys.add(request.key)
+            return True
+
+    def load(self) -> List[BatchRequest]:
+        """Read all queued requests."""
+        if not self.path.exists():
+            return []
+        with open(self.path, encoding="utf-8") as f:
+            return [BatchRequest.from_dict(json.loads(line)) for line in f if line.strip()]
+
+    def clear(self) -> None:
+        """Remove all queued requests."""
+        with self._lock:
+            self.path.unlink(missing_ok=True)
+            self._keys.clear()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+@dataclass
+class BatchJob:
+    """A submitted batch and the cache keys it will answer."""
+    backend: "BatchBackend"
+    batch_id: str
+    keys: List[str]
+    model: str
+    # Backend-specific bookkeeping (e.g. output locations)
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+
+class BatchBackend(ABC):
+    """A provider batch endpoint: submit requests, poll, fetch results."""
+
+    name: str = "batch"
+
+    @abstractmethod
+    def submit(self, model: str, requests: List[BatchRequest]) -> BatchJob:
+        """Submit requests (all for one model) as one batch."""
+
+    @abstractmethod
+    def status(self, job: BatchJob) -> str:
+        """BATCH_PENDING, BATCH_DONE or BATCH_FAILED."""
+
+    @abstractmethod
+    def results(self, job: BatchJob) -> Dict[str, LLMResponse]:
+        """Responses of an ended batch by cache key (failed requests are left out)."""
+
+    def group_key(self, request: BatchRequest) -> Any:
+        """Requests with different group keys go into separate batches."""
+        return request.model
+
+
+class OpenAIBatchBackend(BatchBackend):
+    """OpenAI Batch API: JSONL upload, /v1/responses and /v1/chat/completions bodies."""
+
+    name = "openai"
+
+    TEXT_ENDPOINT = "/v1/responses"
+    VISION_ENDPOINT = "/v1/chat/completions"
+
+    def group_key(self, request: BatchRequest) -> Any:
+        # One endpoint per batch
+        return (request.model, request.is_image)
+
+    def submit(self, model: str, requests: List[BatchRequest]) -> BatchJob:
+        provider = provider_pool.get(model)
+        endpoint = self.VISION_ENDPOINT if requests[0].is_image else self.TEXT_ENDPOINT
+        lines = []
+        for request in requests:
+            if request.is_image:
+                body = provider._build_vision_params(
+                    request.prompt, request.image_data, request.mime_type, request.llm_config()
+                )
+            else:
+                body = provider._build_params(request.messages, request.llm_config())
+            lines.append(json.dumps({"custom_id": request.key, "method": "POST", "url": endpoint, "body": body}))
+        upload = provider.client.files.create(
+            file=("batch_requests.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch",
+        )
+        batch = provider.client.batches.create(
+            input_file_id=upload.id,
+            endpoint=endpoint,
+            completion_window="24h",
+        )
+        return BatchJob(self, batch.id, [r.key for r in requests], model, {"endpoint": endpoint})
+
+    def status(self, job: BatchJob) -> str:
+        batch = provider_pool.get(job.model).client.batches.retrieve(job.batch_id)
+        # Expired batches still return the requests that completed
+        if batch.status in ("completed", "expired"):
+            return BATCH_DONE
+        if batch.status in ("failed", "cancelled"):
+            return BATCH_FAILED
+        return BATCH_PENDING
+
+    def results(self, job: BatchJob) -> Dict[str, LLMResponse]:
+        client = provider_pool.get(job.model).client
+        batch = client.batches.retrieve(job.batch_id)
+        if not batch.output_file_id:
+            return {}
+        responses = {}
+        for line in client.files.content(batch.output_file_id).text.splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            response = item.get("response") or {}
+            if item.get("error") or response.get("status_code") != 200:
+                logger.warning(f"OpenAI batch request {item.get('custom_id', '')[:12]} failed: {item.get('error')}")
+                continue
+            responses[item["custom_id"]] = _openai_body_to_response(response["body"], job.model)
+        return responses
+
+
+def _openai_body_to_response(body: Dict[str, Any], model: str) -> LLMResponse:
+    """Convert a Responses API or Chat Completions JSON body to LLMResponse."""
+    usage = body.get("usage") or {}
+    if "choices" in body:
+        choice = body["choices"][0]
+        return LLMResponse(
+            content=choice["message"].get("content") or "",
+            model=body.get("model", model),
+            usage={
+                "prompt_tokens": usage.get("prompt_tokens", 0),
+                "completion_tokens": usage.get("completion_tokens", 0),
+                "total_tokens": usage.get("total_tokens", 0),
+            },
+            finish_reason=choice.get("finish_reason"),
+        )
+    content = "".join(
+        part.get("text", "")
+        for item in body.get("output", []) if item.get("type") == "message"
+        for part in item.get("content", []) if part.get("type") == "output_text"
+    )
+    finish_reason = body.get("status")
+    if finish_reason == "incomplete":
+        finish_reason = (body.get("incomplete_details") or {}).get("reason") or finish_reason
+    return LLMResponse(
+        content=content,
+        model=body.get("model", model),
+        usage={
+            "prompt_tokens": usage.get("input_tokens", 0),
+            "completion_tokens": usage.get("output_tokens", 0),
+            "total_tokens": usage.get("total_tokens", 0),
+        },
+        finish_reason=finish_reason,
+    )
+
+
+class AnthropicBatchBackend(BatchBackend):
+    """Anthropic Message Batches API (custom_id is the 64-character cache key)."""
+
+    name = "anthropic"
+
+    def submit(self, model: str, requests: List[BatchRequest]) -> BatchJob:
+        provider = provider_pool.get(model)
+        batch_requests = []
+        for request in requests:
+            messages = request.messages
+            if request.is_image:
+                messages = provider._image_messages(request.prompt, request.image_data, request.mime_type)
+            batch_requests.append({
+                "custom_id": request.key,
+                "params": provider._build_params(messages, request.llm_config()),
+            })
+        batch = provider.client.messages.batches.create(requests=batch_requests)
+        return BatchJob(self, batch.id, [r.key for r in requests], model)
+
+    def status(self, job: BatchJob) -> str:
+        batch = provider_pool.get(job.model).client.messages.batches.retrieve(job.batch_id)
+        return BATCH_DONE if batch.processing_status == "ended" else BATCH_PENDING
+
+    def results(self, job: BatchJob) -> Dict[str, LLMResponse]:
+        responses = {}
+        for entry in provider_pool.get(job.model).client.messages.batches.results(job.batch_id):
+            if entry.result.type != "succeeded":
+                logger.warning(f"Anthropic batch request {entry.custom_id[:12]} {entry.result.type}")
+                continue
+            message = entry.result.message
+            input_tokens = message.usage.input_tokens or 0
+            output_tokens = message.usage.output_tokens or 0
+            responses[entry.custom_id] = LLMResponse(
+                content="".join(block.text for block in message.content if block.type == "text"),
+                model=message.model,
+                usage={
+                    "prompt_tokens": input_tokens,
+                    "completion_tokens": output_tokens,
+                    "total_tokens": input_tokens + output_tokens,
+                },
+                finish_reason=message.stop_reason,
+            )
+        return responses
+
+
+class GeminiBatchBackend(BatchBackend):
+    """
+    Gemini batch prediction through google-genai.
+
+    With GOOGLE_CLOUD_PROJECT set, jobs run on Vertex AI batch prediction,
+    which reads and writes JSONL under VERTEX_BATCH_GCS_URI (needs
+    google-cloud-storage). Otherwise requests are sent inline to the Gemini
+    API batch endpoint.
+    """
+
+    name = "gemini"
+
+    # Request label carrying the cache key through Vertex AI batch prediction
+    KEY_LABEL = "p2u_cache_key"
+
+    def __init__(self):
+        from google import genai
+
+        project = os.environ.get("GOOGLE_CLOUD_PROJECT")
+        self.use_vertex = bool(project)
+        if self.use_vertex:
+            self.gcs_uri = os.environ.get(VERTEX_BATCH_GCS_ENV, "").rstrip("/")
+            if not self.gcs_uri.startswith("gs://"):
+                raise ValueError(f"Vertex AI batch prediction needs {VERTEX_BATCH_GCS_ENV}=gs://bucket/prefix")
+            location = os.environ.get("GOOGLE_CLOUD_LOCATION", "us-central1")
+            self.client = genai.Client(vertexai=True, project=project, location=location)
+        else:
+            self.client = genai.Client(api_key=os.environ.get("GOOGLE_API_KEY"))
+
+    def _request_body(self, request: BatchRequest) -> Dict[str, Any]:
+        """GenerateContentRequest in REST (camelCase) form, matching GeminiProvider."""
+        from llm_providers import GeminiProvider
+
+        config = request.llm_config()
+        if request.is_image:
+            parts = [{"text": request.prompt}] + [
+                {"inlineData": {"mimeType": mime_type, "data": base64.b64encode(data).decode("ascii")}}
+                for data, mime_type in image_inputs(request.image_data, request.mime_type)
+            ]
+        else:
+            parts = [{"text": GeminiProvider._format_messages_for_gemini(request.messages)}]
+        generation_config = {"temperature": config.temperature}
+        # Thinking is disabled only where online calls disable it; 2.5 models
+        # keep their default (gemini-2.5-pro rejects a budget of 0)
+        if GeminiProvider.uses_genai_sdk(request.model, self.use_vertex):
+            generation_config["thinkingConfig"] = {"thinkingBudget": 0}
+        if config.max_tokens:
+            generation_config["maxOutputTokens"] = config.max_tokens
+        if config.stop_sequences:
+            generation_config["stopSequences"] = config.stop_sequences
+        if config.top_p is not None:
+            generation_config["topP"] = config.top_p
+        if config.top_k is not None:
+            generation_config["topK"] = config.top_k
+        if config.json_mode:
+            generation_config["responseMimeType"] = "application/json"
+        return {
+            "contents": [{"role": "user", "parts": parts}],
+            "generationConfig": generation_config,
+            # Same BLOCK_NONE settings as online calls (clinical content)
+            "safetySettings": [
+                {"category": category, "threshold": "BLOCK_NONE"}
+                for category in (
+                    "HARM_CATEGORY_HATE_SPEECH",
+                    "HARM_CATEGORY_DANGEROUS_CONTENT",
+                    "HARM_CATEGORY_SEXUALLY_EXPLICIT",
+                    "HARM_CATEGORY_HARASSMENT",
+                )
+            ],
+        }
+
+    def _model_id(self, model: str) -> str:
+        from llm_providers import GeminiProvider
+
+        return GeminiProvider.VERTEX_MODEL_ALIASES.get(model, model) if self.use_vertex else model
+
+    def submit(self, model: str, requests: List[BatchRequest]) -> BatchJob:
+        keys = [r.key for r in requests]
+        if not self.use_vertex:
+            # Inline responses come back in request order
+            inlined = []
+            for r in requests:
+                body = _snake_case(self._request_body(r))
+                inlined.append({
+                    "contents": body["contents"],
+                    "config": {**body["generation_config"], "safety_settings": body["safety_settings"]},
+                    "metadata": {"key": r.key},
+                })
+            job = self.client.batches.create(model=self._model_id(model), src=inlined)
+            return BatchJob(self, job.name, keys, model)
+
+        from google.cloud import storage
+
+        prefix = f"{self.gcs_uri}/{keys[0][:16]}-{len(keys)}"
+        # Label values are limited to 63 characters; the output echoes each request
+        body = "\n".join(
+            json.dumps({"request": {**self._request_body(r), "labels": {self.KEY_LABEL: r.key[:63]}}})
+            for r in requests
+        )
+        bucket_name, _, path = prefix[len("gs://"):].partition("/")
+        storage.Client().bucket(bucket_name).blob(f"{path}/input.jsonl").upload_from_string(body)
+        job = self.client.batches.create(
+            model=self._model_id(model),
+            src=f"{prefix}/input.jsonl",
+            config={"dest": f"{prefix}/output"},
+        )
+        return BatchJob(self, job.name, keys, model, {"output": f"{prefix}/output"})
+
+    def status(self, job: BatchJob) -> str:
+        state = self.client.batches.get(name=job.batch_id).state.name
+        if state in ("JOB_STATE_SUCCEEDED", "JOB_STATE_PARTIALLY_SUCCEEDED", "JOB_STATE_EXPIRED"):
+            return BATCH_DONE
+        if state in ("JOB_STATE_FAILED", "JOB_STATE_CANCELLED"):
+            return BATCH_FAILED
+        return BATCH_PENDING
+
+    def results(self, job: BatchJob) -> Dict[str, LLMResponse]:
+        if not self.use_vertex:
+            batch = self.client.batches.get(name=job.batch_id)
+            responses = {}
+            for key, item in zip(job.keys, batch.dest.inlined_responses or []):
+                if item.error or item.response is None:
+                    logger.warning(f"Gemini batch request {key[:12]} failed: {item.error}")
+                    continue
+                responses[key] = _gemini_body_to_response(
+                    item.response.model_dump(mode="json", by_alias=True, exclude_none=True), job.model
+                )
+            return responses
+
+        from google.cloud import storage
+
+        bucket_name, _, path = job.extra["output"][len("gs://"):].partition("/")
+        keys = {key[:63]: key for key in job.keys}
+        responses = {}
+        for blob in storage.Client().bucket(bucket_name).list_blobs(prefix=path):
+            if not blob.name.endswith(".jsonl"):
+                continue
+            for line in blob.download_as_text().splitlines():
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                key = keys.get(item.get("request", {}).get("labels", {}).get(self.KEY_LABEL))
+                if key is None:
+                    continue
+                if item.get("status") or "response" not in item:
+                    logger.warning(f"Vertex AI batch request {key[:12]} failed: {item.get('status')}")
+                    continue
+                responses[key] = _gemini_body_to_response(item["response"], job.model)
+        return responses
+
+
+def _snake_case(value: Any) -> Any:
+    """Convert camelCase dict keys (REST form) to snake_case (google-genai form)."""
+    if isinstance(value, list):
+        return [_snake_case(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+    return {
+        "".join(f"_{c.lower()}" if c.isupper() else c for c in key): _snake_case(v)
+        for key, v in value.items()
+    }
+
+
+def _gemini_body_to_response(body: Dict[str, Any], model: str) -> LLMResponse:
+    """Convert a GenerateContentResponse JSON body to LLMResponse."""
+    candidates = body.get("candidates") or [{}]
+    parts = (candidates[0].get("content") or {}).get("parts") or []
+    usage = body.get("usageMetadata") or {}
+    return LLMResponse(
+        content="".join(part.get("text", "") for part in parts if not part.get("thought")),
+        model=model,
+        usage={
+            "prompt_tokens": usage.get("promptTokenCount", 0),
+            "completion_tokens": usage.get("candidatesTokenCount", 0),
+            "total_tokens": usage.get("totalTokenCount", 0),
+        },
+        finish_reason=candidates[0].get("finishReason"),
+    )
+
+
+class LocalBatchBackend(BatchBackend):
+    """Client for LocalBatchServer (or any server speaking its JSON protocol)."""
+
+    name = "local"
+
+    def __init__(self, url: str, timeout: float = 30.0):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _call(self, path: str, payload: Optional[Dict[str, Any]] = None) -> bytes:
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        request = urllib.request.Request(
+            f"{self.url}{path}", data=data, headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return response.read()
+
+    def submit(self, model: str, requests: List[BatchRequest]) -> BatchJob:
+        batch = json.loads(self._call("/batches", {"requests": [r.to_dict() for r in requests]}))
+        return BatchJob(self, batch["id"], [r.key for r in requests], model)
+
+    def status(self, job: BatchJob) -> str:
+        batch = json.loads(self._call(f"/batches/{job.batch_id}"))
+        return BATCH_DONE if batch["status"] == "completed" else BATCH_PENDING
+
+    def results(self, job: BatchJob) -> Dict[str, LLMResponse]:
+        responses = {}
+        for line in self._call(f"/batches/{job.batch_id}/results").decode("utf-8").splitlines():
+            item = json.loads(line)
+            if item.get("error"):
+                logger.warning(f"Local batch request {item['custom_id'][:12]} failed: {item['error']}")
+                continue
+            responses[item["custom_id"]] = LLMResponse(**item["response"])
+        return responses
+
+
+Responder = Callable[[BatchRequest], Union[LLMResponse, str]]
+
+
+class LocalBatchServer:
+    """
+    Stand-in batch endpoint on localhost for tests and dry runs.
+
+    Protocol (JSON):
+        POST /batches                {"requests": [BatchRequest dicts]} -> {"id", "status"}
+        GET  /batches/{id}           -> {"id", "status", "request_count"}
+        GET  /batches/{id}/results   -> JSONL of {"custom_id", "response"|"error"}
+
+    A batch reports "in_progress" for the first polls_until_done status
+    requests, then runs every request through the responder and reports
+    "completed". The default responder calls the provider online.
+
+    Usage:
+        with LocalBatchServer(lambda request: '{"ok": true}') as server:
+            backend = LocalBatchBackend(server.url)
+    """
+
+    def __init__(self, responder: Optional[Responder] = None, polls_until_done: int = 1):
+        self.responder = responder or BatchRequest.run
+        self.polls_until_done = polls_until_done
+        self._lock = threading.Lock()
+        self._batches: Dict[str, Dict[str, Any]] = {}
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "LocalBatchServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="local-batch-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "LocalBatchServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _create(self, requests: List[Dict[str, Any]]) -> Dict[str, Any]:
+        with self._lock:
+            batch_id = f"batch_{len(self._batches) + 1}"
+            self._batches[batch_id] = {"requests": requests, "polls": 0, "results": None}
+        return {"id": batch_id, "status": "in_progress"}
+
+    def _status(self, batch_id: str) -> Dict[str, Any]:
+        with self._lock:
+            batch = self._batches[batch_id]
+            batch["polls"] += 1
+            done = batch["polls"] > self.polls_until_done
+        if done and batch["results"] is None:
+            batch["results"] = [self._respond(BatchRequest.from_dict(r)) for r in batch["requests"]]
+        return {
+            "id": batch_id,
+            "status": "completed" if done else "in_progress",
+            "request_count": len(batch["requests"]),
+        }
+
+    def _respond(self, request: BatchRequest) -> Dict[str, Any]:
+        try:
+            response = self.responder(request)
+        except Exception as e:
+            return {"custom_id": request.key, "error": str(e)}
+        if isinstance(response, str):
+            response = LLMResponse(content=response, model=request.model)
+        return {
+            "custom_id": request.key,
+            "response": {
+                "content": response.content,
+                "model": response.model,
+                "usage": response.usage,
+                "finish_reason": response.finish_reason,
+            },
+        }
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path != "/batches":
+                    return self._reply(404, {"error": "not found"})
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                self._reply(200, server._create(payload.get("requests", [])))
+
+            def do_GET(self):
+                parts = self.path.strip("/").split("/")
+                if len(parts) < 2 or parts[0] != "batches" or parts[1] not in server._batches:
+                    return self._reply(404, {"error": "not found"})
+                if len(parts) == 2:
+                    return self._reply(200, server._status(parts[1]))
+                results = server._batches[parts[1]]["results"] or []
+                body = "\n".join(json.dumps(r) for r in results).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/jsonl")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _reply(self, code: int, payload: Dict[str, Any]) -> None:
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(f"Local batch server: {format % args}")
+
+        return Handler
+
+
+_BACKENDS = {
+    "openai": OpenAIBatchBackend,
+    "claude": AnthropicBatchBackend,
+    "gemini": GeminiBatchBackend,
+}
+
+
+def get_batch_backend(provider: str, local_url: Optional[str] = None) -> BatchBackend:
+    """
+    Get the batch backend for a provider.
+
+    Args:
+        provider: Provider name from LLMProviderFactory.detect_provider()
+        local_url: Use the LocalBatchServer at this URL instead
+    """
+    if local_url:
+        return LocalBatchBackend(local_url)
+    if provider not in _BACKENDS:
+        raise ValueError(f"No batch backend for provider '{provider}'")
+    return _BACKENDS[provider]()
+
+
+def submit_batches(requests: List[BatchRequest], local_url: Optional[str] = None) -> List[BatchJob]:
+    """
+    Submit queued requests, one batch per provider backend and group.
+
+    Args:
+        requests: Queued requests (e.g. BatchQueue.load())
+        local_url: Send everything to a LocalBatchServer instead
+
+    Returns:
+        Submitted jobs
+    """
+    backends: Dict[str, BatchBackend] = {}
+    groups: Dict[tuple, List[BatchRequest]] = {}
+    for request in requests:
+        provider = request.provider
+        if provider not in backends:
+            backends[provider] = get_batch_backend(provider, local_url)
+        groups.setdefault((provider, backends[provider].group_key(request)), []).append(request)
+
+    jobs = []
+    for (provider, _), group in groups.items():
+        backend = backends[provider]
+        job = backend.submit(group[0].model, group)
+        logger.info(f"Submitted {len(group)} request(s) to {backend.name} batch {job.batch_id}")
+        jobs.append(job)
+    return jobs
+
+
+def store_batch_results(cache, responses: Dict[str, LLMResponse]) -> int:
+    """
+    Record batch responses in the LLM response cache under their request keys.
+
+    Args:
+        cache: core.llm_cache.LLMResponseCache
+        responses: Responses by cache key (BatchBackend.results())
+
+    Returns:
+        Number of responses stored (empty responses are skipped)
+    """
+    stored = 0
+    for key, response in responses.items():
+        if response.content:
+            cache.put(key, response)
+            stored += 1
+    return stored
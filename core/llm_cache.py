@@ -0,0 +1,449 @@
+"""
+Content-Addressed LLM Response Cache.
+
+Stores LLM responses in a SQLite file keyed by a SHA-256 of everything that
+determines the output: model, messages (or prompt), image bytes and the
+LLMConfig. Prompt iteration and regression runs then only pay for calls
+whose inputs actually changed, and a recorded run can be replayed offline.
+
+Modes (main_v3.py --llm-cache):
+    off     No caching (default)
+    read    Serve cached responses; misses call the provider and are not stored
+    write   Serve cached responses; misses call the provider and are recorded
+    replay  Serve cached responses only; a miss raises LLMCacheMissError
+    collect Serve cached responses; a miss is queued for a provider batch
+            (see core.llm_batch) and raises LLMBatchPendingError
+
+The file is bounded in size: least-recently-used entries are evicted once
+it grows past max_bytes.
+
+Usage:
+    from core.llm_cache import configure_llm_cache, get_llm_cache_stats
+
+    configure_llm_cache("write")
+    client = get_llm_client("gemini-2.5-pro")   # wrapped in CachedLLMProvider
+    response = client.generate(messages, config)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from llm_providers import ImageData, LLMConfig, LLMProvider, LLMResponse, MimeType
+
+from .llm_batch import BatchQueue, BatchRequest
+
+logger = logging.getLogger(__name__)
+
+CACHE_MODES = ("off", "read", "write", "replay", "collect")
+
+# Default cache file (override with LLM_CACHE_PATH)
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "protocol2usdm" / "llm_responses.sqlite"
+DEFAULT_MAX_BYTES = 1 << 30
+
+# Bumped when the key derivation changes, so old entries are never matched
+KEY_VERSION = 1
+
+# Evict down to this fraction of max_bytes, so eviction does not run on every write
+_EVICT_TARGET = 0.9
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    content TEXT NOT NULL,
+    usage TEXT,
+    finish_reason TEXT,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+
+_config_lock = threading.Lock()
+_mode = "off"
+_cache_path: Optional[Path] = None
+_max_bytes = DEFAULT_MAX_BYTES
+_cache: Optional["LLMResponseCache"] = None
+_batch_queue_path: Optional[Path] = None
+_batch_queue: Optional[BatchQueue] = None
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "writes": 0, "queued": 0}
+
+
+class LLMCacheMissError(RuntimeError):
+    """Raised in replay mode when a call has no recorded response."""
+
+
+class LLMBatchPendingError(LLMCacheMissError):
+    """Raised in collect mode when a call was queued for a batch instead of run."""
+
+
+def configure_llm_cache(
+    mode: str = "off",
+    cache_path: Optional[str] = None,
+    max_bytes: Optional[int] = None,
+    batch_queue_path: Optional[str] = None,
+) -> None:
+    """
+    Configure the process-wide LLM response cache.
+
+    Args:
+        mode: One of CACHE_MODES
+        cache_path: SQLite file (default: LLM_CACHE_PATH or ~/.cache)
+        max_bytes: Size bound for stored responses before LRU eviction
+        batch_queue_path: Queue file for collect mode (default: next to the cache file)
+    """
+    global _mode, _cache_path, _max_bytes, _cache, _batch_queue_path, _batch_queue
+    if mode not in CACHE_MODES:
+        raise ValueError(f"Unknown LLM cache mode '{mode}'. Choose from: {', '.join(CACHE_MODES)}")
+    with _config_lock:
+        if _cache is not None:
+            _cache.close()
+        _mode = mode
+        _cache_path = Path(cache_path) if cache_path else None
+        _max_bytes = max_bytes or DEFAULT_MAX_BYTES
+        _cache = None
+        _batch_queue_path = Path(batch_queue_path) if batch_queue_path else None
+        _batch_queue = None
+
+
+def get_llm_cache_mode() -> str:
+    """Get the active cache mode."""
+    return _mode
+
+
+def get_cache_path() -> Path:
+    """Get the active cache file path."""
+    if _cache_path is not None:
+        return _cache_path
+    env_path = os.environ.get("LLM_CACHE_PATH")
+    return Path(env_path) if env_path else DEFAULT_CACHE_PATH
+
+
+def get_llm_cache() -> Optional["LLMResponseCache"]:
+    """Get the shared cache, opening it on first use (None when mode is 'off')."""
+    global _cache
+    if _mode == "off":
+        return None
+    with _config_lock:
+        if _cache is None:
+            _cache = LLMResponseCache(get_cache_path(), max_bytes=_max_bytes)
+        return _cache
+
+
+def get_batch_queue() -> BatchQueue:
+    """Get the collect-mode batch queue, opening it on first use."""
+    global _batch_queue
+    with _config_lock:
+        if _batch_queue is None:
+            path = _batch_queue_path or get_cache_path().with_suffix(".queue.jsonl")
+            _batch_queue = BatchQueue(path)
+        return _batch_queue
+
+
+def get_llm_cache_stats() -> Dict[str, Any]:
+    """Get process-wide hit/miss/write/queued counts for the response cache."""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["mode"] = _mode
+    return stats
+
+
+def reset_llm_cache_stats() -> None:
+    """Reset the process-wide hit/miss/write/queued counts."""
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0
+
+
+def _count(key: str) -> None:
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def compute_cache_key(
+    model: str,
+    messages: Optional[List[Dict[str, Any]]] = None,
+    config: Optional[LLMConfig] = None,
+    prompt: Optional[str] = None,
+    image_data: Optional[ImageData] = None,
+    mime_type: Optional[MimeType] = None,
+) -> str:
+    """
+    Compute the content address of an LLM call.
+
+    Args:
+        model: Model identifier
+        messages: Chat messages (text calls)
+        config: Generation configuration
+        prompt: Prompt text (image calls)
+        image_data: Raw image bytes, or a list of them (image calls)
+        mime_type: Image MIME type, or one per image
+
+    Returns:
+        SHA-256 hex digest
+    """
+    payload = {
+        "v": KEY_VERSION,
+        "model": model,
+        "messages": messages,
+        "prompt": prompt,
+        "config": (config or LLMConfig()).to_dict(),
+        "image": _image_digest(image_data),
+        "mime_type": mime_type if image_data is not None else None,
+    }
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _image_digest(image_data: Optional[ImageData]) -> Optional[Any]:
+    """SHA-256 of an image, or the list of digests of several images."""
+    if image_data is None:
+        return None
+    if isinstance(image_data, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(image_data).hexdigest()
+    return [hashlib.sha256(data).hexdigest() for data in image_data]
+
+
+class LLMResponseCache:
+    """
+    SQLite-backed response store with size-bounded LRU eviction.
+
+    One connection is shared by all threads and serialized with a lock;
+    entries are small and lookups are by primary key.
+    """
+
+    def __init__(self, path: Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Open (or create) the cache file.
+
+        Args:
+            path: SQLite file path
+            max_bytes: Size bound for stored responses
+        """
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key: str) -> Optional[LLMResponse]:
+        """Get a recorded response, or None on a miss."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT model, content, usage, finish_reason FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+        model, content, usage, finish_reason = row
+        return LLMResponse(
+            content=content,
+            model=model,
+            usage=json.loads(usage) if usage else None,
+            finish_reason=finish_reason,
+        )
+
+    def put(self, key: str, response: LLMResponse) -> None:
+        """Record a response, evicting least-recently-used entries if needed."""
+        usage = json.dumps(response.usage) if response.usage else None
+        size = len(response.content.encode("utf-8")) + len(usage or "")
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, model, content, usage, finish_reason, size, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, response.model, response.content, usage, response.finish_reason, size, now, now),
+            )
+            self._size += size - (old[0] if old else 0)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Drop least-recently-used entries until under the size target (lock held)."""
+        target = self.max_bytes * _EVICT_TARGET
+        evicted = 0
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall()
+        for key, size in rows:
+            if self._size <= target:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._size -= size
+            evicted += 1
+        logger.debug(f"Evicted {evicted} LLM cache entries from {self.path}")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    @property
+    def size_bytes(self) -> int:
+        """Total size of stored responses."""
+        return self._size
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def __repr__(self) -> str:
+        return f"LLMResponseCache('{self.path}', size={self._size})"
+
+
+class CachedLLMProvider:
+    """
+    Provider wrapper that serves generate()/generate_with_image() from the
+    response cache.
+
+    The wrapped provider is only constructed on a miss, so replay and
+    collect runs need no API keys. Other attributes are delegated to the
+    wrapped provider.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        provider_factory: Callable[[], LLMProvider],
+        cache: "LLMResponseCache",
+        mode: str,
+    ):
+        """
+        Args:
+            model: Model identifier
+            provider_factory: Returns the real provider (called on first miss)
+            cache: Response store
+            mode: 'read', 'write', 'replay' or 'collect'
+        """
+        self.model = model
+        self.cache = cache
+        self.mode = mode
+        self._provider_factory = provider_factory
+        self._provider: Optional[LLMProvider] = None
+
+    @property
+    def provider(self) -> LLMProvider:
+        """The wrapped provider."""
+        if self._provider is None:
+            self._provider = self._provider_factory()
+        return self._provider
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.provider, name)
+
+    def __repr__(self) -> str:
+        return f"CachedLLMProvider(model='{self.model}', mode='{self.mode}')"
+
+    def _lookup(self, key: str, description: str) -> Optional[LLMResponse]:
+        response = self.cache.get(key)
+        if response is not None:
+            _count("hits")
+            logger.debug(f"LLM cache hit for {self.model} {description} ({key[:12]})")
+            return response
+        _count("misses")
+        if self.mode == "replay":
+            message = (
+                f"LLM cache miss in replay mode: {self.model} {description} "
+                f"(key {key[:12]}) has no recorded response in {self.cache.path}"
+            )
+            logger.error(message)
+            raise LLMCacheMissError(message)
+        return None
+
+    def _defer(self, request: BatchRequest, description: str) -> None:
+        """Queue a missed call for a provider batch and stop the caller."""
+        queue = get_batch_queue()
+        if queue.add(request):
+            _count("queued")
+        raise LLMBatchPendingError(
+            f"LLM call queued for batch: {self.model} {description} "
+            f"(key {request.key[:12]}) in {queue.path}"
+        )
+
+    def _record(self, key: str, response: LLMResponse) -> LLMResponse:
+        if self.mode == "write" and response.content:
+            self.cache.put(key, response)
+            _count("writes")
+        return response
+
+    def generate(self, messages: List[Dict[str, Any]], config: Optional[LLMConfig] = None) -> LLMResponse:
+        """Cached LLMProvider.generate()."""
+        key = compute_cache_key(self.model, messages=messages, config=config)
+        response = self._lookup(key, "text call")
+        if response is None and self.mode == "collect":
+            self._defer(BatchRequest.for_text(key, self.model, messages, config), "text call")
+        if response is None:
+            response = self._record(key, self.provider.generate(messages, config))
+        return response
+
+    def generate_with_image(
+        self,
+        prompt: str,
+        image_data: ImageData,
+        mime_type: MimeType = "image/png",
+        config: Optional[LLMConfig] = None,
+    ) -> LLMResponse:
+        """Cached LLMProvider.generate_with_image()."""
+        key = compute_cache_key(
+            self.model, config=config, prompt=prompt, image_data=image_data, mime_type=mime_type
+        )
+        response = self._lookup(key, "image call")
+        if response is None and self.mode == "collect":
+            self._defer(
+                BatchRequest.for_image(key, self.model, prompt, image_data, mime_type, config), "image call"
+            )
+        if response is None:
+            response = self._record(
+                key, self.provider.generate_with_image(prompt, image_data, mime_type, config)
+            )
+        return response
+
+    async def agenerate(
+        self, messages: List[Dict[str, Any]], config: Optional[LLMConfig] = None
+    ) -> LLMResponse:
+        """Cached LLMProvider.agenerate()."""
+        key = compute_cache_key(self.model, messages=messages, config=config)
+        response = self._lookup(key, "text call")
+        if response is None and self.mode == "collect":
+            self._defer(BatchRequest.for_text(key, self.model, messages, config), "text call")
+        if response is None:
+            response = self._record(key, await self.provider.agenerate(messages, config))
+        return response
+
+    async def agenerate_with_image(
+        self,
+        prompt: str,
+        image_data: ImageData,
+        mime_type: MimeType = "image/png",
+        config: Optional[LLMConfig] = None,
+    ) -> LLMResponse:
+        """Cached LLMProvider.agenerate_with_image()."""
+        key = compute_cache_key(
+            self.model, config=config, prompt=prompt, image_data=image_data, mime_type=mime_type
+        )
+        response = self._lookup(key, "image call")
+        if response is None and self.mode == "collect":
+            self._defer(
+                BatchRequest.for_image(key, self.model, prompt, image_data, mime_type, config), "image call"
+            )
+        if response is None:
+            response = self._record(
+                key, await self.provider.agenerate_with_image(prompt, image_data, mime_type, config)
+            )
+        return response
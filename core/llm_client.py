@@ -16,11 +16,17 @@ Usage:
 """
 
 import os
+import time
 from pathlib import Path
 from typing import Optional, List, Dict, Any
 from dataclasses import dataclass
 from dotenv import load_dotenv
 
+from .json_utils import parse_llm_json
+from .model_router import model_router
+from .prompt_compaction import compact_messages
+from .page_images import ImageSource, load_page_image
+
 # Load environment variables once at module level
 _env_loaded = False
 
@@ -42,10 +48,22 @@ try:
         LLMResponse,
         OpenAIProvider,
         GeminiProvider,
+        provider_pool,
+        hedge_provider,
+        usage_tracker,
+        call_extractor,
+        DEFAULT_MAX_CONTINUATIONS,
+        generate_with_continuation,
+        agenerate_with_continuation,
     )
+    from .llm_cache import CachedLLMProvider, LLMCacheMissError, get_llm_cache, get_llm_cache_mode
     PROVIDER_LAYER_AVAILABLE = True
 except ImportError:
     PROVIDER_LAYER_AVAILABLE = False
+    DEFAULT_MAX_CONTINUATIONS = 0
+    
+    class LLMCacheMissError(RuntimeError):
+        """Raised in replay mode when a call has no recorded response."""
     
     # Minimal fallback definitions
     @dataclass
@@ -68,6 +86,11 @@ def get_llm_client(model_name: str, api_key: Optional[str] = None):
     Get a configured LLM client for the specified model.
     
     This is the single entry point for obtaining LLM clients across the pipeline.
+    Providers are pooled process-wide, so repeated calls for the same model and
+    key share one SDK client and its keep-alive HTTP connections. When the LLM
+    response cache is enabled (see core.llm_cache), the provider is wrapped in
+    a CachedLLMProvider; with hedged requests configured (see
+    llm_providers.configure_hedging), in a HedgedProvider.
     
     Args:
         model_name: Model identifier (e.g., 'gpt-4o', 'gemini-2.5-pro', 'gpt-5.1')
@@ -93,7 +116,16 @@ def get_llm_client(model_name: str, api_key: Optional[str] = None):
             "Ensure llm_providers.py is in the project root."
         )
     
-    return LLMProviderFactory.auto_detect(model_name, api_key=api_key)
+    cache = get_llm_cache()
+    if cache is not None:
+        return CachedLLMProvider(
+            model_name,
+            lambda: hedge_provider(provider_pool.get(model_name, api_key=api_key)),
+            cache,
+            get_llm_cache_mode(),
+        )
+    
+    return hedge_provider(provider_pool.get(model_name, api_key=api_key))
 
 
 def get_default_model() -> str:
@@ -170,6 +202,7 @@ def generate_text(
     temperature: float = 0.0,
     max_tokens: Optional[int] = None,
     extractor_name: Optional[str] = None,
+    max_continuations: int = 0,
 ) -> str:
     """
     Simple text generation helper.
@@ -181,13 +214,207 @@ def generate_text(
         temperature: Generation temperature (ignored if extractor_name provided)
         max_tokens: Maximum output tokens (defaults to model's max)
         extractor_name: Optional extractor name to use task-specific config
+        max_continuations: Continuation requests for a JSON response cut off
+            at max_tokens (see llm_providers.generate_with_continuation)
         
     Returns:
         Generated text content
     """
     if model_name is None:
         model_name = get_default_model()
+    model_name = model_router.route(extractor_name, model_name)
+    
+    config = _build_llm_config(model_name, json_mode, temperature, max_tokens, extractor_name)
+    messages = compact_prompt(messages, model_name, extractor_name)
+    client = get_llm_client(model_name)
+    start = time.monotonic()
+    try:
+        with call_extractor(extractor_name):
+            response = generate_with_continuation(client, messages, config, max_continuations)
+    except Exception:
+        _record_route(extractor_name, model_name, start, None, json_mode, error=True)
+        raise
+    _record_route(extractor_name, model_name, start, response, json_mode)
+    return response.content
+
+
+async def agenerate_text(
+    messages: List[Dict[str, str]],
+    model_name: Optional[str] = None,
+    json_mode: bool = False,
+    temperature: float = 0.0,
+    max_tokens: Optional[int] = None,
+    extractor_name: Optional[str] = None,
+    max_continuations: int = 0,
+) -> str:
+    """
+    Async version of generate_text() using the provider's native async client.
+    
+    Many calls can be awaited concurrently (e.g. with asyncio.gather) from a
+    single event loop without a thread per request.
+    """
+    if model_name is None:
+        model_name = get_default_model()
+    model_name = model_router.route(extractor_name, model_name)
+    
+    config = _build_llm_config(model_name, json_mode, temperature, max_tokens, extractor_name)
+    messages = compact_prompt(messages, model_name, extractor_name)
+    client = get_llm_client(model_name)
+    start = time.monotonic()
+    try:
+        with call_extractor(extractor_name):
+            response = await agenerate_with_continuation(client, messages, config, max_continuations)
+    except Exception:
+        _record_route(extractor_name, model_name, start, None, json_mode, error=True)
+        raise
+    _record_route(extractor_name, model_name, start, response, json_mode)
+    return response.content
+
+
+def generate_with_images(
+    prompt: str,
+    images: List[ImageSource],
+    model_name: Optional[str] = None,
+    json_mode: bool = True,
+    temperature: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+    extractor_name: Optional[str] = None,
+) -> LLMResponse:
+    """
+    Vision generation with one or more page images in a single request.
+    
+    Goes through the provider layer like generate_text(): pooled client,
+    response cache, shared rate limits, retries, hedging and usage tracking.
+    
+    Args:
+        prompt: The prompt text
+        images: Image paths or in-memory PageImages, sent in order
+        model_name: Model to use (defaults to environment/gemini-2.5-pro)
+        json_mode: Whether to request JSON output
+        temperature: Generation temperature (defaults to the task config's
+            with extractor_name, else 0.0)
+        max_tokens: Maximum output tokens (defaults to model's max)
+        extractor_name: Optional extractor name to use task-specific config
+        
+    Returns:
+        LLMResponse (finish_reason tells a blocked response from an empty one)
+    """
+    if model_name is None:
+        model_name = get_default_model()
+    _ensure_env_loaded()
+    
+    config = _build_llm_config(model_name, json_mode, temperature or 0.0, max_tokens, extractor_name)
+    if temperature is not None:
+        config.temperature = temperature
+    pages = [load_page_image(image) for image in images]
+    client = get_llm_client(model_name)
+    start = time.monotonic()
+    try:
+        with call_extractor(extractor_name):
+            response = client.generate_with_image(
+                prompt, [page.data for page in pages], [page.mime_type for page in pages], config
+            )
+    except Exception:
+        _record_route(extractor_name, model_name, start, None, json_mode, error=True)
+        raise
+    _record_route(extractor_name, model_name, start, response, json_mode)
+    return response
+
+
+async def agenerate_with_images(
+    prompt: str,
+    images: List[ImageSource],
+    model_name: Optional[str] = None,
+    json_mode: bool = True,
+    temperature: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+    extractor_name: Optional[str] = None,
+) -> LLMResponse:
+    """Async version of generate_with_images()."""
+    if model_name is None:
+        model_name = get_default_model()
+    _ensure_env_loaded()
     
+    config = _build_llm_config(model_name, json_mode, temperature or 0.0, max_tokens, extractor_name)
+    if temperature is not None:
+        config.temperature = temperature
+    pages = [load_page_image(image) for image in images]
+    client = get_llm_client(model_name)
+    start = time.monotonic()
+    try:
+        with call_extractor(extractor_name):
+            response = await client.agenerate_with_image(
+                prompt, [page.data for page in pages], [page.mime_type for page in pages], config
+            )
+    except Exception:
+        _record_route(extractor_name, model_name, start, None, json_mode, error=True)
+        raise
+    _record_route(extractor_name, model_name, start, response, json_mode)
+    return response
+
+
+def compact_prompt(
+    messages: List[Dict[str, Any]],
+    model_name: str,
+    extractor_name: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Compact a prompt before dispatch and enforce the task's input token budget.
+    
+    The budget is max_input_tokens of the extractor's task type in
+    llm_config.yaml. Tokens saved are recorded in usage_tracker
+    (token_usage.json). See core.prompt_compaction.
+    """
+    budget = None
+    if extractor_name:
+        from extraction.llm_task_config import get_llm_task_config
+        budget = get_llm_task_config(extractor_name, model=model_name).max_input_tokens
+    compacted, stats = compact_messages(messages, model_name, budget)
+    if stats.tokens_before:
+        usage_tracker.add_compaction(
+            model_name, stats.tokens_before, stats.tokens_after,
+            task=extractor_name, truncated=stats.truncated,
+        )
+    return compacted
+
+
+def _record_route(
+    extractor_name: Optional[str],
+    model_name: str,
+    start: float,
+    response: Optional[LLMResponse],
+    json_mode: bool,
+    error: bool = False,
+) -> None:
+    """Record a task's call in the model routing statistics (see core.model_router)."""
+    if not extractor_name:
+        return
+    json_valid = None
+    if response is not None and json_mode:
+        json_valid = parse_llm_json(response.content) is not None
+    model_router.record_call(
+        extractor_name, model_name, time.monotonic() - start,
+        usage=response.usage if response is not None else None,
+        json_valid=json_valid, error=error,
+    )
+
+
+def get_max_continuations() -> int:
+    """Default continuation requests for truncated JSON responses (env LLM_MAX_CONTINUATIONS)."""
+    value = os.environ.get("LLM_MAX_CONTINUATIONS")
+    if value is None or not value.strip().isdigit():
+        return DEFAULT_MAX_CONTINUATIONS
+    return int(value)
+
+
+def _build_llm_config(
+    model_name: str,
+    json_mode: bool,
+    temperature: float,
+    max_tokens: Optional[int],
+    extractor_name: Optional[str],
+) -> LLMConfig:
+    """Build the LLMConfig for a call, from task config when extractor_name is given."""
     # Use task config if extractor_name provided
     if extractor_name:
         from extraction.llm_task_config import get_llm_task_config, to_llm_config
@@ -196,19 +423,16 @@ def generate_text(
         # Override max_tokens if explicitly provided
         if max_tokens is not None:
             config.max_tokens = max_tokens
-    else:
-        # Use model's max if not specified
-        if max_tokens is None:
-            max_tokens = _get_max_tokens_for_model(model_name)
-        config = LLMConfig(
-            temperature=temperature,
-            json_mode=json_mode,
-            max_tokens=max_tokens,
-        )
+        return config
     
-    client = get_llm_client(model_name)
-    response = client.generate(messages, config)
-    return response.content
+    # Use model's max if not specified
+    if max_tokens is None:
+        max_tokens = _get_max_tokens_for_model(model_name)
+    return LLMConfig(
+        temperature=temperature,
+        json_mode=json_mode,
+        max_tokens=max_tokens,
+    )
 
 
 # Legacy compatibility - direct client access
@@ -239,6 +463,22 @@ def get_gemini_client(model_name: str = "gemini-2.5-pro"):
     return None
 
 
+def build_prompt_messages(prompt: str, context: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Build chat messages for a prompt, with optional protocol context first.
+    
+    The context goes into a leading message marked {"cache": True} so the
+    provider can serve it from its prompt cache; the task instructions follow.
+    Extractors reading the same protocol pages then share one cached prefix.
+    """
+    if context is None:
+        return [{"role": "user", "content": prompt}]
+    return [
+        {"role": "user", "content": f"PROTOCOL CONTENT:\n\n{context}", "cache": True},
+        {"role": "user", "content": prompt},
+    ]
+
+
 # Convenience functions for simple LLM calls
 def call_llm(
     prompt: str,
@@ -247,6 +487,8 @@ def call_llm(
     temperature: float = 0.0,
     max_tokens: Optional[int] = None,
     extractor_name: Optional[str] = None,
+    context: Optional[str] = None,
+    max_continuations: Optional[int] = None,
 ) -> Dict[str, Any]:
     """
     Simple LLM call with a single prompt.
@@ -258,6 +500,9 @@ def call_llm(
         temperature: Generation temperature (ignored if extractor_name provided)
         max_tokens: Maximum output tokens (defaults to model's max: 65536 for Gemini)
         extractor_name: Optional extractor name to use task-specific config from llm_config.yaml
+        context: Optional protocol text, sent before the prompt as a cacheable prefix
+        max_continuations: Continuations requested if a JSON response is cut off at
+            max_tokens, joined into one response (default: get_max_continuations())
         
     Returns:
         Dict with 'response' key containing the generated text
@@ -265,7 +510,7 @@ def call_llm(
     if model_name is None:
         model_name = get_default_model()
     
-    messages = [{"role": "user", "content": prompt}]
+    messages = build_prompt_messages(prompt, context)
     
     try:
         content = generate_text(
@@ -275,15 +520,18 @@ def call_llm(
             temperature=temperature,
             max_tokens=max_tokens,
             extractor_name=extractor_name,
+            max_continuations=get_max_continuations() if max_continuations is None else max_continuations,
         )
         return {"response": content}
+    except LLMCacheMissError:
+        raise
     except Exception as e:
         return {"error": str(e)}
 
 
 def call_llm_with_image(
     prompt: str,
-    image_path: str,
+    image_path: ImageSource,
     model_name: Optional[str] = None,
     json_mode: bool = True,
 ) -> Dict[str, Any]:
@@ -294,33 +542,23 @@ def call_llm_with_image(
     
     Args:
         prompt: The prompt text
-        image_path: Path to the image file
+        image_path: Path to the image file, or an in-memory PageImage
         model_name: Model to use (defaults to environment/gemini-2.5-pro)
         json_mode: Whether to request JSON output
         
     Returns:
         Dict with 'response' key containing the generated text
     """
-    from pathlib import Path
-    
     if model_name is None:
         model_name = get_default_model()
     
     _ensure_env_loaded()
     
     try:
-        # Read image data
-        image_data = Path(image_path).read_bytes()
-        
-        # Detect MIME type from extension
-        suffix = Path(image_path).suffix.lower()
-        mime_type = {
-            '.png': 'image/png',
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg',
-            '.gif': 'image/gif',
-            '.webp': 'image/webp',
-        }.get(suffix, 'image/png')
+        # Shared in-memory image buffer (file is read at most once)
+        image = load_page_image(image_path)
+        image_data = image.data
+        mime_type = image.mime_type
         
         # Use provider layer for consistent handling
         client = get_llm_client(model_name)
@@ -335,5 +573,85 @@ def call_llm_with_image(
         
         return {"response": response.content}
             
+    except LLMCacheMissError:
+        raise
+    except Exception as e:
+        return {"error": str(e)}
+
+
+async def acall_llm(
+    prompt: str,
+    model_name: Optional[str] = None,
+    json_mode: bool = True,
+    temperature: float = 0.0,
+    max_tokens: Optional[int] = None,
+    extractor_name: Optional[str] = None,
+    context: Optional[str] = None,
+    max_continuations: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Async version of call_llm().
+    
+    Example:
+        >>> results = await asyncio.gather(*(acall_llm(p) for p in prompts))
+    
+    Returns:
+        Dict with 'response' key containing the generated text
+    """
+    if model_name is None:
+        model_name = get_default_model()
+    
+    messages = build_prompt_messages(prompt, context)
+    
+    try:
+        content = await agenerate_text(
+            messages=messages,
+            model_name=model_name,
+            json_mode=json_mode,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            extractor_name=extractor_name,
+            max_continuations=get_max_continuations() if max_continuations is None else max_continuations,
+        )
+        return {"response": content}
+    except LLMCacheMissError:
+        raise
+    except Exception as e:
+        return {"error": str(e)}
+
+
+async def acall_llm_with_image(
+    prompt: str,
+    image_path: ImageSource,
+    model_name: Optional[str] = None,
+    json_mode: bool = True,
+) -> Dict[str, Any]:
+    """
+    Async version of call_llm_with_image().
+    
+    Returns:
+        Dict with 'response' key containing the generated text
+    """
+    if model_name is None:
+        model_name = get_default_model()
+    
+    _ensure_env_loaded()
+    
+    try:
+        image = load_page_image(image_path)
+        client = get_llm_client(model_name)
+        config = LLMConfig(json_mode=json_mode, temperature=0.0)
+        
+        response = await client.agenerate_with_image(
+            prompt=prompt,
+            image_data=image.data,
+            mime_type=image.mime_type,
+            config=config,
+        )
+        
+        return {"response": response.content}
+    
+    except LLMCacheMissError:
+        raise
     except Exception as e:
         return {"error": str(e)}
@@ -0,0 +1,162 @@
+"""
+Model Routing by Task Cost/Latency Profile.
+
+Every extraction task normally runs on the single --model. The routing
+table (model_routing in llm_config.yaml) sends cheap, short structured
+tasks - entity resolution, execution type and footnote classification,
+abbreviations - to a fast small model from the same provider, while
+SoA/vision and long extractions stay on the large model.
+
+The router also records, per (task, model): calls, latency, token usage,
+whether the JSON response parsed, and the pass rate of the extractor's own
+validation of the result (record_route_validation). main_v3.py writes
+these to model_routing.json so the table can be tuned from data.
+
+Usage:
+    from core.model_router import configure_model_routing, model_router
+
+    configure_model_routing(enabled=True)
+    model = model_router.route("entity_resolver", "gemini-2.5-pro")  # -> gemini-2.5-flash
+"""
+
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRouter:
+    """
+    Routes extraction tasks to models and records per-route outcomes.
+
+    Routing is off by default; statistics are recorded for every call made
+    with an extractor name either way, so routed and unrouted runs can be
+    compared.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.enabled = False
+        self._routes: Optional[Dict[str, Dict[str, str]]] = None
+        self._last_model: Dict[str, str] = {}
+        self._stats: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    def configure(self, enabled: bool, routes: Optional[Dict[str, Dict[str, str]]] = None) -> None:
+        """
+        Args:
+            enabled: Route tasks listed in the routing table
+            routes: {extractor: {provider: model}} (default: from llm_config.yaml)
+        """
+        with self._lock:
+            self.enabled = enabled
+            self._routes = routes
+
+    @property
+    def routes(self) -> Dict[str, Dict[str, str]]:
+        """Routing table by extractor name, loaded from llm_config.yaml on first use."""
+        if self._routes is None:
+            from extraction.llm_task_config import get_model_routes
+            self._routes = get_model_routes()
+        return self._routes
+
+    def route(self, extractor_name: Optional[str], model: str) -> str:
+        """Model to use for a task, given the run's model."""
+        if not self.enabled or not extractor_name:
+            return model
+        from extraction.llm_task_config import detect_provider
+
+        routed = self.routes.get(extractor_name, {}).get(detect_provider(model) or "")
+        if routed and routed != model:
+            logger.debug(f"Routing {extractor_name} to {routed} (instead of {model})")
+            return routed
+        return model
+
+    def _entry(self, extractor_name: str, model: str) -> Dict[str, Any]:
+        """Stats entry for a route (lock held)."""
+        key = (extractor_name, model)
+        if key not in self._stats:
+            self._stats[key] = {
+                "calls": 0, "errors": 0, "latency_seconds": 0.0,
+                "prompt_tokens": 0, "completion_tokens": 0,
+                "json_valid": 0, "validations": 0, "validation_passed": 0,
+            }
+        return self._stats[key]
+
+    def record_call(
+        self,
+        extractor_name: str,
+        model: str,
+        latency: float,
+        usage: Optional[Dict[str, int]] = None,
+        json_valid: Optional[bool] = None,
+        error: bool = False,
+    ) -> None:
+        """Record one LLM call made for a task."""
+        with self._lock:
+            entry = self._entry(extractor_name, model)
+            entry["calls"] += 1
+            entry["errors"] += int(error)
+            entry["latency_seconds"] += latency
+            entry["prompt_tokens"] += (usage or {}).get("prompt_tokens", 0) or 0
+            entry["completion_tokens"] += (usage or {}).get("completion_tokens", 0) or 0
+            entry["json_valid"] += int(bool(json_valid))
+            self._last_model[extractor_name] = model
+
+    def record_validation(self, extractor_name: str, passed: bool, model: Optional[str] = None) -> None:
+        """Record whether a task's result passed the extractor's own validation."""
+        with self._lock:
+            model = model or self._last_model.get(extractor_name)
+            if model is None:
+                return
+            entry = self._entry(extractor_name, model)
+            entry["validations"] += 1
+            entry["validation_passed"] += int(passed)
+
+    def get_summary(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Per-task, per-model statistics with mean latency and pass rates."""
+        with self._lock:
+            stats = {key: dict(entry) for key, entry in self._stats.items()}
+        summary: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for (extractor_name, model), entry in sorted(stats.items()):
+            calls = entry["calls"]
+            entry["mean_latency_seconds"] = round(entry["latency_seconds"] / calls, 3) if calls else None
+            entry["json_valid_rate"] = round(entry["json_valid"] / calls, 3) if calls else None
+            entry["validation_pass_rate"] = (
+                round(entry["validation_passed"] / entry["validations"], 3) if entry["validations"] else None
+            )
+            entry["latency_seconds"] = round(entry["latency_seconds"], 3)
+            summary.setdefault(extractor_name, {})[model] = entry
+        return summary
+
+    def save(self, path: Path) -> None:
+        """Write the routing table in use and the per-route statistics."""
+        data = {
+            "routing_enabled": self.enabled,
+            "routes": self.routes if self.enabled else {},
+            "tasks": self.get_summary(),
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+
+    def reset_stats(self) -> None:
+        """Drop all recorded statistics."""
+        with self._lock:
+            self._stats.clear()
+            self._last_model.clear()
+
+
+# Global router instance
+model_router = ModelRouter()
+
+
+def configure_model_routing(enabled: bool = False, routes: Optional[Dict[str, Dict[str, str]]] = None) -> None:
+    """Enable or disable routing of tasks to the models in the routing table."""
+    model_router.configure(enabled, routes)
+
+
+def record_route_validation(extractor_name: str, passed: bool) -> None:
+    """Report whether a task's LLM result passed validation (for routing statistics)."""
+    model_router.record_validation(extractor_name, passed)
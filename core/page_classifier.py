@@ -0,0 +1,419 @@
+"""
+Page Classifier - single-pass section detection for protocol pages.
+
+Page finders register their section keywords and patterns here once, at
+import time. Each page is then classified once per run: every literal
+phrase from every section is matched in one Aho-Corasick pass over the
+page, and the remaining structural patterns (word boundaries, digits,
+character classes) are each evaluated once and shared by all sections that
+use them. The result is a per-page feature vector that the find_*_pages
+functions query instead of re-scanning the text themselves.
+
+Literal phrases are matched against whitespace-normalized lowercase text, so
+a pattern such as "primary\\s+objective" is handled by the automaton rather
+than by a regex; literal keywords are checked against the original text and
+keep plain substring semantics. Section counts reproduce re.findall() on the
+section's alternation (leftmost match wins, earlier terms win ties, no
+overlaps).
+
+Usage:
+    from core.page_classifier import register_section_patterns
+    from core.pdf_document import get_protocol_document
+
+    register_section_patterns("objectives", [r'primary\\s+objective', r'endpoint'])
+
+    doc = get_protocol_document("protocol.pdf")
+    for page_num, features in doc.iter_page_features(max_pages=50):
+        if features.count("objectives") >= 2:
+            ...
+"""
+
+import bisect
+import itertools
+import logging
+import re
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+Span = Tuple[int, int]
+
+_WHITESPACE_RUN = re.compile(r'\s+')
+_COLLAPSED_RUN = re.compile(r'\s{2,}|[^\S ]')
+
+# Tokens allowed in a pattern that can be matched as a literal phrase
+_LITERAL_TOKEN = re.compile(r'\\s\+|\\[^A-Za-z0-9]|[^\\.^$*+?{}\[\]|()]')
+_SIMPLE_GROUP = re.compile(r'\((?:\?:)?([^()]*)\)')
+_OPTIONAL_CHAR = re.compile(r'(?<!\\)([A-Za-z0-9])\?')
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton reporting every occurrence of every keyword."""
+
+    def __init__(self, keywords: Sequence[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        self._lengths = [len(k) for k in keywords]
+
+        for idx, keyword in enumerate(keywords):
+            if not keyword:
+                continue
+            state = 0
+            for ch in keyword:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                    self._goto[state][ch] = nxt
+                state = nxt
+            self._out[state].append(idx)
+
+        # Breadth-first failure links
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def keyword_length(self, idx: int) -> int:
+        """Length of the keyword at index idx."""
+        return self._lengths[idx]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """Yield (start, keyword index) for every occurrence in text."""
+        goto, fail, out, lengths = self._goto, self._fail, self._out, self._lengths
+        root = goto[0]
+        state = 0
+        for i, ch in enumerate(text):
+            if state == 0 and ch not in root:
+                continue
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for idx in out[state]:
+                yield i - lengths[idx] + 1, idx
+
+
+def _literal_phrase(pattern: str) -> Optional[str]:
+    """Convert a regex without metacharacters (other than \\s+) to a phrase."""
+    parts = []
+    pos = 0
+    while pos < len(pattern):
+        match = _LITERAL_TOKEN.match(pattern, pos)
+        if match is None:
+            return None
+        token = match.group()
+        if token == r'\s+' or token.isspace():
+            parts.append(' ')
+        elif token.startswith('\\'):
+            parts.append(token[1])
+        else:
+            parts.append(token)
+        pos = match.end()
+    return ''.join(parts).lower()
+
+
+def _literal_alternatives(pattern: str) -> Optional[List[str]]:
+    """
+    Expand a pattern into literal phrases, if possible.
+
+    Handles plain phrases, optional characters and non-nested groups of
+    literal alternatives, e.g. r'pk\\s+(?:sampling|profile)s?' expands to
+    ['pk samplings', 'pk sampling', 'pk profiles', 'pk profile'].
+    """
+    pattern = _OPTIONAL_CHAR.sub(r'(?:\1|)', pattern)
+    pieces: List[List[str]] = []
+    pos = 0
+    for group in _SIMPLE_GROUP.finditer(pattern):
+        # A quantified group (e.g. "(s)?") is not a literal
+        if group.end() < len(pattern) and pattern[group.end()] in '*+?{':
+            return None
+        head = _literal_phrase(pattern[pos:group.start()])
+        options = [_literal_phrase(o) for o in group.group(1).split('|')]
+        if head is None or any(o is None for o in options):
+            return None
+        pieces.append([head])
+        pieces.append(options)
+        pos = group.end()
+    tail = _literal_phrase(pattern[pos:])
+    if tail is None:
+        return None
+    pieces.append([tail])
+
+    phrases = [''.join(combo) for combo in itertools.product(*pieces)]
+    if any(not p.strip() for p in phrases):
+        return None
+    return phrases
+
+
+@dataclass
+class _Term:
+    """A registered keyword or pattern, shared by all sections using it."""
+    key: str
+    phrases: Optional[List[str]]          # Literal phrases (Aho-Corasick)
+    regex: Optional["re.Pattern"] = None  # Structural pattern
+    verbatim: bool = False                # Keyword must match the raw text exactly
+
+
+class PageFeatures:
+    """
+    Feature vector for one page: match spans for every registered term.
+
+    Spans are (start, end) offsets into the page's lowercased text.
+    """
+
+    def __init__(self, classifier: "PageClassifier", spans: Dict[int, List[Span]]):
+        self._classifier = classifier
+        self._spans = spans
+
+    def _terms(self, section: str) -> List[int]:
+        terms = self._classifier.get_section_terms(section)
+        if terms is None:
+            raise KeyError(f"Unknown page section: {section}")
+        return terms
+
+    def count(self, section: str) -> int:
+        """
+        Number of matches of a section's patterns on this page.
+
+        Equivalent to len(re.findall('|'.join(patterns), text)).
+        """
+        candidates = []
+        for order, term_id in enumerate(self._terms(section)):
+            for start, end in self._spans.get(term_id, ()):
+                candidates.append((start, order, end))
+        candidates.sort()
+
+        count = 0
+        position = 0
+        for start, _, end in candidates:
+            if start < position:
+                continue
+            count += 1
+            position = max(end, start + 1)
+        return count
+
+    def has(self, section: str) -> bool:
+        """Whether any of a section's patterns match this page."""
+        return any(self._spans.get(t) for t in self._terms(section))
+
+    def distinct(self, section: str) -> int:
+        """Number of a section's keywords/patterns present on this page."""
+        return sum(1 for t in self._terms(section) if self._spans.get(t))
+
+    def term_counts(self, section: str) -> List[int]:
+        """Number of matches of each of a section's keywords/patterns, in order."""
+        return [len(self._spans.get(t, ())) for t in self._terms(section)]
+
+    def matched_terms(self, section: str) -> List[str]:
+        """The section's keywords/patterns present on this page."""
+        return [
+            self._classifier.get_term_key(t)
+            for t in self._terms(section) if self._spans.get(t)
+        ]
+
+
+class PageClassifier:
+    """Registry of section patterns and the single-pass page classifier."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._terms: List[_Term] = []
+        self._term_ids: Dict[str, int] = {}
+        self._sections: Dict[str, List[int]] = {}
+        self._version = 0
+        self._matcher: Optional[Tuple[int, AhoCorasick, List[int], List[int]]] = None
+
+    @property
+    def version(self) -> int:
+        """Incremented whenever a section is registered or changed."""
+        return self._version
+
+    def _add_pattern(self, pattern: str, flags: int) -> int:
+        key = f"{flags}:{pattern}"
+        term_id = self._term_ids.get(key)
+        if term_id is None:
+            phrases = _literal_alternatives(pattern) if not flags else None
+            if phrases is not None:
+                term = _Term(key=pattern, phrases=phrases)
+            else:
+                term = _Term(key=pattern, phrases=None,
+                             regex=re.compile(pattern, re.IGNORECASE | flags))
+            term_id = len(self._terms)
+            self._terms.append(term)
+            self._term_ids[key] = term_id
+        return term_id
+
+    def register_section(
+        self,
+        name: str,
+        patterns: Sequence[str] = (),
+        keywords: Sequence[str] = (),
+        flags: int = 0,
+    ) -> str:
+        """
+        Register (or replace) a section's patterns.
+
+        Args:
+            name: Section name queried through PageFeatures
+            patterns: Regex patterns, matched case-insensitively
+            keywords: Literal keywords, matched verbatim against lowercased text
+            flags: Extra re flags for the patterns (e.g. re.DOTALL)
+
+        Returns:
+            The section name
+        """
+        with self._lock:
+            term_ids = [self._add_pattern(p, flags) for p in patterns]
+            term_ids += [self._add_literal(k) for k in keywords]
+            if self._sections.get(name) != term_ids:
+                self._sections[name] = term_ids
+                self._version += 1
+        return name
+
+    def _add_literal(self, keyword: str) -> int:
+        key = f"literal:{keyword}"
+        term_id = self._term_ids.get(key)
+        if term_id is None:
+            term_id = len(self._terms)
+            self._terms.append(_Term(
+                key=keyword,
+                phrases=[_WHITESPACE_RUN.sub(' ', keyword)],
+                verbatim=_WHITESPACE_RUN.sub(' ', keyword) != keyword or ' ' in keyword,
+            ))
+            self._term_ids[key] = term_id
+        return term_id
+
+    def get_section_terms(self, name: str) -> Optional[List[int]]:
+        """Term ids registered for a section, in registration order."""
+        return self._sections.get(name)
+
+    def get_term_key(self, term_id: int) -> str:
+        """The keyword or pattern string for a term id."""
+        return self._terms[term_id].key
+
+    @property
+    def sections(self) -> List[str]:
+        """Registered section names."""
+        return list(self._sections)
+
+    def _build_matcher(self) -> Tuple[int, AhoCorasick, List[int], List[int]]:
+        with self._lock:
+            if self._matcher is not None and self._matcher[0] == self._version:
+                return self._matcher
+
+            used = sorted({t for ids in self._sections.values() for t in ids})
+            phrases: List[str] = []
+            phrase_terms: List[int] = []
+            regex_terms: List[int] = []
+            for term_id in used:
+                term = self._terms[term_id]
+                if term.phrases is not None:
+                    for phrase in term.phrases:
+                        phrases.append(phrase)
+                        phrase_terms.append(term_id)
+                else:
+                    regex_terms.append(term_id)
+
+            self._matcher = (self._version, AhoCorasick(phrases), phrase_terms, regex_terms)
+            logger.debug(
+                f"Page classifier: {len(self._sections)} sections, "
+                f"{len(phrases)} literal phrases, {len(regex_terms)} structural patterns"
+            )
+            return self._matcher
+
+    def classify(self, text_lower: str) -> PageFeatures:
+        """
+        Classify a page in one pass.
+
+        Args:
+            text_lower: Lowercased page text
+
+        Returns:
+            PageFeatures for the page
+        """
+        _, automaton, phrase_terms, regex_terms = self._build_matcher()
+        spans: Dict[int, List[Span]] = {}
+
+        # Literal phrases: one Aho-Corasick pass over whitespace-normalized text,
+        # with offsets mapped back to the original text
+        normalized, keys, shifts = _normalize_whitespace(text_lower)
+        for start, phrase_idx in automaton.iter_matches(normalized):
+            end = start + automaton.keyword_length(phrase_idx)
+            raw_start = _to_raw(start, keys, shifts)
+            raw_end = _to_raw(end - 1, keys, shifts) + 1
+            term_id = phrase_terms[phrase_idx]
+            # Keywords keep plain substring semantics: a phrase that only
+            # matched because whitespace was collapsed does not count
+            if self._terms[term_id].verbatim and text_lower[raw_start:raw_end] != self._terms[term_id].key:
+                continue
+            spans.setdefault(term_id, []).append((raw_start, raw_end))
+
+        # Alternatives of one term starting at the same offset: keep the
+        # longest, as the regex would
+        for term_id, term_spans in spans.items():
+            if len(self._terms[term_id].phrases) > 1:
+                longest: Dict[int, int] = {}
+                for start, end in term_spans:
+                    longest[start] = max(end, longest.get(start, end))
+                spans[term_id] = sorted(longest.items())
+
+        # Structural patterns: each evaluated once, shared across sections
+        for term_id in regex_terms:
+            found = [m.span() for m in self._terms[term_id].regex.finditer(text_lower)]
+            if found:
+                spans[term_id] = found
+
+        return PageFeatures(self, spans)
+
+
+def _normalize_whitespace(text: str) -> Tuple[str, List[int], List[int]]:
+    """
+    Collapse whitespace runs to single spaces.
+
+    Returns the normalized text plus the data needed by _to_raw() to map
+    normalized offsets back to offsets in the original text.
+    """
+    keys: List[int] = []
+    shifts: List[int] = []
+    shift = 0
+    for match in _COLLAPSED_RUN.finditer(text):
+        start, end = match.span()
+        # Offsets after this run's single space are shifted by the removed chars
+        keys.append(start - shift + 1)
+        shift += (end - start) - 1
+        shifts.append(shift)
+    if not keys:
+        return text, keys, shifts
+    return _WHITESPACE_RUN.sub(' ', text), keys, shifts
+
+
+def _to_raw(offset: int, keys: List[int], shifts: List[int]) -> int:
+    idx = bisect.bisect_right(keys, offset) - 1
+    return offset + (shifts[idx] if idx >= 0 else 0)
+
+
+# Global classifier used by all page finders
+page_classifier = PageClassifier()
+
+
+def register_section_patterns(name: str, patterns: Sequence[str], flags: int = 0) -> str:
+    """Register a section's regex patterns with the global classifier."""
+    return page_classifier.register_section(name, patterns=patterns, flags=flags)
+
+
+def register_section_keywords(name: str, keywords: Sequence[str]) -> str:
+    """Register a section's literal keywords with the global classifier."""
+    return page_classifier.register_section(name, keywords=keywords)
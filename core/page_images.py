@@ -0,0 +1,453 @@
+"""
+In-Memory Page Images.
+
+Renders PDF pages to PNG once and keeps the encoded bytes (and their
+base64 form) in memory, so header analysis, vision validation and
+metadata vision extraction share the same buffers instead of re-reading
+and re-encoding image files for every provider call. Writing the images
+to disk (e.g. 3_soa_images/ for the web UI) is optional.
+
+Images are registered by path, so callers that still pass file paths get
+the in-memory buffer when one exists and read the file only once
+otherwise.
+
+Render modes:
+    fixed     Whole page at a fixed DPI (default, previous behaviour)
+    adaptive  Crop to the text/table bounding box from MuPDF word boxes
+              and pick the DPI per page from text size and density
+    tiled     As adaptive, and split very wide tables into overlapping
+              vertical-strip tiles
+
+Usage:
+    from core.page_images import render_page_images, summarize_page_images
+
+    images = render_page_images("protocol.pdf", [10, 11], mode="adaptive")
+    report = summarize_page_images(images, model_name="gemini-2.5-pro")
+"""
+
+import base64
+import logging
+import math
+import os
+import struct
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .pdf_document import get_pdf_workers, get_protocol_document, map_page_shards
+
+logger = logging.getLogger(__name__)
+
+# Fewer pages than this are rendered in-process
+PARALLEL_MIN_RENDER_PAGES = 4
+
+RENDER_MODES = ("fixed", "adaptive", "tiled")
+
+# Adaptive resolution: render so a typical text line is about
+# TARGET_LINE_PX pixels tall, within [MIN_DPI, MAX_DPI]
+TARGET_LINE_PX = 20
+MIN_DPI = 96
+MAX_DPI = 200
+DENSE_WORDS_PER_SQ_INCH = 8.0  # Denser pages get DENSE_DPI_BOOST
+DENSE_DPI_BOOST = 1.15
+SPARSE_WORD_COUNT = 40  # Pages with fewer words render at MIN_DPI
+
+# Cropping and tiling geometry
+CROP_MARGIN_PT = 12
+MAX_IMAGE_PIXELS = 2_500_000  # Untiled images are scaled down to fit
+MAX_TILE_WIDTH_PX = 1568
+TILE_MIN_ASPECT = 1.3  # Only tile crops at least this much wider than tall
+TILE_OVERLAP = 0.12  # Fraction of each tile shared with its neighbour
+
+Rect = Tuple[float, float, float, float]
+
+MIME_TYPES = {
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp',
+}
+
+
+@dataclass(eq=False)
+class PageImage:
+    """An encoded page image held in memory."""
+    data: bytes
+    mime_type: str = "image/png"
+    page_num: Optional[int] = None  # 0-indexed source page, if rendered from a PDF
+    path: Optional[str] = None  # File the image was loaded from or saved to
+    dpi: Optional[int] = None
+    clip: Optional[Rect] = None  # Rendered page region in points (None = whole page)
+    tile: Optional[int] = None  # 1-based tile index when a page is split
+    tile_count: int = 1
+    page_rect: Optional[Rect] = None
+    _base64: Optional[str] = field(default=None, repr=False)
+
+    @property
+    def base64(self) -> str:
+        """Base64 encoding of the image bytes (computed once)."""
+        if self._base64 is None:
+            self._base64 = base64.b64encode(self.data).decode('utf-8')
+        return self._base64
+
+    @property
+    def size(self) -> Optional[Tuple[int, int]]:
+        """Pixel (width, height) read from the PNG header, if PNG."""
+        if self.data[:8] == b"\x89PNG\r\n\x1a\n" and len(self.data) >= 24:
+            return struct.unpack(">II", self.data[16:24])
+        return None
+
+    @property
+    def data_url(self) -> str:
+        """Image as a base64 data URL."""
+        return f"data:{self.mime_type};base64,{self.base64}"
+
+    def save(self, path: str) -> str:
+        """Write the image to disk and register it under that path."""
+        Path(path).write_bytes(self.data)
+        self.path = path
+        _register(self)
+        return path
+
+    def __fspath__(self) -> str:
+        if self.path is None:
+            raise TypeError("PageImage has not been saved to disk")
+        return self.path
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+
+ImageSource = Union[str, os.PathLike, PageImage]
+
+# Process-wide store: absolute path -> image
+_images: Dict[str, PageImage] = {}
+_images_lock = threading.Lock()
+
+
+def _register(image: PageImage) -> None:
+    if image.path:
+        with _images_lock:
+            _images[os.path.abspath(image.path)] = image
+
+
+def guess_mime_type(path: str) -> str:
+    """Guess an image MIME type from its file extension (default PNG)."""
+    return MIME_TYPES.get(Path(path).suffix.lower(), 'image/png')
+
+
+def load_page_image(source: ImageSource) -> PageImage:
+    """
+    Get the in-memory image for a PageImage or an image file path.
+
+    Files are read once and kept in memory for later callers.
+
+    Args:
+        source: PageImage or path to an image file
+
+    Returns:
+        PageImage with the encoded bytes
+    """
+    if isinstance(source, PageImage):
+        return source
+
+    path = os.fspath(source)
+    key = os.path.abspath(path)
+    with _images_lock:
+        image = _images.get(key)
+    if image is not None:
+        return image
+
+    image = PageImage(data=Path(path).read_bytes(), mime_type=guess_mime_type(path), path=path)
+    _register(image)
+    return image
+
+
+def clear_page_images() -> None:
+    """Forget all registered in-memory images (call at end of a run)."""
+    with _images_lock:
+        _images.clear()
+
+
+@dataclass
+class RenderSpec:
+    """How to render one image of a page."""
+    page_num: int
+    dpi: int
+    clip: Optional[Rect] = None
+    tile: Optional[int] = None
+    tile_count: int = 1
+
+
+def _text_bbox(words: List[tuple], page_rect: Rect, margin: float) -> Optional[Rect]:
+    """Union of word boxes, padded and clipped to the page."""
+    if not words:
+        return None
+    x0 = min(w[0] for w in words) - margin
+    y0 = min(w[1] for w in words) - margin
+    x1 = max(w[2] for w in words) + margin
+    y1 = max(w[3] for w in words) + margin
+    px0, py0, px1, py1 = page_rect
+    return (max(x0, px0), max(y0, py0), min(x1, px1), min(y1, py1))
+
+
+def choose_page_dpi(words: List[tuple], clip: Rect) -> int:
+    """
+    Pick a render DPI from text size and density.
+
+    The lower-quartile word box height approximates the smallest common
+    line height; the DPI is set so that line is TARGET_LINE_PX tall, then
+    raised for dense tables and dropped to MIN_DPI for sparse pages.
+    """
+    if len(words) < SPARSE_WORD_COUNT:
+        return MIN_DPI
+
+    heights = sorted(w[3] - w[1] for w in words if w[3] > w[1])
+    line_height = heights[len(heights) // 4] if heights else 12.0
+    dpi = TARGET_LINE_PX * 72.0 / max(line_height, 1.0)
+
+    area_sq_inch = ((clip[2] - clip[0]) / 72.0) * ((clip[3] - clip[1]) / 72.0)
+    if area_sq_inch > 0 and len(words) / area_sq_inch >= DENSE_WORDS_PER_SQ_INCH:
+        dpi *= DENSE_DPI_BOOST
+
+    return int(min(MAX_DPI, max(MIN_DPI, round(dpi))))
+
+
+def _split_tiles(clip: Rect, dpi: int) -> List[Rect]:
+    """Split a wide region into overlapping vertical strips."""
+    x0, y0, x1, y1 = clip
+    width, height = x1 - x0, y1 - y0
+    width_px = width * dpi / 72.0
+    if width_px <= MAX_TILE_WIDTH_PX or width < height * TILE_MIN_ASPECT:
+        return [clip]
+
+    max_tile = MAX_TILE_WIDTH_PX * 72.0 / dpi
+    count = math.ceil((width - max_tile * TILE_OVERLAP) / (max_tile * (1 - TILE_OVERLAP)))
+    count = max(2, count)
+    tile_width = width / (count - (count - 1) * TILE_OVERLAP)
+    step = tile_width * (1 - TILE_OVERLAP)
+    return [(x0 + i * step, y0, min(x1, x0 + i * step + tile_width), y1) for i in range(count)]
+
+
+def plan_page_render(doc, page_num: int, mode: str = "fixed", dpi: int = 150) -> List[RenderSpec]:
+    """
+    Plan the image(s) to render for one page.
+
+    Args:
+        doc: ProtocolDocument
+        page_num: 0-indexed page number
+        mode: One of RENDER_MODES
+        dpi: DPI for fixed mode
+
+    Returns:
+        One RenderSpec per image (several for tiled wide tables)
+    """
+    if mode not in RENDER_MODES:
+        raise ValueError(f"Unknown render mode '{mode}' (expected one of {RENDER_MODES})")
+    if mode == "fixed":
+        return [RenderSpec(page_num, dpi)]
+
+    page_rect = doc.get_page_rect(page_num)
+    words = doc.get_page_words(page_num)
+    clip = _text_bbox(words, page_rect, CROP_MARGIN_PT) or page_rect
+    page_dpi = choose_page_dpi(words, clip)
+
+    tiles = _split_tiles(clip, page_dpi) if mode == "tiled" else [clip]
+    if len(tiles) == 1:
+        # Keep a single image within the pixel budget
+        pixels = (clip[2] - clip[0]) * (clip[3] - clip[1]) * (page_dpi / 72.0) ** 2
+        if pixels > MAX_IMAGE_PIXELS:
+            page_dpi = max(MIN_DPI, int(page_dpi * math.sqrt(MAX_IMAGE_PIXELS / pixels)))
+        return [RenderSpec(page_num, page_dpi, clip)]
+
+    return [
+        RenderSpec(page_num, page_dpi, tile, tile=i + 1, tile_count=len(tiles))
+        for i, tile in enumerate(tiles)
+    ]
+
+
+def _render_specs_png(pdf_path: str, pages: List[int], specs: Dict[int, List[RenderSpec]]) -> List[List[bytes]]:
+    """Render the planned images of a page range to PNG bytes in a worker process."""
+    import fitz  # PyMuPDF
+    with fitz.open(pdf_path) as doc:
+        return [
+            [doc[page_num].get_pixmap(dpi=spec.dpi, clip=spec.clip).tobytes("png") for spec in specs[page_num]]
+            for page_num in pages
+        ]
+
+
+def render_page_images(
+    pdf_path: str,
+    pages: List[int],
+    dpi: int = 150,
+    output_dir: Optional[str] = None,
+    prefix: str = "soa_page",
+    one_indexed_names: bool = True,
+    workers: Optional[int] = None,
+    mode: str = "fixed",
+) -> List[PageImage]:
+    """
+    Render PDF pages to in-memory PNG images.
+
+    Pages are rendered concurrently in worker processes (each with its own
+    MuPDF handle) when there are enough of them, otherwise in-process
+    through the shared ProtocolDocument. Out-of-range pages are skipped.
+
+    Args:
+        pdf_path: Path to the PDF file
+        pages: 0-indexed page numbers
+        dpi: Resolution in dots per inch (fixed mode)
+        output_dir: Also write each image here (default: memory only)
+        prefix: Filename prefix for written images
+        one_indexed_names: Number files from 1 (PDF viewer numbering)
+        workers: Worker processes (default: get_pdf_workers())
+        mode: "fixed", "adaptive" (crop + per-page DPI) or "tiled"
+
+    Returns:
+        PageImage list in the order of pages (tiles of a page are adjacent)
+    """
+    doc = get_protocol_document(pdf_path)
+    pages = [p for p in pages if doc.has_page(p)]
+    if not pages:
+        return []
+
+    specs = {p: plan_page_render(doc, p, mode=mode, dpi=dpi) for p in pages}
+
+    workers = min(workers or get_pdf_workers(), len(pages))
+    pngs = None
+    if workers > 1 and len(pages) >= PARALLEL_MIN_RENDER_PAGES:
+        try:
+            pngs = map_page_shards(_render_specs_png, doc.pdf_path, pages, workers, specs)
+        except Exception as e:
+            logger.warning(f"Parallel page rendering failed, rendering serially: {e}")
+    if pngs is None:
+        pngs = [
+            [doc.render_page(p, dpi=spec.dpi, clip=spec.clip).tobytes("png") for spec in specs[p]]
+            for p in pages
+        ]
+
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    images = []
+    for page_num, page_pngs in zip(pages, pngs):
+        page_rect = doc.get_page_rect(page_num) if mode != "fixed" else None
+        for spec, png in zip(specs[page_num], page_pngs):
+            image = PageImage(
+                data=png,
+                mime_type="image/png",
+                page_num=page_num,
+                dpi=spec.dpi,
+                clip=spec.clip,
+                tile=spec.tile,
+                tile_count=spec.tile_count,
+                page_rect=page_rect,
+            )
+            if output_dir:
+                number = page_num + 1 if one_indexed_names else page_num
+                suffix = f"_t{spec.tile}" if spec.tile else ""
+                image.save(os.path.join(output_dir, f"{prefix}_{number:03d}{suffix}.png"))
+            images.append(image)
+
+    logger.debug(f"Rendered {len(images)} images from {len(pages)} pages ({mode} mode)")
+    return images
+
+
+def _provider_family(model_name: Optional[str]) -> str:
+    """Map a model name to the provider whose image tokenization applies."""
+    model_lower = (model_name or "").lower()
+    if any(pattern in model_lower for pattern in ['claude', 'anthropic']):
+        return "claude"
+    if any(pattern in model_lower for pattern in ['gpt', 'o1', 'o3']):
+        return "openai"
+    return "gemini"
+
+
+def estimate_image_tokens(width: int, height: int, model_name: Optional[str] = None) -> int:
+    """
+    Estimate the input tokens a provider charges for an image.
+
+    Uses each provider's published sizing rules:
+    - Claude: downscaled to a 1568px long edge / 1.15MP, then w*h/750
+    - OpenAI (high detail): fit 2048px, short side 768px, 170 per 512px tile + 85
+    - Gemini: 258 per 768px tile (258 for images up to 384px)
+
+    Args:
+        width: Image width in pixels
+        height: Image height in pixels
+        model_name: Model the image is sent to (default: Gemini rules)
+    """
+    if width <= 0 or height <= 0:
+        return 0
+    family = _provider_family(model_name)
+
+    if family == "claude":
+        scale = min(1.0, 1568 / max(width, height), math.sqrt(1_150_000 / (width * height)))
+        return math.ceil(width * scale * height * scale / 750)
+
+    if family == "openai":
+        scale = min(1.0, 2048 / max(width, height))
+        w, h = width * scale, height * scale
+        scale = min(1.0, 768 / min(w, h))
+        w, h = w * scale, h * scale
+        return 170 * math.ceil(w / 512) * math.ceil(h / 512) + 85
+
+    if width <= 384 and height <= 384:
+        return 258
+    return 258 * math.ceil(width / 768) * math.ceil(height / 768)
+
+
+def summarize_page_images(
+    images: List[PageImage],
+    model_name: Optional[str] = None,
+    baseline_dpi: int = 150,
+) -> Dict[str, Any]:
+    """
+    Report bytes sent and image token estimates per rendered image.
+
+    For cropped/adaptive images the estimate for sending the whole page at
+    baseline_dpi is included, so the saving is visible.
+
+    Args:
+        images: Rendered PageImage list
+        model_name: Model the images are sent to
+        baseline_dpi: DPI of the fixed-mode baseline
+
+    Returns:
+        Dict with per-image entries and totals
+    """
+    entries = []
+    for image in images:
+        width, height = image.size or (0, 0)
+        tokens = estimate_image_tokens(width, height, model_name)
+        entry = {
+            'page': image.page_num + 1 if image.page_num is not None else None,
+            'tile': image.tile,
+            'dpi': image.dpi,
+            'width': width,
+            'height': height,
+            'bytes': len(image.data),
+            'payload_bytes': 4 * math.ceil(len(image.data) / 3),  # base64 on the wire
+            'estimated_tokens': tokens,
+        }
+        if image.page_rect is not None and (image.tile is None or image.tile == 1):
+            x0, y0, x1, y1 = image.page_rect
+            scale = baseline_dpi / 72.0
+            entry['baseline_estimated_tokens'] = estimate_image_tokens(
+                round((x1 - x0) * scale), round((y1 - y0) * scale), model_name
+            )
+        entries.append(entry)
+
+    total_tokens = sum(e['estimated_tokens'] for e in entries)
+    summary = {
+        'provider': _provider_family(model_name),
+        'images': entries,
+        'total_bytes': sum(e['bytes'] for e in entries),
+        'total_payload_bytes': sum(e['payload_bytes'] for e in entries),
+        'total_estimated_tokens': total_tokens,
+    }
+    if any('baseline_estimated_tokens' in e for e in entries):
+        summary['baseline_estimated_tokens'] = sum(e.get('baseline_estimated_tokens', 0) for e in entries)
+    return summary
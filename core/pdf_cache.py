@@ -0,0 +1,271 @@
+"""
+Persistent PDF Page Text Cache.
+
+Stores per-page text, word boxes and block layout on disk, keyed by the
+SHA-256 of the PDF bytes, so re-running a protocol after prompt changes
+does not re-extract every page with MuPDF.
+
+Each PDF gets one compact append-only file of zlib-compressed records:
+
+    header:  MAGIC (8 bytes)
+    record:  kind (u8) | page (u32) | payload length (u32) | payload
+
+Record kinds are page count, page text, word boxes and blocks. A truncated
+trailing record (e.g. from a killed run) is ignored on load.
+
+Usage:
+    from core.pdf_cache import PageTextCache, get_pdf_cache_stats
+
+    cache = PageTextCache.for_pdf("protocol.pdf")
+    text = cache.get_text(0)
+    if text is None:
+        cache.put_text(0, extracted_text)
+    cache.flush()
+"""
+
+import hashlib
+import json
+import logging
+import os
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Default cache directory (override with PDF_TEXT_CACHE_DIR)
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "protocol2usdm" / "pdf_text"
+
+MAGIC = b"P2UPTC1\x00"
+_RECORD_HEADER = struct.Struct("<BII")
+
+KIND_PAGE_COUNT = 0
+KIND_TEXT = 1
+KIND_WORDS = 2
+KIND_BLOCKS = 3
+
+# Flush pending records once this many have accumulated
+_FLUSH_THRESHOLD = 64
+
+_config_lock = threading.Lock()
+_cache_dir: Optional[Path] = None
+_enabled = True
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "writes": 0}
+
+
+def configure_pdf_cache(cache_dir: Optional[str] = None, enabled: bool = True) -> None:
+    """
+    Configure the on-disk page text cache.
+
+    Args:
+        cache_dir: Cache directory (default: PDF_TEXT_CACHE_DIR or ~/.cache)
+        enabled: Set False to always extract from the PDF
+    """
+    global _cache_dir, _enabled
+    with _config_lock:
+        _cache_dir = Path(cache_dir) if cache_dir else None
+        _enabled = enabled
+
+
+def is_pdf_cache_enabled() -> bool:
+    """Whether the on-disk page text cache is enabled."""
+    return _enabled
+
+
+def get_cache_dir() -> Path:
+    """Get the active cache directory."""
+    if _cache_dir is not None:
+        return _cache_dir
+    env_dir = os.environ.get("PDF_TEXT_CACHE_DIR")
+    return Path(env_dir) if env_dir else DEFAULT_CACHE_DIR
+
+
+def get_pdf_cache_stats() -> Dict[str, int]:
+    """Get process-wide hit/miss/write counts for the page text cache."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_pdf_cache_stats() -> None:
+    """Reset the process-wide hit/miss/write counts."""
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0
+
+
+def _count(key: str) -> None:
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def compute_pdf_hash(pdf_path: str, chunk_size: int = 1 << 20) -> str:
+    """Compute the SHA-256 hex digest of a PDF file's bytes."""
+    sha = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class PageTextCache:
+    """
+    On-disk page cache for a single PDF.
+
+    Records are indexed on load and decompressed lazily on first access.
+    New records are buffered and appended to the file by flush().
+    """
+
+    def __init__(self, pdf_hash: str, cache_dir: Optional[Path] = None):
+        """
+        Open (or create) the cache file for a PDF.
+
+        Args:
+            pdf_hash: SHA-256 hex digest of the PDF bytes
+            cache_dir: Directory holding cache files
+        """
+        self.pdf_hash = pdf_hash
+        self.cache_dir = Path(cache_dir) if cache_dir else get_cache_dir()
+        self.path = self.cache_dir / f"{pdf_hash}.bin"
+        self._lock = threading.Lock()
+        self._data = b""
+        self._index: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        self._values: Dict[Tuple[int, int], Any] = {}
+        self._pending: List[bytes] = []
+        self._rewrite = False
+        self._load()
+
+    @classmethod
+    def for_pdf(cls, pdf_path: str, cache_dir: Optional[Path] = None) -> "PageTextCache":
+        """Open the cache for a PDF, hashing its contents."""
+        return cls(compute_pdf_hash(pdf_path), cache_dir=cache_dir)
+
+    def _load(self) -> None:
+        """Read the cache file and index its records."""
+        if not self.path.exists():
+            return
+        try:
+            data = self.path.read_bytes()
+        except OSError as e:
+            logger.warning(f"Could not read PDF text cache {self.path}: {e}")
+            return
+        if not data.startswith(MAGIC):
+            logger.warning(f"Ignoring PDF text cache with unknown format: {self.path}")
+            self._rewrite = True
+            return
+
+        offset = len(MAGIC)
+        while offset + _RECORD_HEADER.size <= len(data):
+            kind, page, length = _RECORD_HEADER.unpack_from(data, offset)
+            start = offset + _RECORD_HEADER.size
+            if start + length > len(data):
+                logger.debug(f"Truncated record in {self.path} at offset {offset}")
+                break
+            self._index[(kind, page)] = (start, length)
+            offset = start + length
+        self._data = data
+
+    def _get(self, kind: int, page: int) -> Optional[Any]:
+        key = (kind, page)
+        value = self._values.get(key)
+        if value is not None:
+            _count("hits")
+            return value
+
+        location = self._index.get(key)
+        if location is None:
+            _count("misses")
+            return None
+
+        start, length = location
+        try:
+            raw = zlib.decompress(self._data[start:start + length])
+        except zlib.error as e:
+            logger.warning(f"Corrupt record in PDF text cache {self.path}: {e}")
+            _count("misses")
+            return None
+
+        if kind == KIND_TEXT:
+            value = raw.decode("utf-8")
+        else:
+            value = [tuple(item) for item in json.loads(raw)]
+        self._values[key] = value
+        _count("hits")
+        return value
+
+    def _put(self, kind: int, page: int, value: Any, payload: bytes) -> None:
+        compressed = zlib.compress(payload)
+        with self._lock:
+            self._values[(kind, page)] = value
+            self._pending.append(_RECORD_HEADER.pack(kind, page, len(compressed)) + compressed)
+            _count("writes")
+            should_flush = len(self._pending) >= _FLUSH_THRESHOLD
+        if should_flush:
+            self.flush()
+
+    def get_page_count(self) -> Optional[int]:
+        """Get the cached page count, or None if unknown."""
+        if (KIND_PAGE_COUNT, 0) in self._values:
+            return self._values[(KIND_PAGE_COUNT, 0)]
+        location = self._index.get((KIND_PAGE_COUNT, 0))
+        if location is None:
+            return None
+        start, length = location
+        count = int(zlib.decompress(self._data[start:start + length]))
+        self._values[(KIND_PAGE_COUNT, 0)] = count
+        return count
+
+    def put_page_count(self, count: int) -> None:
+        """Record the document page count."""
+        if self.get_page_count() == count:
+            return
+        self._put(KIND_PAGE_COUNT, 0, count, str(count).encode("ascii"))
+
+    def get_text(self, page: int) -> Optional[str]:
+        """Get cached page text, or None on a miss."""
+        return self._get(KIND_TEXT, page)
+
+    def put_text(self, page: int, text: str) -> None:
+        """Store page text."""
+        self._put(KIND_TEXT, page, text, text.encode("utf-8"))
+
+    def get_words(self, page: int) -> Optional[List[tuple]]:
+        """Get cached word boxes (fitz "words" tuples), or None on a miss."""
+        return self._get(KIND_WORDS, page)
+
+    def put_words(self, page: int, words: List[tuple]) -> None:
+        """Store word boxes."""
+        words = [tuple(w) for w in words]
+        self._put(KIND_WORDS, page, words, json.dumps(words).encode("utf-8"))
+
+    def get_blocks(self, page: int) -> Optional[List[tuple]]:
+        """Get cached text blocks (fitz "blocks" tuples), or None on a miss."""
+        return self._get(KIND_BLOCKS, page)
+
+    def put_blocks(self, page: int, blocks: List[tuple]) -> None:
+        """Store text blocks."""
+        blocks = [tuple(b) for b in blocks]
+        self._put(KIND_BLOCKS, page, blocks, json.dumps(blocks).encode("utf-8"))
+
+    def flush(self) -> None:
+        """Append buffered records to the cache file."""
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, []
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                is_new = self._rewrite or not self.path.exists()
+                with open(self.path, "wb" if is_new else "ab") as f:
+                    if is_new:
+                        f.write(MAGIC)
+                    f.write(b"".join(pending))
+                self._rewrite = False
+            except OSError as e:
+                logger.warning(f"Failed to write PDF text cache {self.path}: {e}")
+
+    def __repr__(self) -> str:
+        return f"PageTextCache('{self.path}', records={len(self._index)})"
@@ -0,0 +1,462 @@
+"""
+Shared Protocol Document Store.
+
+Opens each protocol PDF once per run and caches per-page text so that the
+many page finders and extractors do not re-parse the same file with MuPDF.
+Page text, word boxes and blocks are also persisted across runs through
+core.pdf_cache; MuPDF is only opened for pages missing from that cache
+and for rendering. For large documents, missing page text is extracted
+by a pool of worker processes, each with its own MuPDF handle.
+
+Usage:
+    from core.pdf_document import get_protocol_document
+
+    doc = get_protocol_document("protocol.pdf")
+    for page_num, text in doc.iter_page_texts(max_pages=50, lower=True):
+        if "inclusion criteria" in text:
+            ...
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .page_classifier import PageFeatures, page_classifier
+from .pdf_cache import PageTextCache, get_pdf_cache_stats, is_pdf_cache_enabled
+
+logger = logging.getLogger(__name__)
+
+# Fewer missing pages than this are extracted serially (pool startup
+# costs more than it saves on small documents)
+PARALLEL_MIN_PAGES = 64
+
+# Upper bound for the automatic worker count
+MAX_AUTO_WORKERS = 8
+
+_pdf_workers: Optional[int] = None
+
+
+def configure_pdf_workers(workers: Optional[int] = None) -> None:
+    """
+    Configure parallel page text extraction.
+
+    Args:
+        workers: Number of worker processes; 1 disables parallel
+            extraction, None or 0 picks one per CPU (up to MAX_AUTO_WORKERS)
+    """
+    global _pdf_workers
+    _pdf_workers = workers or None
+
+
+def get_pdf_workers() -> int:
+    """Get the effective number of page extraction worker processes."""
+    if _pdf_workers:
+        return max(1, _pdf_workers)
+    return max(1, min(os.cpu_count() or 1, MAX_AUTO_WORKERS))
+
+
+def _extract_pages_text(pdf_path: str, pages: List[int]) -> List[str]:
+    """Extract the text of a page range in a worker process."""
+    import fitz  # PyMuPDF
+    with fitz.open(pdf_path) as doc:
+        return [doc[page_num].get_text() for page_num in pages]
+
+
+def _pool_context():
+    """
+    Pick a multiprocessing start method for the extraction pool.
+
+    fork is cheapest but unsafe once other threads exist (they may hold
+    locks), so fall back to spawn when the pipeline is already threaded.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    if "fork" in methods and threading.active_count() == 1:
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context("spawn")
+
+
+def map_page_shards(func, pdf_path: str, pages: List[int], workers: int, *args) -> list:
+    """
+    Run a per-page worker over contiguous page shards in a process pool.
+
+    Args:
+        func: Picklable function (pdf_path, shard_pages, *args) -> list with
+            one result per page; it must open its own fitz document
+        pdf_path: Path to the PDF file
+        pages: 0-indexed page numbers
+        workers: Number of worker processes (one shard each)
+        *args: Extra arguments passed to every call
+
+    Returns:
+        Flat list of per-page results, in the order of pages
+    """
+    shard_size = -(-len(pages) // workers)
+    shards = [pages[i:i + shard_size] for i in range(0, len(pages), shard_size)]
+    with ProcessPoolExecutor(max_workers=len(shards), mp_context=_pool_context()) as executor:
+        futures = [executor.submit(func, pdf_path, shard, *args) for shard in shards]
+        return [item for future in futures for item in future.result()]
+
+
+class ProtocolDocument:
+    """
+    A protocol PDF opened once, with a lazily-filled page text index.
+
+    MuPDF documents are not safe for concurrent access, so every call that
+    touches the underlying fitz document is serialized with a lock. Page
+    text is cached in both raw and lowercased form on first access.
+    """
+
+    def __init__(self, pdf_path: str, use_cache: Optional[bool] = None):
+        """
+        Open a protocol PDF.
+
+        Args:
+            pdf_path: Path to the PDF file
+            use_cache: Consult the on-disk page cache (default: global setting)
+        """
+        self.pdf_path = pdf_path
+        self._lock = threading.RLock()
+        self._doc = None
+        self._closed = False
+        self._text: Dict[int, str] = {}
+        self._text_lower: Dict[int, str] = {}
+        self._features: Dict[int, Tuple[int, PageFeatures]] = {}
+        self._rects: Dict[int, Tuple[float, float, float, float]] = {}
+
+        if use_cache is None:
+            use_cache = is_pdf_cache_enabled()
+        self._cache: Optional[PageTextCache] = None
+        if use_cache:
+            try:
+                self._cache = PageTextCache.for_pdf(pdf_path)
+            except OSError as e:
+                logger.warning(f"PDF text cache unavailable for {pdf_path}: {e}")
+
+        page_count = self._cache.get_page_count() if self._cache else None
+        if page_count is None:
+            page_count = len(self._open())
+            if self._cache:
+                self._cache.put_page_count(page_count)
+        self._page_count = page_count
+
+    def _open(self):
+        """Open the underlying fitz document on first use."""
+        with self._lock:
+            if self._closed:
+                raise ValueError(f"Document is closed: {self.pdf_path}")
+            if self._doc is None:
+                import fitz  # PyMuPDF
+                self._doc = fitz.open(self.pdf_path)
+            return self._doc
+
+    @property
+    def page_count(self) -> int:
+        """Number of pages in the document."""
+        return self._page_count
+
+    def __len__(self) -> int:
+        return self._page_count
+
+    @property
+    def closed(self) -> bool:
+        """Whether the document has been closed."""
+        return self._closed
+
+    def has_page(self, page_num: int) -> bool:
+        """Check whether a 0-indexed page number is in range."""
+        return 0 <= page_num < self._page_count
+
+    def get_page_text(self, page_num: int) -> str:
+        """
+        Get the text of a page, extracting it on first access.
+
+        Args:
+            page_num: 0-indexed page number
+
+        Returns:
+            Page text as returned by MuPDF
+
+        Raises:
+            IndexError: If page_num is out of range
+        """
+        text = self._text.get(page_num)
+        if text is not None:
+            return text
+
+        if not self.has_page(page_num):
+            raise IndexError(f"Page {page_num} out of range (0-{self._page_count - 1})")
+
+        with self._lock:
+            text = self._text.get(page_num)
+            if text is None:
+                text = self._cache.get_text(page_num) if self._cache else None
+                if text is None:
+                    text = self._open()[page_num].get_text()
+                    if self._cache:
+                        self._cache.put_text(page_num, text)
+                self._text[page_num] = text
+        return text
+
+    def prefetch_text(
+        self,
+        pages: Optional[Iterable[int]] = None,
+        workers: Optional[int] = None,
+    ) -> int:
+        """
+        Load the text of many pages up front.
+
+        Pages already in memory or in the on-disk cache are skipped. If at
+        least PARALLEL_MIN_PAGES remain, they are split into contiguous
+        shards across a process pool; otherwise they are read serially.
+        Results are stored in page order and written to the page cache.
+
+        Args:
+            pages: 0-indexed page numbers (default: all pages)
+            workers: Worker processes (default: get_pdf_workers())
+
+        Returns:
+            Number of pages extracted from the PDF
+        """
+        if pages is None:
+            pages = range(self._page_count)
+        wanted = sorted({p for p in pages if self.has_page(p) and p not in self._text})
+        if not wanted:
+            return 0
+
+        missing = []
+        with self._lock:
+            for page_num in wanted:
+                text = self._cache.get_text(page_num) if self._cache else None
+                if text is None:
+                    missing.append(page_num)
+                else:
+                    self._text.setdefault(page_num, text)
+        if not missing:
+            return 0
+
+        workers = min(workers or get_pdf_workers(), len(missing))
+        if workers > 1 and len(missing) >= PARALLEL_MIN_PAGES:
+            try:
+                self._extract_parallel(missing, workers)
+                return len(missing)
+            except Exception as e:
+                logger.warning(f"Parallel page extraction failed, reading serially: {e}")
+
+        for page_num in missing:
+            self.get_page_text(page_num)
+        return len(missing)
+
+    def _extract_parallel(self, pages: List[int], workers: int) -> None:
+        """Extract page text in worker processes, one shard per worker."""
+        texts = map_page_shards(_extract_pages_text, self.pdf_path, pages, workers)
+        with self._lock:
+            for page_num, text in zip(pages, texts):
+                if page_num in self._text:
+                    continue
+                self._text[page_num] = text
+                if self._cache:
+                    self._cache.put_text(page_num, text)
+
+        logger.debug(f"Extracted {len(pages)} pages with {min(workers, len(pages))} worker processes")
+
+    def get_page_text_lower(self, page_num: int) -> str:
+        """Get the lowercased text of a page (cached)."""
+        text = self._text_lower.get(page_num)
+        if text is None:
+            text = self.get_page_text(page_num).lower()
+            self._text_lower[page_num] = text
+        return text
+
+    def get_page_features(self, page_num: int) -> PageFeatures:
+        """
+        Get the page classifier's feature vector for a page.
+
+        Classified once and reused by every page finder; re-classified only
+        if new sections were registered since.
+        """
+        version = page_classifier.version
+        entry = self._features.get(page_num)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        features = page_classifier.classify(self.get_page_text_lower(page_num))
+        self._features[page_num] = (version, features)
+        return features
+
+    def iter_page_features(self, max_pages: Optional[int] = None) -> Iterator[Tuple[int, PageFeatures]]:
+        """
+        Iterate over (page_num, PageFeatures) from the start of the document.
+
+        Args:
+            max_pages: Stop after this many pages (default: all pages)
+        """
+        total = self._page_count if max_pages is None else min(self._page_count, max_pages)
+        self.prefetch_text(range(total))
+        for page_num in range(total):
+            yield page_num, self.get_page_features(page_num)
+
+    def get_page_words(self, page_num: int) -> List[tuple]:
+        """
+        Get word boxes for a page.
+
+        Returns:
+            fitz "words" tuples: (x0, y0, x1, y1, word, block_no, line_no, word_no)
+        """
+        return self._get_page_layout(page_num, "words")
+
+    def get_page_blocks(self, page_num: int) -> List[tuple]:
+        """
+        Get text blocks for a page.
+
+        Returns:
+            fitz "blocks" tuples: (x0, y0, x1, y1, text, block_no, block_type)
+        """
+        return self._get_page_layout(page_num, "blocks")
+
+    def _get_page_layout(self, page_num: int, option: str) -> List[tuple]:
+        if not self.has_page(page_num):
+            raise IndexError(f"Page {page_num} out of range (0-{self._page_count - 1})")
+
+        with self._lock:
+            if self._cache:
+                cached = getattr(self._cache, f"get_{option}")(page_num)
+                if cached is not None:
+                    return cached
+            items = [tuple(item) for item in self._open()[page_num].get_text(option)]
+            if self._cache:
+                getattr(self._cache, f"put_{option}")(page_num, items)
+            return items
+
+    def iter_page_texts(
+        self,
+        max_pages: Optional[int] = None,
+        lower: bool = False,
+    ) -> Iterator[Tuple[int, str]]:
+        """
+        Iterate over (page_num, text) from the start of the document.
+
+        Args:
+            max_pages: Stop after this many pages (default: all pages)
+            lower: Yield lowercased text
+        """
+        total = self._page_count if max_pages is None else min(self._page_count, max_pages)
+        getter = self.get_page_text_lower if lower else self.get_page_text
+        self.prefetch_text(range(total))
+        for page_num in range(total):
+            yield page_num, getter(page_num)
+
+    def get_pages_text(self, pages: List[int], separator: str = "\n\n") -> str:
+        """
+        Join the text of several pages, skipping out-of-range page numbers.
+
+        Args:
+            pages: 0-indexed page numbers
+            separator: String placed between pages
+        """
+        self.prefetch_text(pages)
+        return separator.join(
+            self.get_page_text(p) for p in pages if self.has_page(p)
+        )
+
+    def get_page_rect(self, page_num: int) -> Tuple[float, float, float, float]:
+        """Get the page rectangle (x0, y0, x1, y1) in points."""
+        rect = self._rects.get(page_num)
+        if rect is None:
+            if not self.has_page(page_num):
+                raise IndexError(f"Page {page_num} out of range (0-{self._page_count - 1})")
+            with self._lock:
+                rect = tuple(self._open()[page_num].rect)
+            self._rects[page_num] = rect
+        return rect
+
+    def render_page(
+        self,
+        page_num: int,
+        dpi: int = 150,
+        clip: Optional[Tuple[float, float, float, float]] = None,
+    ):
+        """
+        Render a page to a fitz.Pixmap.
+
+        Args:
+            page_num: 0-indexed page number
+            dpi: Resolution in dots per inch
+            clip: Optional (x0, y0, x1, y1) region in points to render
+        """
+        if not self.has_page(page_num):
+            raise IndexError(f"Page {page_num} out of range (0-{self._page_count - 1})")
+        with self._lock:
+            return self._open()[page_num].get_pixmap(dpi=dpi, clip=clip)
+
+    def close(self) -> None:
+        """Close the underlying document and flush the page cache."""
+        with self._lock:
+            self._closed = True
+            if self._cache:
+                self._cache.flush()
+            if self._doc is not None:
+                self._doc.close()
+                self._doc = None
+
+    def __repr__(self) -> str:
+        return f"ProtocolDocument('{self.pdf_path}', pages={self._page_count})"
+
+
+# Process-wide store: absolute path -> (file signature, document)
+_documents: Dict[str, Tuple[Tuple[int, float], ProtocolDocument]] = {}
+_documents_lock = threading.Lock()
+
+
+def _file_signature(pdf_path: str) -> Tuple[int, float]:
+    stat = os.stat(pdf_path)
+    return stat.st_size, stat.st_mtime
+
+
+def get_protocol_document(pdf_path: str) -> ProtocolDocument:
+    """
+    Get the shared ProtocolDocument for a PDF, opening it on first use.
+
+    The document is reopened if the file has changed on disk since it was
+    first opened.
+
+    Args:
+        pdf_path: Path to the PDF file
+
+    Returns:
+        Shared ProtocolDocument instance
+    """
+    key = os.path.abspath(pdf_path)
+    signature = _file_signature(key)
+
+    with _documents_lock:
+        entry = _documents.get(key)
+        if entry is not None:
+            cached_signature, document = entry
+            if cached_signature == signature and not document.closed:
+                return document
+            document.close()
+
+        document = ProtocolDocument(pdf_path)
+        _documents[key] = (signature, document)
+        logger.debug(f"Opened shared document: {document}")
+        return document
+
+
+def close_protocol_documents() -> None:
+    """Close and forget all shared documents (call at end of a run)."""
+    with _documents_lock:
+        if not _documents:
+            return
+        for _, document in _documents.values():
+            document.close()
+        _documents.clear()
+
+    stats = get_pdf_cache_stats()
+    if stats["hits"] or stats["misses"]:
+        logger.info(
+            f"PDF text cache: {stats['hits']} hits, {stats['misses']} misses, "
+            f"{stats['writes']} records written"
+        )
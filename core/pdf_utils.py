@@ -5,9 +5,11 @@ Common PDF operations used across the pipeline.
 """
 
 import logging
-from pathlib import Path
 from typing import List, Optional
 
+from .page_images import render_page_images
+from .pdf_document import get_protocol_document
+
 logger = logging.getLogger(__name__)
 
 
@@ -28,10 +30,9 @@ def extract_text_from_pages(
         Combined text from all specified pages, or None on failure
     """
     try:
-        import fitz  # PyMuPDF
-        
-        doc = fitz.open(pdf_path)
-        total_pages = len(doc)
+        doc = get_protocol_document(pdf_path)
+        total_pages = doc.page_count
+        doc.prefetch_text(pages)
         
         texts = []
         for page_num in pages:
@@ -39,16 +40,13 @@ def extract_text_from_pages(
                 logger.warning(f"Page {page_num} out of range (0-{total_pages-1})")
                 continue
                 
-            page = doc[page_num]
-            text = page.get_text()
+            text = doc.get_page_text(page_num)
             
             # Truncate if too long
             if len(text) > max_chars_per_page:
                 text = text[:max_chars_per_page] + "\n...[truncated]..."
                 
             texts.append(f"--- Page {page_num + 1} ---\n{text}")
-            
-        doc.close()
         
         if texts:
             return "\n\n".join(texts)
@@ -62,11 +60,7 @@ def extract_text_from_pages(
 def get_page_count(pdf_path: str) -> int:
     """Get the number of pages in a PDF."""
     try:
-        import fitz
-        doc = fitz.open(pdf_path)
-        count = len(doc)
-        doc.close()
-        return count
+        return get_protocol_document(pdf_path).page_count
     except Exception as e:
         logger.error(f"Failed to get page count: {e}")
         return 0
@@ -91,25 +85,15 @@ def render_page_to_image(
         Path to the created image, or None on failure
     """
     try:
-        import fitz
-        
-        doc = fitz.open(pdf_path)
-        if page_num < 0 or page_num >= len(doc):
+        doc = get_protocol_document(pdf_path)
+        if not doc.has_page(page_num):
             logger.error(f"Page {page_num} out of range")
-            doc.close()
             return None
-            
-        page = doc[page_num]
-        
-        # Calculate zoom factor for DPI
-        zoom = dpi / 72  # 72 is default PDF DPI
-        matrix = fitz.Matrix(zoom, zoom)
         
         # Render page
-        pix = page.get_pixmap(matrix=matrix)
+        pix = doc.render_page(page_num, dpi=dpi)
         pix.save(output_path)
         
-        doc.close()
         logger.info(f"Rendered page {page_num} to {output_path}")
         return output_path
         
@@ -128,6 +112,9 @@ def render_pages_to_images(
     """
     Render multiple PDF pages to images.
     
+    Pages are rendered concurrently and the PNG buffers stay in memory
+    (see core.page_images), so later vision calls do not re-read the files.
+    
     Args:
         pdf_path: Path to the PDF file
         pages: List of 0-indexed page numbers
@@ -138,16 +125,12 @@ def render_pages_to_images(
     Returns:
         List of paths to created images
     """
-    from pathlib import Path
-    
-    output_path = Path(output_dir)
-    output_path.mkdir(parents=True, exist_ok=True)
-    
-    image_paths = []
-    for page_num in pages:
-        img_path = str(output_path / f"{prefix}_{page_num:03d}.png")
-        result = render_page_to_image(pdf_path, page_num, img_path, dpi)
-        if result:
-            image_paths.append(result)
-            
-    return image_paths
+    images = render_page_images(
+        pdf_path,
+        pages,
+        dpi=dpi,
+        output_dir=output_dir,
+        prefix=prefix,
+        one_indexed_names=False,
+    )
+    return [image.path for image in images]
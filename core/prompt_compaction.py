@@ -0,0 +1,348 @@
+"""
+Prompt Compaction and Input Token Budgets.
+
+Pre-dispatch stage for text LLM calls. Extractors paste whole page ranges
+into prompts (via pdf_utils.extract_text_from_pages, one "--- Page N ---"
+block per page), so much of the input is repeated boilerplate. Before a
+call is sent, compact_messages() compacts the protocol text (the cached
+protocol context, or page-marked text after its instructions); system
+prompts and instructions are sent as written:
+
+1. strips running headers/footers: lines repeated at the top or bottom of
+   most pages (protocol title, sponsor, "Page 3 of 120", confidentiality
+   notes), keeping their first occurrence; table rows, such as the column
+   headers of a table continued over several pages, are kept
+2. collapses whitespace runs and table rulings (-----, ====, box drawing)
+3. enforces the task's input token budget (max_input_tokens in
+   llm_config.yaml) by shortening the longest pages evenly
+
+Tokens are counted with the provider's tokenizer where one is available
+locally (tiktoken for OpenAI models, if installed); otherwise with a
+per-provider characters-per-token estimate. Savings per call are recorded
+in usage_tracker and written to token_usage.json.
+
+Usage:
+    from core.prompt_compaction import compact_messages
+
+    messages, stats = compact_messages(messages, "gemini-2.5-pro", max_input_tokens=120000)
+"""
+
+import logging
+import re
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Average characters per token for providers without a local tokenizer
+CHARS_PER_TOKEN = {
+    "openai": 4.0,
+    "gemini": 4.0,
+    "claude": 3.5,
+}
+DEFAULT_CHARS_PER_TOKEN = 4.0
+
+# Page separator written by pdf_utils.extract_text_from_pages
+_PAGE_MARKER = re.compile(r"^--- Page \d+ ---$", re.M)
+
+# Lines at each end of a page checked for running headers/footers
+EDGE_LINES = 3
+# Longer lines are content, not running headers
+MAX_EDGE_LINE_CHARS = 150
+# A header/footer line must repeat on at least this share of pages (and 3 pages)
+MIN_REPEAT_FRACTION = 0.5
+MIN_REPEAT_PAGES = 3
+
+# Lines made only of table ruling / box drawing characters
+_RULING_CHARS = r"\-=_+|:*~\u2500-\u257f"
+_RULING = re.compile(rf"^[\s{_RULING_CHARS}]*[\-=_\u2500-\u257f]{{3}}[\s{_RULING_CHARS}]*$")
+_SPACES = re.compile(r"[ \t\u00a0]{2,}")
+_BLANK_LINES = re.compile(r"\n{3,}")
+_DIGITS = re.compile(r"\d+")
+# Page numbers ("Page 3 of 120", "Page 3/120", a lone "12" or "- 12 -"):
+# matched across pages with their digits masked
+_PAGE_NUMBER = re.compile(r"\bpage\s+\d+(?:\s*(?:of|/)\s*\d+)?\b|^[\s\-\u2013\u2014]*\d+[\s\-\u2013\u2014]*$", re.I)
+# Table rows (cells split by | or tabs, or several numbers, as in the visit
+# and day rows of SoA column headers) are never running headers
+_TABLE_CELL_SEPARATOR = re.compile(r"\||\t")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+MIN_TABLE_ROW_NUMBERS = 4
+
+TRUNCATION_MARK = "\n...[truncated to fit the input token budget]..."
+
+_enabled = True
+
+
+def configure_prompt_compaction(enabled: bool = True) -> None:
+    """Enable or disable compaction (token counting and budgets still apply)."""
+    global _enabled
+    _enabled = enabled
+
+
+@dataclass
+class CompactionStats:
+    """Token counts of one call before and after compaction."""
+    tokens_before: int
+    tokens_after: int
+    header_lines_removed: int = 0
+    budget: Optional[int] = None
+    truncated: bool = False
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+@lru_cache(maxsize=8)
+def _tiktoken_encoding(model: str):
+    """tiktoken encoding for an OpenAI model, or None without tiktoken."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str, model: str) -> int:
+    """
+    Count the tokens of text for a model's tokenizer.
+
+    Exact for OpenAI models when tiktoken is installed; an estimate from
+    CHARS_PER_TOKEN otherwise (Gemini and Claude only count tokens remotely).
+    """
+    if not text:
+        return 0
+    from extraction.llm_task_config import detect_provider
+
+    provider = detect_provider(model)
+    if provider == "openai":
+        encoding = _tiktoken_encoding(model)
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+    return int(len(text) / CHARS_PER_TOKEN.get(provider, DEFAULT_CHARS_PER_TOKEN)) + 1
+
+
+def count_message_tokens(messages: List[Dict[str, Any]], model: str) -> int:
+    """Count the text tokens of chat messages."""
+    return sum(count_tokens(_text(m.get("content")), model) for m in messages)
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return ""
+
+
+def split_pages(text: str) -> Tuple[str, List[Tuple[str, str]]]:
+    """
+    Split text into its preamble and (page marker, page body) pairs.
+
+    Returns:
+        (text before the first page marker, [(marker, body), ...])
+    """
+    markers = list(_PAGE_MARKER.finditer(text))
+    if not markers:
+        return text, []
+    pages = []
+    for i, match in enumerate(markers):
+        end = markers[i + 1].start() if i + 1 < len(markers) else len(text)
+        pages.append((match.group(), text[match.end():end]))
+    return text[:markers[0].start()], pages
+
+
+def join_pages(preamble: str, pages: List[Tuple[str, str]]) -> str:
+    return preamble + "".join(marker + body for marker, body in pages)
+
+
+def _looks_like_table_row(line: str) -> bool:
+    if len(_TABLE_CELL_SEPARATOR.findall(line.strip())) >= 2:
+        return True
+    return len(_NUMBER.findall(_PAGE_NUMBER.sub("", line))) >= MIN_TABLE_ROW_NUMBERS
+
+
+def _edge_key(line: str) -> str:
+    """
+    Normalize a line so running headers (and page numbers) match across pages.
+
+    Returns "" for lines that cannot be running headers.
+    """
+    if _looks_like_table_row(line):
+        return ""
+    key = " ".join(line.split())
+    if len(key) > MAX_EDGE_LINE_CHARS:
+        return ""
+    key = _PAGE_NUMBER.sub(lambda match: _DIGITS.sub("#", match.group()), key)
+    return key.lower()
+
+
+def strip_running_headers(pages: List[Tuple[str, str]]) -> Tuple[List[Tuple[str, str]], int]:
+    """
+    Remove lines repeated at the top or bottom of most pages.
+
+    The first occurrence of each is kept, so the text still says once what
+    the running header was.
+
+    Returns:
+        (pages, number of lines removed)
+    """
+    if len(pages) < MIN_REPEAT_PAGES:
+        return pages, 0
+
+    def edge_indexes(lines: List[str]) -> List[int]:
+        filled = [i for i, line in enumerate(lines) if line.strip()]
+        return sorted(set(filled[:EDGE_LINES] + filled[-EDGE_LINES:]))
+
+    split = [body.split("\n") for _, body in pages]
+    counts = Counter()
+    for lines in split:
+        counts.update({_edge_key(lines[i]) for i in edge_indexes(lines)})
+    threshold = max(MIN_REPEAT_PAGES, MIN_REPEAT_FRACTION * len(pages))
+    running = {key for key, count in counts.items() if count >= threshold and key}
+    if not running:
+        return pages, 0
+
+    removed = 0
+    result = []
+    seen = set()
+    for (marker, _), lines in zip(pages, split):
+        drop = set()
+        for i in edge_indexes(lines):
+            key = _edge_key(lines[i])
+            if key in seen:
+                drop.add(i)
+            elif key in running:
+                seen.add(key)
+        removed += len(drop)
+        result.append((marker, "\n".join(line for i, line in enumerate(lines) if i not in drop)))
+    return result, removed
+
+
+def collapse_whitespace(text: str) -> str:
+    """Collapse space runs, blank line runs and table ruling lines."""
+    lines = []
+    for line in text.split("\n"):
+        if _RULING.match(line):
+            continue
+        lines.append(_SPACES.sub(" ", line).rstrip())
+    return _BLANK_LINES.sub("\n\n", "\n".join(lines))
+
+
+def compact_text(text: str) -> Tuple[str, int]:
+    """
+    Compact protocol text.
+
+    Page-marked text is compacted page by page; the preamble before the
+    first page marker (instructions, JSON examples) is kept as is.
+
+    Returns:
+        (compacted text, running header/footer lines removed)
+    """
+    preamble, pages = split_pages(text)
+    if not pages:
+        return collapse_whitespace(text), 0
+    pages, removed = strip_running_headers(pages)
+    pages = [(marker, collapse_whitespace(body)) for marker, body in pages]
+    return join_pages(preamble, pages), removed
+
+
+def _is_protocol_text(message: Dict[str, Any]) -> bool:
+    """True for a message carrying protocol text: the cached protocol context or page-marked text."""
+    content = message.get("content")
+    if message.get("role") == "system" or not isinstance(content, str):
+        return False
+    return bool(message.get("cache") or _PAGE_MARKER.search(content))
+
+
+def fit_to_budget(text: str, max_tokens: int, model: str) -> str:
+    """
+    Shorten text to about max_tokens.
+
+    Page-marked text keeps every page and cuts the longest pages down to a
+    common length; other text is cut at the end.
+    """
+    tokens = count_tokens(text, model)
+    if tokens <= max_tokens:
+        return text
+    ratio = max_tokens / tokens
+    preamble, pages = split_pages(text)
+    if not pages:
+        return text[:max(0, int(len(text) * ratio) - len(TRUNCATION_MARK))] + TRUNCATION_MARK
+
+    # Largest per-page length whose total (with truncation marks) fits the budget
+    target = (
+        int(len(text) * ratio) - len(preamble)
+        - sum(len(marker) + len(TRUNCATION_MARK) + 2 for marker, _ in pages)
+    )
+    lengths = sorted(len(body) for _, body in pages)
+    cap, remaining, count = 0, target, len(lengths)
+    for length in lengths:
+        if length * count > remaining:
+            cap = max(0, remaining // count)
+            break
+        remaining -= length
+        count -= 1
+    else:
+        cap = lengths[-1]
+    pages = [
+        (marker, body if len(body) <= cap else body[:cap] + TRUNCATION_MARK + "\n\n")
+        for marker, body in pages
+    ]
+    return join_pages(preamble, pages)
+
+
+def compact_messages(
+    messages: List[Dict[str, Any]],
+    model: str,
+    max_input_tokens: Optional[int] = None,
+) -> Tuple[List[Dict[str, Any]], CompactionStats]:
+    """
+    Compact the protocol text of chat messages and enforce an input token budget.
+
+    Only messages carrying protocol text are changed (see _is_protocol_text);
+    the budget is met by shortening the longest of them.
+
+    Args:
+        messages: Chat messages
+        model: Model the call is sent to (selects the tokenizer)
+        max_input_tokens: Input token budget (None: no budget)
+
+    Returns:
+        (new messages, token counts before and after)
+    """
+    tokens_before = count_message_tokens(messages, model)
+    removed = 0
+    compacted = []
+    for message in messages:
+        if _enabled and _is_protocol_text(message):
+            content, lines = compact_text(message["content"])
+            removed += lines
+            message = {**message, "content": content}
+        compacted.append(message)
+
+    stats = CompactionStats(tokens_before, count_message_tokens(compacted, model), removed, max_input_tokens)
+    if max_input_tokens and stats.tokens_after > max_input_tokens:
+        text_indexes = (
+            [i for i, m in enumerate(compacted) if _is_protocol_text(m)]
+            or [i for i, m in enumerate(compacted) if isinstance(m.get("content"), str)]
+        )
+        if text_indexes:
+            longest = max(text_indexes, key=lambda i: len(compacted[i]["content"]))
+            other_tokens = stats.tokens_after - count_tokens(compacted[longest]["content"], model)
+            compacted[longest] = {
+                **compacted[longest],
+                "content": fit_to_budget(compacted[longest]["content"], max(1, max_input_tokens - other_tokens), model),
+            }
+            stats.tokens_after = count_message_tokens(compacted, model)
+            stats.truncated = True
+            logger.warning(
+                f"Prompt for {model} exceeded its {max_input_tokens:,}-token input budget; "
+                f"protocol text shortened to {stats.tokens_after:,} tokens"
+            )
+    return compacted, stats
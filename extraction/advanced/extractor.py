@@ -13,6 +13,8 @@ from typing import List, Optional, Dict, Any
 
 from core.llm_client import call_llm
 from core.pdf_utils import extract_text_from_pages, get_page_count
+from core.pdf_document import get_protocol_document
+from core.page_classifier import register_section_patterns
 from .schema import (
     AdvancedData,
     StudyAmendment,
@@ -38,6 +40,29 @@ class AdvancedExtractionResult:
     model_used: Optional[str] = None
 
 
+# Keywords to find amendment-related pages
+AMENDMENT_HISTORY_KEYWORDS = [
+    r'amendment\s+history',
+    r'protocol\s+amendment\s+history',
+    r'overall\s+rationale\s+for\s+the\s+amendment',
+    r'changes\s+to\s+the\s+protocol',
+    r'summary\s+of\s+changes',
+    r'document\s+history',
+]
+
+ADVANCED_OTHER_KEYWORDS = [
+    r'protocol\s+amendment',
+    r'version\s+history',
+    r'participating\s+countries',
+    r'geographic\s+scope',
+    r'study\s+sites?',
+    r'investigator\s+sites?',
+]
+
+AMENDMENT_HISTORY_SECTION = register_section_patterns("advanced.amendment_history", AMENDMENT_HISTORY_KEYWORDS)
+ADVANCED_OTHER_SECTION = register_section_patterns("advanced.other", ADVANCED_OTHER_KEYWORDS)
+
+
 def find_advanced_pages(
     pdf_path: str,
     max_pages: int = 100,  # Increased to search more of the document
@@ -48,57 +73,29 @@ def find_advanced_pages(
     Amendment history is often near the END of protocols, so we search
     the entire document, not just the first 30 pages.
     """
-    import fitz
-    
-    # Keywords to find amendment-related pages
-    amendment_keywords = [
-        r'amendment\s+history',
-        r'protocol\s+amendment\s+history',
-        r'overall\s+rationale\s+for\s+the\s+amendment',
-        r'changes\s+to\s+the\s+protocol',
-        r'summary\s+of\s+changes',
-        r'document\s+history',
-    ]
-    
-    other_keywords = [
-        r'protocol\s+amendment',
-        r'version\s+history',
-        r'participating\s+countries',
-        r'geographic\s+scope',
-        r'study\s+sites?',
-        r'investigator\s+sites?',
-    ]
-    
-    amendment_pattern = re.compile('|'.join(amendment_keywords), re.IGNORECASE)
-    other_pattern = re.compile('|'.join(other_keywords), re.IGNORECASE)
-    
     found_pages = []
     amendment_pages = []
     
     try:
-        doc = fitz.open(pdf_path)
-        total_pages = len(doc)
+        doc = get_protocol_document(pdf_path)
+        total_pages = doc.page_count
         
         # Always include first few pages (title, current amendment summary often there)
         found_pages = [0, 1, 2, 3]
         
         # Search ENTIRE document for amendment history (often at end)
-        for page_num in range(total_pages):
-            page = doc[page_num]
-            text = page.get_text().lower()
-            
+        for page_num, features in doc.iter_page_features(max_pages=total_pages):
             # Priority: amendment history pages
-            if amendment_pattern.search(text):
+            if features.has(AMENDMENT_HISTORY_SECTION):
                 amendment_pages.append(page_num)
             # Also include other relevant pages (limited)
-            elif other_pattern.search(text) and page_num < 30:
+            elif features.has(ADVANCED_OTHER_SECTION) and page_num < 30:
                 if page_num not in found_pages:
                     found_pages.append(page_num)
         
         # Add all amendment history pages (these contain the detailed summaries)
         found_pages.extend(amendment_pages)
         
-        doc.close()
         found_pages = sorted(set(found_pages))
         
         logger.info(f"Found {len(found_pages)} advanced entity pages "
@@ -140,9 +137,12 @@ def extract_advanced_entities(
         
         # Call LLM for extraction
         logger.info("Extracting advanced entities with LLM...")
-        prompt = build_advanced_extraction_prompt(protocol_text)
+        prompt = build_advanced_extraction_prompt()
         
-        response = call_llm(prompt=prompt, model_name=model_name, json_mode=True, extractor_name="advanced")
+        response = call_llm(
+            prompt=prompt, model_name=model_name, json_mode=True, extractor_name="advanced",
+            context=protocol_text,
+        )
         
         if 'error' in response:
             result.error = response['error']
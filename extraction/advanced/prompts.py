@@ -4,6 +4,8 @@ LLM Prompts for Advanced Entities Extraction.
 These prompts guide the LLM to extract amendments, geographic scope, and sites.
 """
 
+from typing import Optional
+
 ADVANCED_EXTRACTION_PROMPT = """You are an expert at extracting protocol amendment and geographic information from clinical trial protocols.
 
 Analyze the provided protocol content and extract advanced protocol entities.
@@ -84,6 +86,8 @@ Now analyze the protocol content and extract the advanced entities:
 """
 
 
-def build_advanced_extraction_prompt(protocol_text: str) -> str:
-    """Build the full extraction prompt with protocol content."""
+def build_advanced_extraction_prompt(protocol_text: Optional[str] = None) -> str:
+    """Build the full extraction prompt with protocol content (instructions only if protocol_text is None)."""
+    if protocol_text is None:
+        return ADVANCED_EXTRACTION_PROMPT
     return f"{ADVANCED_EXTRACTION_PROMPT}\n\n---\n\nPROTOCOL CONTENT:\n\n{protocol_text}"
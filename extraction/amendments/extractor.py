@@ -12,6 +12,8 @@ from typing import List, Optional, Dict, Any
 
 from core.llm_client import call_llm
 from core.pdf_utils import extract_text_from_pages, get_page_count
+from core.pdf_document import get_protocol_document
+from core.page_classifier import register_section_patterns
 from .schema import (
     AmendmentDetailsData,
     AmendmentDetailsResult,
@@ -27,6 +29,22 @@ from .prompts import get_amendments_prompt, get_system_prompt
 logger = logging.getLogger(__name__)
 
 
+AMENDMENT_KEYWORDS = [
+    r'amendment',
+    r'revision',
+    r'change\s+log',
+    r'change\s+history',
+    r'document\s+history',
+    r'modification',
+    r'protocol\s+change',
+    r'summary\s+of\s+changes',
+    r'rationale',
+    r'reason\s+for\s+change',
+]
+
+AMENDMENT_SECTION = register_section_patterns("amendments", AMENDMENT_KEYWORDS)
+
+
 def find_amendment_pages(
     pdf_path: str,
     max_pages_to_scan: int = 60,
@@ -34,42 +52,20 @@ def find_amendment_pages(
     """
     Find pages containing amendment information.
     """
-    import fitz
-    
-    amendment_keywords = [
-        r'amendment',
-        r'revision',
-        r'change\s+log',
-        r'change\s+history',
-        r'document\s+history',
-        r'modification',
-        r'protocol\s+change',
-        r'summary\s+of\s+changes',
-        r'rationale',
-        r'reason\s+for\s+change',
-    ]
-    
-    pattern = re.compile('|'.join(amendment_keywords), re.IGNORECASE)
-    
     amendment_pages = []
     
     try:
-        doc = fitz.open(pdf_path)
-        total_pages = min(len(doc), max_pages_to_scan)
+        doc = get_protocol_document(pdf_path)
+        total_pages = min(doc.page_count, max_pages_to_scan)
         
         # Include first few pages (often have amendment summary)
         amendment_pages = [0, 1, 2]
         
-        for page_num in range(total_pages):
-            page = doc[page_num]
-            text = page.get_text().lower()
-            
-            matches = len(pattern.findall(text))
+        for page_num, features in doc.iter_page_features(max_pages=total_pages):
+            matches = features.count(AMENDMENT_SECTION)
             if matches >= 2 and page_num not in amendment_pages:
                 amendment_pages.append(page_num)
         
-        doc.close()
-        
         amendment_pages = sorted(set(amendment_pages))
         if len(amendment_pages) > 15:
             amendment_pages = amendment_pages[:15]
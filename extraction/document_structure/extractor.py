@@ -13,6 +13,8 @@ from typing import List, Optional, Dict, Any
 
 from core.llm_client import call_llm
 from core.pdf_utils import extract_text_from_pages, get_page_count
+from core.pdf_document import get_protocol_document
+from core.page_classifier import register_section_patterns
 from .schema import (
     DocumentStructureData,
     DocumentStructureResult,
@@ -26,6 +28,24 @@ from .prompts import get_document_structure_prompt, get_system_prompt
 logger = logging.getLogger(__name__)
 
 
+DOCUMENT_STRUCTURE_KEYWORDS = [
+    r'table\s+of\s+contents',
+    r'list\s+of\s+tables',
+    r'list\s+of\s+figures',
+    r'appendix',
+    r'see\s+section',
+    r'refer\s+to',
+    r'footnote',
+    r'protocol\s+version',
+    r'amendment',
+    r'document\s+history',
+    r'revision\s+history',
+    r'version\s+\d',
+]
+
+DOCUMENT_STRUCTURE_SECTION = register_section_patterns("document_structure", DOCUMENT_STRUCTURE_KEYWORDS)
+
+
 def find_document_structure_pages(
     pdf_path: str,
     max_pages_to_scan: int = 60,
@@ -33,44 +53,20 @@ def find_document_structure_pages(
     """
     Find pages containing document structure information.
     """
-    import fitz
-    
-    structure_keywords = [
-        r'table\s+of\s+contents',
-        r'list\s+of\s+tables',
-        r'list\s+of\s+figures',
-        r'appendix',
-        r'see\s+section',
-        r'refer\s+to',
-        r'footnote',
-        r'protocol\s+version',
-        r'amendment',
-        r'document\s+history',
-        r'revision\s+history',
-        r'version\s+\d',
-    ]
-    
-    pattern = re.compile('|'.join(structure_keywords), re.IGNORECASE)
-    
     structure_pages = []
     
     try:
-        doc = fitz.open(pdf_path)
-        total_pages = min(len(doc), max_pages_to_scan)
+        doc = get_protocol_document(pdf_path)
+        total_pages = min(doc.page_count, max_pages_to_scan)
         
         # Always include first few pages (cover, TOC)
         structure_pages = [0, 1, 2, 3, 4]
         
-        for page_num in range(total_pages):
-            page = doc[page_num]
-            text = page.get_text().lower()
-            
-            matches = len(pattern.findall(text))
+        for page_num, features in doc.iter_page_features(max_pages=total_pages):
+            matches = features.count(DOCUMENT_STRUCTURE_SECTION)
             if matches >= 2 and page_num not in structure_pages:
                 structure_pages.append(page_num)
         
-        doc.close()
-        
         structure_pages = sorted(set(structure_pages))
         if len(structure_pages) > 20:
             structure_pages = structure_pages[:20]
@@ -13,6 +13,8 @@ from typing import List, Optional, Dict, Any, Tuple
 
 from core.llm_client import call_llm
 from core.pdf_utils import extract_text_from_pages, get_page_count
+from core.pdf_document import get_protocol_document
+from core.page_classifier import register_section_patterns, register_section_keywords
 from .schema import (
     EligibilityData,
     EligibilityCriterion,
@@ -36,6 +38,33 @@ class EligibilityExtractionResult:
     model_used: Optional[str] = None
 
 
+# Patterns for section headers followed by numbered criteria
+ELIGIBILITY_CONTENT_PATTERNS = [
+    # Section header followed by numbered items
+    r'inclusion\s+criteria\s*\n.*?(?:1\.|i1|a\))',
+    r'exclusion\s+criteria\s*\n.*?(?:1\.|e1|a\))',
+    # Criteria with typical formatting
+    r'(?:participants?|subjects?)\s+(?:must|aged|with)\s+',
+    r'(?:diagnosis|history)\s+of\s+',
+    r'(?:≥|>=|≤|<=)\s*\d+\s*(?:years?|months?|kg|mg)',
+]
+
+# Keywords that indicate TOC or reference pages (exclude these)
+ELIGIBILITY_TOC_INDICATORS = [
+    r'table\s+of\s+contents',
+    r'\.{5,}',  # Dotted lines typical in TOC
+    r'page\s+\d+\s+of\s+\d+.*page\s+\d+\s+of\s+\d+',  # Multiple page numbers
+]
+
+ELIGIBILITY_HEADERS = ['inclusion criteria', 'exclusion criteria', 'eligibility criteria']
+
+ELIGIBILITY_CONTENT_SECTION = register_section_patterns(
+    "eligibility.content", ELIGIBILITY_CONTENT_PATTERNS, flags=re.DOTALL
+)
+ELIGIBILITY_TOC_SECTION = register_section_patterns("eligibility.toc", ELIGIBILITY_TOC_INDICATORS)
+ELIGIBILITY_HEADER_SECTION = register_section_keywords("eligibility.headers", ELIGIBILITY_HEADERS)
+
+
 def find_eligibility_pages(
     pdf_path: str,
     max_pages_to_scan: int = 50,
@@ -53,56 +82,25 @@ def find_eligibility_pages(
     Returns:
         List of 0-indexed page numbers likely containing eligibility criteria
     """
-    import fitz
-    
-    # Patterns for section headers followed by numbered criteria
-    content_patterns = [
-        # Section header followed by numbered items
-        r'inclusion\s+criteria\s*\n.*?(?:1\.|i1|a\))',
-        r'exclusion\s+criteria\s*\n.*?(?:1\.|e1|a\))',
-        # Criteria with typical formatting
-        r'(?:participants?|subjects?)\s+(?:must|aged|with)\s+',
-        r'(?:diagnosis|history)\s+of\s+',
-        r'(?:≥|>=|≤|<=)\s*\d+\s*(?:years?|months?|kg|mg)',
-    ]
-    
-    # Keywords that indicate TOC or reference pages (exclude these)
-    toc_indicators = [
-        r'table\s+of\s+contents',
-        r'\.{5,}',  # Dotted lines typical in TOC
-        r'page\s+\d+\s+of\s+\d+.*page\s+\d+\s+of\s+\d+',  # Multiple page numbers
-    ]
-    
-    content_pattern = re.compile('|'.join(content_patterns), re.IGNORECASE | re.DOTALL)
-    toc_pattern = re.compile('|'.join(toc_indicators), re.IGNORECASE)
-    
     eligibility_pages = []
     
     try:
-        doc = fitz.open(pdf_path)
-        total_pages = min(len(doc), max_pages_to_scan)
+        doc = get_protocol_document(pdf_path)
+        total_pages = min(doc.page_count, max_pages_to_scan)
         
-        for page_num in range(total_pages):
-            page = doc[page_num]
-            text = page.get_text()
-            text_lower = text.lower()
-            
+        for page_num, features in doc.iter_page_features(max_pages=total_pages):
             # Skip TOC pages
-            if toc_pattern.search(text):
+            if features.has(ELIGIBILITY_TOC_SECTION):
                 continue
             
             # Look for actual eligibility content
-            has_header = ('inclusion criteria' in text_lower or 
-                         'exclusion criteria' in text_lower or
-                         'eligibility criteria' in text_lower)
-            has_content = content_pattern.search(text_lower)
+            has_header = features.has(ELIGIBILITY_HEADER_SECTION)
+            has_content = features.has(ELIGIBILITY_CONTENT_SECTION)
             
             if has_header and has_content:
                 eligibility_pages.append(page_num)
                 logger.debug(f"Found eligibility content on page {page_num + 1}")
         
-        doc.close()
-        
         # If we found pages, also include adjacent pages for context
         if eligibility_pages:
             expanded = set()
@@ -176,64 +174,22 @@ def extract_eligibility_criteria(
         if study_phase:
             context_hints += f"\nStudy phase: {study_phase}"
         
-        prompt = build_eligibility_extraction_prompt(protocol_text, context_hints=context_hints)
+        prompt = build_eligibility_extraction_prompt(context_hints=context_hints)
         
-        # Try extraction with retry for truncated responses
-        # Increased from 2 to 4 retries to handle very long eligibility sections
-        max_retries = 4
-        raw_response = None
-        accumulated_response = ""
+        # Truncated responses are continued by call_llm
+        response = call_llm(
+            prompt=prompt,
+            model_name=model_name,
+            json_mode=True,
+            extractor_name="eligibility",
+            context=protocol_text,
+        )
         
-        for attempt in range(max_retries + 1):
-            if attempt == 0:
-                current_prompt = prompt
-            else:
-                # Retry with continuation prompt - show more context for better continuation
-                logger.info(f"Retry {attempt}/{max_retries}: Requesting continuation...")
-                # Show last 3000 chars for better context
-                context_window = min(3000, len(accumulated_response))
-                current_prompt = (
-                    f"Your previous response was truncated. Here is the end of what you generated:\n\n"
-                    f"```json\n{accumulated_response[-context_window:]}\n```\n\n"
-                    f"Please complete the JSON response. Continue EXACTLY from where you left off. "
-                    f"Do NOT repeat any content already generated. Output ONLY the remaining JSON to complete the structure. "
-                    f"Ensure all arrays and objects are properly closed."
-                )
-            
-            response = call_llm(
-                prompt=current_prompt,
-                model_name=model_name,
-                json_mode=True,
-                extractor_name="eligibility",
-            )
-            
-            if 'error' in response:
-                result.error = response['error']
-                return result
-            
-            response_text = response.get('response', '')
-            
-            # If this is a continuation, accumulate and try to merge
-            if attempt > 0 and response_text:
-                # Accumulate the continuation
-                accumulated_response = accumulated_response.rstrip() + response_text.lstrip()
-                raw_response = _parse_json_response(accumulated_response)
-                if raw_response:
-                    logger.info(f"Successfully parsed combined response after {attempt} continuation(s)")
-                    break
-            else:
-                accumulated_response = response_text
-                raw_response = _parse_json_response(response_text)
-                if raw_response:
-                    break
-                    
-                # Check if truncated and worth retrying
-                try:
-                    json.loads(response_text.strip())
-                except json.JSONDecodeError as e:
-                    if not _is_truncated_json(response_text, e):
-                        # Not truncation, don't retry
-                        break
+        if 'error' in response:
+            result.error = response['error']
+            return result
+        
+        raw_response = _parse_json_response(response.get('response', ''))
         
         if not raw_response:
             result.error = "Failed to parse LLM response as JSON (possibly truncated)"
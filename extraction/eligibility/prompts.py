@@ -7,6 +7,8 @@ from protocol Section 4-5.
 Output format follows USDM v4.0 OpenAPI schema requirements.
 """
 
+from typing import Optional
+
 ELIGIBILITY_EXTRACTION_PROMPT = """You are an expert at extracting eligibility criteria from clinical trial protocols.
 Your output must conform to USDM v4.0 schema specifications.
 
@@ -154,12 +156,17 @@ Pages are 0-indexed. Return ONLY valid JSON.
 """
 
 
-def build_eligibility_extraction_prompt(protocol_text: str, context_hints: str = "") -> str:
-    """Build the full extraction prompt with protocol content and optional context hints."""
+def build_eligibility_extraction_prompt(protocol_text: Optional[str] = None, context_hints: str = "") -> str:
+    """
+    Build the full extraction prompt with protocol content and optional context hints.
+    
+    Without protocol_text, returns the instructions only (for call_llm(context=...)).
+    """
     prompt = ELIGIBILITY_EXTRACTION_PROMPT
     if context_hints:
         prompt += f"\n\nCONTEXT FROM PRIOR EXTRACTION:{context_hints}"
-    prompt += f"\n\n---\n\nPROTOCOL CONTENT:\n\n{protocol_text}"
+    if protocol_text is not None:
+        prompt += f"\n\n---\n\nPROTOCOL CONTENT:\n\n{protocol_text}"
     return prompt
 
 
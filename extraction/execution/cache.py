@@ -282,22 +282,24 @@ def cached(
 
 def cache_pdf_text(pdf_path: str, pages: Optional[list] = None) -> str:
     """
-    Get cached PDF text or extract and cache it.
+    Get PDF text through the shared document and persistent page cache.
+    
+    Text is read from the on-disk page cache (keyed by the PDF's SHA-256)
+    when available and only extracted with PyMuPDF on a miss.
     
     Args:
         pdf_path: Path to PDF file
-        pages: Optional list of page numbers
+        pages: Optional list of 0-indexed page numbers (default: all pages)
         
     Returns:
-        Cached key for the PDF text
+        Page text joined with blank lines
     """
-    import hashlib
+    from core.pdf_document import get_protocol_document
     
-    # Generate key based on file path and modification time
-    path = Path(pdf_path)
-    if not path.exists():
+    if not Path(pdf_path).exists():
         return ""
     
-    mtime = path.stat().st_mtime
-    key_data = f"{pdf_path}:{mtime}:{pages}"
-    return hashlib.sha256(key_data.encode()).hexdigest()[:16]
+    doc = get_protocol_document(pdf_path)
+    if pages is None:
+        pages = range(doc.page_count)
+    return doc.get_pages_text(pages, separator="\n\n")
@@ -16,6 +16,8 @@ import json
 import logging
 from typing import List, Dict, Any, Optional, Tuple
 
+from core.pdf_document import get_protocol_document
+from core.page_classifier import register_section_patterns
 from .schema import (
     CrossoverDesign, TraversalConstraint,
     ExecutionModelResult, ExecutionModelData
@@ -84,31 +86,25 @@ CROSSOVER_KEYWORDS = [
     r'treatment\s+order',
 ]
 
+CROSSOVER_SECTION = register_section_patterns("execution.crossover", CROSSOVER_KEYWORDS)
+
 
 def find_crossover_pages(
     pdf_path: str,
     max_pages_to_scan: int = 40,
 ) -> List[int]:
     """Find pages likely to contain crossover design information."""
-    import fitz
-    
-    pattern = re.compile('|'.join(CROSSOVER_KEYWORDS), re.IGNORECASE)
     pages = []
     
     try:
-        doc = fitz.open(pdf_path)
-        total_pages = min(len(doc), max_pages_to_scan)
+        doc = get_protocol_document(pdf_path)
+        total_pages = min(doc.page_count, max_pages_to_scan)
         
-        for page_num in range(total_pages):
-            page = doc[page_num]
-            text = page.get_text().lower()
-            
-            matches = len(pattern.findall(text))
+        for page_num, features in doc.iter_page_features(max_pages=total_pages):
+            matches = features.count(CROSSOVER_SECTION)
             if matches >= 2:
                 pages.append(page_num)
         
-        doc.close()
-        
         if len(pages) > 15:
             pages = pages[:15]
         
@@ -9,6 +9,8 @@ import re
 import logging
 from typing import List, Optional, Tuple, Dict, Any
 
+from core.pdf_document import get_protocol_document
+from core.page_classifier import register_section_keywords
 from .schema import (
     DerivedVariable,
     VariableType,
@@ -28,6 +30,8 @@ VARIABLE_KEYWORDS = [
     "AUC", "Cmax", "Tmax", "half-life",
 ]
 
+VARIABLE_SECTION = register_section_keywords("execution.derived_variables", VARIABLE_KEYWORDS)
+
 # Patterns for detecting variable types
 VARIABLE_TYPE_PATTERNS = [
     (r'change\s+from\s+baseline', VariableType.CHANGE_FROM_BASELINE, 0.95),
@@ -58,18 +62,13 @@ IMPUTATION_PATTERNS = [
 
 def find_variable_pages(pdf_path: str) -> List[int]:
     """Find pages likely to contain derived variable definitions."""
-    from core.pdf_utils import extract_text_from_pages, get_page_count
-    
-    page_count = get_page_count(pdf_path)
+    doc = get_protocol_document(pdf_path)
     relevant_pages = []
     
-    for page_idx in range(min(page_count, 80)):
-        text = extract_text_from_pages(pdf_path, [page_idx])
-        if text:
-            text_lower = text.lower()
-            score = sum(1 for kw in VARIABLE_KEYWORDS if kw in text_lower)
-            if score >= 2:
-                relevant_pages.append(page_idx)
+    for page_idx, features in doc.iter_page_features(max_pages=80):
+        score = features.distinct(VARIABLE_SECTION)
+        if score >= 2:
+            relevant_pages.append(page_idx)
     
     return relevant_pages
 
@@ -12,7 +12,8 @@ import logging
 from typing import List, Optional, Dict, Any, Tuple
 from pathlib import Path
 
-import fitz  # PyMuPDF
+from core.pdf_document import get_protocol_document
+from core.page_classifier import register_section_keywords
 
 from .schema import (
     ExecutionModelResult,
@@ -38,6 +39,8 @@ DOSING_KEYWORDS = [
     "oral", "intravenous", "subcutaneous", "IV", "SC", "IM",
 ]
 
+DOSING_SECTION = register_section_keywords("execution.dosing", [kw.lower() for kw in DOSING_KEYWORDS])
+
 # Frequency pattern mappings
 FREQUENCY_PATTERNS = {
     r'\b(once\s+daily|QD|q\.?d\.?|od)\b': DosingFrequency.ONCE_DAILY,
@@ -129,10 +132,7 @@ def _parse_dose_amount(value: Any) -> Tuple[float, Optional[float]]:
 def _get_page_count(pdf_path: str) -> int:
     """Get total page count of PDF."""
     try:
-        doc = fitz.open(pdf_path)
-        count = len(doc)
-        doc.close()
-        return count
+        return get_protocol_document(pdf_path).page_count
     except Exception:
         return 0
 
@@ -140,19 +140,12 @@ def _get_page_count(pdf_path: str) -> int:
 def _extract_text_from_pages(pdf_path: str, pages: List[int] = None) -> str:
     """Extract text from specified pages or all pages."""
     try:
-        doc = fitz.open(pdf_path)
-        text_parts = []
+        doc = get_protocol_document(pdf_path)
         
         if pages is None:
-            pages = range(len(doc))
-        
-        for page_num in pages:
-            if 0 <= page_num < len(doc):
-                page = doc[page_num]
-                text_parts.append(page.get_text())
+            pages = range(doc.page_count)
         
-        doc.close()
-        return "\n\n".join(text_parts)
+        return doc.get_pages_text(pages, separator="\n\n")
     except Exception as e:
         logger.warning(f"Error extracting text: {e}")
         return ""
@@ -162,19 +155,13 @@ def find_dosing_pages(pdf_path: str) -> List[int]:
     """Find pages likely to contain dosing information."""
     try:
         pages = []
-        page_count = _get_page_count(pdf_path)
-        
-        for page_num in range(page_count):
-            try:
-                page_text = _extract_text_from_pages(pdf_path, pages=[page_num])
-                if page_text:
-                    text_lower = page_text.lower()
-                    # Check for dosing keywords
-                    keyword_count = sum(1 for kw in DOSING_KEYWORDS if kw.lower() in text_lower)
-                    if keyword_count >= 3:
-                        pages.append(page_num)
-            except Exception:
-                continue
+        doc = get_protocol_document(pdf_path)
+        
+        for page_num, features in doc.iter_page_features():
+            # Check for dosing keywords
+            keyword_count = features.distinct(DOSING_SECTION)
+            if keyword_count >= 3:
+                pages.append(page_num)
         
         return pages[:30]  # Limit to 30 pages
         
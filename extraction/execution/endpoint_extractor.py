@@ -10,6 +10,8 @@ import re
 import logging
 from typing import List, Optional, Tuple, Dict, Any
 
+from core.pdf_document import get_protocol_document
+from core.page_classifier import register_section_keywords
 from .schema import (
     EndpointAlgorithm,
     EndpointType,
@@ -29,6 +31,8 @@ ENDPOINT_KEYWORDS = [
     "change from baseline", "time to event", "survival",
 ]
 
+ENDPOINT_SECTION = register_section_keywords("execution.endpoints", ENDPOINT_KEYWORDS)
+
 # Patterns for detecting endpoint types
 ENDPOINT_TYPE_PATTERNS = [
     (r'primary\s+(?:efficacy\s+)?endpoint', EndpointType.PRIMARY, 0.95),
@@ -72,18 +76,13 @@ COMMON_INPUTS = {
 
 def find_endpoint_pages(pdf_path: str) -> List[int]:
     """Find pages likely to contain endpoint definitions."""
-    from core.pdf_utils import extract_text_from_pages, get_page_count
-    
-    page_count = get_page_count(pdf_path)
+    doc = get_protocol_document(pdf_path)
     relevant_pages = []
     
-    for page_idx in range(min(page_count, 80)):
-        text = extract_text_from_pages(pdf_path, [page_idx])
-        if text:
-            text_lower = text.lower()
-            score = sum(1 for kw in ENDPOINT_KEYWORDS if kw in text_lower)
-            if score >= 2:
-                relevant_pages.append(page_idx)
+    for page_idx, features in doc.iter_page_features(max_pages=80):
+        score = features.distinct(ENDPOINT_SECTION)
+        if score >= 2:
+            relevant_pages.append(page_idx)
     
     return relevant_pages
 
@@ -144,6 +144,7 @@ class EntityResolver:
     ) -> Dict[str, Optional[EntityMapping]]:
         """Use LLM to semantically resolve epoch concepts."""
         from core.llm_client import call_llm
+        from core.model_router import record_route_validation
         
         # Combine system prompt with user prompt (call_llm doesn't support system_prompt)
         full_prompt = f"{EPOCH_RESOLUTION_SYSTEM_PROMPT}\n\n{self._build_epoch_resolution_prompt(concepts, context)}"
@@ -157,8 +158,11 @@ class EntityResolver:
             response = result.get('response', '')
             if result.get('error'):
                 logger.error(f"LLM epoch resolution error: {result.get('error')}")
+                record_route_validation("entity_resolver", False)
                 return {c: None for c in concepts}
-            return self._parse_epoch_resolution_response(response, concepts, context)
+            mappings = self._parse_epoch_resolution_response(response, concepts, context)
+            record_route_validation("entity_resolver", any(m is not None for m in mappings.values()))
+            return mappings
         except Exception as e:
             logger.error(f"LLM epoch resolution failed: {e}")
             return {c: None for c in concepts}
@@ -286,6 +290,7 @@ If a concept has no matching epoch, set epochId and epochName to null."""
     ) -> Dict[str, Optional[EntityMapping]]:
         """Use LLM to resolve visit concepts."""
         from core.llm_client import call_llm
+        from core.model_router import record_route_validation
         
         prompt = f"""Map the following abstract visit concepts to actual protocol visits/encounters.
 
@@ -302,8 +307,11 @@ Return JSON array with mappings (same format as epoch resolution)."""
             response = result.get('response', '')
             if result.get('error'):
                 logger.error(f"LLM visit resolution error: {result.get('error')}")
+                record_route_validation("entity_resolver", False)
                 return {c: None for c in concepts}
-            return self._parse_visit_resolution_response(response, concepts, context)
+            mappings = self._parse_visit_resolution_response(response, concepts, context)
+            record_route_validation("entity_resolver", any(m is not None for m in mappings.values()))
+            return mappings
         except Exception as e:
             logger.error(f"LLM visit resolution failed: {e}")
             return {c: None for c in concepts}
@@ -415,6 +415,7 @@ def _detect_common_activities(text: str) -> List[str]:
 def _classify_with_llm(text: str, model: str) -> List[ExecutionTypeAssignment]:
     """Use LLM for execution type classification."""
     from core.llm_client import call_llm
+    from core.model_router import record_route_validation
     
     prompt = f"""Analyze this clinical protocol and classify the DATA COLLECTION ACTIVITIES by execution type:
 
@@ -473,10 +474,12 @@ Return ONLY the JSON."""
                 rationale=item.get('rationale'),
             ))
         
+        record_route_validation("execution_type", 'classifications' in data)
         return assignments
         
     except Exception as e:
         logger.error(f"LLM classification failed: {e}")
+        record_route_validation("execution_type", False)
         return []
 
 
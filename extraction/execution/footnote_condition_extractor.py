@@ -21,6 +21,8 @@ import json
 import logging
 from typing import List, Dict, Any, Optional, Tuple
 
+from core.pdf_document import get_protocol_document
+from core.page_classifier import register_section_patterns
 from .schema import (
     FootnoteCondition,
     ExecutionModelResult, ExecutionModelData
@@ -117,39 +119,34 @@ FOOTNOTE_MARKERS = [
 ]
 
 
+FOOTNOTE_KEYWORDS = [
+    r'schedule\s+of\s+(?:activities|assessments|events)',
+    r'soa',
+    r'footnote',
+    r'\[a\]|\[b\]|\[1\]|\[2\]',
+    r'note\s*:',
+    r'abbreviation',
+]
+
+FOOTNOTE_SECTION = register_section_patterns("execution.footnotes", FOOTNOTE_KEYWORDS)
+
+
 def find_footnote_pages(
     pdf_path: str,
     max_pages_to_scan: int = 200,
 ) -> List[int]:
     """Find pages likely to contain SoA footnotes."""
-    import fitz
-    
-    footnote_keywords = [
-        r'schedule\s+of\s+(?:activities|assessments|events)',
-        r'soa',
-        r'footnote',
-        r'\[a\]|\[b\]|\[1\]|\[2\]',
-        r'note\s*:',
-        r'abbreviation',
-    ]
-    
-    pattern = re.compile('|'.join(footnote_keywords), re.IGNORECASE)
     pages = []
     
     try:
-        doc = fitz.open(pdf_path)
-        total_pages = min(len(doc), max_pages_to_scan)
+        doc = get_protocol_document(pdf_path)
+        total_pages = min(doc.page_count, max_pages_to_scan)
         
-        for page_num in range(total_pages):
-            page = doc[page_num]
-            text = page.get_text().lower()
-            
-            matches = len(pattern.findall(text))
+        for page_num, features in doc.iter_page_features(max_pages=total_pages):
+            matches = features.count(FOOTNOTE_SECTION)
             if matches >= 2:
                 pages.append(page_num)
         
-        doc.close()
-        
         if len(pages) > 40:
             pages = pages[:40]
         
@@ -512,6 +509,7 @@ def _extract_conditions_llm(
 ) -> List[FootnoteCondition]:
     """Extract structured conditions using LLM."""
     from core.llm_client import call_llm
+    from core.model_router import record_route_validation
     
     footnotes_text = "\n".join([f"{i+1}. {fn}" for i, fn in enumerate(footnotes)])
     
@@ -576,10 +574,12 @@ Return ONLY the JSON."""
                     timing_constraint=item.get('timingConstraint'),
                 ))
         
+        record_route_validation("footnote_condition", 'conditions' in data)
         return conditions
         
     except Exception as e:
         logger.error(f"LLM condition extraction failed: {e}")
+        record_route_validation("footnote_condition", False)
         return []
 
 
@@ -16,6 +16,8 @@ import json
 import logging
 from typing import List, Dict, Any, Optional, Tuple
 
+from core.pdf_document import get_protocol_document
+from core.page_classifier import register_section_patterns
 from .schema import (
     Repetition, RepetitionType, SamplingConstraint,
     ExecutionModelResult, ExecutionModelData, ActivityBinding,
@@ -200,6 +202,8 @@ REPETITION_KEYWORDS = [
     r'washout',
 ]
 
+REPETITION_SECTION = register_section_patterns("execution.repetitions", REPETITION_KEYWORDS)
+
 
 def find_repetition_pages(
     pdf_path: str,
@@ -215,25 +219,17 @@ def find_repetition_pages(
     Returns:
         List of 0-indexed page numbers
     """
-    import fitz
-    
-    pattern = re.compile('|'.join(REPETITION_KEYWORDS), re.IGNORECASE)
     pages = []
     
     try:
-        doc = fitz.open(pdf_path)
-        total_pages = min(len(doc), max_pages_to_scan)
+        doc = get_protocol_document(pdf_path)
+        total_pages = min(doc.page_count, max_pages_to_scan)
         
-        for page_num in range(total_pages):
-            page = doc[page_num]
-            text = page.get_text().lower()
-            
-            matches = len(pattern.findall(text))
+        for page_num, features in doc.iter_page_features(max_pages=total_pages):
+            matches = features.count(REPETITION_SECTION)
             if matches >= 2:
                 pages.append(page_num)
         
-        doc.close()
-        
         if len(pages) > 20:
             pages = pages[:20]
         
@@ -14,6 +14,8 @@ from dataclasses import dataclass, field
 from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 
+from core.pdf_document import get_protocol_document
+from core.page_classifier import register_section_keywords
 from .schema import (
     SamplingConstraint,
     ExecutionModelResult,
@@ -111,6 +113,8 @@ SAMPLING_KEYWORDS = [
     "minimum samples", "sampling window", "PK/PD", "bioanalytical",
 ]
 
+SAMPLING_SECTION = register_section_keywords("execution.sampling", [kw.lower() for kw in SAMPLING_KEYWORDS])
+
 
 @dataclass
 class DenseSamplingWindow:
@@ -239,20 +243,15 @@ def extract_sampling_density(
 def _find_sampling_pages(pdf_path: str) -> List[int]:
     """Find pages likely to contain sampling information."""
     try:
-        import fitz
-        doc = fitz.open(pdf_path)
+        doc = get_protocol_document(pdf_path)
         pages = []
         
-        for page_num in range(min(len(doc), 100)):
-            page = doc[page_num]
-            text = page.get_text().lower()
-            
+        for page_num, features in doc.iter_page_features(max_pages=100):
             # Check for sampling keywords
-            score = sum(1 for kw in SAMPLING_KEYWORDS if kw.lower() in text)
+            score = features.distinct(SAMPLING_SECTION)
             if score >= 2:
                 pages.append(page_num + 1)
         
-        doc.close()
         return pages
         
     except Exception as e:
@@ -263,17 +262,9 @@ def _find_sampling_pages(pdf_path: str) -> List[int]:
 def _extract_text_from_pages(pdf_path: str, pages: List[int]) -> str:
     """Extract text from specified pages."""
     try:
-        import fitz
-        doc = fitz.open(pdf_path)
-        text_parts = []
-        
-        for page_num in pages:
-            if page_num <= len(doc):
-                page = doc[page_num - 1]
-                text_parts.append(page.get_text())
-        
-        doc.close()
-        return "\n".join(text_parts)
+        doc = get_protocol_document(pdf_path)
+        # Pages are 1-indexed here
+        return doc.get_pages_text([p - 1 for p in pages], separator="\n")
         
     except Exception as e:
         logger.warning(f"Error extracting text: {e}")
@@ -9,6 +9,8 @@ import re
 import logging
 from typing import List, Optional, Tuple, Dict, Any
 
+from core.pdf_document import get_protocol_document
+from core.page_classifier import register_section_keywords
 from .schema import (
     SubjectStateMachine,
     StateTransition,
@@ -30,6 +32,8 @@ STATE_KEYWORDS = [
     "adverse event", "death", "consent withdrawn",
 ]
 
+STATE_SECTION = register_section_keywords("execution.disposition", STATE_KEYWORDS)
+
 # Common discontinuation reasons
 DISCONTINUATION_REASONS = [
     "adverse event",
@@ -78,18 +82,13 @@ STANDARD_TRANSITIONS = [
 
 def find_disposition_pages(pdf_path: str) -> List[int]:
     """Find pages likely to contain disposition/flow information."""
-    from core.pdf_utils import extract_text_from_pages, get_page_count
-    
-    page_count = get_page_count(pdf_path)
+    doc = get_protocol_document(pdf_path)
     relevant_pages = []
     
-    for page_idx in range(min(page_count, 80)):
-        text = extract_text_from_pages(pdf_path, [page_idx])
-        if text:
-            text_lower = text.lower()
-            score = sum(1 for kw in STATE_KEYWORDS if kw in text_lower)
-            if score >= 2:
-                relevant_pages.append(page_idx)
+    for page_idx, features in doc.iter_page_features(max_pages=80):
+        score = features.distinct(STATE_SECTION)
+        if score >= 2:
+            relevant_pages.append(page_idx)
     
     return relevant_pages
 
@@ -12,7 +12,8 @@ import logging
 from typing import List, Optional, Dict, Any, Tuple
 from pathlib import Path
 
-import fitz  # PyMuPDF
+from core.pdf_document import get_protocol_document
+from core.page_classifier import register_section_keywords
 
 from .schema import (
     ExecutionModelResult,
@@ -32,6 +33,8 @@ RANDOMIZATION_KEYWORDS = [
     "randomization ratio", "allocation ratio", "1:1", "2:1", "1:1:1",
 ]
 
+RANDOMIZATION_SECTION = register_section_keywords("execution.randomization", [kw.lower() for kw in RANDOMIZATION_KEYWORDS])
+
 # Common stratification factors
 COMMON_STRAT_FACTORS = [
     "age", "sex", "gender", "race", "ethnicity", "region", "site", "country",
@@ -50,10 +53,7 @@ BLOCK_SIZE_PATTERN = re.compile(r'block\s*(?:size)?[:\s]+(\d+)', re.IGNORECASE)
 def _get_page_count(pdf_path: str) -> int:
     """Get total page count of PDF."""
     try:
-        doc = fitz.open(pdf_path)
-        count = len(doc)
-        doc.close()
-        return count
+        return get_protocol_document(pdf_path).page_count
     except Exception:
         return 0
 
@@ -61,19 +61,12 @@ def _get_page_count(pdf_path: str) -> int:
 def _extract_text_from_pages(pdf_path: str, pages: List[int] = None) -> str:
     """Extract text from specified pages or all pages."""
     try:
-        doc = fitz.open(pdf_path)
-        text_parts = []
+        doc = get_protocol_document(pdf_path)
         
         if pages is None:
-            pages = range(len(doc))
-        
-        for page_num in pages:
-            if 0 <= page_num < len(doc):
-                page = doc[page_num]
-                text_parts.append(page.get_text())
+            pages = range(doc.page_count)
         
-        doc.close()
-        return "\n\n".join(text_parts)
+        return doc.get_pages_text(pages, separator="\n\n")
     except Exception as e:
         logger.warning(f"Error extracting text: {e}")
         return ""
@@ -83,18 +76,12 @@ def find_randomization_pages(pdf_path: str) -> List[int]:
     """Find pages likely to contain randomization information."""
     try:
         pages = []
-        page_count = _get_page_count(pdf_path)
+        doc = get_protocol_document(pdf_path)
         
-        for page_num in range(page_count):
-            try:
-                page_text = _extract_text_from_pages(pdf_path, pages=[page_num])
-                if page_text:
-                    text_lower = page_text.lower()
-                    keyword_count = sum(1 for kw in RANDOMIZATION_KEYWORDS if kw.lower() in text_lower)
-                    if keyword_count >= 2:
-                        pages.append(page_num)
-            except Exception:
-                continue
+        for page_num, features in doc.iter_page_features():
+            keyword_count = features.distinct(RANDOMIZATION_SECTION)
+            if keyword_count >= 2:
+                pages.append(page_num)
         
         return pages[:20]  # Limit to 20 pages
         
@@ -18,6 +18,8 @@ import json
 import logging
 from typing import List, Dict, Any, Optional, Tuple
 
+from core.pdf_document import get_protocol_document
+from core.page_classifier import register_section_patterns
 from .schema import TimeAnchor, AnchorType, ExecutionModelResult, ExecutionModelData
 
 logger = logging.getLogger(__name__)
@@ -202,6 +204,8 @@ ANCHOR_KEYWORDS = [
     r'schedule\s+of\s+(?:activities|assessments|events)',
 ]
 
+ANCHOR_SECTION = register_section_patterns("execution.time_anchors", ANCHOR_KEYWORDS)
+
 
 def find_anchor_pages(
     pdf_path: str,
@@ -217,26 +221,18 @@ def find_anchor_pages(
     Returns:
         List of 0-indexed page numbers
     """
-    import fitz
-    
-    pattern = re.compile('|'.join(ANCHOR_KEYWORDS), re.IGNORECASE)
     anchor_pages = []
     
     try:
-        doc = fitz.open(pdf_path)
-        total_pages = min(len(doc), max_pages_to_scan)
+        doc = get_protocol_document(pdf_path)
+        total_pages = min(doc.page_count, max_pages_to_scan)
         
-        for page_num in range(total_pages):
-            page = doc[page_num]
-            text = page.get_text().lower()
-            
-            matches = len(pattern.findall(text))
+        for page_num, features in doc.iter_page_features(max_pages=total_pages):
+            matches = features.count(ANCHOR_SECTION)
             if matches >= 2:
                 anchor_pages.append(page_num)
                 logger.debug(f"Found anchor keywords on page {page_num + 1}")
         
-        doc.close()
-        
         if len(anchor_pages) > 15:
             anchor_pages = anchor_pages[:15]
         
@@ -17,6 +17,8 @@ import json
 import logging
 from typing import List, Dict, Any, Optional, Tuple
 
+from core.pdf_document import get_protocol_document
+from core.page_classifier import register_section_patterns
 from .schema import (
     TraversalConstraint,
     ExecutionModelResult, ExecutionModelData
@@ -79,31 +81,25 @@ TRAVERSAL_KEYWORDS = [
     r'required\s+visit',
 ]
 
+TRAVERSAL_SECTION = register_section_patterns("execution.traversal", TRAVERSAL_KEYWORDS)
+
 
 def find_traversal_pages(
     pdf_path: str,
     max_pages_to_scan: int = 40,
 ) -> List[int]:
     """Find pages likely to contain study design/flow information."""
-    import fitz
-    
-    pattern = re.compile('|'.join(TRAVERSAL_KEYWORDS), re.IGNORECASE)
     pages = []
     
     try:
-        doc = fitz.open(pdf_path)
-        total_pages = min(len(doc), max_pages_to_scan)
+        doc = get_protocol_document(pdf_path)
+        total_pages = min(doc.page_count, max_pages_to_scan)
         
-        for page_num in range(total_pages):
-            page = doc[page_num]
-            text = page.get_text().lower()
-            
-            matches = len(pattern.findall(text))
+        for page_num, features in doc.iter_page_features(max_pages=total_pages):
+            matches = features.count(TRAVERSAL_SECTION)
             if matches >= 2:
                 pages.append(page_num)
         
-        doc.close()
-        
         if len(pages) > 15:
             pages = pages[:15]
         
@@ -12,7 +12,8 @@ import logging
 from typing import List, Optional, Dict, Any, Tuple
 from pathlib import Path
 
-import fitz  # PyMuPDF
+from core.pdf_document import get_protocol_document
+from core.page_classifier import register_section_keywords, register_section_patterns
 
 from .schema import (
     ExecutionModelResult,
@@ -33,6 +34,9 @@ VISIT_KEYWORDS = [
     "window", "± days", "+/- days", "allowable", "deviation",
 ]
 
+VISIT_SECTION = register_section_keywords("execution.visits", [kw.lower() for kw in VISIT_KEYWORDS])
+VISIT_TABLE_SECTION = register_section_patterns("execution.visit_table", [r'visit\s*\d|week\s*\d|day\s*\d'])
+
 # Visit name patterns
 VISIT_PATTERNS = [
     # "Visit 1", "V1"
@@ -112,10 +116,7 @@ def _get_default_window(visit_name: str) -> tuple:
 def _get_page_count(pdf_path: str) -> int:
     """Get total page count of PDF."""
     try:
-        doc = fitz.open(pdf_path)
-        count = len(doc)
-        doc.close()
-        return count
+        return get_protocol_document(pdf_path).page_count
     except Exception:
         return 0
 
@@ -123,19 +124,12 @@ def _get_page_count(pdf_path: str) -> int:
 def _extract_text_from_pages(pdf_path: str, pages: List[int] = None) -> str:
     """Extract text from specified pages or all pages."""
     try:
-        doc = fitz.open(pdf_path)
-        text_parts = []
+        doc = get_protocol_document(pdf_path)
         
         if pages is None:
-            pages = range(len(doc))
-        
-        for page_num in pages:
-            if 0 <= page_num < len(doc):
-                page = doc[page_num]
-                text_parts.append(page.get_text())
+            pages = range(doc.page_count)
         
-        doc.close()
-        return "\n\n".join(text_parts)
+        return doc.get_pages_text(pages, separator="\n\n")
     except Exception as e:
         logger.warning(f"Error extracting text: {e}")
         return ""
@@ -145,21 +139,15 @@ def find_visit_pages(pdf_path: str) -> List[int]:
     """Find pages likely to contain visit schedule information."""
     try:
         pages = []
-        page_count = _get_page_count(pdf_path)
+        doc = get_protocol_document(pdf_path)
         
-        for page_num in range(page_count):
-            try:
-                page_text = _extract_text_from_pages(pdf_path, pages=[page_num])
-                if page_text:
-                    text_lower = page_text.lower()
-                    # Check for visit keywords
-                    keyword_count = sum(1 for kw in VISIT_KEYWORDS if kw.lower() in text_lower)
-                    # Also check for table-like patterns (SoA)
-                    has_table = bool(re.search(r'visit\s*\d|week\s*\d|day\s*\d', text_lower))
-                    if keyword_count >= 3 or has_table:
-                        pages.append(page_num)
-            except Exception:
-                continue
+        for page_num, features in doc.iter_page_features():
+            # Check for visit keywords
+            keyword_count = features.distinct(VISIT_SECTION)
+            # Also check for table-like patterns (SoA)
+            has_table = features.has(VISIT_TABLE_SECTION)
+            if keyword_count >= 3 or has_table:
+                pages.append(page_num)
         
         return pages[:25]  # Limit to 25 pages
         
@@ -22,19 +22,27 @@ Usage:
 """
 
 import json
-import base64
 import logging
-from pathlib import Path
 from typing import List, Optional, Tuple
 from dataclasses import dataclass
 
-from core.llm_client import get_llm_client, LLMConfig
+from core.llm_client import generate_with_images
 from core.json_utils import parse_llm_json
+from core.page_images import ImageSource, load_page_image
 from core.usdm_types import HeaderStructure, Epoch, Encounter, PlannedTimepoint, ActivityGroup
-from llm_providers import usage_tracker
 
 logger = logging.getLogger(__name__)
 
+# Output budget for the structure (large enough for all footnotes a-x)
+HEADER_MAX_TOKENS = 8192
+# Output budget and temperature of each provider's header call, as before
+# the calls moved to the provider layer (None: the task config's)
+HEADER_CALL_SETTINGS = {
+    "openai": (4096, 0.1),
+    "gemini": (None, 0.1),
+    "claude": (HEADER_MAX_TOKENS, None),
+}
+
 
 # Focused prompt for STRUCTURE extraction only
 HEADER_ANALYSIS_PROMPT = """You are analyzing a Schedule of Activities (SoA) table from a clinical trial protocol.
@@ -196,26 +204,13 @@ class HeaderAnalysisResult:
         }
 
 
-def encode_image(image_path: str) -> str:
-    """Encode image to base64 data URL."""
-    with open(image_path, 'rb') as f:
-        data = base64.b64encode(f.read()).decode('utf-8')
-    
-    # Determine MIME type
-    suffix = Path(image_path).suffix.lower()
-    mime_type = {
-        '.png': 'image/png',
-        '.jpg': 'image/jpeg',
-        '.jpeg': 'image/jpeg',
-        '.gif': 'image/gif',
-        '.webp': 'image/webp',
-    }.get(suffix, 'image/png')
-    
-    return f"data:{mime_type};base64,{data}"
+def encode_image(image_path: ImageSource) -> str:
+    """Encode image to base64 data URL (reuses the in-memory buffer)."""
+    return load_page_image(image_path).data_url
 
 
 def analyze_soa_headers(
-    image_paths: List[str],
+    image_paths: List[ImageSource],
     model_name: str = "gemini-2.5-pro",
     custom_prompt: Optional[str] = None,
 ) -> HeaderAnalysisResult:
@@ -254,13 +249,7 @@ def analyze_soa_headers(
         # Build prompt
         prompt = custom_prompt or HEADER_ANALYSIS_PROMPT
         
-        # Route to appropriate provider
-        if 'gemini' in model_name.lower():
-            return _analyze_with_gemini(image_paths, model_name, prompt)
-        elif 'claude' in model_name.lower():
-            return _analyze_with_claude(image_paths, model_name, prompt)
-        else:
-            return _analyze_with_openai(image_paths, model_name, prompt)
+        return _analyze_with_vision(image_paths, model_name, prompt)
     
     except RecitationBlockedError as e:
         # RECITATION is a known Gemini issue - not an actual copyright problem
@@ -293,241 +282,26 @@ def analyze_soa_headers(
         )
 
 
-def _analyze_with_gemini(
-    image_paths: List[str], 
-    model_name: str, 
-    prompt: str
-) -> HeaderAnalysisResult:
-    """Analyze using Google Gemini."""
-    from PIL import Image
-    import io
-    import os
-    import time
-    
-    # Check if this is a Gemini 3 model
-    is_gemini3 = any(g3 in model_name.lower() for g3 in ['gemini-3', 'gemini-3-flash', 'gemini-3-pro'])
-    
-    # Load images as base64
-    image_parts = []
-    for img_path in image_paths:
-        img = Image.open(img_path)
-        img_bytes = io.BytesIO()
-        img.save(img_bytes, format='PNG')
-        image_parts.append({
-            'mime_type': 'image/png',
-            'data': base64.b64encode(img_bytes.getvalue()).decode('utf-8')
-        })
-    
-    # Retry configuration
-    max_retries = 3
-    initial_backoff = 5
-    
-    def call_api_gemini3(images_data: List[dict]) -> Tuple[str, HeaderStructure]:
-        """Make API call using google-genai SDK for Gemini 3."""
-        from google import genai as genai_new
-        from google.genai import types as genai_types
-        
-        project = os.environ.get("GOOGLE_CLOUD_PROJECT")
-        client = genai_new.Client(vertexai=True, project=project, location='global')
-        
-        content_parts = [prompt]
-        for img_data in images_data:
-            content_parts.append(genai_types.Part.from_bytes(
-                data=base64.b64decode(img_data['data']),
-                mime_type=img_data['mime_type']
-            ))
-        
-        config = genai_types.GenerateContentConfig(
-            temperature=0.1,
-            response_mime_type="application/json",
-            thinking_config=genai_types.ThinkingConfig(thinking_budget=0),
-        )
-        
-        response = client.models.generate_content(
-            model=model_name if 'preview' in model_name else f"{model_name}-preview",
-            contents=content_parts,
-            config=config,
-        )
-        
-        # Track token usage
-        if hasattr(response, 'usage_metadata') and response.usage_metadata:
-            input_tokens = getattr(response.usage_metadata, 'prompt_token_count', 0) or 0
-            output_tokens = getattr(response.usage_metadata, 'candidates_token_count', 0) or 0
-            usage_tracker.add_usage(input_tokens, output_tokens)
-        
-        raw = response.text or ""
-        data = parse_llm_json(raw, fallback={})
-        if isinstance(data, list) and data:
-            data = data[0]
-        struct = HeaderStructure.from_dict(data) if isinstance(data, dict) else HeaderStructure.from_dict({})
-        return raw, struct
-    
-    def call_api_standard(images_data: List[dict]) -> Tuple[str, HeaderStructure]:
-        """Make API call using standard AI Studio SDK."""
-        import google.generativeai as genai
-        
-        api_key = os.environ.get("GOOGLE_API_KEY")
-        if not api_key:
-            raise ValueError("GOOGLE_API_KEY not set")
-        
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel(model_name)
-        
-        content_parts = [prompt]
-        for img_data in images_data:
-            content_parts.append({'inline_data': img_data})
-        
-        response = model.generate_content(
-            content_parts,
-            generation_config=genai.types.GenerationConfig(
-                temperature=0.1,
-                response_mime_type="application/json"
-            )
-        )
-        
-        # Check for RECITATION blocking before accessing response.text
-        # finish_reason: 1=STOP (normal), 2=MAX_TOKENS, 3=SAFETY, 4=RECITATION, 5=OTHER
-        if response.candidates:
-            finish_reason = response.candidates[0].finish_reason
-            # finish_reason 4 = RECITATION (blocked due to training data similarity)
-            if finish_reason == 4 or str(finish_reason) == 'FinishReason.RECITATION':
-                raise RecitationBlockedError(
-                    "Gemini RECITATION filter triggered - model detected similarity to training data. "
-                    "This is NOT an actual copyright issue (content is from public domain clinicaltrials.gov). "
-                    "This is a known Gemini limitation that cannot be disabled via API settings."
-                )
-        
-        # Track token usage
-        if hasattr(response, 'usage_metadata') and response.usage_metadata:
-            input_tokens = getattr(response.usage_metadata, 'prompt_token_count', 0) or 0
-            output_tokens = getattr(response.usage_metadata, 'candidates_token_count', 0) or 0
-            usage_tracker.add_usage(input_tokens, output_tokens)
-        
-        raw = response.text or ""
-        data = parse_llm_json(raw, fallback={})
-        if isinstance(data, list) and data:
-            data = data[0]
-        struct = HeaderStructure.from_dict(data) if isinstance(data, dict) else HeaderStructure.from_dict({})
-        return raw, struct
-    
-    def call_api_with_retry(images_data: List[dict]) -> Tuple[str, HeaderStructure]:
-        """Call API with retry logic for rate limits."""
-        for attempt in range(max_retries + 1):
-            try:
-                if is_gemini3:
-                    return call_api_gemini3(images_data)
-                else:
-                    return call_api_standard(images_data)
-            except Exception as e:
-                error_str = str(e).lower()
-                is_rate_limit = '429' in error_str or 'rate' in error_str or 'exhausted' in error_str or 'quota' in error_str
-                
-                if is_rate_limit and attempt < max_retries:
-                    wait_time = min(initial_backoff * (2 ** attempt), 60)
-                    logger.warning(f"Rate limit in header analysis, retrying in {wait_time}s (attempt {attempt + 1}/{max_retries + 1})")
-                    time.sleep(wait_time)
-                else:
-                    raise
-        return "", HeaderStructure.from_dict({})  # Fallback
-    
-    # Try with all images first
-    raw_response, structure = call_api_with_retry(image_parts)
-    structure = _enforce_unique_encounter_names(structure)
-    
-    # If result is empty and we have multiple images, try with later images only
-    # (Early pages often contain SoA title/text, actual table is on later pages)
-    if len(image_parts) > 3 and not structure.encounters:
-        logger.info(f"Empty result with all images, retrying with later images only...")
-        later_images = image_parts[len(image_parts)//2:]
-        raw_response, structure = call_api_with_retry(later_images)
-        structure = _enforce_unique_encounter_names(structure)
-        
-        # If still empty, try middle images
-        if not structure.encounters and len(image_parts) > 4:
-            logger.info(f"Still empty, trying middle images...")
-            mid_start = len(image_parts) // 3
-            mid_end = 2 * len(image_parts) // 3
-            mid_images = image_parts[mid_start:mid_end]
-            raw_response, structure = call_api_with_retry(mid_images)
-            structure = _enforce_unique_encounter_names(structure)
-    
-    return HeaderAnalysisResult(
-        structure=structure,
-        raw_response=raw_response,
-        model_used=model_name,
-        image_count=len(image_paths),
-        success=True
-    )
-
-
-def _analyze_with_openai(
-    image_paths: List[str], 
-    model_name: str, 
+def _analyze_with_vision(
+    image_paths: List[ImageSource],
+    model_name: str,
     prompt: str
 ) -> HeaderAnalysisResult:
-    """Analyze using OpenAI Responses API with vision."""
-    from openai import OpenAI
-    import os
-    
-    api_key = os.environ.get("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY not set")
-    
-    client = OpenAI(api_key=api_key)
-    
-    def call_api(images: List[str]) -> Tuple[str, HeaderStructure]:
-        """Make API call with given images using Responses API."""
-        # Build input content for Responses API - use input_text and input_image types
-        input_content = [{"type": "input_text", "text": prompt}]
-        for img_path in images:
-            data_url = encode_image(img_path)
-            input_content.append({
-                "type": "input_image",
-                "image_url": data_url
-            })
-        
-        # Build parameters for Responses API
-        is_reasoning = any(rm in model_name.lower() for rm in ['o1', 'o3', 'gpt-5'])
-        
-        params = {
-            "model": model_name,
-            "input": [{"role": "user", "content": input_content}],
-            "text": {"format": {"type": "json_object"}},
-            "max_output_tokens": 4096,
-        }
-        
-        if not is_reasoning:
-            params["temperature"] = 0.1
-        
-        response = client.responses.create(**params)
-        
-        # Extract content from Responses API response
-        raw = ""
-        if hasattr(response, 'output_text'):
-            raw = response.output_text
-        elif hasattr(response, 'output') and response.output:
-            for item in response.output:
-                if hasattr(item, 'content'):
-                    for content_item in item.content:
-                        if hasattr(content_item, 'text'):
-                            raw = content_item.text
-                            break
-        
-        data = parse_llm_json(raw, fallback={})
-        struct = HeaderStructure.from_dict(data)
-        return raw, struct
+    """
+    Analyze using the provider layer (all pages in one multi-image request).
     
+    Shares client pooling, the response cache, rate limits and retries
+    with every other LLM call.
+    """
     # Try with all images first
-    raw_response, structure = call_api(image_paths)
-    structure = _enforce_unique_encounter_names(structure)
+    raw_response, structure = _call_vision(image_paths, model_name, prompt)
     
     # If result is empty and we have multiple images, try with later images only
     # (Early pages often contain SoA title/text, actual table is on later pages)
     if len(image_paths) > 3 and not structure.encounters:
         logger.info(f"Empty result with all images, retrying with later images only...")
-        later_images = image_paths[len(image_paths)//2:]  # Use second half of images
-        raw_response, structure = call_api(later_images)
-        structure = _enforce_unique_encounter_names(structure)
+        later_images = image_paths[len(image_paths)//2:]
+        raw_response, structure = _call_vision(later_images, model_name, prompt)
         
         # If still empty, try middle images
         if not structure.encounters and len(image_paths) > 4:
@@ -535,8 +309,17 @@ def _analyze_with_openai(
             mid_start = len(image_paths) // 3
             mid_end = 2 * len(image_paths) // 3
             mid_images = image_paths[mid_start:mid_end]
-            raw_response, structure = call_api(mid_images)
-            structure = _enforce_unique_encounter_names(structure)
+            raw_response, structure = _call_vision(mid_images, model_name, prompt)
+    
+    if not raw_response:
+        return HeaderAnalysisResult(
+            structure=None,
+            raw_response="",
+            model_used=model_name,
+            image_count=len(image_paths),
+            success=False,
+            error=f"Empty response from {model_name}"
+        )
     
     return HeaderAnalysisResult(
         structure=structure,
@@ -547,94 +330,52 @@ def _analyze_with_openai(
     )
 
 
-def _analyze_with_claude(
-    image_paths: List[str], 
-    model_name: str, 
+def _call_vision(
+    images: List[ImageSource],
+    model_name: str,
     prompt: str
-) -> HeaderAnalysisResult:
-    """Analyze using Anthropic Claude API with vision."""
-    import anthropic
-    import os
-    
-    api_key = os.environ.get("ANTHROPIC_API_KEY") or os.environ.get("CLAUDE_API_KEY")
-    if not api_key:
-        raise ValueError("ANTHROPIC_API_KEY or CLAUDE_API_KEY not set")
+) -> Tuple[str, HeaderStructure]:
+    """
+    Make one header analysis call with the given images.
     
-    client = anthropic.Anthropic(api_key=api_key)
+    Returns:
+        (raw response, structure); ("", empty structure) for an empty response
     
-    def call_api(images: List[str]) -> Tuple[str, HeaderStructure]:
-        """Make API call with given images using Claude."""
-        # Build message content with images
-        content = []
-        
-        # Add images first
-        for img_path in images:
-            with open(img_path, 'rb') as f:
-                img_data = base64.b64encode(f.read()).decode('utf-8')
-            content.append({
-                "type": "image",
-                "source": {
-                    "type": "base64",
-                    "media_type": "image/png",
-                    "data": img_data
-                }
-            })
-        
-        # Add text prompt
-        content.append({
-            "type": "text",
-            "text": prompt
-        })
-        
-        # Add JSON mode instruction to system
-        system = "You must respond with valid JSON only. No markdown code blocks, no explanation, just the JSON object."
-        
-        response = client.messages.create(
-            model=model_name,
-            max_tokens=8192,  # Increased from 4096 to capture all footnotes (a-x)
-            system=system,
-            messages=[{"role": "user", "content": content}]
+    Raises:
+        RecitationBlockedError: If the response was blocked by RECITATION
+    """
+    from extraction.llm_task_config import detect_provider
+    
+    max_tokens, temperature = HEADER_CALL_SETTINGS.get(detect_provider(model_name), (HEADER_MAX_TOKENS, None))
+    response = generate_with_images(
+        prompt,
+        images,
+        model_name=model_name,
+        json_mode=True,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        extractor_name="header_analyzer",
+    )
+    finish_reason = getattr(response, 'finish_reason', None)
+    
+    # finish_reason RECITATION: blocked due to training data similarity
+    if finish_reason and 'RECITATION' in str(finish_reason).upper():
+        raise RecitationBlockedError(
+            "Gemini RECITATION filter triggered - model detected similarity to training data. "
+            "This is NOT an actual copyright issue (content is from public domain clinicaltrials.gov). "
+            "This is a known Gemini limitation that cannot be disabled via API settings."
         )
-        
-        # Extract content from response
-        raw = ""
-        if response.content:
-            for block in response.content:
-                if hasattr(block, 'text'):
-                    raw = block.text
-                    break
-        
-        data = parse_llm_json(raw, fallback={})
-        struct = HeaderStructure.from_dict(data)
-        return raw, struct
     
-    # Try with all images first
-    raw_response, structure = call_api(image_paths)
-    structure = _enforce_unique_encounter_names(structure)
+    raw = getattr(response, 'content', None) or ""
+    if not raw.strip():
+        logger.warning(f"Header analysis got an empty response from {model_name} (finish reason: {finish_reason})")
+        return "", HeaderStructure.from_dict({})
     
-    # If result is empty and we have multiple images, try with later images only
-    if len(image_paths) > 3 and not structure.encounters:
-        logger.info(f"Empty result with all images, retrying with later images only...")
-        later_images = image_paths[len(image_paths)//2:]
-        raw_response, structure = call_api(later_images)
-        structure = _enforce_unique_encounter_names(structure)
-        
-        # If still empty, try middle images
-        if not structure.encounters and len(image_paths) > 4:
-            logger.info(f"Still empty, trying middle images...")
-            mid_start = len(image_paths) // 3
-            mid_end = 2 * len(image_paths) // 3
-            mid_images = image_paths[mid_start:mid_end]
-            raw_response, structure = call_api(mid_images)
-            structure = _enforce_unique_encounter_names(structure)
-    
-    return HeaderAnalysisResult(
-        structure=structure,
-        raw_response=raw_response,
-        model_used=model_name,
-        image_count=len(image_paths),
-        success=True
-    )
+    data = parse_llm_json(raw, fallback={})
+    if isinstance(data, list) and data:
+        data = data[0]
+    struct = HeaderStructure.from_dict(data) if isinstance(data, dict) else HeaderStructure.from_dict({})
+    return raw, _enforce_unique_encounter_names(struct)
 
 
 def _enforce_unique_encounter_names(structure: HeaderStructure) -> HeaderStructure:
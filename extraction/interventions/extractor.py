@@ -13,6 +13,8 @@ from typing import List, Optional, Dict, Any
 
 from core.llm_client import call_llm
 from core.pdf_utils import extract_text_from_pages, get_page_count
+from core.pdf_document import get_protocol_document
+from core.page_classifier import register_section_patterns
 from .schema import (
     InterventionsData,
     StudyIntervention,
@@ -40,6 +42,25 @@ class InterventionsExtractionResult:
     model_used: Optional[str] = None
 
 
+INTERVENTION_KEYWORDS = [
+    r'investigational\s+product',
+    r'study\s+drug',
+    r'study\s+treatment',
+    r'study\s+intervention',
+    r'study\s+medication',
+    r'dose\s+and\s+administration',
+    r'dosing\s+regimen',
+    r'route\s+of\s+administration',
+    r'formulation',
+    r'pharmaceutical\s+form',
+    r'active\s+ingredient',
+    r'placebo',
+    r'comparator',
+]
+
+INTERVENTION_SECTION = register_section_patterns("interventions", INTERVENTION_KEYWORDS)
+
+
 def find_intervention_pages(
     pdf_path: str,
     max_pages_to_scan: int = 50,
@@ -47,42 +68,17 @@ def find_intervention_pages(
     """
     Find pages containing intervention/product information using heuristics.
     """
-    import fitz
-    
-    intervention_keywords = [
-        r'investigational\s+product',
-        r'study\s+drug',
-        r'study\s+treatment',
-        r'study\s+intervention',
-        r'study\s+medication',
-        r'dose\s+and\s+administration',
-        r'dosing\s+regimen',
-        r'route\s+of\s+administration',
-        r'formulation',
-        r'pharmaceutical\s+form',
-        r'active\s+ingredient',
-        r'placebo',
-        r'comparator',
-    ]
-    
-    pattern = re.compile('|'.join(intervention_keywords), re.IGNORECASE)
-    
     intervention_pages = []
     
     try:
-        doc = fitz.open(pdf_path)
-        total_pages = min(len(doc), max_pages_to_scan)
+        doc = get_protocol_document(pdf_path)
+        total_pages = min(doc.page_count, max_pages_to_scan)
         
-        for page_num in range(total_pages):
-            page = doc[page_num]
-            text = page.get_text().lower()
-            
-            if pattern.search(text):
+        for page_num, features in doc.iter_page_features(max_pages=total_pages):
+            if features.has(INTERVENTION_SECTION):
                 intervention_pages.append(page_num)
                 logger.debug(f"Found intervention keywords on page {page_num + 1}")
         
-        doc.close()
-        
         # Include adjacent pages for context
         if intervention_pages:
             expanded = set()
@@ -154,13 +150,14 @@ def extract_interventions(
         if study_indication:
             context_hints += f"\nStudy indication: {study_indication}"
         
-        prompt = build_interventions_extraction_prompt(protocol_text, context_hints=context_hints)
+        prompt = build_interventions_extraction_prompt(context_hints=context_hints)
         
         response = call_llm(
             prompt=prompt,
             model_name=model_name,
             json_mode=True,
             extractor_name="interventions",
+            context=protocol_text,
         )
         
         if 'error' in response:
@@ -5,6 +5,8 @@ These prompts guide the LLM to extract study interventions and products
 from protocol investigational product sections.
 """
 
+from typing import Optional
+
 INTERVENTIONS_EXTRACTION_PROMPT = """You are an expert at extracting study intervention information from clinical trial protocols.
 
 Analyze the provided protocol section and extract ALL study interventions, products, and administration details.
@@ -137,12 +139,17 @@ Pages are 0-indexed. Return ONLY valid JSON.
 """
 
 
-def build_interventions_extraction_prompt(protocol_text: str, context_hints: str = "") -> str:
-    """Build the full extraction prompt with protocol content and optional context hints."""
+def build_interventions_extraction_prompt(protocol_text: Optional[str] = None, context_hints: str = "") -> str:
+    """
+    Build the full extraction prompt with protocol content and optional context hints.
+    
+    Without protocol_text, returns the instructions only (for call_llm(context=...)).
+    """
     prompt = INTERVENTIONS_EXTRACTION_PROMPT
     if context_hints:
         prompt += f"\n\nCONTEXT FROM PRIOR EXTRACTION:{context_hints}"
-    prompt += f"\n\n---\n\nPROTOCOL CONTENT:\n\n{protocol_text}"
+    if protocol_text is not None:
+        prompt += f"\n\n---\n\nPROTOCOL CONTENT:\n\n{protocol_text}"
     return prompt
 
 
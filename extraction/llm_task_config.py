@@ -42,6 +42,7 @@ class TaskConfig:
     max_tokens: Optional[int] = 8192
     json_mode: bool = True
     description: str = ""
+    max_input_tokens: Optional[int] = None
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for logging/debugging."""
@@ -51,6 +52,7 @@ class TaskConfig:
             "top_k": self.top_k,
             "max_tokens": self.max_tokens,
             "json_mode": self.json_mode,
+            "max_input_tokens": self.max_input_tokens,
         }
 
 
@@ -155,6 +157,7 @@ class LLMTaskConfigManager:
                     "top_p": 0.95,
                     "top_k": None,
                     "max_tokens": 8192,
+                    "max_input_tokens": 120000,
                     "json_mode": True,
                     "description": "Factual extraction from structured content",
                 },
@@ -163,6 +166,7 @@ class LLMTaskConfigManager:
                     "top_p": 0.9,
                     "top_k": 40,
                     "max_tokens": 4096,
+                    "max_input_tokens": 30000,
                     "json_mode": True,
                     "description": "Semantic entity resolution and mapping",
                 },
@@ -171,6 +175,7 @@ class LLMTaskConfigManager:
                     "top_p": 0.85,
                     "top_k": 40,
                     "max_tokens": 8192,
+                    "max_input_tokens": 60000,
                     "json_mode": True,
                     "description": "Structured output generation and synthesis",
                 },
@@ -179,6 +184,7 @@ class LLMTaskConfigManager:
                     "top_p": 0.9,
                     "top_k": None,
                     "max_tokens": 16384,
+                    "max_input_tokens": 120000,
                     "json_mode": True,
                     "description": "Narrative and freeform text extraction",
                 },
@@ -188,6 +194,7 @@ class LLMTaskConfigManager:
                 "soa_finder": "deterministic",
                 "header_analyzer": "deterministic",
                 "text_extractor": "deterministic",
+                "soa_validator": "deterministic",
                 # Core
                 "metadata": "deterministic",
                 "eligibility": "deterministic",
@@ -215,6 +222,7 @@ class LLMTaskConfigManager:
                 "execution_type": "structured_gen",
                 # Narrative
                 "narrative": "narrative",
+                "abbreviations": "narrative",
                 "amendments": "narrative",
                 "scheduling": "narrative",
                 "document_structure": "narrative",
@@ -247,6 +255,18 @@ class LLMTaskConfigManager:
                 },
             },
             "model_overrides": {},
+            "model_routing": {
+                "routes": {
+                    "small": {
+                        "extractors": ["entity_resolver", "execution_type", "footnote_condition", "abbreviations"],
+                        "models": {
+                            "gemini": "gemini-2.5-flash",
+                            "openai": "gpt-4o-mini",
+                            "claude": "claude-haiku-4-5",
+                        },
+                    },
+                },
+            },
         }
     
     def _apply_env_overrides(self) -> None:
@@ -300,6 +320,7 @@ class LLMTaskConfigManager:
             max_tokens=task_params.get("max_tokens", defaults.get("max_tokens", 8192)),
             json_mode=task_params.get("json_mode", defaults.get("json_mode", True)),
             description=task_params.get("description", ""),
+            max_input_tokens=task_params.get("max_input_tokens", defaults.get("max_input_tokens")),
         )
         
         # Apply provider-specific overrides (before model overrides)
@@ -327,6 +348,19 @@ class LLMTaskConfigManager:
         default_task = self._config.get("defaults", {}).get("task_type", "deterministic")
         return mapping.get(extractor_name, default_task)
     
+    def get_model_routes(self) -> Dict[str, Dict[str, str]]:
+        """
+        Get the model routing table by extractor.
+        
+        Returns:
+            {extractor_name: {provider: model}} from the model_routing section
+        """
+        routes = {}
+        for route in (self._config.get("model_routing") or {}).get("routes", {}).values():
+            for extractor_name in route.get("extractors", []):
+                routes[extractor_name] = dict(route.get("models", {}))
+        return routes
+    
     def list_extractors(self) -> Dict[str, str]:
         """List all configured extractors and their task types."""
         return dict(self._config.get("extractor_mapping", {}))
@@ -383,6 +417,14 @@ def get_task_type(extractor_name: str) -> str:
     return _manager.get_task_type(extractor_name)
 
 
+def get_model_routes() -> Dict[str, Dict[str, str]]:
+    """Get the model routing table ({extractor: {provider: model}})."""
+    global _manager
+    if _manager is None:
+        _manager = LLMTaskConfigManager()
+    return _manager.get_model_routes()
+
+
 def to_llm_config(task_config: TaskConfig) -> "LLMConfig":
     """
     Convert TaskConfig to LLMConfig for use with LLM providers.
@@ -12,6 +12,7 @@ from pathlib import Path
 from typing import List, Optional, Dict, Any, Tuple
 
 from core.llm_client import call_llm, call_llm_with_image
+from core.page_images import ImageSource
 from .schema import (
     StudyMetadata,
     StudyTitle,
@@ -48,7 +49,7 @@ class MetadataExtractionResult:
 def extract_study_metadata(
     pdf_path: str,
     model_name: str = "gemini-2.5-pro",
-    title_page_images: Optional[List[str]] = None,
+    title_page_images: Optional[List[ImageSource]] = None,
     protocol_text: Optional[str] = None,
     pages: Optional[List[int]] = None,
 ) -> MetadataExtractionResult:
@@ -59,6 +60,7 @@ def extract_study_metadata(
         pdf_path: Path to the protocol PDF
         model_name: LLM model to use
         title_page_images: Optional pre-rendered images of title pages
+            (file paths or in-memory PageImage buffers)
         protocol_text: Optional pre-extracted text from title/synopsis pages
         pages: Specific pages to use (0-indexed), defaults to [0, 1, 2]
         
@@ -112,7 +114,7 @@ def extract_study_metadata(
 
 
 def _extract_with_vision(
-    image_paths: List[str],
+    image_paths: List[ImageSource],
     model_name: str,
 ) -> Optional[Dict[str, Any]]:
     """Extract metadata using vision model on title page images."""
@@ -141,12 +143,13 @@ def _extract_with_text(
 ) -> Optional[Dict[str, Any]]:
     """Extract metadata using text-based LLM call."""
     try:
-        prompt = build_metadata_extraction_prompt(protocol_text)
+        prompt = build_metadata_extraction_prompt()
         
         response = call_llm(
             prompt=prompt,
             model_name=model_name,
             extractor_name="metadata",
+            context=protocol_text,
         )
         
         if response and 'response' in response:
@@ -7,6 +7,8 @@ from protocol title pages and synopsis sections.
 Output format follows USDM v4.0 OpenAPI schema requirements.
 """
 
+from typing import Optional
+
 METADATA_EXTRACTION_PROMPT = """You are an expert at extracting study metadata from clinical trial protocols.
 Your output must conform to USDM v4.0 schema specifications.
 
@@ -226,8 +228,10 @@ Pages are 0-indexed. Return ONLY valid JSON.
 """
 
 
-def build_metadata_extraction_prompt(protocol_text: str) -> str:
-    """Build the full extraction prompt with protocol content."""
+def build_metadata_extraction_prompt(protocol_text: Optional[str] = None) -> str:
+    """Build the full extraction prompt with protocol content (instructions only if protocol_text is None)."""
+    if protocol_text is None:
+        return METADATA_EXTRACTION_PROMPT
     return f"{METADATA_EXTRACTION_PROMPT}\n\n---\n\nPROTOCOL CONTENT:\n\n{protocol_text}"
 
 
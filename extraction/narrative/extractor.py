@@ -12,7 +12,10 @@ from pathlib import Path
 from typing import List, Optional, Dict, Any
 
 from core.llm_client import call_llm
+from core.model_router import record_route_validation
 from core.pdf_utils import extract_text_from_pages, get_page_count
+from core.pdf_document import get_protocol_document
+from core.page_classifier import register_section_patterns
 from .schema import (
     NarrativeData,
     NarrativeContent,
@@ -37,6 +40,20 @@ class NarrativeExtractionResult:
     model_used: Optional[str] = None
 
 
+STRUCTURE_KEYWORDS = [
+    r'table\s+of\s+contents',
+    r'list\s+of\s+abbreviations',
+    r'abbreviations?\s+and\s+definitions?',
+    r'abbreviations\s*:',  # SoA table abbreviations format
+    r'glossary',
+    r'synopsis',
+    r'protocol\s+summary',
+    r'schedule\s+of\s+activities',  # Include SoA pages for abbreviations
+]
+
+STRUCTURE_SECTION = register_section_patterns("narrative", STRUCTURE_KEYWORDS)
+
+
 def find_structure_pages(
     pdf_path: str,
     max_pages: int = 30,
@@ -45,36 +62,16 @@ def find_structure_pages(
     Find pages containing document structure (TOC, abbreviations).
     Usually in the first 10-20 pages, but SoA abbreviations may be on page 16+.
     """
-    import fitz
-    
-    structure_keywords = [
-        r'table\s+of\s+contents',
-        r'list\s+of\s+abbreviations',
-        r'abbreviations?\s+and\s+definitions?',
-        r'abbreviations\s*:',  # SoA table abbreviations format
-        r'glossary',
-        r'synopsis',
-        r'protocol\s+summary',
-        r'schedule\s+of\s+activities',  # Include SoA pages for abbreviations
-    ]
-    
-    pattern = re.compile('|'.join(structure_keywords), re.IGNORECASE)
-    
     structure_pages = []
     
     try:
-        doc = fitz.open(pdf_path)
-        total_pages = min(len(doc), max_pages)
+        doc = get_protocol_document(pdf_path)
+        total_pages = min(doc.page_count, max_pages)
         
-        for page_num in range(total_pages):
-            page = doc[page_num]
-            text = page.get_text().lower()
-            
-            if pattern.search(text):
+        for page_num, features in doc.iter_page_features(max_pages=total_pages):
+            if features.has(STRUCTURE_SECTION):
                 structure_pages.append(page_num)
         
-        doc.close()
-        
         # If nothing found, use first 10 pages
         if not structure_pages:
             structure_pages = list(range(min(10, get_page_count(pdf_path))))
@@ -159,150 +156,34 @@ def extract_narrative_structure(
 
 
 def _extract_abbreviations(protocol_text: str, model_name: str) -> Optional[Dict]:
-    """Extract abbreviations using LLM with retry logic for truncation."""
-    prompt = build_abbreviations_extraction_prompt(protocol_text)
-    
-    # Retry logic for truncated responses
-    max_retries = 3
-    accumulated_response = ""
-    
-    for attempt in range(max_retries + 1):
-        if attempt == 0:
-            current_prompt = prompt
-        else:
-            logger.info(f"Abbreviations retry {attempt}/{max_retries}: Requesting continuation...")
-            # Find a good merge point - last complete line ending with comma or bracket
-            merge_point = accumulated_response.rfind(',\n')
-            if merge_point == -1:
-                merge_point = accumulated_response.rfind('[\n')
-            if merge_point == -1:
-                merge_point = max(0, len(accumulated_response) - 500)
-            
-            context = accumulated_response[merge_point:] if merge_point > 0 else accumulated_response[-500:]
-            current_prompt = (
-                f"Your previous response was truncated. Here is the end:\n\n"
-                f"```json\n{context}\n```\n\n"
-                f"Continue EXACTLY from where you left off. Output ONLY the remaining JSON to complete the array/object. "
-                f"Do NOT repeat any content. Start your response with the next item or closing bracket."
-            )
-        
-        response = call_llm(prompt=current_prompt, model_name=model_name, json_mode=True, extractor_name="narrative")
-        
-        if 'error' in response:
-            logger.warning(f"Abbreviation extraction failed: {response['error']}")
-            return None
-        
-        response_text = response.get('response', '')
-        
-        if attempt > 0 and response_text:
-            # Smart merge: find overlap and concatenate
-            merged = _smart_merge_json(accumulated_response, response_text)
-            accumulated_response = merged
-            result = _parse_json_response(accumulated_response)
-            if result:
-                logger.info(f"Successfully parsed abbreviations after {attempt} continuation(s)")
-                return result
-        else:
-            accumulated_response = response_text
-            result = _parse_json_response(response_text)
-            if result:
-                return result
-            # Check if truncated
-            if response_text and not response_text.rstrip().endswith('}'):
-                continue
-            break
-    
-    return None
-
-
-def _smart_merge_json(base: str, continuation: str) -> str:
-    """Merge truncated JSON with continuation, handling overlaps."""
-    base = base.rstrip()
-    continuation = continuation.lstrip()
-    
-    # Remove markdown code blocks from continuation
-    if continuation.startswith('```'):
-        lines = continuation.split('\n')
-        continuation = '\n'.join(lines[1:])
-        if continuation.rstrip().endswith('```'):
-            continuation = continuation.rstrip()[:-3].rstrip()
-    
-    # If continuation starts with closing brackets, append directly
-    if continuation and continuation[0] in '}]':
-        return base + continuation
-    
-    # If base ends mid-string or mid-value, try to find merge point
-    # Look for overlap (continuation might repeat some content)
-    for overlap_len in range(min(100, len(base), len(continuation)), 10, -10):
-        if base.endswith(continuation[:overlap_len]):
-            return base + continuation[overlap_len:]
+    """Extract abbreviations using LLM (truncated responses are continued by call_llm)."""
+    response = call_llm(
+        prompt=build_abbreviations_extraction_prompt(), model_name=model_name, json_mode=True,
+        extractor_name="abbreviations", context=protocol_text,
+    )
     
-    # No overlap found - check if we need a comma
-    if base and continuation:
-        # If base ends with value and continuation starts with new item
-        if base[-1] in '"}0123456789' and continuation[0] == '{':
-            return base + ',\n' + continuation
-        if base[-1] == ',' or continuation[0] == ',':
-            return base + continuation
+    if 'error' in response:
+        logger.warning(f"Abbreviation extraction failed: {response['error']}")
+        record_route_validation("abbreviations", False)
+        return None
     
-    return base + continuation
+    result = _parse_json_response(response.get('response', ''))
+    record_route_validation("abbreviations", bool(result))
+    return result
 
 
 def _extract_structure(protocol_text: str, model_name: str) -> Optional[Dict]:
-    """Extract document structure using LLM with retry logic for truncation."""
-    prompt = build_structure_extraction_prompt(protocol_text)
-    
-    # Retry logic for truncated responses
-    max_retries = 3
-    accumulated_response = ""
+    """Extract document structure using LLM (truncated responses are continued by call_llm)."""
+    response = call_llm(
+        prompt=build_structure_extraction_prompt(), model_name=model_name, json_mode=True,
+        extractor_name="narrative", context=protocol_text,
+    )
     
-    for attempt in range(max_retries + 1):
-        if attempt == 0:
-            current_prompt = prompt
-        else:
-            logger.info(f"Structure retry {attempt}/{max_retries}: Requesting continuation...")
-            # Find a good merge point - last complete line ending with comma or bracket
-            merge_point = accumulated_response.rfind(',\n')
-            if merge_point == -1:
-                merge_point = accumulated_response.rfind('[\n')
-            if merge_point == -1:
-                merge_point = max(0, len(accumulated_response) - 500)
-            
-            context = accumulated_response[merge_point:] if merge_point > 0 else accumulated_response[-500:]
-            current_prompt = (
-                f"Your previous response was truncated. Here is the end:\n\n"
-                f"```json\n{context}\n```\n\n"
-                f"Continue EXACTLY from where you left off. Output ONLY the remaining JSON to complete the array/object. "
-                f"Do NOT repeat any content. Start your response with the next item or closing bracket."
-            )
-        
-        response = call_llm(prompt=current_prompt, model_name=model_name, json_mode=True, extractor_name="narrative")
-        
-        if 'error' in response:
-            logger.warning(f"Structure extraction failed: {response['error']}")
-            return None
-        
-        response_text = response.get('response', '')
-        
-        if attempt > 0 and response_text:
-            # Smart merge: find overlap and concatenate
-            merged = _smart_merge_json(accumulated_response, response_text)
-            accumulated_response = merged
-            result = _parse_json_response(accumulated_response)
-            if result:
-                logger.info(f"Successfully parsed structure after {attempt} continuation(s)")
-                return result
-        else:
-            accumulated_response = response_text
-            result = _parse_json_response(response_text)
-            if result:
-                return result
-            # Check if truncated
-            if response_text and not response_text.rstrip().endswith('}'):
-                continue
-            break
+    if 'error' in response:
+        logger.warning(f"Structure extraction failed: {response['error']}")
+        return None
     
-    return None
+    return _parse_json_response(response.get('response', ''))
 
 
 def _parse_json_response(response_text: str) -> Optional[Dict[str, Any]]:
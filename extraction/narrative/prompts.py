@@ -4,6 +4,8 @@ LLM Prompts for Document Structure & Narrative Extraction.
 These prompts guide the LLM to extract document structure and abbreviations.
 """
 
+from typing import Optional
+
 ABBREVIATIONS_EXTRACTION_PROMPT = """You are an expert at extracting abbreviations from clinical trial protocols.
 
 Analyze the provided protocol content and extract ALL abbreviations and their definitions.
@@ -131,11 +133,15 @@ Now analyze the protocol content and extract the structure:
 """
 
 
-def build_abbreviations_extraction_prompt(protocol_text: str) -> str:
-    """Build the full extraction prompt with protocol content."""
+def build_abbreviations_extraction_prompt(protocol_text: Optional[str] = None) -> str:
+    """Build the full extraction prompt with protocol content (instructions only if protocol_text is None)."""
+    if protocol_text is None:
+        return ABBREVIATIONS_EXTRACTION_PROMPT
     return f"{ABBREVIATIONS_EXTRACTION_PROMPT}\n\n---\n\nPROTOCOL CONTENT:\n\n{protocol_text}"
 
 
-def build_structure_extraction_prompt(protocol_text: str) -> str:
-    """Build the full extraction prompt with protocol content."""
+def build_structure_extraction_prompt(protocol_text: Optional[str] = None) -> str:
+    """Build the full extraction prompt with protocol content (instructions only if protocol_text is None)."""
+    if protocol_text is None:
+        return STRUCTURE_EXTRACTION_PROMPT
     return f"{STRUCTURE_EXTRACTION_PROMPT}\n\n---\n\nPROTOCOL CONTENT:\n\n{protocol_text}"
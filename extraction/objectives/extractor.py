@@ -13,6 +13,8 @@ from typing import List, Optional, Dict, Any, Tuple
 
 from core.llm_client import call_llm
 from core.pdf_utils import extract_text_from_pages, get_page_count
+from core.pdf_document import get_protocol_document
+from core.page_classifier import register_section_patterns
 from .schema import (
     ObjectivesData,
     Objective,
@@ -39,6 +41,22 @@ class ObjectivesExtractionResult:
     model_used: Optional[str] = None
 
 
+OBJECTIVES_KEYWORDS = [
+    r'primary\s+objective',
+    r'secondary\s+objective',
+    r'exploratory\s+objective',
+    r'study\s+objectives?',
+    r'primary\s+endpoint',
+    r'secondary\s+endpoint',
+    r'study\s+endpoints?',
+    r'efficacy\s+endpoints?',
+    r'safety\s+endpoints?',
+    r'estimand',
+]
+
+OBJECTIVES_SECTION = register_section_patterns("objectives", OBJECTIVES_KEYWORDS)
+
+
 def find_objectives_pages(
     pdf_path: str,
     max_pages_to_scan: int = 30,
@@ -53,39 +71,17 @@ def find_objectives_pages(
     Returns:
         List of 0-indexed page numbers likely containing objectives
     """
-    import fitz
-    
-    objectives_keywords = [
-        r'primary\s+objective',
-        r'secondary\s+objective',
-        r'exploratory\s+objective',
-        r'study\s+objectives?',
-        r'primary\s+endpoint',
-        r'secondary\s+endpoint',
-        r'study\s+endpoints?',
-        r'efficacy\s+endpoints?',
-        r'safety\s+endpoints?',
-        r'estimand',
-    ]
-    
-    pattern = re.compile('|'.join(objectives_keywords), re.IGNORECASE)
-    
     objectives_pages = []
     
     try:
-        doc = fitz.open(pdf_path)
-        total_pages = min(len(doc), max_pages_to_scan)
+        doc = get_protocol_document(pdf_path)
+        total_pages = min(doc.page_count, max_pages_to_scan)
         
-        for page_num in range(total_pages):
-            page = doc[page_num]
-            text = page.get_text().lower()
-            
-            if pattern.search(text):
+        for page_num, features in doc.iter_page_features(max_pages=total_pages):
+            if features.has(OBJECTIVES_SECTION):
                 objectives_pages.append(page_num)
                 logger.debug(f"Found objectives keywords on page {page_num + 1}")
         
-        doc.close()
-        
         # If we found pages, also include adjacent pages for context
         if objectives_pages:
             expanded = set()
@@ -166,11 +162,11 @@ def extract_objectives_endpoints(
         # =====================================================================
         logger.info("Phase 1: Extracting objectives and endpoints...")
         
-        phase1_response = _extract_with_retry(
-            prompt=build_objectives_extraction_prompt(protocol_text, context_hints=context_hints),
+        phase1_response = _extract_json(
+            prompt=build_objectives_extraction_prompt(context_hints=context_hints),
             model_name=model_name,
+            context=protocol_text,
             phase_name="objectives",
-            max_retries=3,
         )
         
         if phase1_response is None:
@@ -199,11 +195,11 @@ def extract_objectives_endpoints(
             # Build endpoint context for Phase 2
             endpoints_for_context = [ep.to_dict() for ep in objectives_data.endpoints]
             
-            phase2_response = _extract_with_retry(
-                prompt=build_estimands_prompt(protocol_text, endpoints_for_context, context_hints),
+            phase2_response = _extract_json(
+                prompt=build_estimands_prompt(None, endpoints_for_context, context_hints),
                 model_name=model_name,
+                context=protocol_text,
                 phase_name="estimands",
-                max_retries=2,
             )
             
             if phase2_response and phase2_response.get('estimands'):
@@ -236,70 +232,37 @@ def extract_objectives_endpoints(
     return result
 
 
-def _extract_with_retry(
+def _extract_json(
     prompt: str,
     model_name: str,
     phase_name: str,
-    max_retries: int = 3,
+    context: Optional[str] = None,
 ) -> Optional[Dict[str, Any]]:
     """
-    Call LLM with retry logic for truncated responses.
+    Call LLM and parse its JSON response (truncated responses are continued by call_llm).
     
     Args:
         prompt: The extraction prompt
         model_name: LLM model to use
         phase_name: Name for logging (e.g., "objectives", "estimands")
-        max_retries: Maximum continuation retries
+        context: Protocol text sent ahead of the prompt as a cacheable prefix
         
     Returns:
         Parsed JSON response or None if failed
     """
-    accumulated_response = ""
+    response = call_llm(
+        prompt=prompt,
+        model_name=model_name,
+        json_mode=True,
+        extractor_name=phase_name,
+        context=context,
+    )
     
-    for attempt in range(max_retries + 1):
-        if attempt == 0:
-            current_prompt = prompt
-        else:
-            logger.info(f"{phase_name} retry {attempt}/{max_retries}: Requesting continuation...")
-            context_window = min(3000, len(accumulated_response))
-            current_prompt = (
-                f"Your previous response was truncated. Here is the end of what you generated:\n\n"
-                f"```json\n{accumulated_response[-context_window:]}\n```\n\n"
-                f"Please complete the JSON response. Continue EXACTLY from where you left off. "
-                f"Do NOT repeat any content already generated. Output ONLY the remaining JSON."
-            )
-        
-        response = call_llm(
-            prompt=current_prompt,
-            model_name=model_name,
-            json_mode=True,
-            extractor_name=phase_name,
-        )
-        
-        if 'error' in response:
-            logger.error(f"{phase_name} LLM error: {response['error']}")
-            return None
-        
-        response_text = response.get('response', '')
-        
-        if attempt > 0 and response_text:
-            accumulated_response = accumulated_response.rstrip() + response_text.lstrip()
-            parsed = _parse_json_response(accumulated_response)
-            if parsed:
-                logger.info(f"{phase_name}: Parsed after {attempt} continuation(s)")
-                return parsed
-        else:
-            accumulated_response = response_text
-            parsed = _parse_json_response(response_text)
-            if parsed:
-                return parsed
-                
-            # Check if truncated
-            if response_text and not response_text.rstrip().endswith('}'):
-                continue  # Likely truncated, retry
-            break  # Not truncated, just failed
+    if 'error' in response:
+        logger.error(f"{phase_name} LLM error: {response['error']}")
+        return None
     
-    return None
+    return _parse_json_response(response.get('response', ''))
 
 
 def _parse_objectives_only(raw: Dict[str, Any]) -> Optional[ObjectivesData]:
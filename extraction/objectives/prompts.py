@@ -14,6 +14,8 @@ This separation improves reliability by:
 Output format follows USDM v4.0 OpenAPI schema requirements.
 """
 
+from typing import Optional
+
 # =============================================================================
 # PHASE 1: Objectives & Endpoints (Core extraction - always runs)
 # =============================================================================
@@ -188,17 +190,23 @@ Pages are 0-indexed. Return ONLY valid JSON.
 # Prompt builders
 # =============================================================================
 
-def build_objectives_extraction_prompt(protocol_text: str, context_hints: str = "") -> str:
-    """Build prompt for Phase 1: objectives and endpoints extraction."""
+def build_objectives_extraction_prompt(protocol_text: Optional[str] = None, context_hints: str = "") -> str:
+    """
+    Build prompt for Phase 1: objectives and endpoints extraction.
+    
+    Without protocol_text, returns the instructions only, for
+    call_llm(context=protocol_text) to send after the cached protocol prefix.
+    """
     prompt = OBJECTIVES_ENDPOINTS_PROMPT
     if context_hints:
         prompt += f"\n\nCONTEXT FROM PRIOR EXTRACTION:{context_hints}"
-    prompt += f"\n\n---\n\nPROTOCOL CONTENT:\n\n{protocol_text}"
+    if protocol_text is not None:
+        prompt += f"\n\n---\n\nPROTOCOL CONTENT:\n\n{protocol_text}"
     return prompt
 
 
-def build_estimands_prompt(protocol_text: str, endpoints: list, context_hints: str = "") -> str:
-    """Build prompt for Phase 2: estimands extraction with endpoint context."""
+def build_estimands_prompt(protocol_text: Optional[str], endpoints: list, context_hints: str = "") -> str:
+    """Build prompt for Phase 2: estimands extraction with endpoint context (instructions only if protocol_text is None)."""
     # Format endpoints for context
     if endpoints:
         endpoints_lines = []
@@ -216,7 +224,8 @@ def build_estimands_prompt(protocol_text: str, endpoints: list, context_hints: s
     prompt = ESTIMANDS_PROMPT.format(endpoints_context=endpoints_context)
     if context_hints:
         prompt += f"\n\nADDITIONAL CONTEXT:{context_hints}"
-    prompt += f"\n\n---\n\nPROTOCOL CONTENT:\n\n{protocol_text}"
+    if protocol_text is not None:
+        prompt += f"\n\n---\n\nPROTOCOL CONTENT:\n\n{protocol_text}"
     return prompt
 
 
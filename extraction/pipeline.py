@@ -20,16 +20,21 @@ import os
 import json
 import logging
 from pathlib import Path
-from typing import Optional, List
+from typing import Any, Optional, List
 from dataclasses import dataclass, field
 
 from .header_analyzer import analyze_soa_headers, load_header_structure, save_header_structure
-from .text_extractor import extract_soa_from_text, build_usdm_output, save_extraction_result
-from .validator import validate_extraction, apply_validation_fixes, save_validation_result
+from .text_extractor import (
+    extract_soa_from_text, save_extraction_result, load_extraction_result,
+)
+from .validator import (
+    validate_extraction, apply_validation_fixes, save_validation_result, load_validation_result,
+)
 
 from core.provenance import ProvenanceTracker, get_provenance_path
 from core.superscript_utils import normalize_soa_with_footnotes
 from core.constants import USDM_VERSION
+from core.page_images import ImageSource, render_page_images, summarize_page_images
 
 logger = logging.getLogger(__name__)
 
@@ -50,6 +55,8 @@ class PipelineConfig:
     remove_hallucinations: bool = False  # Keep all text-extracted cells; use provenance for confidence
     hallucination_confidence_threshold: float = 0.7
     save_intermediate: bool = True
+    save_images: bool = True  # Also write rendered SoA pages to 3_soa_images/ (used by the web UI)
+    image_mode: str = "fixed"  # SoA image rendering: "fixed", "adaptive" or "tiled" (see core.page_images)
 
 
 @dataclass
@@ -69,6 +76,9 @@ class PipelineResult:
     output_path: Optional[str] = None
     provenance_path: Optional[str] = None
     
+    # SoA pages used (0-indexed)
+    soa_pages: List[int] = field(default_factory=list)
+    
     # Statistics
     activities_count: int = 0
     ticks_count: int = 0
@@ -175,9 +185,10 @@ def _resolve_activity_group_links(activities, activity_groups):
 
 def run_extraction_pipeline(
     protocol_text: str,
-    soa_images: List[str],
+    soa_images: List[ImageSource],
     output_dir: str,
     config: Optional[PipelineConfig] = None,
+    manifest: Any = None,
 ) -> PipelineResult:
     """
     Run the complete SoA extraction pipeline.
@@ -190,9 +201,11 @@ def run_extraction_pipeline(
     
     Args:
         protocol_text: Text content from protocol (SoA pages)
-        soa_images: List of paths to SoA table images
+        soa_images: SoA table images (file paths or in-memory PageImage buffers)
         output_dir: Directory for output files
         config: Pipeline configuration
+        manifest: Optional RunManifest (pipeline.run_manifest); steps 1-3 are
+            recorded in it, and a resumed run reloads their saved outputs
         
     Returns:
         PipelineResult with output paths and statistics
@@ -211,41 +224,53 @@ def run_extraction_pipeline(
         'final': os.path.join(output_dir, "9_final_soa.json"),
     }
     
+    # Steps are checkpointed through their intermediate files
+    checkpoint = manifest if config.save_intermediate else None
+    
     try:
         # ═══════════════════════════════════════════════════════════════
         # STEP 1: Vision extracts STRUCTURE
         # ═══════════════════════════════════════════════════════════════
-        logger.info("Step 1: Analyzing SoA header structure from images...")
-        
-        header_result = analyze_soa_headers(
-            image_paths=soa_images,
-            model_name=config.model_name,
-        )
-        
-        if not header_result.success:
-            # Track recitation blocking as a processing issue (known limitation)
-            if header_result.recitation_blocked:
-                result.processing_issues.append(ProcessingIssue(
-                    phase="soa_header_analysis",
-                    issue_type="recitation_blocked",
-                    message=(
-                        "Gemini RECITATION filter triggered during SoA header analysis. "
-                        "This is NOT a copyright issue - the model detected similarity to training data. "
-                        "Content from public domain sources (clinicaltrials.gov) can trigger this. "
-                        "This is a known Gemini limitation that cannot be disabled."
-                    ),
-                    is_known_limitation=True,
-                    fallback_used="Text extraction only (no vision-based header structure)"
-                ))
-            result.errors.append(f"Header analysis failed: {header_result.error}")
-            return result
+        if checkpoint and checkpoint.reusable('soa_header', after=('soa_pages',)):
+            logger.info(f"Step 1: Reusing SoA header structure from {paths['header']}")
+            header_structure = load_header_structure(paths['header'])
+        else:
+            logger.info("Step 1: Analyzing SoA header structure from images...")
+            if checkpoint:
+                checkpoint.start('soa_header')
+            
+            header_result = analyze_soa_headers(
+                image_paths=soa_images,
+                model_name=config.model_name,
+            )
+            
+            if not header_result.success:
+                # Track recitation blocking as a processing issue (known limitation)
+                if header_result.recitation_blocked:
+                    result.processing_issues.append(ProcessingIssue(
+                        phase="soa_header_analysis",
+                        issue_type="recitation_blocked",
+                        message=(
+                            "Gemini RECITATION filter triggered during SoA header analysis. "
+                            "This is NOT a copyright issue - the model detected similarity to training data. "
+                            "Content from public domain sources (clinicaltrials.gov) can trigger this. "
+                            "This is a known Gemini limitation that cannot be disabled."
+                        ),
+                        is_known_limitation=True,
+                        fallback_used="Text extraction only (no vision-based header structure)"
+                    ))
+                result.errors.append(f"Header analysis failed: {header_result.error}")
+                return result
+            
+            header_structure = header_result.structure
+            
+            if config.save_intermediate:
+                save_header_structure(header_structure, paths['header'])
+                if checkpoint:
+                    checkpoint.complete('soa_header', outputs=[paths['header']])
         
-        header_structure = header_result.structure
         result.timepoints_count = len(header_structure.plannedTimepoints)
         
-        if config.save_intermediate:
-            save_header_structure(header_structure, paths['header'])
-        
         logger.info(f"  Found {result.timepoints_count} timepoints, "
                    f"{len(header_structure.epochs)} epochs, "
                    f"{len(header_structure.activityGroups)} groups")
@@ -253,38 +278,46 @@ def run_extraction_pipeline(
         # ═══════════════════════════════════════════════════════════════
         # STEP 2: Text extracts DATA using header structure as anchor
         # ═══════════════════════════════════════════════════════════════
-        logger.info("Step 2: Extracting SoA data from text...")
-        
-        # Check if model needs fallback for SoA text extraction
-        soa_model = config.model_name
-        if config.model_name in SOA_FALLBACK_MODELS:
-            soa_model = SOA_FALLBACK_MODELS[config.model_name]
-            logger.info(f"  Using fallback model for SoA text extraction: {soa_model}")
-        
-        text_result = extract_soa_from_text(
-            protocol_text=protocol_text,
-            header_structure=header_structure,
-            model_name=soa_model,
-        )
-        
-        # Continue even if extraction returned fewer activities than expected,
-        # as long as we have SOME activities. Only fail if we got zero activities.
-        if not text_result.activities:
-            result.errors.append(f"Text extraction failed: {text_result.error or 'No activities extracted'}")
-            return result
-        
-        if not text_result.success:
-            # Log warning but continue with partial results
-            logger.warning(f"  Text extraction below expectations: {text_result.error}")
+        text_provenance_path = get_provenance_path(paths['raw_text'])
+        if checkpoint and checkpoint.reusable('soa_text', after=('soa_header',)):
+            logger.info(f"Step 2: Reusing SoA text extraction from {paths['raw_text']}")
+            text_result = load_extraction_result(paths['raw_text'], header_structure, text_provenance_path)
+        else:
+            logger.info("Step 2: Extracting SoA data from text...")
+            if checkpoint:
+                checkpoint.start('soa_text')
+            
+            # Check if model needs fallback for SoA text extraction
+            soa_model = config.model_name
+            if config.model_name in SOA_FALLBACK_MODELS:
+                soa_model = SOA_FALLBACK_MODELS[config.model_name]
+                logger.info(f"  Using fallback model for SoA text extraction: {soa_model}")
+            
+            text_result = extract_soa_from_text(
+                protocol_text=protocol_text,
+                header_structure=header_structure,
+                model_name=soa_model,
+            )
+            
+            # Continue even if extraction returned fewer activities than expected,
+            # as long as we have SOME activities. Only fail if we got zero activities.
+            if not text_result.activities:
+                result.errors.append(f"Text extraction failed: {text_result.error or 'No activities extracted'}")
+                return result
+            
+            if not text_result.success:
+                # Log warning but continue with partial results
+                logger.warning(f"  Text extraction below expectations: {text_result.error}")
+            
+            if config.save_intermediate:
+                # Provenance is saved too, so a resumed run can rebuild text_result
+                save_extraction_result(text_result, header_structure, paths['raw_text'], text_provenance_path)
+                if checkpoint:
+                    checkpoint.complete('soa_text', outputs=[paths['raw_text'], text_provenance_path])
         
         result.activities_count = len(text_result.activities)
         result.ticks_count = len(text_result.activity_timepoints)
         
-        if config.save_intermediate:
-            usdm_output = build_usdm_output(text_result, header_structure)
-            with open(paths['raw_text'], 'w', encoding='utf-8') as f:
-                json.dump(usdm_output, f, indent=2, ensure_ascii=False)
-        
         logger.info(f"  Extracted {result.activities_count} activities, "
                    f"{result.ticks_count} ticks")
         
@@ -295,31 +328,39 @@ def run_extraction_pipeline(
         provenance = text_result.provenance
         
         if config.validate_with_vision and soa_images:
-            logger.info("Step 3: Validating extraction against images...")
-            
-            # Extract footnotes from header structure if available
-            footnotes_text = ""
-            if hasattr(header_structure, 'footnotes') and header_structure.footnotes:
-                footnotes_text = "\n".join(header_structure.footnotes)
-            
-            validation = validate_extraction(
-                text_activities=[a.to_dict() for a in text_result.activities],
-                text_ticks=final_ticks,
-                header_structure=header_structure,
-                image_paths=soa_images,
-                model_name=config.model_name,
-                protocol_text=protocol_text,
-                footnotes=footnotes_text,
-            )
+            if checkpoint and checkpoint.reusable('soa_validation', after=('soa_text',)):
+                logger.info(f"Step 3: Reusing validation result from {paths['validation']}")
+                validation = load_validation_result(paths['validation'])
+            else:
+                logger.info("Step 3: Validating extraction against images...")
+                if checkpoint:
+                    checkpoint.start('soa_validation')
+                
+                # Extract footnotes from header structure if available
+                footnotes_text = ""
+                if hasattr(header_structure, 'footnotes') and header_structure.footnotes:
+                    footnotes_text = "\n".join(header_structure.footnotes)
+                
+                validation = validate_extraction(
+                    text_activities=[a.to_dict() for a in text_result.activities],
+                    text_ticks=final_ticks,
+                    header_structure=header_structure,
+                    image_paths=soa_images,
+                    model_name=config.model_name,
+                    protocol_text=protocol_text,
+                    footnotes=footnotes_text,
+                )
+                
+                if validation.success and config.save_intermediate:
+                    save_validation_result(validation, paths['validation'])
+                    if checkpoint:
+                        checkpoint.complete('soa_validation', outputs=[paths['validation']])
             
             if validation.success:
                 result.validated = True
                 result.hallucinations_removed = validation.hallucination_count
                 result.missed_ticks_found = validation.missed_count
                 
-                if config.save_intermediate:
-                    save_validation_result(validation, paths['validation'])
-                
                 # Apply validation fixes and update provenance
                 # Always run to tag validated ticks as "both" (confirmed by vision)
                 final_ticks, val_provenance = apply_validation_fixes(
@@ -409,6 +450,7 @@ def run_from_files(
     output_dir: str,
     soa_pages: Optional[List[int]] = None,
     config: Optional[PipelineConfig] = None,
+    manifest: Any = None,
 ) -> PipelineResult:
     """
     Run pipeline from PDF file.
@@ -424,11 +466,14 @@ def run_from_files(
         soa_pages: Optional list of SoA page numbers (0-indexed). If not provided,
                    will automatically detect SoA pages.
         config: Pipeline configuration
+        manifest: Optional RunManifest (pipeline.run_manifest) recording the
+            completed steps; a resumed run reuses the pages found and the
+            saved header, text and validation results
         
     Returns:
         PipelineResult
     """
-    import fitz  # PyMuPDF
+    from core.pdf_document import get_protocol_document
     from .soa_finder import find_soa_pages
     
     if config is None:
@@ -439,12 +484,17 @@ def run_from_files(
     # Create output directory
     os.makedirs(output_dir, exist_ok=True)
     
-    # Open PDF
-    doc = fitz.open(pdf_path)
+    # Open PDF (shared with page finders and expansion phases)
+    doc = get_protocol_document(pdf_path)
     
     # Find SoA pages if not provided
-    if soa_pages is None:
+    if soa_pages is None and manifest and manifest.reusable('soa_pages', after=()):
+        soa_pages = manifest.get('soa_pages')['pages']
+        logger.info(f"Reusing SoA pages: {[p+1 for p in soa_pages]} (PDF viewer numbering)")
+    elif soa_pages is None:
         logger.info("Finding SoA pages...")
+        if manifest:
+            manifest.start('soa_pages')
         # Use enhanced finder with title detection and adjacent page expansion
         soa_pages = find_soa_pages(pdf_path, model_name=config.model_name, use_llm=True)
         
@@ -454,37 +504,43 @@ def run_from_files(
         else:
             # Log pages in human-readable format (1-indexed)
             logger.info(f"Found SoA pages: {[p+1 for p in sorted(soa_pages)]} (PDF viewer numbering)")
+        if manifest:
+            manifest.complete('soa_pages', pages=sorted(soa_pages))
     
     # Extract text from SoA pages
-    text = "\n\n--- PAGE BREAK ---\n\n".join(
-        doc[p].get_text() for p in soa_pages if 0 <= p < len(doc)
-    )
-    
-    # Extract images from SoA pages only
-    images_dir = os.path.join(output_dir, "3_soa_images")
-    os.makedirs(images_dir, exist_ok=True)
+    text = doc.get_pages_text(soa_pages, separator="\n\n--- PAGE BREAK ---\n\n")
     
-    image_paths = []
-    for page_num in soa_pages:
-        if 0 <= page_num < len(doc):
-            page = doc[page_num]
-            pix = page.get_pixmap(dpi=150)
-            img_path = os.path.join(images_dir, f"soa_page_{page_num + 1:03d}.png")  # 1-indexed for human readability
-            pix.save(img_path)
-            image_paths.append(img_path)
-            logger.debug(f"Extracted page {page_num} as image")
-    
-    doc.close()
+    # Render SoA pages once; the in-memory buffers are shared by header
+    # analysis and vision validation
+    images_dir = os.path.join(output_dir, "3_soa_images") if config.save_images else None
+    soa_images = render_page_images(
+        pdf_path, soa_pages, dpi=150, output_dir=images_dir, mode=config.image_mode,
+    )
     
-    logger.info(f"Extracted {len(image_paths)} SoA page images")
+    payload = summarize_page_images(soa_images, model_name=config.model_name)
+    logger.info(f"Extracted {len(soa_images)} SoA page images "
+                f"({payload['total_payload_bytes'] / 1024:.0f} KB, "
+                f"~{payload['total_estimated_tokens']} image tokens per call)")
+    if 'baseline_estimated_tokens' in payload:
+        logger.info(f"  Whole pages at 150 DPI would be ~{payload['baseline_estimated_tokens']} image tokens")
+    for entry in payload['images']:
+        tile = f" tile {entry['tile']}" if entry['tile'] else ""
+        logger.debug(f"  Page {entry['page']}{tile}: {entry['width']}x{entry['height']} @ {entry['dpi']} DPI, "
+                     f"{entry['payload_bytes']} bytes, ~{entry['estimated_tokens']} tokens")
+    if config.save_intermediate:
+        with open(os.path.join(output_dir, "3_soa_image_payload.json"), 'w', encoding='utf-8') as f:
+            json.dump(payload, f, indent=2)
     
     # Run pipeline
-    return run_extraction_pipeline(
+    result = run_extraction_pipeline(
         protocol_text=text,
-        soa_images=image_paths,
+        soa_images=soa_images,
         output_dir=output_dir,
         config=config,
+        manifest=manifest,
     )
+    result.soa_pages = sorted({image.page_num for image in soa_images})
+    return result
 
 
 # ═══════════════════════════════════════════════════════════════════════════
@@ -17,9 +17,18 @@ Architecture:
     PDF → Study Design → references all above, adds to context
                               ↓
     ... subsequent extractors reference accumulated context ...
+
+Thread safety:
+    Phases may run in parallel (PipelineOrchestrator.run_phases_parallel).
+    Updates take the context's lock, replace field values rather than
+    mutating them, and swap in new lookup maps, so a reader never sees a
+    half-built index. For a consistent view across fields, read from
+    snapshot(): an immutable copy of the context at one version, which is
+    what BasePhase.run hands to each phase's extraction.
 """
 
 import logging
+import threading
 from typing import Dict, List, Any, Optional
 from dataclasses import dataclass, field
 from datetime import datetime
@@ -83,7 +92,7 @@ class PipelineContext:
     traversal_constraints: List[Dict[str, Any]] = field(default_factory=list)
     footnote_conditions: List[Dict[str, Any]] = field(default_factory=list)
     
-    # Lookup maps (built lazily)
+    # Lookup maps (rebuilt per field when that field changes)
     _epoch_by_id: Dict[str, Dict[str, Any]] = field(default_factory=dict)
     _epoch_by_name: Dict[str, Dict[str, Any]] = field(default_factory=dict)
     _encounter_by_id: Dict[str, Dict[str, Any]] = field(default_factory=dict)
@@ -92,49 +101,88 @@ class PipelineContext:
     _arm_by_id: Dict[str, Dict[str, Any]] = field(default_factory=dict)
     _intervention_by_id: Dict[str, Dict[str, Any]] = field(default_factory=dict)
     
+    # Concurrency: lock held by updates, bumped on every change
+    _lock: Any = field(default_factory=threading.RLock, repr=False, compare=False)
+    _version: int = field(default=0, repr=False, compare=False)
+    _frozen: bool = field(default=False, repr=False, compare=False)
+    
+    # Lookup maps by list field: (map attribute, item key, lower-cased)
+    _INDEXES = {
+        'epochs': (('_epoch_by_id', 'id', False), ('_epoch_by_name', 'name', True)),
+        'encounters': (('_encounter_by_id', 'id', False),),
+        'activities': (('_activity_by_id', 'id', False), ('_activity_by_name', 'name', True)),
+        'arms': (('_arm_by_id', 'id', False),),
+        'interventions': (('_intervention_by_id', 'id', False),),
+    }
+    
     def __post_init__(self):
         """Build lookup maps after initialization."""
         self._rebuild_lookup_maps()
     
     def _rebuild_lookup_maps(self):
         """Rebuild all lookup maps from current data."""
-        self._epoch_by_id.clear()
-        self._epoch_by_name.clear()
-        for epoch in self.epochs:
-            epoch_id = epoch.get('id', '')
-            epoch_name = epoch.get('name', '')
-            if epoch_id:
-                self._epoch_by_id[epoch_id] = epoch
-            if epoch_name:
-                self._epoch_by_name[epoch_name.lower()] = epoch
-        
-        self._encounter_by_id.clear()
-        for enc in self.encounters:
-            enc_id = enc.get('id', '')
-            if enc_id:
-                self._encounter_by_id[enc_id] = enc
-        
-        self._activity_by_id.clear()
-        self._activity_by_name.clear()
-        for act in self.activities:
-            act_id = act.get('id', '')
-            act_name = act.get('name', '')
-            if act_id:
-                self._activity_by_id[act_id] = act
-            if act_name:
-                self._activity_by_name[act_name.lower()] = act
+        with self._lock:
+            for field_name in self._INDEXES:
+                self._reindex(field_name, [], getattr(self, field_name))
+    
+    def _reindex(self, field_name: str, old_items: List[Dict[str, Any]], new_items: List[Dict[str, Any]]):
+        """
+        Swap in new lookup maps for one list field (lock held).
         
-        self._arm_by_id.clear()
-        for arm in self.arms:
-            arm_id = arm.get('id', '')
-            if arm_id:
-                self._arm_by_id[arm_id] = arm
+        When the new list extends the old one, only the added items are
+        indexed; the maps are always new dicts, so readers holding the old
+        ones are unaffected.
+        """
+        old_count = len(old_items)
+        extends = (
+            0 < old_count <= len(new_items)
+            and all(old is new for old, new in zip(old_items, new_items))
+        )
+        added = new_items[old_count:] if extends else new_items
+        for attr, key, lower in self._INDEXES[field_name]:
+            index = dict(getattr(self, attr)) if extends else {}
+            for item in added:
+                value = item.get(key, '') if isinstance(item, dict) else ''
+                if value:
+                    index[value.lower() if lower else value] = item
+            setattr(self, attr, index)
+    
+    def _update(self, **values: Any) -> None:
+        """Set fields and refresh the lookup maps of those that changed, atomically."""
+        if self._frozen:
+            raise AttributeError("PipelineContext snapshots are read-only")
+        with self._lock:
+            changed = False
+            for field_name, value in values.items():
+                old = getattr(self, field_name)
+                if value is old:
+                    continue
+                setattr(self, field_name, value)
+                if field_name in self._INDEXES:
+                    self._reindex(field_name, old, value)
+                changed = True
+            if changed:
+                self._version += 1
+    
+    @property
+    def version(self) -> int:
+        """Number of updates applied to this context."""
+        return self._version
+    
+    def snapshot(self) -> 'PipelineContext':
+        """
+        Read-only copy of the context at its current version.
         
-        self._intervention_by_id.clear()
-        for intv in self.interventions:
-            intv_id = intv.get('id', '')
-            if intv_id:
-                self._intervention_by_id[intv_id] = intv
+        Field values and lookup maps are never mutated in place, so the copy
+        shares them with the live context and costs only a dict copy.
+        """
+        with self._lock:
+            state = dict(self.__dict__)
+        snapshot = object.__new__(PipelineContext)
+        snapshot.__dict__.update(state)
+        snapshot._lock = threading.RLock()
+        snapshot._frozen = True
+        return snapshot
     
     # === Update methods ===
     
@@ -143,30 +191,33 @@ class PipelineContext:
         if not soa_data:
             return
         
-        # Try direct keys first
-        self.epochs = soa_data.get('epochs', self.epochs)
-        self.encounters = soa_data.get('encounters', self.encounters)
-        self.activities = soa_data.get('activities', self.activities)
-        self.timepoints = soa_data.get('timepoints', self.timepoints)
-        self.arms = soa_data.get('arms', self.arms)
-        self.study_cells = soa_data.get('studyCells', self.study_cells)
-        
-        # Try nested USDM structure
-        study = soa_data.get('study', {})
-        versions = study.get('versions', [])
-        if versions:
-            for version in versions:
-                designs = version.get('studyDesigns', [])
-                if designs:
-                    design = designs[0]
-                    self.epochs = self.epochs or design.get('epochs', [])
-                    self.encounters = self.encounters or design.get('encounters', [])
-                    self.activities = self.activities or design.get('activities', [])
-                    self.arms = self.arms or design.get('arms', [])
-                    self.study_cells = self.study_cells or design.get('studyCells', [])
-                    break
-        
-        self._rebuild_lookup_maps()
+        with self._lock:
+            # Try direct keys first
+            values = {
+                'epochs': soa_data.get('epochs', self.epochs),
+                'encounters': soa_data.get('encounters', self.encounters),
+                'activities': soa_data.get('activities', self.activities),
+                'timepoints': soa_data.get('timepoints', self.timepoints),
+                'arms': soa_data.get('arms', self.arms),
+                'study_cells': soa_data.get('studyCells', self.study_cells),
+            }
+            
+            # Try nested USDM structure
+            study = soa_data.get('study', {})
+            versions = study.get('versions', [])
+            if versions:
+                for version in versions:
+                    designs = version.get('studyDesigns', [])
+                    if designs:
+                        design = designs[0]
+                        values['epochs'] = values['epochs'] or design.get('epochs', [])
+                        values['encounters'] = values['encounters'] or design.get('encounters', [])
+                        values['activities'] = values['activities'] or design.get('activities', [])
+                        values['arms'] = values['arms'] or design.get('arms', [])
+                        values['study_cells'] = values['study_cells'] or design.get('studyCells', [])
+                        break
+            
+            self._update(**values)
         logger.info(f"Updated context from SoA: {len(self.epochs)} epochs, {len(self.encounters)} encounters, {len(self.activities)} activities")
     
     def update_from_metadata(self, metadata):
@@ -179,11 +230,14 @@ class PipelineContext:
         elif hasattr(metadata, '__dict__') and not isinstance(metadata, dict):
             metadata = vars(metadata)
         if isinstance(metadata, dict):
-            self.study_title = metadata.get('studyTitle', metadata.get('study_title', self.study_title))
-            self.study_id = metadata.get('studyId', metadata.get('study_id', self.study_id))
-            self.sponsor = metadata.get('sponsor', self.sponsor)
-            self.indication = metadata.get('indication', self.indication)
-            self.phase = metadata.get('phase', self.phase)
+            with self._lock:
+                self._update(
+                    study_title=metadata.get('studyTitle', metadata.get('study_title', self.study_title)),
+                    study_id=metadata.get('studyId', metadata.get('study_id', self.study_id)),
+                    sponsor=metadata.get('sponsor', self.sponsor),
+                    indication=metadata.get('indication', self.indication),
+                    phase=metadata.get('phase', self.phase),
+                )
         logger.debug(f"Updated context from metadata: {self.study_title}")
     
     def _to_dict(self, obj):
@@ -203,8 +257,11 @@ class PipelineContext:
         if not eligibility:
             return
         data = self._to_dict(eligibility)
-        self.inclusion_criteria = data.get('inclusionCriteria', data.get('inclusion_criteria', self.inclusion_criteria))
-        self.exclusion_criteria = data.get('exclusionCriteria', data.get('exclusion_criteria', self.exclusion_criteria))
+        with self._lock:
+            self._update(
+                inclusion_criteria=data.get('inclusionCriteria', data.get('inclusion_criteria', self.inclusion_criteria)),
+                exclusion_criteria=data.get('exclusionCriteria', data.get('exclusion_criteria', self.exclusion_criteria)),
+            )
         logger.debug(f"Updated context from eligibility: {len(self.inclusion_criteria)} inclusion, {len(self.exclusion_criteria)} exclusion")
     
     def update_from_objectives(self, objectives):
@@ -212,8 +269,11 @@ class PipelineContext:
         if not objectives:
             return
         data = self._to_dict(objectives)
-        self.objectives = data.get('objectives', self.objectives)
-        self.endpoints = data.get('endpoints', self.endpoints)
+        with self._lock:
+            self._update(
+                objectives=data.get('objectives', self.objectives),
+                endpoints=data.get('endpoints', self.endpoints),
+            )
         logger.debug(f"Updated context from objectives: {len(self.objectives)} objectives, {len(self.endpoints)} endpoints")
     
     def update_from_studydesign(self, design):
@@ -221,9 +281,8 @@ class PipelineContext:
         if not design:
             return
         data = self._to_dict(design)
-        self.arms = data.get('arms', self.arms)
-        self.cohorts = data.get('cohorts', self.cohorts)
-        self._rebuild_lookup_maps()
+        with self._lock:
+            self._update(arms=data.get('arms', self.arms), cohorts=data.get('cohorts', self.cohorts))
         logger.debug(f"Updated context from study design: {len(self.arms)} arms, {len(self.cohorts)} cohorts")
     
     def update_from_interventions(self, interventions):
@@ -231,9 +290,11 @@ class PipelineContext:
         if not interventions:
             return
         data = self._to_dict(interventions)
-        self.interventions = data.get('interventions', self.interventions)
-        self.products = data.get('products', self.products)
-        self._rebuild_lookup_maps()
+        with self._lock:
+            self._update(
+                interventions=data.get('interventions', self.interventions),
+                products=data.get('products', self.products),
+            )
         logger.debug(f"Updated context from interventions: {len(self.interventions)} interventions")
     
     def update_from_procedures(self, procedures):
@@ -241,8 +302,8 @@ class PipelineContext:
         if not procedures:
             return
         data = self._to_dict(procedures)
-        self.procedures = data.get('procedures', self.procedures)
-        self.devices = data.get('devices', self.devices)
+        with self._lock:
+            self._update(procedures=data.get('procedures', self.procedures), devices=data.get('devices', self.devices))
         logger.debug(f"Updated context from procedures: {len(self.procedures)} procedures")
     
     def update_from_scheduling(self, scheduling):
@@ -250,18 +311,21 @@ class PipelineContext:
         if not scheduling:
             return
         data = self._to_dict(scheduling)
-        self.timings = data.get('timings', self.timings)
-        self.scheduling_rules = data.get('rules', self.scheduling_rules)
+        with self._lock:
+            self._update(timings=data.get('timings', self.timings), scheduling_rules=data.get('rules', self.scheduling_rules))
         logger.debug(f"Updated context from scheduling: {len(self.timings)} timings")
     
     def update_from_execution_model(self, execution: Dict[str, Any]):
         """Update context from execution model extraction."""
         if not execution:
             return
-        self.time_anchors = execution.get('timeAnchors', self.time_anchors)
-        self.repetitions = execution.get('repetitions', self.repetitions)
-        self.traversal_constraints = execution.get('traversalConstraints', self.traversal_constraints)
-        self.footnote_conditions = execution.get('footnoteConditions', self.footnote_conditions)
+        with self._lock:
+            self._update(
+                time_anchors=execution.get('timeAnchors', self.time_anchors),
+                repetitions=execution.get('repetitions', self.repetitions),
+                traversal_constraints=execution.get('traversalConstraints', self.traversal_constraints),
+                footnote_conditions=execution.get('footnoteConditions', self.footnote_conditions),
+            )
         logger.debug(f"Updated context from execution: {len(self.repetitions)} repetitions")
     
     # === Query methods ===
@@ -13,6 +13,8 @@ from typing import List, Optional, Dict, Any
 
 from core.llm_client import call_llm
 from core.pdf_utils import extract_text_from_pages, get_page_count
+from core.pdf_document import get_protocol_document
+from core.page_classifier import register_section_patterns
 from .schema import (
     ProceduresDevicesData,
     ProceduresDevicesResult,
@@ -29,6 +31,39 @@ from .prompts import get_procedures_prompt, get_system_prompt
 logger = logging.getLogger(__name__)
 
 
+PROCEDURE_KEYWORDS = [
+    r'procedure',
+    r'blood\s+draw',
+    r'blood\s+sample',
+    r'venipuncture',
+    r'biopsy',
+    r'imaging',
+    r'x-ray',
+    r'ct\s+scan',
+    r'mri',
+    r'ultrasound',
+    r'ecg',
+    r'electrocardiogram',
+    r'echocardiogram',
+    r'infusion',
+    r'injection',
+    r'administration\s+of',
+    r'specimen\s+collection',
+    r'sample\s+collection',
+    r'physical\s+examination',
+    r'vital\s+signs',
+    r'medical\s+device',
+    r'drug\s+delivery',
+    r'autoinjector',
+    r'prefilled\s+syringe',
+    r'infusion\s+pump',
+    r'inhaler',
+    r'nebulizer',
+]
+
+PROCEDURE_SECTION = register_section_patterns("procedures", PROCEDURE_KEYWORDS)
+
+
 def find_procedure_pages(
     pdf_path: str,
     max_pages_to_scan: int = 60,
@@ -36,58 +71,19 @@ def find_procedure_pages(
     """
     Find pages containing procedure and device information using heuristics.
     """
-    import fitz
-    
-    procedure_keywords = [
-        r'procedure',
-        r'blood\s+draw',
-        r'blood\s+sample',
-        r'venipuncture',
-        r'biopsy',
-        r'imaging',
-        r'x-ray',
-        r'ct\s+scan',
-        r'mri',
-        r'ultrasound',
-        r'ecg',
-        r'electrocardiogram',
-        r'echocardiogram',
-        r'infusion',
-        r'injection',
-        r'administration\s+of',
-        r'specimen\s+collection',
-        r'sample\s+collection',
-        r'physical\s+examination',
-        r'vital\s+signs',
-        r'medical\s+device',
-        r'drug\s+delivery',
-        r'autoinjector',
-        r'prefilled\s+syringe',
-        r'infusion\s+pump',
-        r'inhaler',
-        r'nebulizer',
-    ]
-    
-    pattern = re.compile('|'.join(procedure_keywords), re.IGNORECASE)
-    
     procedure_pages = []
     
     try:
-        doc = fitz.open(pdf_path)
-        total_pages = min(len(doc), max_pages_to_scan)
+        doc = get_protocol_document(pdf_path)
+        total_pages = min(doc.page_count, max_pages_to_scan)
         
-        for page_num in range(total_pages):
-            page = doc[page_num]
-            text = page.get_text().lower()
-            
+        for page_num, features in doc.iter_page_features(max_pages=total_pages):
             # Count keyword matches on this page
-            matches = len(pattern.findall(text))
+            matches = features.count(PROCEDURE_SECTION)
             if matches >= 2:  # Require at least 2 keyword matches
                 procedure_pages.append(page_num)
                 logger.debug(f"Found procedure keywords on page {page_num + 1} ({matches} matches)")
         
-        doc.close()
-        
         # Limit to most relevant pages
         if len(procedure_pages) > 15:
             procedure_pages = procedure_pages[:15]
@@ -13,6 +13,8 @@ from typing import List, Optional, Dict, Any
 
 from core.llm_client import call_llm
 from core.pdf_utils import extract_text_from_pages, get_page_count
+from core.pdf_document import get_protocol_document
+from core.page_classifier import register_section_patterns
 from .schema import (
     SchedulingData,
     SchedulingResult,
@@ -31,6 +33,31 @@ from .prompts import get_scheduling_prompt, get_system_prompt
 logger = logging.getLogger(__name__)
 
 
+SCHEDULING_KEYWORDS = [
+    r'visit\s+window',
+    r'visit\s+schedule',
+    r'study\s+schedule',
+    r'study\s+duration',
+    r'±\s*\d+\s*days?',
+    r'\+/-\s*\d+\s*days?',
+    r'within\s+\d+\s*days?',
+    r'screening\s+period',
+    r'treatment\s+period',
+    r'follow-up\s+period',
+    r'washout',
+    r'discontinuation',
+    r'early\s+termination',
+    r'withdrawal',
+    r'stopping\s+rule',
+    r'transition',
+    r'rescue\s+therapy',
+    r'dose\s+modification',
+    r'dose\s+reduction',
+]
+
+SCHEDULING_SECTION = register_section_patterns("scheduling", SCHEDULING_KEYWORDS)
+
+
 def find_scheduling_pages(
     pdf_path: str,
     max_pages_to_scan: int = 60,
@@ -38,49 +65,18 @@ def find_scheduling_pages(
     """
     Find pages containing scheduling/timing information using heuristics.
     """
-    import fitz
-    
-    scheduling_keywords = [
-        r'visit\s+window',
-        r'visit\s+schedule',
-        r'study\s+schedule',
-        r'study\s+duration',
-        r'±\s*\d+\s*days?',
-        r'\+/-\s*\d+\s*days?',
-        r'within\s+\d+\s*days?',
-        r'screening\s+period',
-        r'treatment\s+period',
-        r'follow-up\s+period',
-        r'washout',
-        r'discontinuation',
-        r'early\s+termination',
-        r'withdrawal',
-        r'stopping\s+rule',
-        r'transition',
-        r'rescue\s+therapy',
-        r'dose\s+modification',
-        r'dose\s+reduction',
-    ]
-    
-    pattern = re.compile('|'.join(scheduling_keywords), re.IGNORECASE)
-    
     scheduling_pages = []
     
     try:
-        doc = fitz.open(pdf_path)
-        total_pages = min(len(doc), max_pages_to_scan)
+        doc = get_protocol_document(pdf_path)
+        total_pages = min(doc.page_count, max_pages_to_scan)
         
-        for page_num in range(total_pages):
-            page = doc[page_num]
-            text = page.get_text().lower()
-            
-            matches = len(pattern.findall(text))
+        for page_num, features in doc.iter_page_features(max_pages=total_pages):
+            matches = features.count(SCHEDULING_SECTION)
             if matches >= 2:
                 scheduling_pages.append(page_num)
                 logger.debug(f"Found scheduling keywords on page {page_num + 1}")
         
-        doc.close()
-        
         if len(scheduling_pages) > 20:
             scheduling_pages = scheduling_pages[:20]
         
@@ -12,16 +12,16 @@ Usage:
     print(f"SoA found on pages: {pages}")
 """
 
-import os
-import re
 import logging
 from typing import List, Optional, Tuple
 from dataclasses import dataclass
 
-import fitz  # PyMuPDF
-
 from core.llm_client import get_llm_client, LLMConfig
 from core.json_utils import parse_llm_json
+from core.page_images import render_page_images
+from core.pdf_document import get_protocol_document
+from core.page_classifier import register_section_keywords, register_section_patterns
+from llm_providers import call_extractor
 
 logger = logging.getLogger(__name__)
 
@@ -47,6 +47,29 @@ TABLE_INDICATORS = [
     r'\bfollow[-\s]*up\b',
 ]
 
+# Patterns for actual table titles (not TOC or references)
+# Requires "Table X:" format which indicates actual table caption
+SOA_TABLE_TITLE_PATTERNS = [
+    r'table\s+\d+[:\.]?\s*schedule\s+of\s+(activities|assessments)',  # "Table 1: Schedule of..."
+]
+
+# Patterns for table structure (columns/headers)
+SOA_STRUCTURE_PATTERNS = [
+    r'\bday\s*[-+]?\d+',
+    r'\bweek\s*[-+]?\d+', 
+    r'\bvisit\s*\d+',
+    r'\bscreening\b.*\btreatment\b',  # Multiple epochs on same page
+    r'\binpatient\b',
+    r'\boutpatient\b',
+]
+
+SOA_KEYWORD_SECTION = register_section_keywords("soa.keywords", SOA_KEYWORDS)
+SOA_TABLE_SECTION = register_section_patterns("soa.table_indicators", TABLE_INDICATORS)
+SOA_VISIT_COLUMNS_SECTION = register_section_patterns("soa.visit_columns", [r'visit\s*\d+'])
+SOA_TABLE_TITLE_SECTION = register_section_patterns("soa.table_title", SOA_TABLE_TITLE_PATTERNS)
+SOA_TITLE_SECTION = register_section_patterns("soa.title", [r'schedule\s+of\s+(activities|assessments)'])
+SOA_STRUCTURE_SECTION = register_section_patterns("soa.structure", SOA_STRUCTURE_PATTERNS)
+
 
 @dataclass
 class PageScore:
@@ -69,35 +92,26 @@ def find_soa_pages_heuristic(pdf_path: str, top_n: int = 5) -> List[int]:
     Returns:
         List of 0-indexed page numbers likely containing SoA
     """
-    doc = fitz.open(pdf_path)
+    doc = get_protocol_document(pdf_path)
     scores: List[PageScore] = []
     
-    for page_num in range(len(doc)):
-        page = doc[page_num]
-        text = page.get_text().lower()
-        
+    for page_num, features in doc.iter_page_features():
         # Score keywords
-        keyword_score = 0.0
-        for kw in SOA_KEYWORDS:
-            if kw in text:
-                keyword_score += 2.0
+        keyword_score = features.distinct(SOA_KEYWORD_SECTION) * 2.0
         
         # Score table indicators
-        table_score = 0.0
-        for pattern in TABLE_INDICATORS:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            table_score += len(matches) * 0.5
+        table_score = sum(features.term_counts(SOA_TABLE_SECTION)) * 0.5
         
         # Bonus for having multiple column-like structures
         # (rough heuristic based on repeated patterns)
-        visit_matches = re.findall(r'visit\s*\d+', text, re.IGNORECASE)
-        if len(visit_matches) >= 3:
+        if features.count(SOA_VISIT_COLUMNS_SECTION) >= 3:
             table_score += 3.0
         
         total_score = keyword_score + table_score
         
         if total_score > 0:
             # Get a snippet for debugging
+            text = doc.get_page_text_lower(page_num)
             snippet_start = text.find("schedule")
             if snippet_start == -1:
                 snippet_start = 0
@@ -111,8 +125,6 @@ def find_soa_pages_heuristic(pdf_path: str, top_n: int = 5) -> List[int]:
                 text_snippet=snippet,
             ))
     
-    doc.close()
-    
     # Sort by score descending
     scores.sort(key=lambda x: x.total_score, reverse=True)
     
@@ -137,7 +149,7 @@ def find_soa_pages_llm(
     Returns:
         List of 0-indexed page numbers containing SoA
     """
-    doc = fitz.open(pdf_path)
+    doc = get_protocol_document(pdf_path)
     
     # If no candidates provided, use heuristics to narrow down
     if candidate_pages is None:
@@ -148,12 +160,10 @@ def find_soa_pages_llm(
     # Extract text from candidate pages
     page_texts = []
     for page_num in candidate_pages:
-        if 0 <= page_num < len(doc):
-            text = doc[page_num].get_text()[:2000]  # Limit text per page
+        if doc.has_page(page_num):
+            text = doc.get_page_text(page_num)[:2000]  # Limit text per page
             page_texts.append(f"PAGE {page_num}:\n{text}")
     
-    doc.close()
-    
     if not page_texts:
         return []
     
@@ -190,10 +200,11 @@ Include any page that has SoA table content, even if it's a continuation page.""
         config = to_llm_config(task_config)
         
         client = get_llm_client(model_name)
-        response = client.generate(
-            messages=[{"role": "user", "content": prompt}],
-            config=config,
-        )
+        with call_extractor("soa_finder"):
+            response = client.generate(
+                messages=[{"role": "user", "content": prompt}],
+                config=config,
+            )
         
         data = parse_llm_json(response.content, fallback={})
         # Handle LLM returning list instead of dict (e.g., [{...}] instead of {...})
@@ -274,46 +285,22 @@ def _find_soa_title_pages(pdf_path: str) -> List[int]:
     - "Table X: Schedule of Activities" pattern (actual table title)
     - Combined presence of title AND table structure (column headers like Day, Visit)
     """
-    doc = fitz.open(pdf_path)
+    doc = get_protocol_document(pdf_path)
     title_pages = []
     
-    # Patterns for actual table titles (not TOC or references)
-    # Requires "Table X:" format which indicates actual table caption
-    table_title_patterns = [
-        r'table\s+\d+[:\.]?\s*schedule\s+of\s+(activities|assessments)',  # "Table 1: Schedule of..."
-    ]
-    
-    # Patterns for table structure (columns/headers)
-    structure_patterns = [
-        r'\bday\s*[-+]?\d+',
-        r'\bweek\s*[-+]?\d+', 
-        r'\bvisit\s*\d+',
-        r'\bscreening\b.*\btreatment\b',  # Multiple epochs on same page
-        r'\binpatient\b',
-        r'\boutpatient\b',
-    ]
-    
-    for page_num in range(len(doc)):
-        text = doc[page_num].get_text().lower()
-        
+    for page_num, features in doc.iter_page_features():
         # Method 1: Explicit table title pattern
-        for pattern in table_title_patterns:
-            if re.search(pattern, text):
+        if features.has(SOA_TABLE_TITLE_SECTION):
+            title_pages.append(page_num)
+            logger.debug(f"Page {page_num + 1}: Found table title pattern")
+        # Method 2: "Schedule of Activities" + significant table structure
+        elif features.has(SOA_TITLE_SECTION):
+            structure_count = features.distinct(SOA_STRUCTURE_SECTION)
+            # Need both the title AND substantial table structure
+            if structure_count >= 3:
                 title_pages.append(page_num)
-                logger.debug(f"Page {page_num + 1}: Found table title pattern")
-                break
-        else:
-            # Method 2: "Schedule of Activities" + significant table structure
-            if re.search(r'schedule\s+of\s+(activities|assessments)', text):
-                structure_count = sum(
-                    1 for p in structure_patterns if re.search(p, text)
-                )
-                # Need both the title AND substantial table structure
-                if structure_count >= 3:
-                    title_pages.append(page_num)
-                    logger.debug(f"Page {page_num + 1}: Found title + {structure_count} structure indicators")
-    
-    doc.close()
+                logger.debug(f"Page {page_num + 1}: Found title + {structure_count} structure indicators")
+    
     return title_pages
 
 
@@ -328,8 +315,7 @@ def _expand_adjacent_pages(pages: List[int], pdf_path: str) -> List[int]:
     if not pages:
         return pages
     
-    doc = fitz.open(pdf_path)
-    total_pages = len(doc)
+    total_pages = get_protocol_document(pdf_path).page_count
     
     expanded = set(pages)
     
@@ -358,7 +344,6 @@ def _expand_adjacent_pages(pages: List[int], pdf_path: str) -> List[int]:
         expanded.add(max_page + 1)
         logger.debug(f"Added page {max_page + 2} (1-indexed) after SoA")
     
-    doc.close()
     return list(expanded)
 
 
@@ -373,15 +358,8 @@ def extract_soa_text(pdf_path: str, page_numbers: List[int]) -> str:
     Returns:
         Combined text from specified pages
     """
-    doc = fitz.open(pdf_path)
-    texts = []
-    
-    for page_num in page_numbers:
-        if 0 <= page_num < len(doc):
-            texts.append(doc[page_num].get_text())
-    
-    doc.close()
-    return "\n\n---PAGE BREAK---\n\n".join(texts)
+    doc = get_protocol_document(pdf_path)
+    return doc.get_pages_text(page_numbers, separator="\n\n---PAGE BREAK---\n\n")
 
 
 def extract_soa_images(
@@ -402,18 +380,5 @@ def extract_soa_images(
     Returns:
         List of paths to extracted images
     """
-    os.makedirs(output_dir, exist_ok=True)
-    doc = fitz.open(pdf_path)
-    image_paths = []
-    
-    for page_num in page_numbers:
-        if 0 <= page_num < len(doc):
-            page = doc[page_num]
-            pix = page.get_pixmap(dpi=dpi)
-            img_path = os.path.join(output_dir, f"soa_page_{page_num + 1:03d}.png")  # 1-indexed for human readability
-            pix.save(img_path)
-            image_paths.append(img_path)
-            logger.debug(f"Saved page {page_num} to {img_path}")
-    
-    doc.close()
-    return image_paths
+    images = render_page_images(pdf_path, page_numbers, dpi=dpi, output_dir=output_dir)
+    return [image.path for image in images]
@@ -13,6 +13,8 @@ from typing import List, Optional, Dict, Any, Tuple
 
 from core.llm_client import call_llm
 from core.pdf_utils import extract_text_from_pages, get_page_count
+from core.pdf_document import get_protocol_document
+from core.page_classifier import register_section_patterns
 from .schema import (
     StudyDesignData,
     InterventionalStudyDesign,
@@ -43,6 +45,26 @@ class StudyDesignExtractionResult:
     model_used: Optional[str] = None
 
 
+STUDY_DESIGN_KEYWORDS = [
+    r'study\s+design',
+    r'trial\s+design',
+    r'randomization',
+    r'randomisation',
+    r'blinding',
+    r'double.?blind',
+    r'open.?label',
+    r'treatment\s+arms?',
+    r'study\s+arms?',
+    r'allocation\s+ratio',
+    r'stratification',
+    r'interventional',
+    r'parallel\s+group',
+    r'crossover',
+]
+
+STUDY_DESIGN_SECTION = register_section_patterns("studydesign", STUDY_DESIGN_KEYWORDS)
+
+
 def find_study_design_pages(
     pdf_path: str,
     max_pages_to_scan: int = 30,
@@ -57,43 +79,17 @@ def find_study_design_pages(
     Returns:
         List of 0-indexed page numbers likely containing study design
     """
-    import fitz
-    
-    design_keywords = [
-        r'study\s+design',
-        r'trial\s+design',
-        r'randomization',
-        r'randomisation',
-        r'blinding',
-        r'double.?blind',
-        r'open.?label',
-        r'treatment\s+arms?',
-        r'study\s+arms?',
-        r'allocation\s+ratio',
-        r'stratification',
-        r'interventional',
-        r'parallel\s+group',
-        r'crossover',
-    ]
-    
-    pattern = re.compile('|'.join(design_keywords), re.IGNORECASE)
-    
     design_pages = []
     
     try:
-        doc = fitz.open(pdf_path)
-        total_pages = min(len(doc), max_pages_to_scan)
+        doc = get_protocol_document(pdf_path)
+        total_pages = min(doc.page_count, max_pages_to_scan)
         
-        for page_num in range(total_pages):
-            page = doc[page_num]
-            text = page.get_text().lower()
-            
-            if pattern.search(text):
+        for page_num, features in doc.iter_page_features(max_pages=total_pages):
+            if features.has(STUDY_DESIGN_SECTION):
                 design_pages.append(page_num)
                 logger.debug(f"Found design keywords on page {page_num + 1}")
         
-        doc.close()
-        
         # If we found pages, also include adjacent pages for context
         if design_pages:
             expanded = set()
@@ -171,13 +167,14 @@ def extract_study_design(
             if arm_names:
                 context_hints += f"\nKnown treatment arms from SoA: {', '.join(arm_names)}"
         
-        prompt = build_study_design_extraction_prompt(protocol_text, context_hints=context_hints)
+        prompt = build_study_design_extraction_prompt(context_hints=context_hints)
         
         response = call_llm(
             prompt=prompt,
             model_name=model_name,
             json_mode=True,
             extractor_name="studydesign",
+            context=protocol_text,
         )
         
         if 'error' in response:
@@ -25,19 +25,27 @@ import logging
 from typing import Optional, List
 from dataclasses import dataclass
 
-from core.llm_client import get_llm_client, LLMConfig
+from core.llm_client import (
+    get_llm_client, get_max_continuations, generate_with_continuation, compact_prompt, LLMConfig,
+)
 from core.json_utils import parse_llm_json
+from core.json_stream import JSONShapeError
 from core.usdm_types import (
     HeaderStructure, Timeline, Activity, ActivityTimepoint,
     create_wrapper_input
 )
 from core.provenance import ProvenanceTracker, ProvenanceSource
 from core.constants import USDM_VERSION, SYSTEM_NAME, SYSTEM_VERSION
+from llm_providers import call_extractor
 
 logger = logging.getLogger(__name__)
 
 MAX_EXTRACTION_RETRIES = 2  # Retry if response format is invalid
 
+# Top-level keys of the nested USDM format the model sometimes returns instead
+# of the flat {activities, activityTimepoints} object
+WRONG_SHAPE_KEYS = ('study', 'studyDesigns', 'activityGroups')
+
 
 def validate_extraction_response(data: dict, min_activities: int = 1) -> tuple[bool, str]:
     """
@@ -49,7 +57,7 @@ def validate_extraction_response(data: dict, min_activities: int = 1) -> tuple[b
     # Check for required top-level keys
     if 'activities' not in data:
         # Check if model returned nested USDM structure instead
-        if 'study' in data or 'studyDesigns' in data or 'activityGroups' in data:
+        if any(key in data for key in WRONG_SHAPE_KEYS):
             return False, "Response has wrong structure (nested USDM format instead of flat {activities, activityTimepoints})"
         return False, "Missing 'activities' key in response"
     
@@ -333,16 +341,24 @@ def extract_soa_from_text(
         # Get LLM client
         client = get_llm_client(model_name)
         
-        # Build base messages
+        # Build base messages: stable system + protocol text first, as a
+        # cacheable prefix, then the header-specific extraction instructions
         base_messages = [
-            {"role": "system", "content": "You are an expert in clinical trial protocols and CDISC USDM standards."},
-            {"role": "user", "content": f"{prompt}\n\nPROTOCOL TEXT:\n\n{protocol_text}"}
+            {"role": "system", "content": "You are an expert in clinical trial protocols and CDISC USDM standards.", "cache": True},
+            {"role": "user", "content": f"PROTOCOL TEXT:\n\n{protocol_text}", "cache": True},
+            {"role": "user", "content": prompt},
         ]
+        # Drop running page headers/footers and table rulings; enforce the input budget
+        base_messages = compact_prompt(base_messages, model_name, "text_extractor")
         
         # Configure for JSON output using task-specific settings
         from extraction.llm_task_config import get_llm_task_config, to_llm_config
         task_config = get_llm_task_config("text_extractor", model=model_name)
         config = to_llm_config(task_config)
+        # Abort a streamed answer as soon as it is not the flat
+        # {activities, activityTimepoints} object (see validate_extraction_response)
+        config.json_root = "object"
+        config.json_forbidden_keys = list(WRONG_SHAPE_KEYS)
         
         raw_response = ""
         data = {}
@@ -374,7 +390,19 @@ DO NOT wrap in "study" or any other container. Return FLAT JSON only."""
                 messages.append({"role": "user", "content": correction})
             
             # Generate response
-            response = client.generate(messages, config)
+            try:
+                # Large SoA outputs are continued rather than cut off at max_tokens
+                with call_extractor("text_extractor"):
+                    response = generate_with_continuation(client, messages, config, get_max_continuations())
+            except JSONShapeError as e:
+                # Wrong shape detected mid-stream: retry without waiting for the rest
+                raw_response = e.partial_text
+                last_error = f"Response has wrong structure: {e}"
+                logger.warning(f"  Aborted response early: {e}")
+                if attempt == MAX_EXTRACTION_RETRIES:
+                    logger.error(f"  Extraction failed validation after {MAX_EXTRACTION_RETRIES + 1} attempts: {last_error}")
+                    data = {}
+                continue
             raw_response = response.content
             
             # Parse response
@@ -506,3 +534,55 @@ def save_extraction_result(
     if provenance_path:
         result.provenance.save(provenance_path)
         logger.info(f"Saved provenance to {provenance_path}")
+
+
+def load_extraction_result(
+    output_path: str,
+    header: HeaderStructure,
+    provenance_path: str,
+) -> TextExtractionResult:
+    """
+    Load an extraction result saved by save_extraction_result.
+    
+    Activities and ticks are read back from the USDM output (leaving out the
+    parent activities built from the header's groups); tick footnote
+    references come from the saved provenance.
+    
+    Args:
+        output_path: USDM JSON saved by save_extraction_result
+        header: Header structure the result was saved with
+        provenance_path: Provenance JSON saved with it
+        
+    Returns:
+        TextExtractionResult (without the raw LLM response)
+    """
+    with open(output_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    provenance = ProvenanceTracker.load(provenance_path)
+    
+    design = data['study']['versions'][0]['studyDesigns'][0]
+    group_ids = {g.id for g in header.activityGroups}
+    activities = [
+        Activity.from_dict(a) for a in design.get('activities', [])
+        if a.get('id') not in group_ids
+    ]
+    
+    activity_timepoints = []
+    for timeline in design.get('scheduleTimelines', [])[:1]:
+        for instance in timeline.get('instances', []):
+            activity_id = (instance.get('activityIds') or [''])[0]
+            encounter_id = instance.get('encounterId', '')
+            activity_timepoints.append(ActivityTimepoint(
+                activityId=activity_id,
+                encounterId=encounter_id,
+                footnoteRefs=provenance.cellFootnotes.get(f"{activity_id}|{encounter_id}", []),
+            ))
+    
+    return TextExtractionResult(
+        activities=activities,
+        activity_timepoints=activity_timepoints,
+        raw_response="",
+        model_used=provenance.metadata.get('model', ''),
+        success=True,
+        provenance=provenance,
+    )
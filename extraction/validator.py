@@ -24,20 +24,22 @@ Usage:
 """
 
 import json
-import base64
 import logging
 from typing import List, Optional, Set, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 
-from core.llm_client import get_llm_client, LLMConfig
+from core.llm_client import generate_with_images
 from core.json_utils import parse_llm_json
+from core.page_images import ImageSource
 from core.usdm_types import HeaderStructure, ActivityTimepoint
 from core.provenance import ProvenanceTracker, ProvenanceSource
-from llm_providers import usage_tracker
 
 logger = logging.getLogger(__name__)
 
+# Output budget for the verified/missed tick lists
+VALIDATION_MAX_TOKENS = 4096
+
 
 class IssueType(Enum):
     """Types of validation issues."""
@@ -161,7 +163,7 @@ def validate_extraction(
     text_activities: List[dict],
     text_ticks: List[dict],
     header_structure: HeaderStructure,
-    image_paths: List[str],
+    image_paths: List[ImageSource],
     model_name: str = "gemini-2.5-pro",
     protocol_text: str = "",
     footnotes: str = "",
@@ -231,19 +233,30 @@ def validate_extraction(
             context_section=context_section,
         )
         
-        # Call vision model
-        if 'gemini' in model_name.lower():
-            result = _validate_with_gemini(prompt, image_paths, model_name)
-        elif 'claude' in model_name.lower():
-            result = _validate_with_claude(prompt, image_paths, model_name)
-        else:
-            result = _validate_with_openai(prompt, image_paths, model_name)
+        # Call vision model (all pages in one request, via the provider layer)
+        response = generate_with_images(
+            prompt,
+            image_paths,
+            model_name=model_name,
+            json_mode=True,
+            max_tokens=VALIDATION_MAX_TOKENS,
+            extractor_name="soa_validator",
+        )
+        raw_response = getattr(response, 'content', None) or ""
+        if not raw_response.strip():
+            finish_reason = getattr(response, 'finish_reason', None)
+            logger.warning(f"Validation got an empty response from {model_name} (finish reason: {finish_reason})")
+            return ValidationResult(
+                success=False,
+                error=f"Empty response from {model_name} (finish reason: {finish_reason})",
+                model_used=model_name,
+            )
         
         # Parse results into issues
         issues = []
         confirmed = 0
         
-        data = parse_llm_json(result['response'], fallback={})
+        data = parse_llm_json(raw_response, fallback={})
         
         for tick in data.get('verified_ticks', []):
             if tick.get('visible', True):
@@ -281,7 +294,7 @@ def validate_extraction(
             confirmed_ticks=confirmed,
             total_ticks_checked=len(text_ticks),
             model_used=model_name,
-            raw_response=result['response'],
+            raw_response=raw_response,
         )
         
     except Exception as e:
@@ -293,225 +306,6 @@ def validate_extraction(
         )
 
 
-def _validate_with_gemini(prompt: str, image_paths: List[str], model_name: str) -> dict:
-    """Run validation with Gemini via llm_providers for consistent retry/config handling."""
-    from PIL import Image
-    import io
-    import os
-    import time
-    
-    # Check if this is a Gemini 3 model that requires google-genai SDK
-    is_gemini3 = any(g3 in model_name.lower() for g3 in ['gemini-3', 'gemini-3-flash', 'gemini-3-pro'])
-    
-    # Load images as base64
-    image_parts = []
-    for img_path in image_paths:
-        img = Image.open(img_path)
-        img_bytes = io.BytesIO()
-        img.save(img_bytes, format='PNG')
-        image_parts.append({
-            'mime_type': 'image/png',
-            'data': base64.b64encode(img_bytes.getvalue()).decode('utf-8')
-        })
-    
-    # Retry configuration for rate limits
-    max_retries = 3
-    initial_backoff = 5
-    
-    for attempt in range(max_retries + 1):
-        try:
-            if is_gemini3:
-                # Use google-genai SDK for Gemini 3 with thinking disabled
-                try:
-                    from google import genai as genai_new
-                    from google.genai import types as genai_types
-                    
-                    project = os.environ.get("GOOGLE_CLOUD_PROJECT")
-                    client = genai_new.Client(
-                        vertexai=True,
-                        project=project,
-                        location='global',
-                    )
-                    
-                    # Build content parts for vision
-                    content_parts = [prompt]
-                    for img_part in image_parts:
-                        content_parts.append(genai_types.Part.from_bytes(
-                            data=base64.b64decode(img_part['data']),
-                            mime_type=img_part['mime_type']
-                        ))
-                    
-                    # Config with thinking disabled
-                    config = genai_types.GenerateContentConfig(
-                        temperature=0.1,
-                        response_mime_type="application/json",
-                        thinking_config=genai_types.ThinkingConfig(thinking_budget=0),
-                    )
-                    
-                    response = client.models.generate_content(
-                        model=model_name if 'preview' in model_name else f"{model_name}-preview",
-                        contents=content_parts,
-                        config=config,
-                    )
-                    # Track token usage
-                    if hasattr(response, 'usage_metadata') and response.usage_metadata:
-                        input_tokens = getattr(response.usage_metadata, 'prompt_token_count', 0) or 0
-                        output_tokens = getattr(response.usage_metadata, 'candidates_token_count', 0) or 0
-                        usage_tracker.add_usage(input_tokens, output_tokens)
-                    return {'response': response.text or ""}
-                    
-                except ImportError:
-                    logger.warning("google-genai SDK not available, falling back to AI Studio")
-                    is_gemini3 = False  # Fall through to AI Studio path
-            
-            # Standard AI Studio path for non-Gemini-3 models
-            import google.generativeai as genai
-            
-            api_key = os.environ.get("GOOGLE_API_KEY")
-            if not api_key:
-                raise ValueError("GOOGLE_API_KEY not set")
-            
-            genai.configure(api_key=api_key)
-            model = genai.GenerativeModel(model_name)
-            
-            content_parts = [prompt]
-            for img_part in image_parts:
-                content_parts.append({
-                    'inline_data': img_part
-                })
-            
-            response = model.generate_content(
-                content_parts,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.1,
-                    response_mime_type="application/json"
-                )
-            )
-            # Track token usage
-            if hasattr(response, 'usage_metadata') and response.usage_metadata:
-                input_tokens = getattr(response.usage_metadata, 'prompt_token_count', 0) or 0
-                output_tokens = getattr(response.usage_metadata, 'candidates_token_count', 0) or 0
-                usage_tracker.add_usage(input_tokens, output_tokens)
-            return {'response': response.text or ""}
-            
-        except Exception as e:
-            error_str = str(e).lower()
-            is_rate_limit = '429' in error_str or 'rate' in error_str or 'exhausted' in error_str or 'quota' in error_str
-            
-            if is_rate_limit and attempt < max_retries:
-                wait_time = min(initial_backoff * (2 ** attempt), 60)
-                logger.warning(f"Rate limit in validation, retrying in {wait_time}s (attempt {attempt + 1}/{max_retries + 1})")
-                time.sleep(wait_time)
-            else:
-                raise
-
-
-def _validate_with_openai(prompt: str, image_paths: List[str], model_name: str) -> dict:
-    """Run validation with OpenAI Responses API."""
-    from openai import OpenAI
-    import os
-    
-    api_key = os.environ.get("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY not set")
-    
-    client = OpenAI(api_key=api_key)
-    
-    # Build input content for Responses API - use input_text and input_image types
-    input_content = [{"type": "input_text", "text": prompt}]
-    
-    for img_path in image_paths:
-        with open(img_path, 'rb') as f:
-            data = base64.b64encode(f.read()).decode('utf-8')
-        input_content.append({
-            "type": "input_image",
-            "image_url": f"data:image/png;base64,{data}"
-        })
-    
-    # Handle reasoning models differently
-    is_reasoning = any(rm in model_name.lower() for rm in ['o1', 'o3', 'gpt-5'])
-    
-    params = {
-        "model": model_name,
-        "input": [{"role": "user", "content": input_content}],
-        "text": {"format": {"type": "json_object"}},
-        "max_output_tokens": 4096,
-    }
-    
-    if not is_reasoning:
-        params["temperature"] = 0.1
-    
-    response = client.responses.create(**params)
-    
-    # Extract content from Responses API response
-    result = ""
-    if hasattr(response, 'output_text'):
-        result = response.output_text
-    elif hasattr(response, 'output') and response.output:
-        for item in response.output:
-            if hasattr(item, 'content'):
-                for content_item in item.content:
-                    if hasattr(content_item, 'text'):
-                        result = content_item.text
-                        break
-    
-    return {'response': result}
-
-
-def _validate_with_claude(prompt: str, image_paths: List[str], model_name: str) -> dict:
-    """Run validation with Anthropic Claude API."""
-    import anthropic
-    import os
-    
-    api_key = os.environ.get("ANTHROPIC_API_KEY") or os.environ.get("CLAUDE_API_KEY")
-    if not api_key:
-        raise ValueError("ANTHROPIC_API_KEY or CLAUDE_API_KEY not set")
-    
-    client = anthropic.Anthropic(api_key=api_key)
-    
-    # Build message content with images
-    content = []
-    
-    # Add images first
-    for img_path in image_paths:
-        with open(img_path, 'rb') as f:
-            data = base64.b64encode(f.read()).decode('utf-8')
-        content.append({
-            "type": "image",
-            "source": {
-                "type": "base64",
-                "media_type": "image/png",
-                "data": data
-            }
-        })
-    
-    # Add text prompt
-    content.append({
-        "type": "text",
-        "text": prompt
-    })
-    
-    # Add JSON mode instruction to system
-    system = "You must respond with valid JSON only. No markdown code blocks, no explanation, just the JSON object."
-    
-    response = client.messages.create(
-        model=model_name,
-        max_tokens=4096,
-        system=system,
-        messages=[{"role": "user", "content": content}]
-    )
-    
-    # Extract content from response
-    result = ""
-    if response.content:
-        for block in response.content:
-            if hasattr(block, 'text'):
-                result = block.text
-                break
-    
-    return {'response': result}
-
-
 def apply_validation_fixes(
     text_ticks: List[dict],
     validation: ValidationResult,
@@ -586,3 +380,29 @@ def save_validation_result(validation: ValidationResult, output_path: str) -> No
     with open(output_path, 'w', encoding='utf-8') as f:
         json.dump(validation.to_dict(), f, indent=2, ensure_ascii=False)
     logger.info(f"Saved validation result to {output_path}")
+
+
+def load_validation_result(input_path: str) -> ValidationResult:
+    """Load a validation result saved by save_validation_result."""
+    with open(input_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    issues = [
+        ValidationIssue(
+            issue_type=IssueType(i['issue_type']),
+            activity_id=i.get('activity_id', ''),
+            activity_name=i.get('activity_name', ''),
+            timepoint_id=i.get('timepoint_id', ''),
+            timepoint_name=i.get('timepoint_name', ''),
+            confidence=i.get('confidence', 0.0),
+            details=i.get('details', ''),
+        )
+        for i in data.get('issues', [])
+    ]
+    return ValidationResult(
+        success=data.get('success', False),
+        issues=issues,
+        confirmed_ticks=data.get('confirmed_ticks', 0),
+        total_ticks_checked=data.get('total_ticks_checked', 0),
+        model_used=data.get('model_used', ''),
+        error=data.get('error'),
+    )
@@ -7,14 +7,27 @@ Supports GPT-4, GPT-5 (when available), and Gemini 2.x models.
 Usage:
     provider = LLMProviderFactory.create("openai", model="gpt-4o")
     response = provider.generate(messages, config)
+
+    # Async (native SDK async clients, many requests on one event loop)
+    response = await provider.agenerate(messages, config)
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
+from typing import Dict, List, Optional, Any, Sequence, Tuple, Union
+from dataclasses import dataclass, field, replace
+from contextlib import contextmanager
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+import asyncio
+import contextvars
+import hashlib
+import json
 import os
+import re
+import threading
 import time
 import logging
+import weakref
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -25,68 +38,244 @@ MAX_RETRIES = 3
 INITIAL_BACKOFF_SECONDS = 5
 MAX_BACKOFF_SECONDS = 60
 
+# Default per-provider budgets for the shared rate limiter. Override per
+# provider or model with configure_rate_limits(), or globally with the
+# LLM_RPM_LIMIT / LLM_TPM_LIMIT environment variables.
+DEFAULT_RATE_LIMITS = {
+    'openai': (500, 500_000),
+    'gemini': (150, 2_000_000),
+    'claude': (1000, 450_000),
+}
+
+# Cached input tokens cost roughly this fraction of the normal input rate
+# (Anthropic cache reads, Gemini context caching, OpenAI cached input)
+CACHED_INPUT_PRICE_FACTOR = 0.1
+
+# Finish reasons meaning the output token limit was hit (OpenAI chat and
+# Responses API, Claude, Gemini)
+TRUNCATED_FINISH_REASONS = frozenset({'length', 'max_output_tokens', 'max_tokens', 'MAX_TOKENS'})
+
+# Continuation requests made for a truncated JSON response by default
+# (see generate_with_continuation); override with LLM_MAX_CONTINUATIONS
+DEFAULT_MAX_CONTINUATIONS = 2
+
+CONTINUATION_PROMPT = (
+    "Your previous response was cut off at the output token limit. Continue EXACTLY from "
+    "the last character of your previous response, without repeating anything. "
+    "If you can only answer with a complete JSON document, include ONLY the items that are "
+    "not already in your previous response, using the same top-level structure."
+)
+
+# Hedged requests (see HedgedProvider): a duplicate request is sent once a
+# call has run longer than this percentile of its task's recorded latencies
+HEDGE_PERCENTILE = 0.9
+# Recorded latencies a task needs before its calls are hedged
+HEDGE_MIN_SAMPLES = 10
+# Most recent latencies kept per task
+LATENCY_WINDOW = 200
+DEFAULT_LATENCY_STATS_PATH = Path.home() / ".cache" / "protocol2usdm" / "llm_latency.json"
+
+# Pre-send token estimate: characters per token, fixed cost per image
+CHARS_PER_TOKEN = 4
+IMAGE_TOKEN_ESTIMATE = 1600
 
-def _retry_with_backoff(func, max_retries=MAX_RETRIES, initial_backoff=INITIAL_BACKOFF_SECONDS):
+# Keep-alive HTTP connection pool for SDK clients. Pooled providers are reused
+# across calls, so idle connections are kept long enough to bridge the gap
+# between successive LLM requests (the SDK default expires them after 5s).
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+HTTP_KEEPALIVE_EXPIRY_SECONDS = 60.0
+
+
+def _is_rate_limit_error(error: Exception) -> bool:
+    """Check whether an exception looks like a rate limit (429) / quota error."""
+    if getattr(error, 'status_code', None) == 429:
+        return True
+    error_str = str(error).lower()
+    return (
+        '429' in error_str
+        or any(marker in error_str for marker in ('rate limit', 'rate_limit', 'ratelimit'))
+        or 'exhausted' in error_str
+        or 'quota' in error_str
+    )
+
+
+_RETRY_DELAY_PATTERN = re.compile(r'retry(?:[ _-]?delay| in| after)["\']?\s*[:=]?\s*["\']?(\d+(?:\.\d+)?)\s*s', re.I)
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
     """
-    Retry a function with exponential backoff for rate limit (429) errors.
+    Get the server-requested wait from a rate limit error, if any.
     
-    Args:
-        func: Callable to retry
-        max_retries: Maximum number of retries
-        initial_backoff: Initial backoff in seconds (doubles each retry)
+    Reads Retry-After / retry-after-ms headers (OpenAI, Anthropic) or a
+    retryDelay in the error text (Gemini). Returns None if absent.
+    """
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if headers:
+        retry_ms = headers.get('retry-after-ms')
+        if retry_ms:
+            try:
+                return float(retry_ms) / 1000
+            except ValueError:
+                pass
+        retry_after = headers.get('retry-after')
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                from email.utils import parsedate_to_datetime
+                try:
+                    return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+                except (TypeError, ValueError):
+                    pass
+    match = _RETRY_DELAY_PATTERN.search(str(error))
+    return float(match.group(1)) if match else None
+
+
+def estimate_tokens(content: Any) -> int:
+    """
+    Rough token count of request content, before sending.
     
-    Returns:
-        Result of successful function call
-        
-    Raises:
-        Last exception if all retries exhausted
+    Text is counted at CHARS_PER_TOKEN characters per token; images (image
+    message parts, raw bytes, SDK Part objects) at IMAGE_TOKEN_ESTIMATE.
+    """
+    if content is None:
+        return 0
+    if isinstance(content, str):
+        return len(content) // CHARS_PER_TOKEN + 1
+    if isinstance(content, dict):
+        if content.get('type') in ('image', 'image_url') or 'inline_data' in content or 'mime_type' in content:
+            return IMAGE_TOKEN_ESTIMATE
+        return sum(estimate_tokens(v) for k, v in content.items() if k != 'role')
+    if isinstance(content, (list, tuple)):
+        return sum(estimate_tokens(item) for item in content)
+    if isinstance(content, (int, float, bool)):
+        return 0
+    return IMAGE_TOKEN_ESTIMATE
+
+
+def payload_bytes(content: Any) -> int:
     """
-    last_exception = None
-    backoff = initial_backoff
+    Approximate request size in bytes: UTF-8 text plus image data.
     
-    for attempt in range(max_retries + 1):
-        try:
-            return func()
-        except Exception as e:
-            error_str = str(e).lower()
-            # Check for rate limit errors (429) or resource exhausted
-            is_rate_limit = '429' in error_str or 'rate' in error_str or 'exhausted' in error_str or 'quota' in error_str
-            
-            if is_rate_limit and attempt < max_retries:
-                wait_time = min(backoff, MAX_BACKOFF_SECONDS)
-                _logger.warning(f"Rate limit hit, retrying in {wait_time}s (attempt {attempt + 1}/{max_retries + 1}): {e}")
-                time.sleep(wait_time)
-                backoff *= 2  # Exponential backoff
-                last_exception = e
-            else:
-                # Not a rate limit error or out of retries
-                raise e
+    Base64 image strings count at their encoded size, raw bytes and SDK
+    Part objects at their data size.
+    """
+    if content is None or isinstance(content, (int, float, bool)):
+        return 0
+    if isinstance(content, str):
+        return len(content.encode("utf-8"))
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        return len(content)
+    if isinstance(content, dict):
+        return sum(payload_bytes(v) for v in content.values())
+    if isinstance(content, (list, tuple)):
+        return sum(payload_bytes(item) for item in content)
+    data = getattr(getattr(content, "inline_data", None), "data", None)
+    if data is None:
+        data = getattr(content, "data", None)
+    return len(data) if isinstance(data, (bytes, bytearray, str)) else 0
+
+
+def split_cached_prefix(messages: List[Dict[str, Any]]) -> tuple:
+    """
+    Split messages into the cacheable prefix and the rest.
     
-    # Should not reach here, but just in case
-    if last_exception:
-        raise last_exception
+    The prefix is the leading run of messages marked {"cache": True}: stable
+    content (protocol text) shared by many calls, placed before the task
+    instructions so providers can reuse it from their prompt cache.
+    
+    Returns:
+        (prefix_messages, remaining_messages)
+    """
+    split = 0
+    while split < len(messages) and messages[split].get('cache'):
+        split += 1
+    return messages[:split], messages[split:]
+
+
+def _prefix_digest(prefix_messages: List[Dict[str, Any]]) -> str:
+    """Stable digest of a cacheable prefix (used as cache key / routing hint)."""
+    payload = repr([(m.get('role'), m.get('content')) for m in prefix_messages])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+def _usage_int(obj: Any, *path: str) -> int:
+    """Read a nested integer usage field, returning 0 when absent."""
+    for name in path:
+        obj = getattr(obj, name, None)
+        if obj is None:
+            return 0
+    return obj if isinstance(obj, int) else 0
+
 
 # Load .env file from project root
 _env_path = Path(__file__).parent / ".env"
 if _env_path.exists():
     load_dotenv(_env_path)
 
-from openai import OpenAI
-import google.generativeai as genai
-from google.generativeai.types import HarmCategory, HarmBlockThreshold
-import anthropic
+# Provider SDKs are heavyweight (seconds to import all of them), so each is
+# imported only when a provider that needs it is built. The names below are
+# bound in this module on first use; accessing them as module attributes
+# (llm_providers.OpenAI, llm_providers.genai, ...) also triggers the import.
+_SDK_NAMES = {
+    'openai': ('openai', 'OpenAI', 'AsyncOpenAI'),
+    'google.generativeai': ('genai', 'HarmCategory', 'HarmBlockThreshold'),
+    'google.genai': ('genai_new', 'genai_types', 'HAS_GENAI_SDK'),
+    'anthropic': ('anthropic',),
+}
+_SDK_FOR_NAME = {name: sdk for sdk, names in _SDK_NAMES.items() for name in names}
+_sdk_lock = threading.Lock()
+
+
+def _import_sdk(sdk: str) -> Dict[str, Any]:
+    """Import a provider SDK and return the module-level names it binds."""
+    if sdk == 'openai':
+        import openai
+        return {'openai': openai, 'OpenAI': openai.OpenAI, 'AsyncOpenAI': openai.AsyncOpenAI}
+    if sdk == 'google.generativeai':
+        import google.generativeai as genai
+        from google.generativeai.types import HarmCategory, HarmBlockThreshold
+        return {'genai': genai, 'HarmCategory': HarmCategory, 'HarmBlockThreshold': HarmBlockThreshold}
+    if sdk == 'google.genai':
+        # For Gemini 3 models via Vertex AI (requires global endpoint)
+        try:
+            from google import genai as genai_new
+            from google.genai import types as genai_types
+        except ImportError:
+            return {'genai_new': None, 'genai_types': None, 'HAS_GENAI_SDK': False}
+        # Suppress verbose SDK logging (project/location precedence, AFC enabled messages)
+        logging.getLogger("google.genai").setLevel(logging.WARNING)
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        return {'genai_new': genai_new, 'genai_types': genai_types, 'HAS_GENAI_SDK': True}
+    if sdk == 'anthropic':
+        import anthropic
+        return {'anthropic': anthropic}
+    raise ValueError(f"Unknown provider SDK: {sdk}")
+
+
+def _load_sdk(sdk: str) -> None:
+    """
+    Import a provider SDK on first use and bind its names in this module.
+    
+    Names that are already bound (e.g. patched in tests) are left as they are.
+    """
+    module_globals = globals()
+    if all(name in module_globals for name in _SDK_NAMES[sdk]):
+        return
+    with _sdk_lock:
+        for name, value in _import_sdk(sdk).items():
+            module_globals.setdefault(name, value)
 
-# For Gemini 3 models via Vertex AI (requires global endpoint)
-try:
-    from google import genai as genai_new
-    from google.genai import types as genai_types
-    HAS_GENAI_SDK = True
-    # Suppress verbose SDK logging (project/location precedence, AFC enabled messages)
-    import logging
-    logging.getLogger("google.genai").setLevel(logging.WARNING)
-    logging.getLogger("httpx").setLevel(logging.WARNING)
-except ImportError:
-    HAS_GENAI_SDK = False
+
+def __getattr__(name: str) -> Any:
+    """Resolve provider SDK names on first attribute access (PEP 562)."""
+    sdk = _SDK_FOR_NAME.get(name)
+    if sdk is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    _load_sdk(sdk)
+    return globals()[name]
 
 
 @dataclass
@@ -98,14 +287,57 @@ class LLMConfig:
     stop_sequences: Optional[List[str]] = None
     top_p: Optional[float] = None
     top_k: Optional[int] = None
+    # Early validation of JSON output (see core.json_stream): expected
+    # top-level type ("object"/"array") and top-level keys that mean the
+    # model answered in the wrong shape. Setting either streams the response
+    # and aborts it with JSONShapeError as soon as the shape is wrong.
+    json_root: Optional[str] = None
+    json_forbidden_keys: Optional[List[str]] = None
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary, excluding None values."""
         return {k: v for k, v in self.__dict__.items() if v is not None}
+    
+    @property
+    def validates_json_shape(self) -> bool:
+        """True if the streamed JSON output is checked against an expected shape."""
+        return bool(self.json_mode and (self.json_root or self.json_forbidden_keys))
+
+
+def _json_stream_parser(config: LLMConfig):
+    """Incremental parser checking streamed output against config's JSON shape."""
+    from core.json_stream import StreamingJSONParser
+    if not config.validates_json_shape:
+        return StreamingJSONParser()
+    return StreamingJSONParser(root=config.json_root, forbidden_keys=config.json_forbidden_keys or ())
+
+
+def _warn_if_truncated_json(parser, provider: str, finish_reason: Any) -> None:
+    """Log a JSON response that ended with unclosed containers."""
+    if parser.truncated:
+        _logger.warning(
+            f"{provider} response ended inside unclosed JSON "
+            f"({parser.depth} open containers after {len(parser.text):,} chars, finish reason: {finish_reason})"
+        )
+
+
+def _is_json_shape_error(error: Exception) -> bool:
+    """True for an early JSON shape rejection, which callers handle unwrapped."""
+    from core.json_stream import JSONShapeError
+    return isinstance(error, JSONShapeError)
+
+
+def _http_limits() -> "httpx.Limits":
+    """Connection limits for keep-alive SDK HTTP clients."""
+    import httpx
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    )
 
 
 # Global token usage tracker
-import threading
 
 class TokenUsageTracker:
     """
@@ -125,8 +357,10 @@ class TokenUsageTracker:
         with self._lock:
             self.total_input_tokens = 0
             self.total_output_tokens = 0
+            self.total_cached_input_tokens = 0
             self.call_count = 0
             self.calls_by_phase = {}
+            self.compactions = []
         self._thread_local.current_phase = "unknown"
     
     @property
@@ -138,14 +372,15 @@ class TokenUsageTracker:
         """Set the current extraction phase for tracking (thread-local)."""
         self._thread_local.current_phase = phase
     
-    def add_usage(self, input_tokens: int, output_tokens: int, phase: str = None):
+    def add_usage(self, input_tokens: int, output_tokens: int, phase: str = None, cached_input_tokens: int = 0):
         """
         Add usage from an LLM call.
         
         Args:
-            input_tokens: Number of input tokens
+            input_tokens: Number of input tokens (including cached)
             output_tokens: Number of output tokens  
             phase: Optional explicit phase name. If None, uses thread-local current_phase.
+            cached_input_tokens: Input tokens served from the provider's prompt cache
         """
         # Use explicit phase if provided, otherwise thread-local
         phase_name = phase if phase is not None else self.current_phase
@@ -153,24 +388,70 @@ class TokenUsageTracker:
         with self._lock:
             self.total_input_tokens += input_tokens
             self.total_output_tokens += output_tokens
+            self.total_cached_input_tokens += cached_input_tokens
             self.call_count += 1
             
             if phase_name not in self.calls_by_phase:
-                self.calls_by_phase[phase_name] = {"input": 0, "output": 0, "calls": 0}
+                self.calls_by_phase[phase_name] = {"input": 0, "cached_input": 0, "output": 0, "calls": 0}
             self.calls_by_phase[phase_name]["input"] += input_tokens
+            self.calls_by_phase[phase_name]["cached_input"] += cached_input_tokens
             self.calls_by_phase[phase_name]["output"] += output_tokens
             self.calls_by_phase[phase_name]["calls"] += 1
     
+    def add_compaction(
+        self,
+        model: str,
+        tokens_before: int,
+        tokens_after: int,
+        task: Optional[str] = None,
+        truncated: bool = False,
+        phase: str = None,
+    ):
+        """
+        Record the input tokens saved by prompt compaction for one call.
+        
+        Args:
+            model: Model the call was sent to
+            tokens_before: Input tokens before compaction
+            tokens_after: Input tokens sent
+            task: Extractor name, if known
+            truncated: Whether the input token budget cut the prompt
+            phase: Optional explicit phase name. If None, uses thread-local current_phase.
+        """
+        entry = {
+            "phase": phase if phase is not None else self.current_phase,
+            "task": task,
+            "model": model,
+            "tokens_before": tokens_before,
+            "tokens_after": tokens_after,
+            "tokens_saved": tokens_before - tokens_after,
+            "truncated": truncated,
+        }
+        with self._lock:
+            self.compactions.append(entry)
+    
     def get_summary(self) -> Dict[str, Any]:
         """Get usage summary (thread-safe)."""
         with self._lock:
-            return {
+            summary = {
                 "total_input_tokens": self.total_input_tokens,
+                "total_cached_input_tokens": self.total_cached_input_tokens,
+                "total_uncached_input_tokens": self.total_input_tokens - self.total_cached_input_tokens,
                 "total_output_tokens": self.total_output_tokens,
                 "total_tokens": self.total_input_tokens + self.total_output_tokens,
                 "call_count": self.call_count,
                 "by_phase": dict(self.calls_by_phase),  # Copy to avoid mutation
             }
+            if self.compactions:
+                summary["prompt_compaction"] = {
+                    "calls": len(self.compactions),
+                    "tokens_before": sum(c["tokens_before"] for c in self.compactions),
+                    "tokens_after": sum(c["tokens_after"] for c in self.compactions),
+                    "tokens_saved": sum(c["tokens_saved"] for c in self.compactions),
+                    "truncated_calls": sum(1 for c in self.compactions if c["truncated"]),
+                    "by_call": list(self.compactions),
+                }
+            return summary
     
     def print_summary(self, model: str = "claude-opus-4-5"):
         """Print a formatted summary with cost estimates (thread-safe)."""
@@ -196,11 +477,14 @@ class TokenUsageTracker:
         # Get thread-safe snapshot of data
         with self._lock:
             total_input = self.total_input_tokens
+            total_cached = self.total_cached_input_tokens
             total_output = self.total_output_tokens
             call_count = self.call_count
             phases = dict(self.calls_by_phase)
         
-        input_cost = (total_input / 1_000_000) * input_rate
+        # Cached input tokens are billed at a fraction of the input rate
+        cached_rate = input_rate * CACHED_INPUT_PRICE_FACTOR
+        input_cost = ((total_input - total_cached) / 1_000_000) * input_rate + (total_cached / 1_000_000) * cached_rate
         output_cost = (total_output / 1_000_000) * output_rate
         total_cost = input_cost + output_cost
         
@@ -213,11 +497,14 @@ class TokenUsageTracker:
         print("By Phase:")
         print("-" * 70)
         for phase, data in phases.items():
-            phase_cost = (data['input']/1e6 * input_rate) + (data['output']/1e6 * output_rate)
+            cached = data.get('cached_input', 0)
+            phase_cost = ((data['input'] - cached)/1e6 * input_rate) + (cached/1e6 * cached_rate) + (data['output']/1e6 * output_rate)
             print(f"  {phase:40} {data['input']:>8,} in / {data['output']:>7,} out  ${phase_cost:.2f}")
         print("-" * 70)
         print()
         print(f"Total Input Tokens:  {total_input:>12,}")
+        if total_cached:
+            print(f"  Cached (prompt cache): {total_cached:>10,}  ({total_cached / total_input:.0%} of input)")
         print(f"Total Output Tokens: {total_output:>12,}")
         print(f"Total Tokens:        {total_input + total_output:>12,}")
         print()
@@ -231,6 +518,370 @@ class TokenUsageTracker:
 usage_tracker = TokenUsageTracker()
 
 
+# Per-call latency and throughput telemetry
+# Current extractor (set by core.llm_client) and the call being sent, per thread / asyncio task
+_call_extractor: contextvars.ContextVar = contextvars.ContextVar("llm_call_extractor", default=None)
+_current_call: contextvars.ContextVar = contextvars.ContextVar("llm_current_call", default=None)
+
+# Metrics summarized with p50/p95/max in llm_metrics.json
+CALL_METRICS = ("queue_wait_seconds", "time_to_first_token_seconds", "latency_seconds", "bytes_sent")
+SLOWEST_CALLS_REPORTED = 10
+
+
+@contextmanager
+def call_extractor(extractor_name: Optional[str]):
+    """Attribute provider calls made inside the block to an extractor (for call_metrics)."""
+    token = _call_extractor.set(extractor_name)
+    try:
+        yield
+    finally:
+        _call_extractor.reset(token)
+
+
+@dataclass
+class CallRecord:
+    """Telemetry of one provider call, including its rate limit retries."""
+    provider: str
+    model: str
+    phase: str
+    extractor: Optional[str]
+    bytes_sent: int
+    estimated_tokens: int
+    started: float = field(default_factory=time.monotonic)
+    sent: Optional[float] = None
+    first_token: Optional[float] = None
+    queue_wait_seconds: float = 0.0
+    latency_seconds: Optional[float] = None
+    retries: int = 0
+    finish_reason: Optional[str] = None
+    error: Optional[str] = None
+    
+    @property
+    def time_to_first_token_seconds(self) -> Optional[float]:
+        """Seconds from sending the (last) request to its first streamed text, if streamed."""
+        if self.first_token is None or self.sent is None:
+            return None
+        return self.first_token - self.sent
+    
+    def mark_first_token(self) -> None:
+        if self.first_token is None:
+            self.first_token = time.monotonic()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        ttft = self.time_to_first_token_seconds
+        return {
+            "provider": self.provider,
+            "model": self.model,
+            "phase": self.phase,
+            "extractor": self.extractor,
+            "queue_wait_seconds": round(self.queue_wait_seconds, 3),
+            "time_to_first_token_seconds": round(ttft, 3) if ttft is not None else None,
+            "latency_seconds": round(self.latency_seconds, 3) if self.latency_seconds is not None else None,
+            "retries": self.retries,
+            "bytes_sent": self.bytes_sent,
+            "estimated_tokens": self.estimated_tokens,
+            "finish_reason": self.finish_reason,
+            "error": self.error,
+        }
+
+
+def _metric_summary(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Counts, totals and p50/p95/max of CALL_METRICS over call records."""
+    summary: Dict[str, Any] = {
+        "calls": len(records),
+        "errors": sum(1 for r in records if r["error"]),
+        "retries": sum(r["retries"] for r in records),
+        "finish_reasons": {},
+    }
+    for record in records:
+        reason = record["finish_reason"] or ("error" if record["error"] else "unknown")
+        summary["finish_reasons"][reason] = summary["finish_reasons"].get(reason, 0) + 1
+    for metric in CALL_METRICS:
+        values = sorted(r[metric] for r in records if r[metric] is not None)
+        if not values:
+            summary[metric] = None
+            continue
+        summary[metric] = {
+            "p50": values[len(values) // 2],
+            "p95": values[min(len(values) - 1, int(0.95 * len(values)))],
+            "max": values[-1],
+            "total": round(sum(values), 3),
+        }
+    return summary
+
+
+class CallMetrics:
+    """
+    Per-call telemetry of every provider request (thread-safe).
+    
+    LLMProvider._send()/_asend() record queue wait at the shared rate
+    limiter, time to first streamed token, total latency, rate limit
+    retries, request bytes (images included) and finish reason. main_v3.py
+    writes the summary by phase and by extractor to llm_metrics.json.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records: List[CallRecord] = []
+    
+    def start(self, provider: str, model: str, content: Any) -> CallRecord:
+        """Begin the record of a call about to be sent."""
+        return CallRecord(
+            provider=provider,
+            model=model,
+            phase=usage_tracker.current_phase,
+            extractor=_call_extractor.get(),
+            bytes_sent=payload_bytes(content),
+            estimated_tokens=estimate_tokens(content),
+        )
+    
+    def finish(self, record: CallRecord, response: Optional["LLMResponse"] = None, error: Optional[Exception] = None) -> None:
+        """Complete a call record and store it."""
+        record.latency_seconds = time.monotonic() - record.started
+        if response is not None:
+            record.finish_reason = response.finish_reason
+        if error is not None:
+            record.error = type(error).__name__
+        with self._lock:
+            self._records.append(record)
+    
+    def get_summary(self) -> Dict[str, Any]:
+        """Overall, per-phase and per-extractor statistics, plus the slowest calls."""
+        with self._lock:
+            records = [r.to_dict() for r in self._records]
+        by_phase: Dict[str, List[Dict[str, Any]]] = {}
+        by_extractor: Dict[str, List[Dict[str, Any]]] = {}
+        for record in records:
+            by_phase.setdefault(record["phase"], []).append(record)
+            by_extractor.setdefault(record["extractor"] or "unattributed", []).append(record)
+        slowest = sorted(records, key=lambda r: r["latency_seconds"] or 0.0, reverse=True)
+        return {
+            "overall": _metric_summary(records),
+            "by_phase": {phase: _metric_summary(rs) for phase, rs in sorted(by_phase.items())},
+            "by_extractor": {name: _metric_summary(rs) for name, rs in sorted(by_extractor.items())},
+            "slowest_calls": slowest[:SLOWEST_CALLS_REPORTED],
+        }
+    
+    def save(self, path: Path) -> None:
+        """Write the summary (see get_summary) as JSON."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.get_summary(), f, indent=2)
+    
+    @property
+    def call_count(self) -> int:
+        with self._lock:
+            return len(self._records)
+    
+    def reset(self) -> None:
+        """Drop all records."""
+        with self._lock:
+            self._records.clear()
+
+
+# Global call metrics instance
+call_metrics = CallMetrics()
+
+
+def _feed_stream(parser, text: str) -> None:
+    """Feed streamed response text to parser, timing the current call's first token."""
+    if text:
+        record = _current_call.get()
+        if record is not None:
+            record.mark_first_token()
+    parser.feed(text)
+
+
+class _TokenBucket:
+    """
+    Token bucket refilled continuously at per_minute / 60 per second.
+    
+    Reservations are debited immediately and may drive the level negative;
+    the caller waits until the debt is repaid. Because every reservation
+    queues behind earlier ones, callers are served in arrival order.
+    """
+    
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+    
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+            self.updated = now
+    
+    def reserve(self, amount: float, now: float) -> float:
+        """Debit amount and return the seconds to wait before using it."""
+        self._refill(now)
+        self.level -= amount
+        return 0.0 if self.level >= 0 else -self.level / self.rate
+    
+    def adjust(self, delta: float, now: float) -> None:
+        """Debit (positive) or refund (negative) a correction."""
+        self._refill(now)
+        self.level = min(self.capacity, self.level - delta)
+
+
+@dataclass
+class RateLimitTicket:
+    """A granted reservation, settled against actual usage after the call."""
+    key: tuple
+    estimated_tokens: int
+    wait_seconds: float
+
+
+class RateLimiter:
+    """
+    Process-wide requests-per-minute / tokens-per-minute limiter.
+    
+    One pair of token buckets is kept per (provider, model). Every provider
+    request reserves one request and its estimated tokens before it is sent;
+    the estimate is corrected from LLMResponse.usage afterwards. A rate limit
+    error pauses the whole key for the server's Retry-After, so parallel
+    phases wait together instead of each backing off and retrying at once.
+    
+    Thread-safe; reservations are computed under a lock and the caller sleeps
+    outside it (time.sleep or asyncio.sleep), so sync and async callers share
+    the same queue.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: Dict[tuple, tuple] = {}
+        self._paused_until: Dict[tuple, float] = {}
+        self._overrides: Dict[str, tuple] = {}
+        self.reset_stats()
+    
+    def configure(
+        self,
+        target: Optional[str] = None,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+    ) -> None:
+        """
+        Override budgets.
+        
+        Args:
+            target: Provider name ('openai', 'gemini', 'claude'), model name,
+                or None for every provider
+            requests_per_minute: RPM budget (None keeps the default)
+            tokens_per_minute: TPM budget (None keeps the default)
+        """
+        with self._lock:
+            self._overrides[target or '*'] = (requests_per_minute, tokens_per_minute)
+            self._buckets.clear()
+    
+    def limits_for(self, provider: str, model: str) -> tuple:
+        """Resolve (rpm, tpm) for a provider/model: model > provider > global > env > default."""
+        rpm, tpm = DEFAULT_RATE_LIMITS.get(provider, (None, None))
+        env_rpm = os.environ.get('LLM_RPM_LIMIT')
+        env_tpm = os.environ.get('LLM_TPM_LIMIT')
+        rpm = float(env_rpm) if env_rpm else rpm
+        tpm = float(env_tpm) if env_tpm else tpm
+        for target in ('*', provider, model):
+            override_rpm, override_tpm = self._overrides.get(target, (None, None))
+            rpm = override_rpm if override_rpm is not None else rpm
+            tpm = override_tpm if override_tpm is not None else tpm
+        return rpm, tpm
+    
+    def _get_buckets(self, key: tuple) -> tuple:
+        buckets = self._buckets.get(key)
+        if buckets is None:
+            rpm, tpm = self.limits_for(*key)
+            buckets = (_TokenBucket(rpm) if rpm else None, _TokenBucket(tpm) if tpm else None)
+            self._buckets[key] = buckets
+        return buckets
+    
+    def reserve(self, provider: str, model: str, estimated_tokens: int = 0) -> RateLimitTicket:
+        """
+        Reserve capacity for one request without waiting.
+        
+        Returns:
+            Ticket whose wait_seconds the caller must sleep before sending
+        """
+        key = (provider, model)
+        now = time.monotonic()
+        with self._lock:
+            requests, tokens = self._get_buckets(key)
+            wait = max(0.0, self._paused_until.get(key, 0.0) - now)
+            if requests is not None:
+                wait = max(wait, requests.reserve(1, now))
+            if tokens is not None:
+                wait = max(wait, tokens.reserve(estimated_tokens, now))
+            self._stats['requests'] += 1
+            if wait > 0:
+                self._stats['throttled'] += 1
+                self._stats['wait_seconds'] += wait
+        return RateLimitTicket(key=key, estimated_tokens=estimated_tokens, wait_seconds=wait)
+    
+    def acquire(self, provider: str, model: str, estimated_tokens: int = 0) -> RateLimitTicket:
+        """Reserve capacity and sleep until it is available."""
+        ticket = self.reserve(provider, model, estimated_tokens)
+        if ticket.wait_seconds > 0:
+            _logger.debug(f"Rate limiter: waiting {ticket.wait_seconds:.1f}s for {provider}/{model}")
+            time.sleep(ticket.wait_seconds)
+        return ticket
+    
+    async def aacquire(self, provider: str, model: str, estimated_tokens: int = 0) -> RateLimitTicket:
+        """Async version of acquire()."""
+        ticket = self.reserve(provider, model, estimated_tokens)
+        if ticket.wait_seconds > 0:
+            _logger.debug(f"Rate limiter: waiting {ticket.wait_seconds:.1f}s for {provider}/{model}")
+            await asyncio.sleep(ticket.wait_seconds)
+        return ticket
+    
+    def settle(self, ticket: RateLimitTicket, actual_tokens: Optional[int]) -> None:
+        """Correct a reservation's token estimate with the reported usage."""
+        if not isinstance(actual_tokens, (int, float)) or actual_tokens <= 0:
+            return
+        with self._lock:
+            _, tokens = self._get_buckets(ticket.key)
+            if tokens is not None:
+                tokens.adjust(actual_tokens - ticket.estimated_tokens, time.monotonic())
+    
+    def release(self, ticket: RateLimitTicket) -> None:
+        """Refund a reservation's estimated tokens (the request failed or was rejected)."""
+        if ticket.estimated_tokens <= 0:
+            return
+        with self._lock:
+            _, tokens = self._get_buckets(ticket.key)
+            if tokens is not None:
+                tokens.adjust(-ticket.estimated_tokens, time.monotonic())
+    
+    def pause(self, provider: str, model: str, seconds: float) -> None:
+        """Hold back every request for a provider/model (e.g. for Retry-After)."""
+        key = (provider, model)
+        with self._lock:
+            until = time.monotonic() + seconds
+            if until > self._paused_until.get(key, 0.0):
+                self._paused_until[key] = until
+            self._stats['rate_limited'] += 1
+    
+    def reset_stats(self) -> None:
+        """Reset counters."""
+        with self._lock:
+            self._stats = {'requests': 0, 'throttled': 0, 'wait_seconds': 0.0, 'rate_limited': 0}
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get counters: requests, throttled (had to wait), wait_seconds, rate_limited (429s seen)."""
+        with self._lock:
+            return dict(self._stats)
+
+
+# Global rate limiter instance
+rate_limiter = RateLimiter()
+
+
+def configure_rate_limits(
+    target: Optional[str] = None,
+    requests_per_minute: Optional[float] = None,
+    tokens_per_minute: Optional[float] = None,
+) -> None:
+    """Override rate limits for a provider, a model, or (target=None) all providers."""
+    rate_limiter.configure(target, requests_per_minute, tokens_per_minute)
+
+
 @dataclass
 class LLMResponse:
     """Standardized response from any LLM provider."""
@@ -239,11 +890,50 @@ class LLMResponse:
     usage: Optional[Dict[str, int]] = None
     finish_reason: Optional[str] = None
     raw_response: Optional[Any] = None
+    
+    @property
+    def truncated(self) -> bool:
+        """True if generation stopped at the output token limit."""
+        return self.finish_reason in TRUNCATED_FINISH_REASONS
+
+
+# Image input of generate_with_image(): one image, or several pages sent together
+ImageData = Union[bytes, Sequence[bytes]]
+MimeType = Union[str, Sequence[str]]
+
+
+def image_inputs(image_data: ImageData, mime_type: MimeType = "image/png") -> List[Tuple[bytes, str]]:
+    """
+    Normalize generate_with_image() arguments to (image bytes, MIME type) pairs.
+    
+    Args:
+        image_data: Raw image bytes, or a list of them
+        mime_type: MIME type of every image, or one per image
+    """
+    if isinstance(image_data, (bytes, bytearray, memoryview)):
+        images = [bytes(image_data)]
+    else:
+        images = [bytes(data) for data in image_data]
+    mime_types = [mime_type] * len(images) if isinstance(mime_type, str) else list(mime_type)
+    if len(mime_types) != len(images):
+        raise ValueError(f"Got {len(mime_types)} MIME types for {len(images)} images")
+    if not images:
+        raise ValueError("generate_with_image() needs at least one image")
+    return list(zip(images, mime_types))
 
 
 class LLMProvider(ABC):
     """Abstract base class for LLM providers."""
     
+    # Provider name used for rate limit budgets (see DEFAULT_RATE_LIMITS)
+    PROVIDER_NAME: str = ''
+    
+    # Environment variables holding the API key, in lookup order
+    API_KEY_ENV_VARS: tuple = ()
+    
+    # Provider SDKs imported when the provider is built (see _SDK_NAMES)
+    SDK_MODULES: tuple = ()
+    
     def __init__(self, model: str, api_key: Optional[str] = None):
         """
         Initialize provider.
@@ -252,8 +942,44 @@ class LLMProvider(ABC):
             model: Model identifier (e.g., "gpt-4o", "gemini-2.5-pro")
             api_key: API key (if None, reads from environment)
         """
+        for sdk in self.SDK_MODULES:
+            _load_sdk(sdk)
         self.model = model
         self.api_key = api_key or self._get_api_key_from_env()
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._async_clients_lock = threading.Lock()
+    
+    @classmethod
+    def endpoint_key(cls, model: str) -> Optional[tuple]:
+        """
+        Identify the service endpoint a provider for this model talks to.
+        
+        Providers built for the same model and key but different endpoints
+        (base URL, Vertex project/location) are pooled separately.
+        """
+        return None
+    
+    @classmethod
+    def pool_key(cls, model: str, api_key: Optional[str] = None) -> tuple:
+        """
+        Key under which ProviderPool shares an instance of this provider.
+        
+        The API key (explicit, or resolved from the environment) is stored
+        as a digest so raw keys are never kept in the registry.
+        """
+        if api_key is None:
+            api_key = next((os.environ[v] for v in cls.API_KEY_ENV_VARS if os.environ.get(v)), "")
+        key_digest = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+        return (cls.__name__, model, key_digest, cls.endpoint_key(model))
+    
+    def close(self) -> None:
+        """Close the provider's SDK client and its HTTP connections."""
+        client = getattr(self, "client", None)
+        if client is not None and hasattr(client, "close"):
+            try:
+                client.close()
+            except Exception as e:
+                _logger.debug(f"Error closing {self}: {e}")
     
     @abstractmethod
     def _get_api_key_from_env(self) -> str:
@@ -269,6 +995,9 @@ class LLMProvider(ABC):
         """
         Generate completion from messages.
         
+        Leading messages marked {"cache": True} form a cacheable prefix
+        (see split_cached_prefix), mapped to the provider's prompt caching.
+        
         Args:
             messages: List of message dicts with 'role' and 'content'
             config: Generation configuration
@@ -289,17 +1018,20 @@ class LLMProvider(ABC):
     def generate_with_image(
         self,
         prompt: str,
-        image_data: bytes,
-        mime_type: str = "image/png",
+        image_data: ImageData,
+        mime_type: MimeType = "image/png",
         config: Optional[LLMConfig] = None
     ) -> LLMResponse:
         """
-        Generate completion with an image input.
+        Generate completion with image input.
+        
+        Several images (e.g. the pages of a multi-page table) are sent in
+        order in a single request.
         
         Args:
             prompt: Text prompt
-            image_data: Raw image bytes
-            mime_type: Image MIME type (e.g., 'image/png', 'image/jpeg')
+            image_data: Raw image bytes, or a list of them
+            mime_type: Image MIME type (e.g., 'image/png', 'image/jpeg'), or one per image
             config: Generation configuration
             
         Returns:
@@ -309,6 +1041,133 @@ class LLMProvider(ABC):
             NotImplementedError: If provider doesn't support vision
         """
         raise NotImplementedError(f"{self.__class__.__name__} does not support image input")
+    
+    async def agenerate(
+        self,
+        messages: List[Dict[str, str]],
+        config: Optional[LLMConfig] = None
+    ) -> LLMResponse:
+        """
+        Async version of generate().
+        
+        Providers with a native async SDK client override this; the default
+        runs generate() in a worker thread.
+        """
+        return await asyncio.to_thread(self.generate, messages, config)
+    
+    async def agenerate_with_image(
+        self,
+        prompt: str,
+        image_data: ImageData,
+        mime_type: MimeType = "image/png",
+        config: Optional[LLMConfig] = None
+    ) -> LLMResponse:
+        """Async version of generate_with_image()."""
+        return await asyncio.to_thread(self.generate_with_image, prompt, image_data, mime_type, config)
+    
+    def _send(self, request, content: Any) -> LLMResponse:
+        """
+        Send one request through the shared rate limiter.
+        
+        Rate limit errors pause the provider/model for every caller (for the
+        server's Retry-After when given, otherwise exponential backoff) and
+        the request is retried up to MAX_RETRIES times. The call is recorded
+        in call_metrics.
+        
+        Args:
+            request: Callable performing the API call and returning LLMResponse
+            content: Request payload, for the TPM budget estimate and bytes sent
+        """
+        record = call_metrics.start(self.PROVIDER_NAME, self.model, content)
+        token = _current_call.set(record)
+        backoff = INITIAL_BACKOFF_SECONDS
+        try:
+            for attempt in range(MAX_RETRIES + 1):
+                queued = time.monotonic()
+                ticket = rate_limiter.acquire(self.PROVIDER_NAME, self.model, record.estimated_tokens)
+                record.sent = time.monotonic()
+                record.queue_wait_seconds += record.sent - queued
+                record.first_token = None
+                try:
+                    response = request()
+                except Exception as e:
+                    # A failed or rejected attempt uses no tokens; retries reserve again
+                    rate_limiter.release(ticket)
+                    if not _is_rate_limit_error(e) or attempt >= MAX_RETRIES:
+                        raise
+                    record.retries += 1
+                    wait_time = self._on_rate_limit(e, backoff, attempt)
+                    backoff *= 2
+                    time.sleep(wait_time)
+                    continue
+                rate_limiter.settle(ticket, (response.usage or {}).get('total_tokens'))
+                call_metrics.finish(record, response)
+                return response
+        except BaseException as e:
+            call_metrics.finish(record, error=e)
+            raise
+        finally:
+            _current_call.reset(token)
+    
+    async def _asend(self, request, content: Any) -> LLMResponse:
+        """Async version of _send(); request returns an awaitable."""
+        record = call_metrics.start(self.PROVIDER_NAME, self.model, content)
+        token = _current_call.set(record)
+        backoff = INITIAL_BACKOFF_SECONDS
+        try:
+            for attempt in range(MAX_RETRIES + 1):
+                queued = time.monotonic()
+                ticket = await rate_limiter.aacquire(self.PROVIDER_NAME, self.model, record.estimated_tokens)
+                record.sent = time.monotonic()
+                record.queue_wait_seconds += record.sent - queued
+                record.first_token = None
+                try:
+                    response = await request()
+                except Exception as e:
+                    # A failed or rejected attempt uses no tokens; retries reserve again
+                    rate_limiter.release(ticket)
+                    if not _is_rate_limit_error(e) or attempt >= MAX_RETRIES:
+                        raise
+                    record.retries += 1
+                    wait_time = self._on_rate_limit(e, backoff, attempt)
+                    backoff *= 2
+                    await asyncio.sleep(wait_time)
+                    continue
+                rate_limiter.settle(ticket, (response.usage or {}).get('total_tokens'))
+                call_metrics.finish(record, response)
+                return response
+        except BaseException as e:
+            call_metrics.finish(record, error=e)
+            raise
+        finally:
+            _current_call.reset(token)
+    
+    def _on_rate_limit(self, error: Exception, backoff: float, attempt: int) -> float:
+        """Pause the shared limiter after a rate limit error; returns this caller's wait."""
+        wait_time = _retry_after_seconds(error)
+        if wait_time is None:
+            wait_time = min(backoff, MAX_BACKOFF_SECONDS)
+        rate_limiter.pause(self.PROVIDER_NAME, self.model, wait_time)
+        _logger.warning(
+            f"Rate limit hit for {self.model}, pausing {wait_time:.1f}s "
+            f"(attempt {attempt + 1}/{MAX_RETRIES + 1}): {error}"
+        )
+        return wait_time
+    
+    def _loop_client(self, factory):
+        """
+        Get an async SDK client for the running event loop.
+        
+        Async HTTP clients are bound to the loop they were first used on, so
+        one client is created (via factory) per event loop.
+        """
+        loop = asyncio.get_running_loop()
+        with self._async_clients_lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                client = factory()
+                self._async_clients[loop] = client
+        return client
 
 
 class OpenAIProvider(LLMProvider):
@@ -333,9 +1192,21 @@ class OpenAIProvider(LLMProvider):
     # Models that use max_completion_tokens instead of max_tokens
     COMPLETION_TOKENS_MODELS = ['o1', 'o1-mini', 'o3', 'o3-mini', 'o3-mini-high', 'gpt-5', 'gpt-5-mini', 'gpt-5.1', 'gpt-5.1-mini', 'gpt-5.2', 'gpt-5.2-mini']
     
+    PROVIDER_NAME = 'openai'
+    API_KEY_ENV_VARS = ("OPENAI_API_KEY",)
+    SDK_MODULES = ('openai',)
+    
     def __init__(self, model: str, api_key: Optional[str] = None):
         super().__init__(model, api_key)
-        self.client = OpenAI(api_key=self.api_key)
+        self.client = OpenAI(
+            api_key=self.api_key,
+            http_client=openai.DefaultHttpxClient(limits=_http_limits()),
+        )
+    
+    @classmethod
+    def endpoint_key(cls, model: str) -> Optional[tuple]:
+        """OpenAI endpoint is set by OPENAI_BASE_URL (default: api.openai.com)."""
+        return (os.environ.get("OPENAI_BASE_URL"),)
     
     def _get_api_key_from_env(self) -> str:
         """Get OpenAI API key from environment."""
@@ -348,6 +1219,14 @@ class OpenAIProvider(LLMProvider):
         """OpenAI supports JSON mode for most chat models."""
         return True
     
+    @property
+    def async_client(self) -> "AsyncOpenAI":
+        """AsyncOpenAI client for the running event loop."""
+        return self._loop_client(lambda: AsyncOpenAI(
+            api_key=self.api_key,
+            http_client=openai.DefaultAsyncHttpxClient(limits=_http_limits()),
+        ))
+    
     def generate(
         self, 
         messages: List[Dict[str, str]], 
@@ -363,9 +1242,87 @@ class OpenAIProvider(LLMProvider):
         Returns:
             LLMResponse with content and metadata
         """
-        if config is None:
-            config = LLMConfig()
+        config = config or LLMConfig()
+        params = self._build_params(messages, config)
+        
+        def request():
+            if not config.validates_json_shape:
+                return self._parse_response(self.client.responses.create(**params))
+            
+            # Stream so a wrongly shaped JSON answer is abandoned early
+            parser = _json_stream_parser(config)
+            final = None
+            with self.client.responses.create(**params, stream=True) as stream:
+                for event in stream:
+                    final = self._handle_stream_event(event, parser) or final
+            return self._finish_stream(final, parser)
+        
+        # Make API call using Responses API
+        try:
+            return self._send(request, params["input"])
+        except Exception as e:
+            if _is_json_shape_error(e):
+                raise
+            raise RuntimeError(f"OpenAI Responses API call failed for model '{self.model}': {e}")
+    
+    async def agenerate(
+        self,
+        messages: List[Dict[str, str]],
+        config: Optional[LLMConfig] = None
+    ) -> LLMResponse:
+        """Async version of generate() using the AsyncOpenAI client."""
+        config = config or LLMConfig()
+        params = self._build_params(messages, config)
         
+        try:
+            client = self.async_client
+            
+            async def request():
+                if not config.validates_json_shape:
+                    return self._parse_response(await client.responses.create(**params))
+                
+                parser = _json_stream_parser(config)
+                final = None
+                async with await client.responses.create(**params, stream=True) as stream:
+                    async for event in stream:
+                        final = self._handle_stream_event(event, parser) or final
+                return self._finish_stream(final, parser)
+            
+            return await self._asend(request, params["input"])
+        except Exception as e:
+            if _is_json_shape_error(e):
+                raise
+            raise RuntimeError(f"OpenAI Responses API call failed for model '{self.model}': {e}")
+    
+    @staticmethod
+    def _handle_stream_event(event, parser) -> Optional[Any]:
+        """Feed a Responses API stream event to parser; return the final response, if any."""
+        event_type = getattr(event, 'type', '')
+        if event_type == 'response.output_text.delta':
+            _feed_stream(parser, event.delta)
+        elif event_type in ('response.completed', 'response.incomplete'):
+            return event.response
+        elif event_type == 'response.failed':
+            raise RuntimeError(f"Response failed: {getattr(event.response, 'error', None)}")
+        elif event_type == 'error':
+            raise RuntimeError(getattr(event, 'message', 'stream error'))
+        return None
+    
+    def _finish_stream(self, final_response, parser) -> LLMResponse:
+        """Build the LLMResponse for a streamed call."""
+        if final_response is None:
+            _warn_if_truncated_json(parser, "OpenAI", None)
+            return LLMResponse(content=parser.text, model=self.model, finish_reason=None)
+        
+        response = self._parse_response(final_response)
+        if not response.content:
+            response.content = parser.text
+        if response.finish_reason == 'completed':
+            _warn_if_truncated_json(parser, "OpenAI", response.finish_reason)
+        return response
+    
+    def _build_params(self, messages: List[Dict[str, str]], config: LLMConfig) -> Dict[str, Any]:
+        """Build Responses API parameters."""
         # Convert messages to Responses API input format
         # Responses API uses 'input' with role-based messages
         input_items = []
@@ -385,6 +1342,12 @@ class OpenAIProvider(LLMProvider):
             "input": input_items,
         }
         
+        # Prefix caching is automatic for identical leading input; the key
+        # routes requests sharing a protocol prefix to the same cache
+        prefix, _ = split_cached_prefix(messages)
+        if prefix:
+            params["prompt_cache_key"] = _prefix_digest(prefix)
+        
         # Add temperature if supported
         if self.model not in self.NO_TEMP_MODELS:
             params["temperature"] = config.temperature
@@ -397,71 +1360,110 @@ class OpenAIProvider(LLMProvider):
         if config.max_tokens:
             params["max_output_tokens"] = config.max_tokens
         
-        # Make API call using Responses API
-        try:
-            response = self.client.responses.create(**params)
-            
-            # Extract usage information
-            usage = None
-            if hasattr(response, 'usage') and response.usage:
-                usage = {
-                    "prompt_tokens": getattr(response.usage, 'input_tokens', 0),
-                    "completion_tokens": getattr(response.usage, 'output_tokens', 0),
-                    "total_tokens": getattr(response.usage, 'total_tokens', 0)
-                }
-            
-            # Extract content from response - try output_text first (simpler)
-            content = ""
-            if hasattr(response, 'output_text'):
-                content = response.output_text
-            elif hasattr(response, 'output') and response.output:
-                for item in response.output:
-                    if hasattr(item, 'content'):
-                        for content_item in item.content:
-                            if hasattr(content_item, 'text'):
-                                content = content_item.text
-                                break
-            
-            return LLMResponse(
-                content=content,
-                model=getattr(response, 'model', self.model),
-                usage=usage,
-                finish_reason=getattr(response, 'status', None),
-                raw_response=response
+        return params
+    
+    def _parse_response(self, response) -> LLMResponse:
+        """Convert a Responses API response to LLMResponse."""
+        # Extract usage information
+        usage = None
+        if hasattr(response, 'usage') and response.usage:
+            usage = {
+                "prompt_tokens": getattr(response.usage, 'input_tokens', 0),
+                "completion_tokens": getattr(response.usage, 'output_tokens', 0),
+                "total_tokens": getattr(response.usage, 'total_tokens', 0),
+                "cached_tokens": _usage_int(response.usage, 'input_tokens_details', 'cached_tokens'),
+            }
+            usage_tracker.add_usage(
+                _usage_int(response.usage, 'input_tokens'),
+                _usage_int(response.usage, 'output_tokens'),
+                cached_input_tokens=usage["cached_tokens"],
             )
         
-        except Exception as e:
-            raise RuntimeError(f"OpenAI Responses API call failed for model '{self.model}': {e}")
+        # Extract content from response - try output_text first (simpler)
+        content = ""
+        if hasattr(response, 'output_text'):
+            content = response.output_text
+        elif hasattr(response, 'output') and response.output:
+            for item in response.output:
+                if hasattr(item, 'content'):
+                    for content_item in item.content:
+                        if hasattr(content_item, 'text'):
+                            content = content_item.text
+                            break
+        
+        # An incomplete response reports why (e.g. max_output_tokens)
+        finish_reason = getattr(response, 'status', None)
+        if finish_reason == 'incomplete':
+            reason = getattr(getattr(response, 'incomplete_details', None), 'reason', None)
+            finish_reason = reason if isinstance(reason, str) else finish_reason
+        
+        return LLMResponse(
+            content=content,
+            model=getattr(response, 'model', self.model),
+            usage=usage,
+            finish_reason=finish_reason,
+            raw_response=response
+        )
     
     def generate_with_image(
         self,
         prompt: str,
-        image_data: bytes,
-        mime_type: str = "image/png",
+        image_data: ImageData,
+        mime_type: MimeType = "image/png",
         config: Optional[LLMConfig] = None
     ) -> LLMResponse:
         """Generate completion with an image using OpenAI vision models."""
-        import base64
+        params = self._build_vision_params(prompt, image_data, mime_type, config or LLMConfig())
         
-        if config is None:
-            config = LLMConfig()
+        try:
+            return self._send(
+                lambda: self._parse_vision_response(self.client.chat.completions.create(**params)),
+                params["messages"],
+            )
+        except Exception as e:
+            raise RuntimeError(f"OpenAI vision call failed for model '{self.model}': {e}")
+    
+    async def agenerate_with_image(
+        self,
+        prompt: str,
+        image_data: ImageData,
+        mime_type: MimeType = "image/png",
+        config: Optional[LLMConfig] = None
+    ) -> LLMResponse:
+        """Async version of generate_with_image() using the AsyncOpenAI client."""
+        params = self._build_vision_params(prompt, image_data, mime_type, config or LLMConfig())
         
-        base64_image = base64.b64encode(image_data).decode('utf-8')
+        try:
+            client = self.async_client
+            
+            async def request():
+                return self._parse_vision_response(await client.chat.completions.create(**params))
+            
+            return await self._asend(request, params["messages"])
+        except Exception as e:
+            raise RuntimeError(f"OpenAI vision call failed for model '{self.model}': {e}")
+    
+    def _build_vision_params(
+        self,
+        prompt: str,
+        image_data: ImageData,
+        mime_type: MimeType,
+        config: LLMConfig,
+    ) -> Dict[str, Any]:
+        """Build Chat Completions parameters for a prompt followed by one or more images."""
+        import base64
         
-        messages = [
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": prompt},
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:{mime_type};base64,{base64_image}"
-                        }
-                    }
-                ]
-            }
-        ]
+        content = [{"type": "text", "text": prompt}]
+        for data, image_mime_type in image_inputs(image_data, mime_type):
+            base64_image = base64.b64encode(data).decode('utf-8')
+            content.append({
+                "type": "image_url",
+                "image_url": {
+                    "url": f"data:{image_mime_type};base64,{base64_image}"
+                }
+            })
+        
+        messages = [{"role": "user", "content": content}]
         
         params = {
             "model": self.model,
@@ -475,31 +1477,35 @@ class OpenAIProvider(LLMProvider):
             params["response_format"] = {"type": "json_object"}
         
         if config.max_tokens:
-            params["max_tokens"] = config.max_tokens
+            if self.model in self.COMPLETION_TOKENS_MODELS:
+                params["max_completion_tokens"] = config.max_tokens
+            else:
+                params["max_tokens"] = config.max_tokens
         
-        try:
-            response = self.client.chat.completions.create(**params)
-            
-            usage = None
-            if response.usage:
-                input_tokens = response.usage.prompt_tokens or 0
-                output_tokens = response.usage.completion_tokens or 0
-                usage = {
-                    "prompt_tokens": input_tokens,
-                    "completion_tokens": output_tokens,
-                    "total_tokens": response.usage.total_tokens or 0
-                }
-                usage_tracker.add_usage(input_tokens, output_tokens)
-            
-            return LLMResponse(
-                content=response.choices[0].message.content,
-                model=response.model,
-                usage=usage,
-                finish_reason=response.choices[0].finish_reason,
-                raw_response=response
-            )
-        except Exception as e:
-            raise RuntimeError(f"OpenAI vision call failed for model '{self.model}': {e}")
+        return params
+    
+    def _parse_vision_response(self, response) -> LLMResponse:
+        """Convert a Chat Completions response to LLMResponse (tracks usage)."""
+        usage = None
+        if response.usage:
+            input_tokens = response.usage.prompt_tokens or 0
+            output_tokens = response.usage.completion_tokens or 0
+            cached_tokens = _usage_int(response.usage, 'prompt_tokens_details', 'cached_tokens')
+            usage = {
+                "prompt_tokens": input_tokens,
+                "completion_tokens": output_tokens,
+                "total_tokens": response.usage.total_tokens or 0,
+                "cached_tokens": cached_tokens,
+            }
+            usage_tracker.add_usage(input_tokens, output_tokens, cached_input_tokens=cached_tokens)
+        
+        return LLMResponse(
+            content=response.choices[0].message.content,
+            model=response.model,
+            usage=usage,
+            finish_reason=response.choices[0].finish_reason,
+            raw_response=response
+        )
 
 
 class GeminiProvider(LLMProvider):
@@ -543,13 +1549,19 @@ class GeminiProvider(LLMProvider):
     # Models that are only available via AI Studio (not Vertex AI)
     AI_STUDIO_ONLY_MODELS = []  # Empty - route all models through Vertex AI when available
     
-    # Safety settings: disable all safety filters for clinical content
-    SAFETY_SETTINGS = {
-        HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
-        HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
-        HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
-        HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-    }
+    PROVIDER_NAME = 'gemini'
+    API_KEY_ENV_VARS = ("GOOGLE_API_KEY",)
+    # google.generativeai (AI Studio) is only imported when AI Studio is used
+    SDK_MODULES = ('google.genai',)
+    
+    # Cacheable prefixes at least this large (estimated tokens) are stored as
+    # explicit cached contents; smaller ones rely on implicit prefix caching
+    MIN_CACHED_PREFIX_TOKENS = 4096
+    CACHED_PREFIX_TTL_SECONDS = 600
+    
+    # (backend, model, prefix digest) -> (cached content handle or None, expiry)
+    _prefix_caches: Dict[tuple, tuple] = {}
+    _prefix_caches_lock = threading.Lock()
     
     def __init__(self, model: str, api_key: Optional[str] = None):
         super().__init__(model, api_key)
@@ -557,10 +1569,9 @@ class GeminiProvider(LLMProvider):
         # Check for Vertex AI configuration
         has_vertex_config = bool(os.environ.get("GOOGLE_CLOUD_PROJECT"))
         is_ai_studio_only = model in self.AI_STUDIO_ONLY_MODELS
-        is_gemini3 = model in self.GLOBAL_ENDPOINT_MODELS
         
         self.use_vertex = has_vertex_config and not is_ai_studio_only
-        self.use_genai_sdk = is_gemini3 and HAS_GENAI_SDK and self.use_vertex
+        self.use_genai_sdk = self.uses_genai_sdk(model, has_vertex_config)
         
         if self.use_genai_sdk:
             # Gemini 3 models use google-genai SDK with Vertex AI backend
@@ -583,8 +1594,22 @@ class GeminiProvider(LLMProvider):
             vertexai.init(project=project, location=location)
         else:
             # Configure for Google AI Studio
+            _load_sdk('google.generativeai')
             genai.configure(api_key=self.api_key)
     
+    @classmethod
+    def endpoint_key(cls, model: str) -> Optional[tuple]:
+        """Vertex AI project/location, or AI Studio, mirroring __init__ routing."""
+        project = os.environ.get("GOOGLE_CLOUD_PROJECT")
+        if not project or model in cls.AI_STUDIO_ONLY_MODELS:
+            return ("ai-studio",)
+        if model in cls.GLOBAL_ENDPOINT_MODELS:
+            _load_sdk('google.genai')
+        if model in cls.GLOBAL_ENDPOINT_MODELS and HAS_GENAI_SDK:
+            return ("vertex", project, "global")
+        location = os.environ.get("GOOGLE_CLOUD_LOCATION", "us-central1")
+        return ("vertex", project, "us-central1" if location == "global" else location)
+    
     def _get_api_key_from_env(self) -> str:
         """Get Google API key from environment."""
         # Always need API key for AI Studio (including Gemini 3 models)
@@ -612,10 +1637,119 @@ class GeminiProvider(LLMProvider):
         Returns:
             LLMResponse with content and metadata
         """
-        if config is None:
-            config = LLMConfig()
+        config = config or LLMConfig()
+        gen_config_dict = self._build_gen_config_dict(config)
+        # Stream through an incremental JSON parser when the shape is validated
+        parser = _json_stream_parser(config) if config.validates_json_shape else None
+        
+        # Convert messages to Gemini format (cacheable prefix first)
+        prefix, rest = split_cached_prefix(messages)
+        cached_content = self._get_cached_prefix(prefix) if prefix else None
+        if cached_content is not None:
+            return self._generate_content(
+                self._format_messages_for_gemini(rest), gen_config_dict,
+                cached_content=cached_content, parser=parser,
+            )
+        
+        full_prompt = self._format_messages_for_gemini(messages)
+        return self._generate_content(full_prompt, gen_config_dict, parser=parser)
+    
+    async def agenerate(
+        self,
+        messages: List[Dict[str, str]],
+        config: Optional[LLMConfig] = None
+    ) -> LLMResponse:
+        """Async version of generate() using the SDKs' async generate_content."""
+        config = config or LLMConfig()
+        gen_config_dict = self._build_gen_config_dict(config)
+        parser = _json_stream_parser(config) if config.validates_json_shape else None
+        prefix, rest = split_cached_prefix(messages)
+        cached_content = await asyncio.to_thread(self._get_cached_prefix, prefix) if prefix else None
+        if cached_content is not None:
+            return await self._agenerate_content(
+                self._format_messages_for_gemini(rest), gen_config_dict,
+                cached_content=cached_content, parser=parser,
+            )
+        
+        full_prompt = self._format_messages_for_gemini(messages)
+        return await self._agenerate_content(full_prompt, gen_config_dict, parser=parser)
+    
+    def generate_with_image(
+        self,
+        prompt: str,
+        image_data: ImageData,
+        mime_type: MimeType = "image/png",
+        config: Optional[LLMConfig] = None
+    ) -> LLMResponse:
+        """Generate completion with an image using Gemini vision."""
+        gen_config_dict = self._build_gen_config_dict(config or LLMConfig())
+        contents = self._image_contents(prompt, image_data, mime_type)
+        return self._generate_content(contents, gen_config_dict, vision=True)
+    
+    async def agenerate_with_image(
+        self,
+        prompt: str,
+        image_data: ImageData,
+        mime_type: MimeType = "image/png",
+        config: Optional[LLMConfig] = None
+    ) -> LLMResponse:
+        """Async version of generate_with_image()."""
+        gen_config_dict = self._build_gen_config_dict(config or LLMConfig())
+        contents = self._image_contents(prompt, image_data, mime_type)
+        return await self._agenerate_content(contents, gen_config_dict, vision=True)
+    
+    def _get_cached_prefix(self, prefix: List[Dict[str, Any]]):
+        """
+        Get (or create) an explicit cached content for a message prefix.
+        
+        Returns None when the prefix is too small or caching is unavailable;
+        the prefix is then sent inline, first, where implicit caching applies.
+        """
+        prefix_text = self._format_messages_for_gemini(prefix)
+        if estimate_tokens(prefix_text) < self.MIN_CACHED_PREFIX_TOKENS:
+            return None
+        
+        key = (self._backend_label(False), self.model, _prefix_digest(prefix))
+        now = time.time()
+        with self._prefix_caches_lock:
+            entry = self._prefix_caches.get(key)
+            # Leave a margin so a cache does not expire mid-request
+            if entry is not None and entry[1] > now + 60:
+                return entry[0]
+            
+            try:
+                handle = self._create_cached_content(prefix_text)
+                _logger.debug(f"Created Gemini cached content for {self.model} ({key[2][:12]})")
+            except Exception as e:
+                # Unsupported model/backend or quota: fall back to implicit caching
+                _logger.info(f"Gemini context caching unavailable for {self.model}, sending prefix inline: {e}")
+                handle = None
+            self._prefix_caches[key] = (handle, now + self.CACHED_PREFIX_TTL_SECONDS)
+            return handle
+    
+    def _create_cached_content(self, prefix_text: str):
+        """Create a cached content holding prefix_text on the active backend."""
+        from datetime import timedelta
+        
+        ttl = timedelta(seconds=self.CACHED_PREFIX_TTL_SECONDS)
+        model_id = self.VERTEX_MODEL_ALIASES.get(self.model, self.model)
         
-        # Build generation config
+        if self.use_genai_sdk:
+            cached = self._genai_client.caches.create(
+                model=model_id,
+                config=genai_types.CreateCachedContentConfig(
+                    contents=[prefix_text],
+                    ttl=f"{self.CACHED_PREFIX_TTL_SECONDS}s",
+                ),
+            )
+            return cached.name
+        if self.use_vertex:
+            from vertexai.preview import caching
+            return caching.CachedContent.create(model_name=model_id, contents=[prefix_text], ttl=ttl)
+        return genai.caching.CachedContent.create(model=model_id, contents=[prefix_text], ttl=ttl)
+    
+    def _build_gen_config_dict(self, config: LLMConfig) -> Dict[str, Any]:
+        """Build the generation config shared by all Gemini backends."""
         gen_config_dict = {
             "temperature": config.temperature,
         }
@@ -633,21 +1767,51 @@ class GeminiProvider(LLMProvider):
         if config.json_mode and self.supports_json_mode():
             gen_config_dict["response_mime_type"] = "application/json"
         
-        # Convert messages to Gemini format
-        full_prompt = self._format_messages_for_gemini(messages)
+        return gen_config_dict
+    
+    def _image_contents(self, prompt: str, image_data: ImageData, mime_type: MimeType) -> list:
+        """Build prompt + image contents in the active backend's format."""
+        import base64
+        
+        images = image_inputs(image_data, mime_type)
+        if self.use_vertex and not self.use_genai_sdk:
+            from vertexai.generative_models import Part
+            return [prompt] + [Part.from_data(data=data, mime_type=image_mime_type) for data, image_mime_type in images]
         
+        contents = [prompt]
+        for data, image_mime_type in images:
+            image_part = {
+                "mime_type": image_mime_type,
+                "data": base64.b64encode(data).decode('utf-8'),
+            }
+            contents.append({"inline_data": image_part} if self.use_genai_sdk else image_part)
+        return contents
+    
+    @classmethod
+    def uses_genai_sdk(cls, model: str, has_vertex_config: bool) -> bool:
+        """
+        True if calls to model go through the google-genai SDK (Gemini 3 on
+        Vertex AI), the only path that disables thinking (see _genai_sdk_config).
+        """
+        return (
+            model in cls.GLOBAL_ENDPOINT_MODELS
+            and HAS_GENAI_SDK
+            and has_vertex_config
+            and model not in cls.AI_STUDIO_ONLY_MODELS
+        )
+    
+    def _backend_label(self, vision: bool) -> str:
+        """Backend name used in error messages."""
         if self.use_genai_sdk:
-            return self._generate_genai_sdk(full_prompt, gen_config_dict)
+            label = "Gemini 3 (google-genai SDK)"
         elif self.use_vertex:
-            return self._generate_vertex(full_prompt, gen_config_dict)
+            label = "Vertex AI Gemini"
         else:
-            return self._generate_ai_studio(full_prompt, gen_config_dict)
+            label = "Gemini AI Studio"
+        return f"{label} vision" if vision else label
     
-    def _generate_genai_sdk(self, prompt: str, gen_config_dict: dict) -> LLMResponse:
-        """Generate using google-genai SDK with Vertex AI backend (for Gemini 3 models)."""
-        # Map model aliases to actual model IDs
-        model_id = self.VERTEX_MODEL_ALIASES.get(self.model, self.model)
-        
+    def _genai_sdk_config(self, gen_config_dict: dict, cached_content: Optional[str] = None):
+        """Build a google-genai GenerateContentConfig (Gemini 3 models)."""
         # Build config with safety settings completely disabled
         # Per https://ai.google.dev/gemini-api/docs/safety-settings
         # BLOCK_NONE = don't block any content regardless of probability
@@ -655,13 +1819,14 @@ class GeminiProvider(LLMProvider):
         # Disable thinking mode for Gemini 3 models to reduce token consumption
         # Per https://ai.google.dev/gemini-api/docs/thought-signatures
         # thinking_budget=0 disables thinking entirely
-        config = genai_types.GenerateContentConfig(
+        return genai_types.GenerateContentConfig(
             temperature=gen_config_dict.get("temperature", 0.0),
             max_output_tokens=gen_config_dict.get("max_output_tokens"),
             stop_sequences=gen_config_dict.get("stop_sequences"),
             top_p=gen_config_dict.get("top_p"),
             top_k=gen_config_dict.get("top_k"),
             response_mime_type=gen_config_dict.get("response_mime_type"),
+            cached_content=cached_content,
             # Disable thinking to reduce token usage and avoid 429 rate limits
             thinking_config=genai_types.ThinkingConfig(
                 thinking_budget=0,  # 0 = DISABLED, -1 = AUTOMATIC
@@ -686,44 +1851,9 @@ class GeminiProvider(LLMProvider):
                 ),
             ],
         )
-        
-        try:
-            # Wrap API call with retry logic for 429 rate limit errors
-            def make_request():
-                return self._genai_client.models.generate_content(
-                    model=model_id,
-                    contents=prompt,
-                    config=config,
-                )
-            
-            response = _retry_with_backoff(make_request)
-            
-            # Extract usage information
-            usage = None
-            if hasattr(response, 'usage_metadata') and response.usage_metadata:
-                input_tokens = getattr(response.usage_metadata, 'prompt_token_count', 0) or 0
-                output_tokens = getattr(response.usage_metadata, 'candidates_token_count', 0) or 0
-                usage = {
-                    "prompt_tokens": input_tokens,
-                    "completion_tokens": output_tokens,
-                    "total_tokens": getattr(response.usage_metadata, 'total_token_count', 0) or 0,
-                }
-                # Track usage globally
-                usage_tracker.add_usage(input_tokens, output_tokens)
-            
-            return LLMResponse(
-                content=response.text,
-                model=self.model,
-                usage=usage,
-                finish_reason=str(response.candidates[0].finish_reason) if response.candidates else None,
-                raw_response=response
-            )
-        
-        except Exception as e:
-            raise RuntimeError(f"Gemini 3 (google-genai SDK) call failed for model '{self.model}': {e}")
     
-    def _generate_vertex(self, prompt: str, gen_config_dict: dict) -> LLMResponse:
-        """Generate using Vertex AI with safety controls disabled."""
+    def _vertex_model(self, gen_config_dict: dict, cached_content=None):
+        """Build a Vertex AI model, generation config and safety settings."""
         from vertexai.generative_models import GenerativeModel, GenerationConfig, HarmCategory, HarmBlockThreshold
         
         generation_config = GenerationConfig(**gen_config_dict)
@@ -740,87 +1870,200 @@ class GeminiProvider(LLMProvider):
         # Map model aliases to actual Vertex AI model IDs
         vertex_model = self.VERTEX_MODEL_ALIASES.get(self.model, self.model)
         
-        # Create model instance (safety_settings passed to generate_content, not constructor)
-        model = GenerativeModel(vertex_model)
-        
-        try:
-            # Wrap API call with retry logic for 429 rate limit errors
-            def make_request():
-                return model.generate_content(
-                    prompt,
-                    generation_config=generation_config,
-                    safety_settings=safety_settings,
-                )
-            
-            response = _retry_with_backoff(make_request)
-            
-            usage = None
-            if hasattr(response, 'usage_metadata') and response.usage_metadata:
-                input_tokens = response.usage_metadata.prompt_token_count or 0
-                output_tokens = response.usage_metadata.candidates_token_count or 0
-                usage = {
-                    "prompt_tokens": input_tokens,
-                    "completion_tokens": output_tokens,
-                    "total_tokens": response.usage_metadata.total_token_count or 0
-                }
-                # Track usage globally
-                usage_tracker.add_usage(input_tokens, output_tokens)
-            
-            return LLMResponse(
-                content=response.text,
-                model=self.model,
-                usage=usage,
-                finish_reason=str(response.candidates[0].finish_reason) if response.candidates else None,
-                raw_response=response
-            )
+        if cached_content is not None:
+            from vertexai.preview.generative_models import GenerativeModel as PreviewGenerativeModel
+            return PreviewGenerativeModel.from_cached_content(cached_content=cached_content), generation_config, safety_settings
         
-        except Exception as e:
-            raise RuntimeError(f"Vertex AI Gemini call failed for model '{self.model}': {e}")
+        # Create model instance (safety_settings passed to generate_content, not constructor)
+        return GenerativeModel(vertex_model), generation_config, safety_settings
     
-    def _generate_ai_studio(self, prompt: str, gen_config_dict: dict) -> LLMResponse:
-        """Generate using Google AI Studio (for Gemini 3 models)."""
+    def _ai_studio_model(self, gen_config_dict: dict, cached_content=None):
+        """Build a Google AI Studio model with safety controls disabled."""
         generation_config = genai.types.GenerationConfig(**gen_config_dict)
         
+        # Safety settings: disable all safety filters for clinical content
+        safety_settings = {
+            HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
+            HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
+            HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
+            HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
+        }
+        
+        if cached_content is not None:
+            return genai.GenerativeModel.from_cached_content(
+                cached_content,
+                generation_config=generation_config,
+                safety_settings=safety_settings,
+            )
+        
         # Map model aliases to actual AI Studio model IDs (same as Vertex)
         ai_studio_model = self.VERTEX_MODEL_ALIASES.get(self.model, self.model)
         
-        model = genai.GenerativeModel(
+        return genai.GenerativeModel(
             ai_studio_model,
             generation_config=generation_config,
-            safety_settings=self.SAFETY_SETTINGS,
+            safety_settings=safety_settings,
         )
+    
+    def _generate_content(
+        self, contents, gen_config_dict: dict, vision: bool = False, cached_content=None, parser=None
+    ) -> LLMResponse:
+        """
+        Run generate_content on the active backend (google-genai, Vertex AI or AI Studio).
         
-        try:
-            # Wrap API call with retry logic for 429 rate limit errors
+        With a parser (core.json_stream), the response is streamed and each
+        chunk is fed to it, so a wrongly shaped JSON answer is abandoned early.
+        """
+        stream = parser is not None
+        if self.use_genai_sdk:
+            model_id = self.VERTEX_MODEL_ALIASES.get(self.model, self.model)
+            config = self._genai_sdk_config(gen_config_dict, cached_content)
+            generate = (
+                self._genai_client.models.generate_content_stream if stream
+                else self._genai_client.models.generate_content
+            )
+            
             def make_request():
-                return model.generate_content(prompt)
+                return generate(
+                    model=model_id,
+                    contents=contents,
+                    config=config,
+                )
+        elif self.use_vertex:
+            model, generation_config, safety_settings = self._vertex_model(gen_config_dict, cached_content)
             
-            response = _retry_with_backoff(make_request)
+            def make_request():
+                return model.generate_content(
+                    contents,
+                    generation_config=generation_config,
+                    safety_settings=safety_settings,
+                    stream=stream,
+                )
+        else:
+            model = self._ai_studio_model(gen_config_dict, cached_content)
             
-            usage = None
-            if hasattr(response, 'usage_metadata') and response.usage_metadata:
-                input_tokens = response.usage_metadata.prompt_token_count or 0
-                output_tokens = response.usage_metadata.candidates_token_count or 0
-                usage = {
-                    "prompt_tokens": input_tokens,
-                    "completion_tokens": output_tokens,
-                    "total_tokens": response.usage_metadata.total_token_count or 0
-                }
-                # Track usage globally
-                usage_tracker.add_usage(input_tokens, output_tokens)
+            def make_request():
+                return model.generate_content(contents, stream=stream)
+        
+        def request():
+            if not stream:
+                return self._to_llm_response(make_request())
+            last_chunk = None
+            for chunk in make_request():
+                _feed_stream(parser, self._chunk_text(chunk))
+                last_chunk = chunk
+            return self._finish_stream(last_chunk, parser)
+        
+        try:
+            # Rate limited, with retry on 429 rate limit errors
+            return self._send(request, contents)
+        except Exception as e:
+            if _is_json_shape_error(e):
+                raise
+            raise RuntimeError(f"{self._backend_label(vision)} call failed for model '{self.model}': {e}")
+    
+    async def _agenerate_content(
+        self, contents, gen_config_dict: dict, vision: bool = False, cached_content=None, parser=None
+    ) -> LLMResponse:
+        """Async version of _generate_content() using the SDKs' async methods."""
+        stream = parser is not None
+        if self.use_genai_sdk:
+            model_id = self.VERTEX_MODEL_ALIASES.get(self.model, self.model)
+            config = self._genai_sdk_config(gen_config_dict, cached_content)
+            client = self._loop_client(lambda: genai_new.Client(
+                vertexai=True,
+                project=os.environ.get("GOOGLE_CLOUD_PROJECT"),
+                location='global',
+            ))
             
-            return LLMResponse(
-                content=response.text,
-                model=self.model,
-                usage=usage,
-                finish_reason=str(response.candidates[0].finish_reason) if response.candidates else None,
-                raw_response=response
-            )
+            generate = client.aio.models.generate_content_stream if stream else client.aio.models.generate_content
+            
+            def make_request():
+                return generate(
+                    model=model_id,
+                    contents=contents,
+                    config=config,
+                )
+        elif self.use_vertex:
+            model, generation_config, safety_settings = self._vertex_model(gen_config_dict, cached_content)
+            
+            def make_request():
+                return model.generate_content_async(
+                    contents,
+                    generation_config=generation_config,
+                    safety_settings=safety_settings,
+                    stream=stream,
+                )
+        else:
+            model = self._ai_studio_model(gen_config_dict, cached_content)
+            
+            def make_request():
+                return model.generate_content_async(contents, stream=stream)
         
+        try:
+            async def request():
+                if not stream:
+                    return self._to_llm_response(await make_request())
+                last_chunk = None
+                async for chunk in await make_request():
+                    _feed_stream(parser, self._chunk_text(chunk))
+                    last_chunk = chunk
+                return self._finish_stream(last_chunk, parser)
+            
+            return await self._asend(request, contents)
         except Exception as e:
-            raise RuntimeError(f"Gemini AI Studio call failed for model '{self.model}': {e}")
+            if _is_json_shape_error(e):
+                raise
+            raise RuntimeError(f"{self._backend_label(vision)} call failed for model '{self.model}': {e}")
+    
+    @staticmethod
+    def _finish_reason_name(finish_reason) -> str:
+        """Finish reason enum name (e.g. 'MAX_TOKENS'), whichever SDK produced it."""
+        return getattr(finish_reason, 'name', None) or str(finish_reason)
+    
+    @staticmethod
+    def _chunk_text(chunk) -> str:
+        """Text of a streamed chunk ('' for chunks carrying only metadata)."""
+        try:
+            return chunk.text or ""
+        except (ValueError, AttributeError):
+            return ""
+    
+    def _finish_stream(self, last_chunk, parser) -> LLMResponse:
+        """Build the LLMResponse for a streamed call (usage and finish reason come with the last chunk)."""
+        response = self._to_llm_response(last_chunk, content=parser.text) if last_chunk is not None else (
+            LLMResponse(content=parser.text, model=self.model)
+        )
+        if response.finish_reason is None or 'MAX_TOKENS' not in response.finish_reason:
+            _warn_if_truncated_json(parser, "Gemini", response.finish_reason)
+        return response
+    
+    def _to_llm_response(self, response, content: Optional[str] = None) -> LLMResponse:
+        """Convert a Gemini response to LLMResponse and track usage (content overrides response.text)."""
+        usage = None
+        if hasattr(response, 'usage_metadata') and response.usage_metadata:
+            input_tokens = getattr(response.usage_metadata, 'prompt_token_count', 0) or 0
+            output_tokens = getattr(response.usage_metadata, 'candidates_token_count', 0) or 0
+            cached_tokens = _usage_int(response.usage_metadata, 'cached_content_token_count')
+            usage = {
+                "prompt_tokens": input_tokens,
+                "completion_tokens": output_tokens,
+                "total_tokens": getattr(response.usage_metadata, 'total_token_count', 0) or 0,
+                "cached_tokens": cached_tokens,
+            }
+            # Track usage globally
+            usage_tracker.add_usage(input_tokens, output_tokens, cached_input_tokens=cached_tokens)
+        
+        return LLMResponse(
+            content=response.text if content is None else content,
+            model=self.model,
+            usage=usage,
+            finish_reason=self._finish_reason_name(response.candidates[0].finish_reason) if response.candidates else None,
+            raw_response=response
+        )
     
-    def _format_messages_for_gemini(self, messages: List[Dict[str, str]]) -> str:
+    @staticmethod
+    def _format_messages_for_gemini(messages: List[Dict[str, str]]) -> str:
         """
         Convert OpenAI-style messages to Gemini prompt format.
         
@@ -845,181 +2088,6 @@ class GeminiProvider(LLMProvider):
                 formatted_parts.append(f"\nAssistant: {content}")
         
         return '\n'.join(formatted_parts)
-    
-    def generate_with_image(
-        self,
-        prompt: str,
-        image_data: bytes,
-        mime_type: str = "image/png",
-        config: Optional[LLMConfig] = None
-    ) -> LLMResponse:
-        """Generate completion with an image using Gemini vision."""
-        import base64
-        
-        if config is None:
-            config = LLMConfig()
-        
-        base64_image = base64.b64encode(image_data).decode('utf-8')
-        
-        # Build generation config
-        gen_config_dict = {
-            "temperature": config.temperature,
-        }
-        if config.max_tokens:
-            gen_config_dict["max_output_tokens"] = config.max_tokens
-        if config.json_mode and self.supports_json_mode():
-            gen_config_dict["response_mime_type"] = "application/json"
-        
-        # Create image part
-        image_part = {
-            "mime_type": mime_type,
-            "data": base64_image,
-        }
-        
-        if self.use_genai_sdk:
-            # Gemini 3 via google-genai SDK
-            model_id = self.VERTEX_MODEL_ALIASES.get(self.model, self.model)
-            config_obj = genai_types.GenerateContentConfig(
-                temperature=gen_config_dict.get("temperature", 0.0),
-                max_output_tokens=gen_config_dict.get("max_output_tokens"),
-                response_mime_type=gen_config_dict.get("response_mime_type"),
-                thinking_config=genai_types.ThinkingConfig(thinking_budget=0),
-                safety_settings=[
-                    genai_types.SafetySetting(
-                        category=genai_types.HarmCategory.HARM_CATEGORY_HATE_SPEECH,
-                        threshold=genai_types.HarmBlockThreshold.BLOCK_NONE,
-                    ),
-                    genai_types.SafetySetting(
-                        category=genai_types.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT,
-                        threshold=genai_types.HarmBlockThreshold.BLOCK_NONE,
-                    ),
-                    genai_types.SafetySetting(
-                        category=genai_types.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT,
-                        threshold=genai_types.HarmBlockThreshold.BLOCK_NONE,
-                    ),
-                    genai_types.SafetySetting(
-                        category=genai_types.HarmCategory.HARM_CATEGORY_HARASSMENT,
-                        threshold=genai_types.HarmBlockThreshold.BLOCK_NONE,
-                    ),
-                ],
-            )
-            
-            try:
-                def make_request():
-                    return self._genai_client.models.generate_content(
-                        model=model_id,
-                        contents=[prompt, {"inline_data": image_part}],
-                        config=config_obj,
-                    )
-                
-                response = _retry_with_backoff(make_request)
-                
-                usage = None
-                if hasattr(response, 'usage_metadata') and response.usage_metadata:
-                    input_tokens = getattr(response.usage_metadata, 'prompt_token_count', 0) or 0
-                    output_tokens = getattr(response.usage_metadata, 'candidates_token_count', 0) or 0
-                    usage = {
-                        "prompt_tokens": input_tokens,
-                        "completion_tokens": output_tokens,
-                        "total_tokens": getattr(response.usage_metadata, 'total_token_count', 0) or 0,
-                    }
-                    usage_tracker.add_usage(input_tokens, output_tokens)
-                
-                return LLMResponse(
-                    content=response.text,
-                    model=self.model,
-                    usage=usage,
-                    finish_reason=str(response.candidates[0].finish_reason) if response.candidates else None,
-                    raw_response=response
-                )
-            except Exception as e:
-                raise RuntimeError(f"Gemini 3 vision call failed for model '{self.model}': {e}")
-        
-        elif self.use_vertex:
-            # Vertex AI for older Gemini models
-            from vertexai.generative_models import GenerativeModel, GenerationConfig, Part, Image
-            from vertexai.generative_models import HarmCategory, HarmBlockThreshold
-            
-            generation_config = GenerationConfig(**gen_config_dict)
-            safety_settings = {
-                HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
-                HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-                HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
-                HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
-            }
-            
-            vertex_model = self.VERTEX_MODEL_ALIASES.get(self.model, self.model)
-            model = GenerativeModel(vertex_model)
-            
-            try:
-                image_part_vertex = Part.from_data(data=image_data, mime_type=mime_type)
-                
-                def make_request():
-                    return model.generate_content(
-                        [prompt, image_part_vertex],
-                        generation_config=generation_config,
-                        safety_settings=safety_settings,
-                    )
-                
-                response = _retry_with_backoff(make_request)
-                
-                usage = None
-                if hasattr(response, 'usage_metadata') and response.usage_metadata:
-                    input_tokens = response.usage_metadata.prompt_token_count or 0
-                    output_tokens = response.usage_metadata.candidates_token_count or 0
-                    usage = {
-                        "prompt_tokens": input_tokens,
-                        "completion_tokens": output_tokens,
-                        "total_tokens": response.usage_metadata.total_token_count or 0
-                    }
-                    usage_tracker.add_usage(input_tokens, output_tokens)
-                
-                return LLMResponse(
-                    content=response.text,
-                    model=self.model,
-                    usage=usage,
-                    finish_reason=str(response.candidates[0].finish_reason) if response.candidates else None,
-                    raw_response=response
-                )
-            except Exception as e:
-                raise RuntimeError(f"Vertex AI Gemini vision call failed for model '{self.model}': {e}")
-        
-        else:
-            # AI Studio
-            generation_config = genai.types.GenerationConfig(**gen_config_dict)
-            ai_studio_model = self.VERTEX_MODEL_ALIASES.get(self.model, self.model)
-            model = genai.GenerativeModel(
-                ai_studio_model,
-                generation_config=generation_config,
-                safety_settings=self.SAFETY_SETTINGS,
-            )
-            
-            try:
-                def make_request():
-                    return model.generate_content([prompt, image_part])
-                
-                response = _retry_with_backoff(make_request)
-                
-                usage = None
-                if hasattr(response, 'usage_metadata') and response.usage_metadata:
-                    input_tokens = response.usage_metadata.prompt_token_count or 0
-                    output_tokens = response.usage_metadata.candidates_token_count or 0
-                    usage = {
-                        "prompt_tokens": input_tokens,
-                        "completion_tokens": output_tokens,
-                        "total_tokens": response.usage_metadata.total_token_count or 0
-                    }
-                    usage_tracker.add_usage(input_tokens, output_tokens)
-                
-                return LLMResponse(
-                    content=response.text,
-                    model=self.model,
-                    usage=usage,
-                    finish_reason=str(response.candidates[0].finish_reason) if response.candidates else None,
-                    raw_response=response
-                )
-            except Exception as e:
-                raise RuntimeError(f"Gemini AI Studio vision call failed for model '{self.model}': {e}")
 
 
 class ClaudeProvider(LLMProvider):
@@ -1052,9 +2120,21 @@ class ClaudeProvider(LLMProvider):
         'claude-3-haiku', 'claude-3-haiku-20240307',
     ]
     
+    PROVIDER_NAME = 'claude'
+    API_KEY_ENV_VARS = ("ANTHROPIC_API_KEY", "CLAUDE_API_KEY")
+    SDK_MODULES = ('anthropic',)
+    
     def __init__(self, model: str, api_key: Optional[str] = None):
         super().__init__(model, api_key)
-        self.client = anthropic.Anthropic(api_key=self.api_key)
+        self.client = anthropic.Anthropic(
+            api_key=self.api_key,
+            http_client=anthropic.DefaultHttpxClient(limits=_http_limits()),
+        )
+    
+    @classmethod
+    def endpoint_key(cls, model: str) -> Optional[tuple]:
+        """Anthropic endpoint is set by ANTHROPIC_BASE_URL (default: api.anthropic.com)."""
+        return (os.environ.get("ANTHROPIC_BASE_URL"),)
     
     def _get_api_key_from_env(self) -> str:
         """Get Anthropic API key from environment."""
@@ -1068,6 +2148,14 @@ class ClaudeProvider(LLMProvider):
         """Claude supports JSON mode via system prompt."""
         return True
     
+    @property
+    def async_client(self) -> "anthropic.AsyncAnthropic":
+        """AsyncAnthropic client for the running event loop."""
+        return self._loop_client(lambda: anthropic.AsyncAnthropic(
+            api_key=self.api_key,
+            http_client=anthropic.DefaultAsyncHttpxClient(limits=_http_limits()),
+        ))
+    
     def generate(
         self, 
         messages: List[Dict[str, str]], 
@@ -1083,10 +2171,142 @@ class ClaudeProvider(LLMProvider):
         Returns:
             LLMResponse with content and metadata
         """
-        if config is None:
-            config = LLMConfig()
+        config = config or LLMConfig()
+        params = self._build_params(messages, config)
         
-        # Separate system message from other messages (Claude API requirement)
+        # Make API call with streaming to handle long operations
+        # Anthropic requires streaming for operations >10 minutes
+        def request():
+            # Use streaming to avoid 10-minute timeout. Text is fed to an
+            # incremental JSON parser, which keeps it as a list of chunks and
+            # aborts the stream if the JSON shape is wrong.
+            parser = _json_stream_parser(config)
+            input_tokens = 0
+            output_tokens = 0
+            cache_read_tokens = 0
+            stop_reason = None
+            model_used = self.model
+            
+            with self.client.messages.stream(**params) as stream:
+                for text in stream.text_stream:
+                    _feed_stream(parser, text)
+                
+                # Get final message for metadata
+                final_message = stream.get_final_message()
+                if final_message:
+                    stop_reason = final_message.stop_reason
+                    model_used = final_message.model
+                    if final_message.usage:
+                        usage = final_message.usage
+                        cache_read_tokens = _usage_int(usage, 'cache_read_input_tokens')
+                        # input_tokens excludes tokens read from / written to the cache
+                        input_tokens = (
+                            usage.input_tokens + cache_read_tokens
+                            + _usage_int(usage, 'cache_creation_input_tokens')
+                        )
+                        output_tokens = usage.output_tokens
+            
+            if config.json_mode and stop_reason != 'max_tokens':
+                _warn_if_truncated_json(parser, "Claude", stop_reason)
+            return self._finish(parser.text, model_used, stop_reason, input_tokens, output_tokens, cache_read_tokens)
+        
+        try:
+            return self._send(request, [params.get("system"), params["messages"]])
+        except Exception as e:
+            if _is_json_shape_error(e):
+                raise
+            raise RuntimeError(f"Anthropic API call failed for model '{self.model}': {e}")
+    
+    async def agenerate(
+        self,
+        messages: List[Dict[str, str]],
+        config: Optional[LLMConfig] = None
+    ) -> LLMResponse:
+        """Async version of generate() streaming through the AsyncAnthropic client."""
+        config = config or LLMConfig()
+        params = self._build_params(messages, config)
+        
+        client = self.async_client
+        
+        async def request():
+            parser = _json_stream_parser(config)
+            input_tokens = 0
+            output_tokens = 0
+            cache_read_tokens = 0
+            stop_reason = None
+            model_used = self.model
+            
+            async with client.messages.stream(**params) as stream:
+                async for text in stream.text_stream:
+                    _feed_stream(parser, text)
+                
+                final_message = await stream.get_final_message()
+                if final_message:
+                    stop_reason = final_message.stop_reason
+                    model_used = final_message.model
+                    if final_message.usage:
+                        usage = final_message.usage
+                        cache_read_tokens = _usage_int(usage, 'cache_read_input_tokens')
+                        # input_tokens excludes tokens read from / written to the cache
+                        input_tokens = (
+                            usage.input_tokens + cache_read_tokens
+                            + _usage_int(usage, 'cache_creation_input_tokens')
+                        )
+                        output_tokens = usage.output_tokens
+            
+            if config.json_mode and stop_reason != 'max_tokens':
+                _warn_if_truncated_json(parser, "Claude", stop_reason)
+            return self._finish(parser.text, model_used, stop_reason, input_tokens, output_tokens, cache_read_tokens)
+        
+        try:
+            return await self._asend(request, [params.get("system"), params["messages"]])
+        except Exception as e:
+            if _is_json_shape_error(e):
+                raise
+            raise RuntimeError(f"Anthropic API call failed for model '{self.model}': {e}")
+    
+    def generate_with_image(
+        self,
+        prompt: str,
+        image_data: ImageData,
+        mime_type: MimeType = "image/png",
+        config: Optional[LLMConfig] = None
+    ) -> LLMResponse:
+        """Generate completion with an image using Claude vision."""
+        return self.generate(self._image_messages(prompt, image_data, mime_type), config)
+    
+    async def agenerate_with_image(
+        self,
+        prompt: str,
+        image_data: ImageData,
+        mime_type: MimeType = "image/png",
+        config: Optional[LLMConfig] = None
+    ) -> LLMResponse:
+        """Async version of generate_with_image()."""
+        return await self.agenerate(self._image_messages(prompt, image_data, mime_type), config)
+    
+    @staticmethod
+    def _image_messages(prompt: str, image_data: ImageData, mime_type: MimeType) -> List[Dict[str, Any]]:
+        """Build a user message with the images first, then the prompt."""
+        import base64
+        
+        content = [
+            {
+                "type": "image",
+                "source": {
+                    "type": "base64",
+                    "media_type": image_mime_type,
+                    "data": base64.b64encode(data).decode('utf-8'),
+                },
+            }
+            for data, image_mime_type in image_inputs(image_data, mime_type)
+        ]
+        content.append({"type": "text", "text": prompt})
+        return [{"role": "user", "content": content}]
+    
+    def _build_params(self, messages: List[Dict[str, Any]], config: LLMConfig) -> Dict[str, Any]:
+        """Build Messages API parameters."""
+        # Separate system message from other messages (Claude API requirement)
         system_content = ""
         api_messages = []
         
@@ -1096,6 +2316,17 @@ class ClaudeProvider(LLMProvider):
             
             if role == 'system':
                 system_content = content
+                continue
+            
+            if msg.get('cache'):
+                # Cache breakpoint: everything up to this block is cached
+                content = self._cached_blocks(content)
+            
+            previous = api_messages[-1] if api_messages else None
+            if previous and previous["role"] == role and isinstance(previous["content"], list):
+                # Merge consecutive turns so the cached prefix and the task
+                # instructions travel as blocks of one user message
+                previous["content"] = previous["content"] + self._as_blocks(content)
             else:
                 # Claude uses 'assistant' for assistant messages
                 api_messages.append({
@@ -1128,66 +2359,65 @@ class ClaudeProvider(LLMProvider):
         if config.top_p is not None:
             params["top_p"] = config.top_p
         
-        # Make API call with streaming to handle long operations
-        # Anthropic requires streaming for operations >10 minutes
-        try:
-            import logging
-            logger = logging.getLogger(__name__)
-            
-            # Use streaming to avoid 10-minute timeout
-            content = ""
-            input_tokens = 0
-            output_tokens = 0
-            stop_reason = None
-            model_used = self.model
-            
-            with self.client.messages.stream(**params) as stream:
-                for text in stream.text_stream:
-                    content += text
-                
-                # Get final message for metadata
-                final_message = stream.get_final_message()
-                if final_message:
-                    stop_reason = final_message.stop_reason
-                    model_used = final_message.model
-                    if final_message.usage:
-                        input_tokens = final_message.usage.input_tokens
-                        output_tokens = final_message.usage.output_tokens
-            
-            # Log warning if response was truncated
-            if stop_reason == 'max_tokens':
-                logger.warning(
-                    f"Claude response was truncated (max_tokens reached). "
-                    f"Used {output_tokens} tokens. Consider increasing max_tokens."
-                )
-            
-            # Log warning if empty response
-            if not content:
-                logger.warning(
-                    f"Claude returned empty content. Stop reason: {stop_reason}"
-                )
-            
-            # Build usage information
-            usage = None
-            if input_tokens or output_tokens:
-                usage = {
-                    "prompt_tokens": input_tokens,
-                    "completion_tokens": output_tokens,
-                    "total_tokens": input_tokens + output_tokens
-                }
-                # Track usage globally
-                usage_tracker.add_usage(input_tokens, output_tokens)
-            
-            return LLMResponse(
-                content=content,
-                model=model_used,
-                usage=usage,
-                finish_reason=stop_reason,
-                raw_response=None  # No raw response with streaming
+        return params
+    
+    @staticmethod
+    def _as_blocks(content: Any) -> List[Dict[str, Any]]:
+        """Normalize message content to a list of content blocks."""
+        if isinstance(content, list):
+            return list(content)
+        return [{"type": "text", "text": content}]
+    
+    @classmethod
+    def _cached_blocks(cls, content: Any) -> List[Dict[str, Any]]:
+        """Content blocks with an ephemeral cache_control breakpoint on the last block."""
+        blocks = cls._as_blocks(content)
+        if blocks:
+            blocks[-1] = {**blocks[-1], "cache_control": {"type": "ephemeral"}}
+        return blocks
+    
+    def _finish(
+        self,
+        content: str,
+        model_used: str,
+        stop_reason: Optional[str],
+        input_tokens: int,
+        output_tokens: int,
+        cache_read_tokens: int = 0,
+    ) -> LLMResponse:
+        """Log truncation/empty responses, track usage and build the LLMResponse."""
+        # Log warning if response was truncated
+        if stop_reason == 'max_tokens':
+            _logger.warning(
+                f"Claude response was truncated (max_tokens reached). "
+                f"Used {output_tokens} tokens. Consider increasing max_tokens."
             )
         
-        except Exception as e:
-            raise RuntimeError(f"Anthropic API call failed for model '{self.model}': {e}")
+        # Log warning if empty response
+        if not content:
+            _logger.warning(
+                f"Claude returned empty content. Stop reason: {stop_reason}"
+            )
+        
+        # Build usage information
+        usage = None
+        if input_tokens or output_tokens:
+            usage = {
+                "prompt_tokens": input_tokens,
+                "completion_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+                "cached_tokens": cache_read_tokens,
+            }
+            # Track usage globally
+            usage_tracker.add_usage(input_tokens, output_tokens, cached_input_tokens=cache_read_tokens)
+        
+        return LLMResponse(
+            content=content,
+            model=model_used,
+            usage=usage,
+            finish_reason=stop_reason,
+            raw_response=None  # No raw response with streaming
+        )
 
 
 class LLMProviderFactory:
@@ -1245,6 +2475,16 @@ class LLMProviderFactory:
         Returns:
             LLMProvider instance
         
+        Raises:
+            ValueError: If model name doesn't match known patterns
+        """
+        return cls.create(cls.detect_provider(model), model, api_key)
+    
+    @classmethod
+    def detect_provider(cls, model: str) -> str:
+        """
+        Detect the provider name for a model identifier.
+        
         Raises:
             ValueError: If model name doesn't match known patterns
         """
@@ -1252,15 +2492,15 @@ class LLMProviderFactory:
         
         # Check OpenAI patterns
         if any(pattern in model_lower for pattern in ['gpt', 'o1', 'o3']):
-            return cls.create('openai', model, api_key)
+            return 'openai'
         
         # Check Gemini patterns
         if 'gemini' in model_lower:
-            return cls.create('gemini', model, api_key)
+            return 'gemini'
         
         # Check Claude/Anthropic patterns
         if any(pattern in model_lower for pattern in ['claude', 'anthropic']):
-            return cls.create('claude', model, api_key)
+            return 'claude'
         
         raise ValueError(
             f"Could not auto-detect provider for model '{model}'. "
@@ -1271,3 +2511,583 @@ class LLMProviderFactory:
     def list_providers(cls) -> List[str]:
         """Get list of supported provider names."""
         return list(cls._providers.keys())
+
+
+class ProviderPool:
+    """
+    Process-wide registry of provider instances.
+    
+    Reuses one provider per (provider, model, api_key, endpoint), so its SDK
+    client and keep-alive HTTP connection pool (and one-time setup such as
+    vertexai.init) are shared by every call instead of rebuilt per call.
+    
+    Thread-safe: concurrent first requests for the same key construct the
+    provider once. Setup time is recorded so the saving can be reported.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._providers: Dict[tuple, LLMProvider] = {}
+        self._key_locks: Dict[tuple, threading.Lock] = {}
+        self.reset_stats()
+    
+    def get(self, model: str, api_key: Optional[str] = None) -> LLMProvider:
+        """
+        Get the shared provider for a model, creating it on first use.
+        
+        Args:
+            model: Model identifier (provider is auto-detected)
+            api_key: Optional API key (reads from env if not provided)
+        
+        Returns:
+            Pooled LLMProvider instance
+        """
+        provider_name = LLMProviderFactory.detect_provider(model)
+        provider_class = LLMProviderFactory._providers[provider_name]
+        key = provider_class.pool_key(model, api_key)
+        
+        provider = self._providers.get(key)
+        if provider is None:
+            with self._lock:
+                key_lock = self._key_locks.setdefault(key, threading.Lock())
+            with key_lock:
+                provider = self._providers.get(key)
+                if provider is None:
+                    start = time.perf_counter()
+                    provider = LLMProviderFactory.create(provider_name, model, api_key)
+                    elapsed = time.perf_counter() - start
+                    with self._lock:
+                        self._providers[key] = provider
+                        self._stats["created"] += 1
+                        self._stats["setup_seconds"] += elapsed
+                    _logger.debug(f"Created pooled {provider} in {elapsed * 1000:.0f}ms")
+                    return provider
+        
+        with self._lock:
+            self._stats["reused"] += 1
+        return provider
+    
+    def clear(self) -> None:
+        """Close and drop all pooled providers."""
+        with self._lock:
+            providers = list(self._providers.values())
+            self._providers.clear()
+            self._key_locks.clear()
+        for provider in providers:
+            provider.close()
+    
+    def reset_stats(self) -> None:
+        """Reset creation/reuse counters."""
+        with self._lock:
+            self._stats = {"created": 0, "reused": 0, "setup_seconds": 0.0}
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get pool statistics.
+        
+        estimated_saved_seconds is the mean measured setup time multiplied by
+        the number of reuses, i.e. what constructing a client per call would
+        have cost (excluding the TLS handshakes kept alive by the pool).
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pooled"] = len(self._providers)
+        mean_setup = stats["setup_seconds"] / stats["created"] if stats["created"] else 0.0
+        stats["estimated_saved_seconds"] = mean_setup * stats["reused"]
+        return stats
+    
+    def __len__(self) -> int:
+        return len(self._providers)
+
+
+# Global provider pool instance
+provider_pool = ProviderPool()
+
+
+class LatencyStats:
+    """
+    Per-task latency samples for LLM calls, persisted across runs.
+    
+    A task is the pipeline phase, call kind and model (see latency_task),
+    e.g. "SoA_Extraction/image/gemini-2.5-pro". Only the most recent
+    LATENCY_WINDOW samples per task are kept.
+    """
+    
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples: Dict[str, deque] = {}
+    
+    def record(self, task: str, seconds: float) -> None:
+        """Record the latency of one call."""
+        with self._lock:
+            samples = self._samples.get(task)
+            if samples is None:
+                samples = self._samples[task] = deque(maxlen=self.window)
+            samples.append(seconds)
+    
+    def percentile(self, task: str, q: float = HEDGE_PERCENTILE, min_samples: int = HEDGE_MIN_SAMPLES) -> Optional[float]:
+        """Latency percentile q for a task, or None with fewer than min_samples samples."""
+        with self._lock:
+            samples = sorted(self._samples.get(task, ()))
+        if not samples or len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+    
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Sample count, p50 and p90 latency by task."""
+        with self._lock:
+            tasks = {task: sorted(samples) for task, samples in self._samples.items() if samples}
+        return {
+            task: {
+                "count": len(samples),
+                "p50": samples[len(samples) // 2],
+                "p90": samples[min(len(samples) - 1, int(0.9 * len(samples)))],
+            }
+            for task, samples in tasks.items()
+        }
+    
+    def load(self, path: Path) -> int:
+        """Merge samples saved by an earlier run; returns the number of tasks loaded."""
+        try:
+            data = json.loads(Path(path).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            _logger.warning(f"Ignoring unreadable LLM latency stats {path}: {e}")
+            return 0
+        tasks = data.get("tasks", {})
+        with self._lock:
+            for task, samples in tasks.items():
+                merged = deque(samples, maxlen=self.window)
+                merged.extend(self._samples.get(task, ()))
+                self._samples[task] = merged
+        return len(tasks)
+    
+    def save(self, path: Path) -> None:
+        """Write all samples to path (atomically)."""
+        path = Path(path)
+        with self._lock:
+            data = {"version": 1, "tasks": {task: list(samples) for task, samples in self._samples.items()}}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp_path, path)
+    
+    def reset(self) -> None:
+        """Drop all samples."""
+        with self._lock:
+            self._samples.clear()
+
+
+# Global latency statistics instance
+latency_stats = LatencyStats()
+
+
+def latency_task(model: str, kind: str) -> str:
+    """Latency task key for a call made from the current thread's phase."""
+    return f"{usage_tracker.current_phase}/{kind}/{model}"
+
+
+class HedgingPolicy:
+    """
+    Process-wide settings for hedged requests (see configure_hedging).
+    
+    With recording on, every provider call is timed into latency_stats;
+    with hedging on, calls are also hedged once they pass their task's
+    percentile latency.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.configure()
+    
+    def configure(
+        self,
+        enabled: bool = False,
+        fallback_model: Optional[str] = None,
+        stats_path: Optional[Path] = None,
+        percentile: float = HEDGE_PERCENTILE,
+        min_samples: int = HEDGE_MIN_SAMPLES,
+    ) -> None:
+        self.enabled = enabled
+        self.fallback_model = fallback_model
+        self.stats_path = Path(stats_path) if stats_path else None
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.reset_stats()
+    
+    @property
+    def recording(self) -> bool:
+        """True if provider calls are timed (hedging on or a stats file configured)."""
+        return self.enabled or self.stats_path is not None
+    
+    def delay_for(self, task: str) -> Optional[float]:
+        """Seconds after which a call of this task is hedged (None: not hedged)."""
+        if not self.enabled:
+            return None
+        return latency_stats.percentile(task, self.percentile, self.min_samples)
+    
+    def count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+    
+    def reset_stats(self) -> None:
+        """Reset hedge counters."""
+        with self._lock:
+            self._stats = {"hedged": 0, "hedge_wins": 0}
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Calls hedged, and how often the duplicate finished first."""
+        with self._lock:
+            return dict(self._stats)
+
+
+# Global hedging policy instance
+hedging_policy = HedgingPolicy()
+
+_hedge_executor: Optional[ThreadPoolExecutor] = None
+_hedge_executor_lock = threading.Lock()
+
+
+def _get_hedge_executor() -> ThreadPoolExecutor:
+    """Worker threads running the two sides of a hedged sync call."""
+    global _hedge_executor
+    with _hedge_executor_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-hedge")
+        return _hedge_executor
+
+
+def configure_hedging(
+    enabled: bool = False,
+    fallback_model: Optional[str] = None,
+    stats_path: Optional[str] = None,
+    percentile: float = HEDGE_PERCENTILE,
+    min_samples: int = HEDGE_MIN_SAMPLES,
+) -> None:
+    """
+    Configure hedged requests and per-task latency learning.
+    
+    Latencies are loaded from stats_path (recorded by earlier runs) and
+    written back by save_latency_stats().
+    
+    Args:
+        enabled: Send a duplicate request once a call passes its task's percentile latency
+        fallback_model: Send the duplicate to this model (default: the same model)
+        stats_path: Latency statistics file to learn from and update
+        percentile: Latency percentile after which calls are hedged
+        min_samples: Recorded latencies a task needs before it is hedged
+    """
+    hedging_policy.configure(enabled, fallback_model, stats_path, percentile, min_samples)
+    if hedging_policy.stats_path is not None:
+        tasks = latency_stats.load(hedging_policy.stats_path)
+        _logger.debug(f"Loaded LLM latency stats for {tasks} task(s) from {hedging_policy.stats_path}")
+
+
+def save_latency_stats() -> None:
+    """Persist latency samples to the configured stats file, if any."""
+    if hedging_policy.stats_path is not None:
+        latency_stats.save(hedging_policy.stats_path)
+
+
+def hedge_provider(provider: "LLMProvider") -> Any:
+    """Wrap a provider in a HedgedProvider when latency recording or hedging is on."""
+    return HedgedProvider(provider) if hedging_policy.recording else provider
+
+
+class HedgedProvider:
+    """
+    Provider wrapper that times every call and hedges slow ones.
+    
+    When a call runs past its task's learned p90 latency, a duplicate is
+    sent (to the same model, or to hedging_policy.fallback_model) and the
+    first successful response wins. An async loser is cancelled; a sync
+    loser cannot be interrupted mid-request, so it is abandoned and its
+    response discarded. Calls of tasks without enough history are not
+    hedged. Other attributes are delegated to the wrapped provider.
+    """
+    
+    def __init__(self, provider: "LLMProvider"):
+        self.provider = provider
+        self.model = provider.model
+    
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.provider, name)
+    
+    def __repr__(self) -> str:
+        return f"HedgedProvider({self.provider!r})"
+    
+    def _hedge_target(self) -> "LLMProvider":
+        fallback = hedging_policy.fallback_model
+        return provider_pool.get(fallback) if fallback and fallback != self.model else self.provider
+    
+    def generate(self, messages: List[Dict[str, Any]], config: Optional[LLMConfig] = None) -> LLMResponse:
+        """Hedged LLMProvider.generate()."""
+        return self._call("text", lambda provider: provider.generate(messages, config))
+    
+    def generate_with_image(
+        self,
+        prompt: str,
+        image_data: ImageData,
+        mime_type: MimeType = "image/png",
+        config: Optional[LLMConfig] = None,
+    ) -> LLMResponse:
+        """Hedged LLMProvider.generate_with_image()."""
+        return self._call(
+            "image", lambda provider: provider.generate_with_image(prompt, image_data, mime_type, config)
+        )
+    
+    async def agenerate(self, messages: List[Dict[str, Any]], config: Optional[LLMConfig] = None) -> LLMResponse:
+        """Hedged LLMProvider.agenerate()."""
+        return await self._acall("text", lambda provider: provider.agenerate(messages, config))
+    
+    async def agenerate_with_image(
+        self,
+        prompt: str,
+        image_data: ImageData,
+        mime_type: MimeType = "image/png",
+        config: Optional[LLMConfig] = None,
+    ) -> LLMResponse:
+        """Hedged LLMProvider.agenerate_with_image()."""
+        return await self._acall(
+            "image", lambda provider: provider.agenerate_with_image(prompt, image_data, mime_type, config)
+        )
+    
+    def _call(self, kind: str, call) -> LLMResponse:
+        task = latency_task(self.model, kind)
+        delay = hedging_policy.delay_for(task)
+        start = time.monotonic()
+        if delay is None:
+            response = call(self.provider)
+            latency_stats.record(task, time.monotonic() - start)
+            return response
+        
+        # Worker threads do not inherit the caller's phase (token accounting)
+        # or extractor (call metrics)
+        phase = usage_tracker.current_phase
+        extractor = _call_extractor.get()
+        
+        def run(provider):
+            usage_tracker.set_phase(phase)
+            with call_extractor(extractor):
+                return call(provider)
+        
+        executor = _get_hedge_executor()
+        primary = executor.submit(run, self.provider)
+        try:
+            response = primary.result(timeout=delay)
+        except FutureTimeoutError:
+            pass
+        else:
+            latency_stats.record(task, time.monotonic() - start)
+            return response
+        
+        _logger.info(f"Hedging {task} after {delay:.1f}s (p{hedging_policy.percentile * 100:.0f})")
+        hedging_policy.count("hedged")
+        hedge = executor.submit(run, self._hedge_target())
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    continue
+                for loser in pending:
+                    loser.cancel()
+                self._finish(task, start, future is hedge)
+                return future.result()
+        raise error
+    
+    async def _acall(self, kind: str, call) -> LLMResponse:
+        task = latency_task(self.model, kind)
+        delay = hedging_policy.delay_for(task)
+        start = time.monotonic()
+        if delay is None:
+            response = await call(self.provider)
+            latency_stats.record(task, time.monotonic() - start)
+            return response
+        
+        primary = asyncio.ensure_future(call(self.provider))
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done:
+                latency_stats.record(task, time.monotonic() - start)
+                return primary.result()
+            
+            _logger.info(f"Hedging {task} after {delay:.1f}s (p{hedging_policy.percentile * 100:.0f})")
+            hedging_policy.count("hedged")
+            hedge = asyncio.ensure_future(call(self._hedge_target()))
+            pending = {primary, hedge}
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task_future in done:
+                    if task_future.exception() is not None:
+                        error = error or task_future.exception()
+                        continue
+                    self._finish(task, start, task_future is hedge)
+                    return task_future.result()
+            raise error
+        finally:
+            for loser in pending:
+                loser.cancel()
+    
+    @staticmethod
+    def _finish(task: str, start: float, hedge_won: bool) -> None:
+        # When the hedge wins, the primary's own latency is unknown; the
+        # elapsed time is recorded as its lower bound
+        latency_stats.record(task, time.monotonic() - start)
+        if hedge_won:
+            hedging_policy.count("hedge_wins")
+
+
+
+def _continuation_messages(messages: List[Dict[str, Any]], content: str) -> List[Dict[str, Any]]:
+    """Original messages (cacheable prefix first), the truncated answer, and a request to continue."""
+    return list(messages) + [
+        {"role": "assistant", "content": content.rstrip()},
+        {"role": "user", "content": CONTINUATION_PROMPT},
+    ]
+
+
+def _continuation_config(config: LLMConfig) -> LLMConfig:
+    """
+    Config for continuation calls: without the JSON shape check, since a
+    continuation starts mid-document. The joined response is checked instead.
+    """
+    return replace(config, json_root=None, json_forbidden_keys=None)
+
+
+def _add_usage(total: Optional[Dict[str, int]], usage: Optional[Dict[str, int]]) -> Optional[Dict[str, int]]:
+    """Sum the usage dicts of a response and its continuations."""
+    if not usage:
+        return total
+    total = dict(total or {})
+    for key, value in usage.items():
+        if isinstance(value, int):
+            total[key] = total.get(key, 0) + value
+    return total
+
+
+def _continued_response(
+    content: str,
+    response: LLMResponse,
+    usage: Optional[Dict[str, int]],
+    continuations: int,
+    config: LLMConfig,
+) -> LLMResponse:
+    """
+    Final LLMResponse of a continued generation, closing JSON that is still truncated.
+    
+    Raises:
+        JSONShapeError: If the joined response does not have config's JSON shape
+    """
+    from core.json_stream import StreamingJSONParser
+    
+    parser = StreamingJSONParser()
+    parser.feed(content)
+    if parser.truncated:
+        partial = parser.partial_value()
+        if partial is not None:
+            _logger.warning(
+                f"Response still truncated after {continuations} continuation(s); "
+                f"keeping the {len(json.dumps(partial)):,} chars of complete JSON elements"
+            )
+            content = json.dumps(partial, ensure_ascii=False)
+    else:
+        _logger.info(f"Truncated response completed with {continuations} continuation(s)")
+    if config.validates_json_shape:
+        _json_stream_parser(config).feed(content)
+    
+    return LLMResponse(
+        content=content,
+        model=response.model,
+        usage=usage,
+        finish_reason=response.finish_reason,
+    )
+
+
+def generate_with_continuation(
+    provider: LLMProvider,
+    messages: List[Dict[str, Any]],
+    config: Optional[LLMConfig] = None,
+    max_continuations: int = DEFAULT_MAX_CONTINUATIONS,
+) -> LLMResponse:
+    """
+    Generate a JSON response, continuing it if it hits the output token limit.
+    
+    When the finish reason reports truncation, the model is shown its answer
+    so far and asked to continue; fragments are joined structurally (see
+    core.json_stream.join_json_continuation), so continuations that restart
+    the document, as JSON modes require, are merged rather than appended.
+    The cacheable prefix stays first, so continuations reuse the prompt cache.
+    A JSON shape check in config (json_root, json_forbidden_keys) applies to
+    the first response and to the joined one, not to the fragments.
+    
+    Args:
+        provider: Provider (or cached provider) to call
+        messages: Chat messages
+        config: Generation configuration
+        max_continuations: Maximum continuation requests (0 disables)
+    
+    Returns:
+        LLMResponse whose content joins the response and its continuations
+    """
+    config = config or LLMConfig()
+    response = provider.generate(messages, config)
+    if not (config.json_mode and response.truncated and max_continuations > 0):
+        return response
+    
+    from core.json_stream import StreamingJSONParser, join_json_continuation
+    
+    content = response.content
+    usage = response.usage
+    continuation_config = _continuation_config(config)
+    for attempt in range(1, max_continuations + 1):
+        _logger.info(f"Response truncated ({response.finish_reason}); requesting continuation {attempt}/{max_continuations}")
+        response = provider.generate(_continuation_messages(messages, content), continuation_config)
+        content = join_json_continuation(content, response.content)
+        usage = _add_usage(usage, response.usage)
+        
+        parser = StreamingJSONParser()
+        parser.feed(content)
+        if parser.complete or not response.truncated:
+            break
+    
+    return _continued_response(content, response, usage, attempt, config)
+
+
+async def agenerate_with_continuation(
+    provider: LLMProvider,
+    messages: List[Dict[str, Any]],
+    config: Optional[LLMConfig] = None,
+    max_continuations: int = DEFAULT_MAX_CONTINUATIONS,
+) -> LLMResponse:
+    """Async version of generate_with_continuation()."""
+    config = config or LLMConfig()
+    response = await provider.agenerate(messages, config)
+    if not (config.json_mode and response.truncated and max_continuations > 0):
+        return response
+    
+    from core.json_stream import StreamingJSONParser, join_json_continuation
+    
+    content = response.content
+    usage = response.usage
+    continuation_config = _continuation_config(config)
+    for attempt in range(1, max_continuations + 1):
+        _logger.info(f"Response truncated ({response.finish_reason}); requesting continuation {attempt}/{max_continuations}")
+        response = await provider.agenerate(_continuation_messages(messages, content), continuation_config)
+        content = join_json_continuation(content, response.content)
+        usage = _add_usage(usage, response.usage)
+        
+        parser = StreamingJSONParser()
+        parser.feed(content)
+        if parser.complete or not response.truncated:
+            break
+    
+    return _continued_response(content, response, usage, attempt, config)
@@ -32,11 +32,23 @@ logger = logging.getLogger(__name__)
 
 from extraction import run_from_files, PipelineConfig
 from core.constants import DEFAULT_MODEL
-from llm_providers import usage_tracker
+from core.page_images import clear_page_images
+from core.pdf_document import close_protocol_documents, configure_pdf_workers
+from core.pdf_cache import configure_pdf_cache
+from core.llm_cache import CACHE_MODES, configure_llm_cache, get_llm_cache_stats
+from core.model_router import configure_model_routing, model_router
+from core.prompt_compaction import configure_prompt_compaction
+from llm_providers import (
+    usage_tracker, provider_pool, rate_limiter, configure_rate_limits,
+    hedging_policy, configure_hedging, save_latency_stats, DEFAULT_LATENCY_STATS_PATH,
+    call_metrics,
+)
 
 # Import pipeline module (triggers phase registration)
 from pipeline import PipelineOrchestrator, phase_registry
 from pipeline.orchestrator import combine_to_full_usdm
+from pipeline.fingerprint import file_digest, outputs_match, save_fingerprint, soa_fingerprint
+from pipeline.run_manifest import FINAL_STEP_INPUTS, FINAL_STEPS, SOA_STEPS, RunManifest, load_saved_result
 from pipeline.phases import *  # noqa - triggers registration
 
 # Import validation functions from core module
@@ -102,8 +114,41 @@ Examples:
     conditional_group.add_argument("--sap", type=str, metavar="PATH", help="Path to SAP PDF")
     conditional_group.add_argument("--sites", type=str, metavar="PATH", help="Path to site list (CSV/Excel)")
     
+    # Performance
+    perf_group = parser.add_argument_group('Performance')
+    perf_group.add_argument("--no-pdf-cache", action="store_true", help="Do not use the on-disk PDF page text cache")
+    perf_group.add_argument("--pdf-cache-dir", type=str, metavar="DIR", help="PDF page text cache directory (default: ~/.cache/protocol2usdm/pdf_text)")
+    perf_group.add_argument("--no-soa-images", action="store_true", help="Keep rendered SoA page images in memory only (skip writing 3_soa_images/)")
+    perf_group.add_argument("--soa-image-mode", choices=["fixed", "adaptive", "tiled"], default="fixed", help="SoA image rendering: fixed 150 DPI pages, adaptive (crop + per-page DPI) or tiled (adaptive + overlapping tiles for wide tables)")
+    perf_group.add_argument("--pdf-workers", type=int, default=0, metavar="N", help="Worker processes for page text extraction on large PDFs (default: one per CPU, 1 = serial)")
+    perf_group.add_argument("--llm-cache", choices=CACHE_MODES, default="off", help="LLM response cache: read (use recorded responses), write (use and record), replay (recorded responses only; fail on any miss), collect (queue misses for a provider batch; see scripts/run_all_trials.py --batch)")
+    perf_group.add_argument("--llm-cache-path", type=str, metavar="FILE", help="LLM response cache file (default: ~/.cache/protocol2usdm/llm_responses.sqlite)")
+    perf_group.add_argument("--llm-batch-queue", type=str, metavar="FILE", help="Queue file for --llm-cache collect (default: next to the cache file)")
+    perf_group.add_argument("--llm-rpm", type=float, metavar="N", help="Requests-per-minute budget per model, shared by all parallel phases (default: per-provider)")
+    perf_group.add_argument("--llm-tpm", type=float, metavar="N", help="Tokens-per-minute budget per model, shared by all parallel phases (default: per-provider)")
+    perf_group.add_argument("--model-routing", action="store_true", help="Send cheap structured tasks (entity resolution, execution type, footnotes, abbreviations) to a small model; see model_routing in llm_config.yaml")
+    perf_group.add_argument("--no-prompt-compaction", action="store_true", help="Send page text as extracted (keep running headers/footers, whitespace and table rulings); input token budgets still apply")
+    perf_group.add_argument("--llm-hedge", action="store_true", help="Send a duplicate LLM request when a call runs past its task's p90 latency (learned from earlier runs); the first response wins")
+    perf_group.add_argument("--llm-hedge-model", type=str, metavar="MODEL", help="Send hedge duplicates to this model instead of the same one")
+    perf_group.add_argument("--llm-latency-stats", type=str, metavar="FILE", default=str(DEFAULT_LATENCY_STATS_PATH), help="Per-task LLM latency history used for hedging (default: ~/.cache/protocol2usdm/llm_latency.json)")
+    perf_group.add_argument("--incremental", action="store_true", help="Re-run only the SoA pipeline and phases whose inputs (PDF, pages, prompts/extractor code, model, task config, upstream data) changed since the last run into --output-dir, plus their dependents")
+    perf_group.add_argument("--resume", action="store_true", help="Restart an interrupted run into --output-dir from its first incomplete step (see run_manifest.json); completed steps keep their saved outputs")
+    perf_group.add_argument("--llm-cache-max-mb", type=int, default=1024, metavar="MB", help="Evict least-recently-used LLM cache entries beyond this size (default: 1024)")
+    
     args = parser.parse_args()
     
+    configure_pdf_cache(cache_dir=args.pdf_cache_dir, enabled=not args.no_pdf_cache)
+    configure_pdf_workers(args.pdf_workers)
+    if args.llm_rpm or args.llm_tpm:
+        configure_rate_limits(requests_per_minute=args.llm_rpm, tokens_per_minute=args.llm_tpm)
+    configure_model_routing(enabled=args.model_routing)
+    configure_prompt_compaction(enabled=not args.no_prompt_compaction)
+    configure_hedging(enabled=args.llm_hedge, fallback_model=args.llm_hedge_model,
+                      stats_path=args.llm_latency_stats)
+    configure_llm_cache(args.llm_cache, cache_path=args.llm_cache_path,
+                        max_bytes=args.llm_cache_max_mb * 1024 * 1024,
+                        batch_queue_path=args.llm_batch_queue)
+    
     # Handle --update-cache
     if args.update_cache:
         _handle_cache_update()
@@ -122,9 +167,14 @@ Examples:
     protocol_name = Path(args.pdf_path).stem
     if args.output_dir:
         output_dir = args.output_dir
+    elif args.resume:
+        logger.error("--resume needs the --output-dir of the run to resume")
+        sys.exit(1)
     else:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         output_dir = os.path.join("output", f"{protocol_name}_{timestamp}")
+        if args.incremental:
+            logger.warning("--incremental has no earlier outputs to reuse without --output-dir")
     
     # Parse page numbers
     soa_pages = None
@@ -143,6 +193,8 @@ Examples:
         remove_hallucinations=args.remove_hallucinations,
         hallucination_confidence_threshold=args.confidence_threshold,
         save_intermediate=True,
+        save_images=not args.no_soa_images,
+        image_mode=args.soa_image_mode,
     )
     
     # Determine if any specific phases were requested
@@ -192,52 +244,65 @@ Examples:
     
     os.makedirs(output_dir, exist_ok=True)
     
+    # Record completed steps in run_manifest.json; --resume skips those an
+    # earlier run of the same inputs completed
+    manifest = RunManifest(output_dir, inputs={
+        "pdf": file_digest(args.pdf_path),
+        "soaPages": soa_pages,
+        "config": vars(config),
+    }, resume=args.resume)
+    if manifest.resuming:
+        restart = manifest.first_incomplete(_planned_steps(args, config, soa_pages, phases_to_run, run_soa))
+        logger.info(f"Resuming run: {f'restarting at step {restart}' if restart else 'all steps completed'}")
+    
     # Run pipeline
     try:
         result = None
         soa_data = None
         
+        # With --parallel, SoA extraction runs as a node of the phase graph,
+        # alongside the expansion phases that do not use SoA data
+        overlap_soa = run_soa and run_any_expansion and args.parallel
+        
         # Run SoA extraction
-        if run_soa:
+        if run_soa and not overlap_soa:
             logger.info("\n" + "="*60)
             logger.info("SCHEDULE OF ACTIVITIES EXTRACTION")
             logger.info("="*60)
-            usage_tracker.set_phase("SoA_Extraction")
-            result = run_from_files(
-                pdf_path=args.pdf_path,
-                output_dir=output_dir,
-                soa_pages=soa_pages,
-                config=config,
-            )
-            
-            if result.success and result.output_path:
-                with open(result.output_path, 'r', encoding='utf-8') as f:
-                    soa_data = json.load(f)
-        else:
+            result, soa_data = _run_soa_extraction(args, output_dir, soa_pages, config, manifest)
+        elif not run_soa:
             existing_soa = os.path.join(output_dir, "9_final_soa.json")
             if os.path.exists(existing_soa):
                 logger.info(f"Loading existing SoA from {existing_soa}")
                 with open(existing_soa, 'r', encoding='utf-8') as f:
                     soa_data = json.load(f)
-        
-        # Add footnotes from header to soa_data
-        soa_data = _merge_header_footnotes(soa_data, output_dir, args.pdf_path)
-        
-        # Print SoA results
-        if result:
-            _print_soa_results(result)
+            
+            # Add footnotes from header to soa_data
+            soa_data = _merge_header_footnotes(soa_data, output_dir, args.pdf_path)
         
         # Run expansion phases using orchestrator
         expansion_results = {}
         if run_any_expansion:
             logger.info("\n" + "="*60)
-            logger.info("USDM EXPANSION PHASES")
+            logger.info("USDM EXPANSION PHASES" + (" + SCHEDULE OF ACTIVITIES" if overlap_soa else ""))
             logger.info("="*60)
             
-            orchestrator = PipelineOrchestrator(usage_tracker=usage_tracker)
+            orchestrator = PipelineOrchestrator(
+                usage_tracker=usage_tracker, incremental=args.incremental, manifest=manifest,
+            )
             
             if args.parallel:
                 logger.info(f"Parallel mode enabled (max {args.max_workers} workers)")
+                soa_run = {}
+                
+                def soa_runner():
+                    try:
+                        soa_run['result'], data = _run_soa_extraction(args, output_dir, soa_pages, config, manifest)
+                    except Exception as e:
+                        soa_run['error'] = e
+                        raise
+                    return data
+                
                 expansion_results = orchestrator.run_phases_parallel(
                     pdf_path=args.pdf_path,
                     output_dir=output_dir,
@@ -245,7 +310,13 @@ Examples:
                     phases_to_run=phases_to_run,
                     soa_data=soa_data,
                     max_workers=args.max_workers,
+                    soa_runner=soa_runner if overlap_soa else None,
                 )
+                if 'error' in soa_run:
+                    raise soa_run['error']
+                if overlap_soa:
+                    result = soa_run['result']
+                    soa_data = orchestrator.get_soa_data()
             else:
                 expansion_results = orchestrator.run_phases(
                     pdf_path=args.pdf_path,
@@ -263,7 +334,7 @@ Examples:
         
         # Run conditional source extraction
         expansion_results = _run_conditional_sources(
-            args, expansion_results, config, output_dir
+            args, expansion_results, config, output_dir, manifest
         )
         
         # Combine outputs
@@ -271,19 +342,35 @@ Examples:
         schema_validation_result = None
         schema_fixer_result = None
         usdm_result = None
+        schema_valid = None
         
-        if args.full_protocol or run_any_expansion or soa_data:
+        if ((args.full_protocol or run_any_expansion or soa_data)
+                and manifest.reusable('combine', after=FINAL_STEP_INPUTS['combine'])
+                and manifest.reusable('schema_fix', after=FINAL_STEP_INPUTS['schema_fix'])):
+            combined_usdm_path = os.path.join(output_dir, manifest.get('combine')['outputs'][0])
+            schema_valid = manifest.get('schema_fix').get('valid')
+            logger.info(f"\nCombine and schema validation completed in an earlier run, keeping {combined_usdm_path}")
+        elif args.full_protocol or run_any_expansion or soa_data:
             logger.info("\n" + "="*60)
             logger.info("COMBINING OUTPUTS")
             logger.info("="*60)
-            combined_data, combined_usdm_path = combine_to_full_usdm(
-                output_dir, soa_data, expansion_results, args.pdf_path
-            )
+            if manifest.reusable('combine', after=FINAL_STEP_INPUTS['combine']):
+                combined_usdm_path = os.path.join(output_dir, manifest.get('combine')['outputs'][0])
+                logger.info(f"  Combined in an earlier run, keeping {combined_usdm_path}")
+                with open(combined_usdm_path, 'r', encoding='utf-8') as f:
+                    combined_data = json.load(f)
+            else:
+                manifest.start('combine')
+                combined_data, combined_usdm_path = combine_to_full_usdm(
+                    output_dir, soa_data, expansion_results, args.pdf_path
+                )
+                manifest.complete('combine', outputs=[combined_usdm_path])
             
             # Schema validation
             logger.info("\n" + "="*60)
             logger.info("SCHEMA VALIDATION & AUTO-FIX")
             logger.info("="*60)
+            manifest.start('schema_fix')
             
             use_llm_for_fixes = not args.no_validate
             fixed_data, schema_validation_result, schema_fixer_result, usdm_result, id_map = validate_and_fix_schema(
@@ -306,16 +393,19 @@ Examples:
             
             # Save schema validation results
             _save_schema_validation(output_dir, schema_validation_result, schema_fixer_result, usdm_result)
+            if schema_validation_result is not None:
+                schema_valid = schema_validation_result.valid
+            manifest.complete('schema_fix', outputs=[combined_usdm_path, "schema_validation.json"], valid=schema_valid)
         
         # Run post-processing
         validation_target = combined_usdm_path or (result.output_path if result else None)
         if validation_target:
             _run_post_processing(args, validation_target, output_dir, config, 
-                               schema_validation_result, usdm_result)
+                               schema_validation_result, usdm_result, manifest)
             
             # Update computational execution status
-            if combined_usdm_path and args.validate_schema and schema_validation_result is not None:
-                _update_execution_status(combined_usdm_path, schema_validation_result)
+            if combined_usdm_path and args.validate_schema and schema_valid is not None:
+                _update_execution_status(combined_usdm_path, schema_valid)
         
         # Final summary
         _print_final_summary(result, expansion_results, schema_validation_result, 
@@ -326,7 +416,8 @@ Examples:
         soa_success = result.success if result else True
         expansion_success = all(r.success for k, r in expansion_results.items() 
                                if k != '_pipeline_context' and hasattr(r, 'success')) if expansion_results else True
-        sys.exit(0 if (soa_success and expansion_success) else 1)
+        cache_ok = _report_llm_cache(args.llm_cache)
+        sys.exit(0 if (soa_success and expansion_success and cache_ok) else 1)
         
     except Exception as e:
         logger.error(f"Pipeline failed: {e}")
@@ -334,6 +425,52 @@ Examples:
             import traceback
             traceback.print_exc()
         sys.exit(1)
+    finally:
+        save_latency_stats()
+        close_protocol_documents()
+        clear_page_images()
+
+
+def _planned_steps(args, config, soa_pages, phases_to_run, run_soa):
+    """Run manifest steps this run performs, in pipeline order."""
+    steps = []
+    if run_soa:
+        skipped = {'soa_pages'} if soa_pages else set()
+        if not config.validate_with_vision:
+            skipped.add('soa_validation')
+        steps += [step for step in SOA_STEPS if step not in skipped]
+    steps += [name for name, should_run in phases_to_run.items() if should_run]
+    steps += [source for source in ('sap', 'sites') if getattr(args, source)]
+    final = {
+        'combine': True,
+        'schema_fix': True,
+        'enrichment': args.enrich or args.soa or args.full_protocol,
+        'conformance': args.conformance or args.soa or args.full_protocol,
+    }
+    return steps + [step for step in FINAL_STEPS if final[step]]
+
+
+def _report_llm_cache(mode: str) -> bool:
+    """Log LLM response cache statistics; returns False if replay had misses."""
+    if mode == "off":
+        return True
+    stats = get_llm_cache_stats()
+    logger.info(
+        f"LLM cache ({mode}): {stats['hits']} hit(s), {stats['misses']} miss(es), "
+        f"{stats['writes']} recorded"
+    )
+    if mode == "collect":
+        logger.info(
+            f"Queued {stats['queued']} LLM call(s) for batch submission"
+            if stats['queued'] else "No LLM calls left to batch; outputs are complete"
+        )
+    if mode == "replay" and stats['misses']:
+        logger.error(
+            f"Replay run had {stats['misses']} LLM call(s) with no recorded response; "
+            f"outputs are incomplete. Re-record with --llm-cache write."
+        )
+        return False
+    return True
 
 
 def _handle_cache_update():
@@ -364,8 +501,12 @@ def _handle_cache_update():
         sys.exit(1)
 
 
-def _merge_header_footnotes(soa_data, output_dir, pdf_path):
-    """Merge footnotes from header structure into soa_data."""
+def _merge_header_footnotes(soa_data, output_dir, pdf_path, soa_pages=None):
+    """Merge footnotes from header structure into soa_data.
+    
+    soa_pages are the 0-indexed SoA pages of this run; when not given they
+    are recovered from the 3_soa_images/ filenames of a previous run.
+    """
     import re
     
     header_path = os.path.join(output_dir, "4_header_structure.json")
@@ -394,10 +535,10 @@ def _merge_header_footnotes(soa_data, output_dir, pdf_path):
             if marker_match:
                 vision_footnote_markers.add(marker_match.group(1))
         
-        # Find SoA pages
-        soa_pages_list = []
+        # Find SoA pages (1-indexed, as in the image filenames)
+        soa_pages_list = [p + 1 for p in soa_pages] if soa_pages else []
         soa_images_dir = os.path.join(output_dir, "3_soa_images")
-        if os.path.exists(soa_images_dir):
+        if not soa_pages_list and os.path.exists(soa_images_dir):
             for img_file in os.listdir(soa_images_dir):
                 page_match = re.search(r'page_(\d+)', img_file)
                 if page_match:
@@ -437,6 +578,53 @@ def _merge_header_footnotes(soa_data, output_dir, pdf_path):
     return soa_data
 
 
+def _run_soa_extraction(args, output_dir, soa_pages, config, manifest):
+    """Run the SoA pipeline; returns (pipeline result, SoA data with merged footnotes).
+    
+    With --incremental, a 9_final_soa.json produced from the same inputs is
+    kept, and with --resume one the interrupted run completed; the pipeline
+    result is then None. Otherwise a resumed run restarts at the first
+    incomplete SoA step.
+    """
+    fingerprint = soa_fingerprint(args.pdf_path, soa_pages, config)
+    final_soa = os.path.join(output_dir, "9_final_soa.json")
+    if args.incremental and outputs_match(final_soa, fingerprint):
+        logger.info(f"SoA inputs unchanged, keeping {final_soa}")
+    elif manifest.reusable('soa', after=()):
+        logger.info(f"SoA completed in an earlier run, keeping {final_soa}")
+    else:
+        final_soa = None
+    if final_soa:
+        with open(final_soa, 'r', encoding='utf-8') as f:
+            soa_data = json.load(f)
+        return None, _merge_header_footnotes(soa_data, output_dir, args.pdf_path)
+    
+    usage_tracker.set_phase("SoA_Extraction")
+    manifest.start('soa')
+    result = run_from_files(
+        pdf_path=args.pdf_path,
+        output_dir=output_dir,
+        soa_pages=soa_pages,
+        config=config,
+        manifest=manifest,
+    )
+    
+    soa_data = None
+    if result.success and result.output_path:
+        with open(result.output_path, 'r', encoding='utf-8') as f:
+            soa_data = json.load(f)
+        save_fingerprint(result.output_path, fingerprint)
+        manifest.complete('soa', outputs=[result.output_path])
+    
+    # Add footnotes from header to soa_data
+    soa_data = _merge_header_footnotes(
+        soa_data, output_dir, args.pdf_path, soa_pages=result.soa_pages,
+    )
+    
+    _print_soa_results(result)
+    return result, soa_data
+
+
 def _print_soa_results(result):
     """Print SoA extraction results."""
     print()
@@ -468,28 +656,40 @@ def _print_soa_results(result):
     logger.info("="*60)
 
 
-def _run_conditional_sources(args, expansion_results, config, output_dir):
-    """Run conditional source extraction (SAP, sites)."""
-    if args.sap:
+def _run_conditional_sources(args, expansion_results, config, output_dir, manifest):
+    """Run conditional source extraction (SAP, sites); a resumed run keeps completed ones."""
+    for source, filename, data_key in (('sap', "11_sap_populations.json", "sapData"),
+                                       ('sites', "12_study_sites.json", "sitesData")):
+        if getattr(args, source) and manifest.reusable(source, after=()):
+            saved = load_saved_result(os.path.join(output_dir, filename), data_key)
+            if saved is not None:
+                logger.info(f"\n--- Conditional: {source} completed in an earlier run, keeping {filename} ---")
+                expansion_results[source] = saved
+    
+    if args.sap and 'sap' not in expansion_results:
         logger.info("\n--- Conditional: SAP Analysis Populations ---")
+        manifest.start('sap')
         try:
             from extraction.conditional import extract_from_sap
             sap_result = extract_from_sap(args.sap, model=config.model_name, output_dir=output_dir)
             if sap_result.success:
                 expansion_results['sap'] = sap_result
+                manifest.complete('sap', outputs=["11_sap_populations.json"])
                 logger.info(f"  ✓ SAP extraction ({sap_result.data.to_dict()['summary']['populationCount']} populations)")
             else:
                 logger.warning(f"  ✗ SAP extraction failed: {sap_result.error}")
         except Exception as e:
             logger.warning(f"  ✗ SAP extraction error: {e}")
     
-    if args.sites:
+    if args.sites and 'sites' not in expansion_results:
         logger.info("\n--- Conditional: Study Sites ---")
+        manifest.start('sites')
         try:
             from extraction.conditional import extract_from_sites
             sites_result = extract_from_sites(args.sites, output_dir=output_dir)
             if sites_result.success:
                 expansion_results['sites'] = sites_result
+                manifest.complete('sites', outputs=["12_study_sites.json"])
                 logger.info(f"  ✓ Sites extraction ({sites_result.data.to_dict()['summary']['siteCount']} sites)")
             else:
                 logger.warning(f"  ✗ Sites extraction failed: {sites_result.error}")
@@ -530,14 +730,20 @@ def _save_schema_validation(output_dir, schema_validation_result, schema_fixer_r
 
 
 def _run_post_processing(args, validation_target, output_dir, config, 
-                        schema_validation_result, usdm_result):
-    """Run post-processing steps (enrichment, validation, conformance)."""
+                        schema_validation_result, usdm_result, manifest):
+    """Run post-processing steps (enrichment, validation, conformance).
+    
+    A resumed run skips the steps the interrupted run completed.
+    """
     run_enrich = args.enrich or args.soa or args.full_protocol
     run_validate = args.validate_schema or args.soa or args.full_protocol
     run_conform = args.conformance or args.soa or args.full_protocol
     
-    if run_enrich:
+    if run_enrich and manifest.reusable('enrichment', after=FINAL_STEP_INPUTS['enrichment']):
+        logger.info("\n--- Step 7: Terminology Enrichment (completed in an earlier run) ---")
+    elif run_enrich:
         logger.info("\n--- Step 7: Terminology Enrichment ---")
+        manifest.start('enrichment')
         from enrichment.terminology import enrich_terminology as enrich_fn, update_evs_cache
         
         if args.update_evs_cache:
@@ -552,9 +758,10 @@ def _run_post_processing(args, validation_target, output_dir, config,
             logger.info(f"  ✓ Enriched {enriched}/{total} entities with NCI codes")
         else:
             logger.info(f"  No entities required enrichment")
+        manifest.complete('enrichment', outputs=[validation_target])
     
     if run_validate:
-        if schema_validation_result is not None:
+        if schema_validation_result is not None or manifest.reusable('schema_fix', after=FINAL_STEP_INPUTS['schema_fix']):
             logger.info("\n--- Step 8: Schema Validation (already completed) ---")
             if usdm_result and usdm_result.valid:
                 logger.info(f"  ✓ Schema validation PASSED")
@@ -562,6 +769,7 @@ def _run_post_processing(args, validation_target, output_dir, config,
                 logger.warning(f"  Schema validation: {usdm_result.error_count} errors, {usdm_result.warning_count} warnings")
         else:
             logger.info("\n--- Step 8: Schema Validation ---")
+            manifest.start('schema_fix')
             with open(validation_target, 'r', encoding='utf-8') as f:
                 target_data = json.load(f)
             
@@ -576,12 +784,17 @@ def _run_post_processing(args, validation_target, output_dir, config,
                 logger.info(f"  ✓ Schema validation PASSED")
             else:
                 logger.warning(f"  Schema validation found issues")
+            manifest.complete('schema_fix', outputs=[validation_target])
     
-    if run_conform:
+    if run_conform and manifest.reusable('conformance', after=FINAL_STEP_INPUTS['conformance']):
+        logger.info("\n--- Step 9: CDISC Conformance (completed in an earlier run) ---")
+    elif run_conform:
         logger.info("\n--- Step 9: CDISC Conformance ---")
+        manifest.start('conformance')
         from validation.cdisc_conformance import run_cdisc_conformance as conform_fn
         conform_result = conform_fn(validation_target, output_dir)
         if conform_result.get('success'):
+            manifest.complete('conformance', outputs=["conformance_report.json"])
             issues = conform_result.get('issues', 0)
             warnings = conform_result.get('warnings', 0)
             if issues == 0 and warnings == 0:
@@ -594,7 +807,7 @@ def _run_post_processing(args, validation_target, output_dir, config,
             logger.warning(f"  ✗ CDISC CORE failed: {error_msg}")
 
 
-def _update_execution_status(combined_usdm_path, schema_validation_result):
+def _update_execution_status(combined_usdm_path, schema_valid):
     """Update computational execution status."""
     with open(combined_usdm_path, 'r', encoding='utf-8') as f:
         final_data = json.load(f)
@@ -603,7 +816,7 @@ def _update_execution_status(combined_usdm_path, schema_validation_result):
         final_data["computationalExecution"] = {}
     
     final_data["computationalExecution"]["validationStatus"] = \
-        "complete" if schema_validation_result.valid else "issues_found"
+        "complete" if schema_valid else "issues_found"
     
     with open(combined_usdm_path, 'w', encoding='utf-8') as f:
         json.dump(final_data, f, indent=2, ensure_ascii=False)
@@ -617,7 +830,9 @@ def _print_final_summary(result, expansion_results, schema_validation_result,
     logger.info("EXTRACTION COMPLETE")
     logger.info("="*60)
     
-    if run_soa:
+    if run_soa and result is None:
+        logger.info("SoA: ✓ Kept 9_final_soa.json from an earlier run")
+    elif run_soa:
         logger.info(f"SoA: {'✓ Success' if (result and result.success) else '✗ Failed'}")
     
     if run_any_expansion:
@@ -691,6 +906,50 @@ def _print_final_summary(result, expansion_results, schema_validation_result,
         with open(usage_file, 'w') as f:
             json.dump(usage_tracker.get_summary(), f, indent=2)
         logger.info(f"Token usage saved to: {usage_file}")
+        compaction = usage_tracker.get_summary().get("prompt_compaction")
+        if compaction:
+            logger.info(
+                f"Prompt compaction: {compaction['tokens_saved']:,} input tokens saved "
+                f"over {compaction['calls']} call(s)"
+                + (f", {compaction['truncated_calls']} cut to budget" if compaction['truncated_calls'] else "")
+            )
+        
+        metrics_file = os.path.join(output_dir, "llm_metrics.json")
+        call_metrics.save(metrics_file)
+        overall = call_metrics.get_summary()["overall"]
+        if overall["latency_seconds"]:
+            logger.info(
+                f"LLM call latency: p50 {overall['latency_seconds']['p50']:.1f}s, "
+                f"p95 {overall['latency_seconds']['p95']:.1f}s, max {overall['latency_seconds']['max']:.1f}s "
+                f"over {overall['calls']} call(s), {overall['retries']} rate limit retries"
+            )
+        logger.info(f"Per-call latency metrics saved to: {metrics_file}")
+        
+        routing_file = os.path.join(output_dir, "model_routing.json")
+        model_router.save(routing_file)
+        logger.info(f"Per-task model routing stats saved to: {routing_file}")
+        
+        pool_stats = provider_pool.get_stats()
+        logger.info(
+            f"LLM client pool: {pool_stats['created']} client(s) created, "
+            f"{pool_stats['reused']} reuse(s), "
+            f"~{pool_stats['estimated_saved_seconds']:.2f}s client setup saved"
+        )
+        
+        limiter_stats = rate_limiter.get_stats()
+        if limiter_stats['throttled'] or limiter_stats['rate_limited']:
+            logger.info(
+                f"LLM rate limiter: {limiter_stats['throttled']}/{limiter_stats['requests']} request(s) "
+                f"queued for {limiter_stats['wait_seconds']:.1f}s total, "
+                f"{limiter_stats['rate_limited']} rate limit error(s)"
+            )
+        
+        hedge_stats = hedging_policy.get_stats()
+        if hedge_stats['hedged']:
+            logger.info(
+                f"LLM hedging: {hedge_stats['hedged']} slow call(s) hedged, "
+                f"duplicate finished first {hedge_stats['hedge_wins']} time(s)"
+            )
 
 
 if __name__ == "__main__":
@@ -10,7 +10,7 @@ Each phase implements a common interface for:
 
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Callable
+from typing import Any, Dict, List, Optional, Callable, Tuple
 from extraction.pipeline_context import PipelineContext
 import logging
 
@@ -24,6 +24,7 @@ class PhaseResult:
     data: Any = None
     error: Optional[str] = None
     confidence: Optional[float] = None
+    reused: bool = False  # Inputs unchanged; output file from an earlier run kept
     
     def to_dict(self) -> dict:
         """Convert to dictionary for serialization."""
@@ -51,6 +52,16 @@ class PhaseConfig:
     requires_pdf: bool = True
     requires_soa: bool = False
     optional: bool = False  # If True, ImportError on extractor is OK
+    extraction_package: Optional[str] = None  # Prompts/extractor code, part of the input fingerprint
+    llm_tasks: Tuple[str, ...] = ()  # llm_config.yaml extractor names the phase calls
+    reusable: bool = True  # Saved output can stand in for an unchanged re-run (combine falls back to it)
+
+
+class _SavedOutput(dict):
+    """Saved phase output, usable where update_context expects result.data."""
+    
+    def to_dict(self) -> dict:
+        return dict(self)
 
 
 class BasePhase(ABC):
@@ -141,6 +152,19 @@ class BasePhase(ABC):
         """
         pass
     
+    def restore_context(self, context: PipelineContext, output_path: str) -> None:
+        """
+        Update pipeline context from a saved output file (when re-use skips extraction).
+        
+        Calls update_context with the saved data, so phases need no override.
+        """
+        import json
+        
+        with open(output_path, 'r', encoding='utf-8') as f:
+            saved = json.load(f).get(self.config.name.lower())
+        if isinstance(saved, dict) and saved:
+            self.update_context(context, PhaseResult(success=True, data=_SavedOutput(saved)))
+    
     def calculate_confidence(self, result: PhaseResult) -> Optional[float]:
         """
         Calculate confidence score for extraction results.
@@ -191,14 +215,23 @@ class BasePhase(ABC):
         context: PipelineContext,
         usage_tracker: Any = None,
         soa_data: Optional[dict] = None,
+        reuse_unchanged: bool = False,
+        keep_output: bool = False,
         **kwargs
     ) -> PhaseResult:
         """
         Full phase execution: extract, save, update context.
         
-        This is the main entry point called by the orchestrator.
+        This is the main entry point called by the orchestrator. Extraction
+        sees a snapshot of the context taken when the phase starts; results
+        are written to the live context. The output file is saved with a
+        fingerprint of the phase's inputs; with reuse_unchanged, a saved
+        output with the same fingerprint is kept instead of re-extracting.
+        With keep_output (resuming a run that completed the phase), the
+        saved output is kept as is.
         """
         import os
+        from .fingerprint import changed_inputs, phase_fingerprint, save_fingerprint
         
         config = self.config
         logger.info(f"\n--- Expansion: {config.display_name} (Phase {config.phase_number}) ---")
@@ -208,15 +241,38 @@ class BasePhase(ABC):
             usage_tracker.set_phase(config.name)
         
         try:
+            # Read from a consistent snapshot; phases running in parallel
+            # update the live context meanwhile
+            snapshot = context.snapshot()
+            
             # Get context parameters
-            context_params = self.get_context_params(context)
+            context_params = self.get_context_params(snapshot)
+            
+            output_path = os.path.join(output_dir, config.output_filename)
+            if keep_output:
+                logger.info(f"  ↺ {config.display_name} completed in an earlier run, keeping {config.output_filename}")
+                self.restore_context(context, output_path)
+                return PhaseResult(success=True, reused=True)
+            
+            try:
+                fingerprint = phase_fingerprint(self, pdf_path, model, context_params, soa_data)
+            except Exception as e:
+                logger.debug(f"  No input fingerprint for {config.display_name}: {e}")
+                fingerprint = None
+            if reuse_unchanged and config.reusable and fingerprint:
+                changed = changed_inputs(output_path, fingerprint)
+                if not changed:
+                    logger.info(f"  ↺ {config.display_name} inputs unchanged, keeping {config.output_filename}")
+                    self.restore_context(context, output_path)
+                    return PhaseResult(success=True, reused=True)
+                logger.info(f"  {config.display_name} re-run: changed {', '.join(changed)}")
             
             # Run extraction
             result = self.extract(
                 pdf_path=pdf_path,
                 model=model,
                 output_dir=output_dir,
-                context=context,
+                context=snapshot,
                 soa_data=soa_data,
                 **context_params,
                 **kwargs
@@ -227,8 +283,9 @@ class BasePhase(ABC):
                 result.confidence = self.calculate_confidence(result)
             
             # Save result
-            output_path = os.path.join(output_dir, config.output_filename)
             self.save_result(result, output_path)
+            if result.success and fingerprint:
+                save_fingerprint(output_path, fingerprint)
             
             # Update context
             if result.success and result.data:
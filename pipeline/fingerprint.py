@@ -0,0 +1,200 @@
+"""
+Input fingerprints for incremental re-runs.
+
+Each phase records a fingerprint of everything its output depends on next
+to its output file (2_study_metadata.json -> 2_study_metadata.fingerprint.json):
+
+- pdf: SHA-256 of the protocol PDF
+- pages: the page set given to the step, where it is chosen up front
+  (SoA --pages); phases pick their own pages from the PDF, so the PDF hash
+  covers those
+- code: digest of the extraction package's sources (prompt templates and
+  extractor code) and of the phase module
+- model and task_config: the model and its llm_config.yaml settings for
+  every LLM task the step runs
+- context: digest of the upstream data the step reads (pipeline context
+  parameters, and SoA data for phases that require it)
+
+With PipelineOrchestrator(incremental=True) a phase whose fingerprint
+matches its saved, successful output is not re-run.
+
+Usage:
+    from pipeline.fingerprint import outputs_match, save_fingerprint
+
+    if not outputs_match(output_path, fingerprint):
+        ...  # run the step, then
+        save_fingerprint(output_path, fingerprint)
+"""
+
+import hashlib
+import inspect
+import importlib
+import json
+import logging
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_SUFFIX = ".fingerprint.json"
+
+# Pipeline steps of the SoA extraction (run_from_files) and their LLM tasks
+SOA_MODULES = (
+    "extraction.pipeline", "extraction.soa_finder", "extraction.header_analyzer",
+    "extraction.text_extractor", "extraction.validator",
+)
+SOA_LLM_TASKS = ("soa_finder", "header_analyzer", "text_extractor", "soa_validator")
+
+
+def json_digest(data: Any) -> str:
+    """SHA-256 of a JSON-serializable value (objects via to_dict or str)."""
+    def default(obj):
+        return obj.to_dict() if hasattr(obj, "to_dict") else str(obj)
+    text = json.dumps(data, sort_keys=True, default=default, ensure_ascii=False)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@lru_cache(maxsize=32)
+def _file_digest(path: str, size: int, mtime_ns: int) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file (cached while its size and mtime are unchanged)."""
+    stat = os.stat(path)
+    return _file_digest(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+
+def _source_files(module_name: str) -> List[Path]:
+    """Python sources of a module, or of every module in a package."""
+    module = importlib.import_module(module_name)
+    path = Path(inspect.getfile(module))
+    if path.name == "__init__.py":
+        return sorted(path.parent.rglob("*.py"))
+    return [path]
+
+
+def source_digest(module_names: Iterable[str]) -> str:
+    """Digest of the source files of modules and packages."""
+    sha = hashlib.sha256()
+    for name in module_names:
+        for path in _source_files(name):
+            sha.update(path.name.encode("utf-8"))
+            sha.update(file_digest(str(path)).encode("ascii"))
+    return sha.hexdigest()
+
+
+def task_config_digest(llm_tasks: Iterable[str], model: str) -> str:
+    """Digest of the llm_config.yaml settings (and routed model) the tasks run with."""
+    from core.model_router import model_router
+    from extraction.llm_task_config import get_llm_task_config
+    return json_digest({
+        task: {**get_llm_task_config(task, model).to_dict(), "model": model_router.route(task, model)}
+        for task in sorted(llm_tasks)
+    })
+
+
+def phase_fingerprint(
+    phase: Any,
+    pdf_path: str,
+    model: str,
+    context_params: Dict[str, Any],
+    soa_data: Optional[dict] = None,
+) -> Dict[str, Any]:
+    """
+    Fingerprint of the inputs of one phase run.
+
+    Args:
+        phase: BasePhase instance
+        pdf_path: Path to protocol PDF
+        model: LLM model name
+        context_params: Parameters the phase reads from the pipeline context
+        soa_data: SoA data (part of the fingerprint if the phase requires SoA)
+    """
+    config = phase.config
+    modules = [type(phase).__module__]
+    if config.extraction_package:
+        modules.append(config.extraction_package)
+    upstream = {"context": context_params}
+    if config.requires_soa:
+        upstream["soa"] = soa_data
+    return {
+        "pdf": file_digest(pdf_path),
+        "code": source_digest(modules),
+        "model": model,
+        "task_config": task_config_digest(config.llm_tasks, model),
+        "context": json_digest(upstream),
+    }
+
+
+def soa_fingerprint(pdf_path: str, soa_pages: Optional[List[int]], config: Any) -> Dict[str, Any]:
+    """
+    Fingerprint of the inputs of the SoA pipeline (run_from_files).
+
+    Args:
+        pdf_path: Path to protocol PDF
+        soa_pages: SoA pages given on the command line (0-indexed), or None
+        config: PipelineConfig of the run
+    """
+    return {
+        "pdf": file_digest(pdf_path),
+        "pages": sorted(soa_pages) if soa_pages else None,
+        "code": source_digest(SOA_MODULES),
+        "model": config.model_name,
+        "task_config": task_config_digest(SOA_LLM_TASKS, config.model_name),
+        "context": json_digest(vars(config)),
+    }
+
+
+def fingerprint_path(output_path: str) -> str:
+    """Fingerprint file stored next to an output file."""
+    root, _ = os.path.splitext(output_path)
+    return root + FINGERPRINT_SUFFIX
+
+
+def save_fingerprint(output_path: str, fingerprint: Dict[str, Any]) -> None:
+    """Record the fingerprint of the inputs that produced output_path."""
+    with open(fingerprint_path(output_path), "w", encoding="utf-8") as f:
+        json.dump({"output": os.path.basename(output_path), "fingerprint": fingerprint}, f, indent=2)
+
+
+def load_fingerprint(output_path: str) -> Optional[Dict[str, Any]]:
+    """Fingerprint recorded for output_path, or None."""
+    try:
+        with open(fingerprint_path(output_path), "r", encoding="utf-8") as f:
+            return json.load(f).get("fingerprint")
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.debug(f"Ignoring unreadable fingerprint for {output_path}: {e}")
+        return None
+
+
+def changed_inputs(output_path: str, fingerprint: Dict[str, Any]) -> Tuple[str, ...]:
+    """
+    Inputs that differ from those recorded for output_path.
+
+    Returns ("output",) if the output is missing or failed, ("fingerprint",)
+    if none was recorded, else the changed fingerprint keys (empty: unchanged).
+    """
+    try:
+        with open(output_path, "r", encoding="utf-8") as f:
+            if not json.load(f).get("success", True):
+                return ("output",)
+    except (OSError, ValueError):
+        return ("output",)
+    recorded = load_fingerprint(output_path)
+    if recorded is None:
+        return ("fingerprint",)
+    return tuple(sorted(key for key in fingerprint.keys() | recorded.keys() if fingerprint.get(key) != recorded.get(key)))
+
+
+def outputs_match(output_path: str, fingerprint: Dict[str, Any]) -> bool:
+    """True if output_path is a successful output of exactly these inputs."""
+    return not changed_inputs(output_path, fingerprint)
@@ -7,28 +7,37 @@ registry-driven approach.
 Supports both sequential and parallel execution of phases.
 """
 
-from typing import Dict, List, Optional, Any, Set
+from typing import Callable, Dict, Optional, Any, Set
 from pathlib import Path
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 import json
 import os
+import time
 import logging
 
 from .phase_registry import phase_registry
 from .base_phase import BasePhase, PhaseResult
+from .phase_scheduler import (
+    DEFAULT_PHASE_DURATIONS_PATH, PhaseDurations, critical_path_lengths, ready_phases,
+)
+from .run_manifest import RunManifest
 from extraction.pipeline_context import PipelineContext, create_pipeline_context
 from extraction.conditional.ars_generator import generate_ars_from_sap
 
 logger = logging.getLogger(__name__)
 
+# SoA pipeline node, scheduled with the phases when run_phases_parallel gets a soa_runner
+SOA_PHASE = 'soa'
+
 # Phase dependency graph - phases that must complete before others can start
 # Format: phase_name -> set of phases it depends on
 PHASE_DEPENDENCIES = {
+    SOA_PHASE: set(),  # SoA find, render, header, text extraction, validation
     'metadata': set(),  # No dependencies
     'eligibility': {'metadata'},  # Uses indication/phase from metadata
     'objectives': {'metadata'},  # Uses indication/phase from metadata
-    'studydesign': set(),  # Uses SoA data (passed separately)
+    'studydesign': {SOA_PHASE},  # Uses SoA epochs/arms
     'interventions': {'metadata', 'studydesign'},  # Uses arms + indication
     'narrative': set(),  # Independent
     'advanced': set(),  # Independent
@@ -36,7 +45,7 @@ PHASE_DEPENDENCIES = {
     'scheduling': set(),  # Independent
     'docstructure': set(),  # Independent
     'amendmentdetails': set(),  # Independent
-    'execution': set(),  # Uses SoA data (passed separately)
+    'execution': {SOA_PHASE},  # Uses SoA data
 }
 
 
@@ -51,16 +60,36 @@ class PipelineOrchestrator:
     - Clean separation of extraction and combination
     """
     
-    def __init__(self, usage_tracker: Any = None):
+    def __init__(
+        self,
+        usage_tracker: Any = None,
+        durations_path: Optional[Path] = DEFAULT_PHASE_DURATIONS_PATH,
+        incremental: bool = False,
+        manifest: Optional[RunManifest] = None,
+    ):
         """
         Initialize orchestrator.
         
         Args:
             usage_tracker: Optional token usage tracker
+            durations_path: Phase duration history used to prioritize parallel
+                phases, updated after each run (None: not persisted)
+            incremental: Keep the saved output of phases whose input
+                fingerprint is unchanged (see pipeline.fingerprint); phases
+                depending on a re-run phase always re-run
+            manifest: Run manifest recording completed phases; when resuming,
+                phases it records as completed keep their saved output
         """
         self.usage_tracker = usage_tracker
+        self.incremental = incremental
+        self.manifest = manifest
         self._results: Dict[str, PhaseResult] = {}
         self._pipeline_context: Optional[PipelineContext] = None
+        self._soa_data: Optional[dict] = None
+        self.durations_path = Path(durations_path) if durations_path else None
+        self.phase_durations = PhaseDurations()
+        if self.durations_path is not None:
+            self.phase_durations.load(self.durations_path)
     
     def run_phases(
         self,
@@ -93,6 +122,7 @@ class PipelineOrchestrator:
         logger.info(f"Pipeline context: {pipeline_context.get_summary()}")
         
         results = {}
+        rerun: Set[str] = set()
         
         # Run each requested phase in registry order
         for phase in phase_registry.get_all():
@@ -103,16 +133,26 @@ class PipelineOrchestrator:
                 continue
             
             # Run the phase
-            result = phase.run(
+            result = self._run_timed(
+                phase_name,
+                phase.run,
                 pdf_path=pdf_path,
                 model=model,
                 output_dir=output_dir,
                 context=pipeline_context,
                 usage_tracker=self.usage_tracker,
                 soa_data=soa_data,
+                reuse_unchanged=self._may_reuse(phase_name, rerun),
+                keep_output=self._start_phase(phase_name),
             )
             
             results[phase_name] = result
+            if not result.reused:
+                rerun.add(phase_name)
+            self._record_phase(phase_name, result)
+        
+        self._log_reused(results)
+        self._save_phase_durations()
         
         # Store pipeline context in results for downstream use
         results['_pipeline_context'] = pipeline_context
@@ -129,11 +169,19 @@ class PipelineOrchestrator:
         soa_data: Optional[dict] = None,
         pipeline_context: Optional[PipelineContext] = None,
         max_workers: int = 4,
+        soa_runner: Optional[Callable[[], Optional[dict]]] = None,
     ) -> Dict[str, PhaseResult]:
         """
         Run extraction phases with parallel execution where possible.
         
-        Phases are grouped by dependency level and run in parallel within each level.
+        Each phase starts as soon as the phases it depends on have finished.
+        When more phases are ready than workers are free, the phase heading
+        the longest remaining chain of work (by recorded durations) starts first.
+        
+        With soa_runner, SoA extraction is itself a node of the graph: phases
+        that do not use SoA data run alongside it, and those that do
+        (studydesign, execution and their dependents) start once it returns,
+        with its data passed in and added to the pipeline context.
         
         Args:
             pdf_path: Path to protocol PDF
@@ -143,6 +191,8 @@ class PipelineOrchestrator:
             soa_data: Optional SoA extraction data
             pipeline_context: Optional existing pipeline context
             max_workers: Maximum parallel workers (default: 4)
+            soa_runner: Runs SoA extraction and returns its data (or None);
+                its result is available from get_soa_data() afterwards
             
         Returns:
             Dict of phase_name -> PhaseResult
@@ -151,6 +201,7 @@ class PipelineOrchestrator:
         if pipeline_context is None:
             pipeline_context = create_pipeline_context(soa_data)
         self._pipeline_context = pipeline_context
+        self._soa_data = soa_data
         
         logger.info(f"Pipeline context: {pipeline_context.get_summary()}")
         
@@ -159,6 +210,8 @@ class PipelineOrchestrator:
             name for name, should_run in phases_to_run.items() 
             if should_run and phase_registry.has(name)
         }
+        if soa_runner is not None:
+            requested_phases.add(SOA_PHASE)
         
         if not requested_phases:
             logger.info("No phases requested")
@@ -166,94 +219,132 @@ class PipelineOrchestrator:
         
         results = {}
         completed: Set[str] = set()
+        rerun: Set[str] = set()
+        pending = set(requested_phases)
+        running: Dict[Future, str] = {}
         
-        # Build execution waves based on dependencies
-        waves = self._build_execution_waves(requested_phases)
-        logger.info(f"Parallel execution: {len(waves)} waves for {len(requested_phases)} phases")
+        priority = critical_path_lengths(requested_phases, PHASE_DEPENDENCIES, self.phase_durations.estimate)
+        order = {name: i for i, name in enumerate(phase_registry.get_names())}
+        logger.info(
+            f"Parallel execution: {len(requested_phases)} phases, up to {max_workers} at a time "
+            f"(critical path ~{max(priority.values()):.0f}s)"
+        )
         
-        for wave_num, wave_phases in enumerate(waves, 1):
-            if len(wave_phases) == 1:
-                # Single phase - run directly
-                phase_name = list(wave_phases)[0]
-                phase = phase_registry.get(phase_name)
-                if phase:
-                    result = phase.run(
-                        pdf_path=pdf_path,
-                        model=model,
-                        output_dir=output_dir,
-                        context=pipeline_context,
-                        usage_tracker=self.usage_tracker,
-                        soa_data=soa_data,
-                    )
-                    results[phase_name] = result
-                    completed.add(phase_name)
-            else:
-                # Multiple phases - run in parallel
-                logger.info(f"  Wave {wave_num}: Running {len(wave_phases)} phases in parallel: {wave_phases}")
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="phase") as executor:
+            while pending or running:
+                ready = ready_phases(pending, completed, requested_phases, PHASE_DEPENDENCIES)
+                if not ready and not running:
+                    # No phases ready - break dependency cycle by running all remaining
+                    logger.warning(f"Breaking dependency cycle, running remaining: {pending}")
+                    ready = list(pending)
+                ready.sort(key=lambda name: (-priority[name], order.get(name, 0)))
                 
-                with ThreadPoolExecutor(max_workers=min(max_workers, len(wave_phases))) as executor:
-                    futures = {}
-                    for phase_name in wave_phases:
-                        phase = phase_registry.get(phase_name)
-                        if phase:
-                            future = executor.submit(
-                                phase.run,
-                                pdf_path=pdf_path,
-                                model=model,
-                                output_dir=output_dir,
-                                context=pipeline_context,
-                                usage_tracker=self.usage_tracker,
-                                soa_data=soa_data,
-                            )
-                            futures[future] = phase_name
-                    
-                    # Collect results as they complete
-                    for future in as_completed(futures):
-                        phase_name = futures[future]
-                        try:
-                            result = future.result()
-                            results[phase_name] = result
-                            completed.add(phase_name)
-                        except Exception as e:
-                            logger.error(f"Phase {phase_name} failed: {e}")
+                # Submit only into free workers so the priority order holds
+                for phase_name in ready[:max(0, max_workers - len(running))]:
+                    pending.discard(phase_name)
+                    if phase_name == SOA_PHASE:
+                        future = executor.submit(self._run_timed, SOA_PHASE, soa_runner)
+                    else:
+                        future = executor.submit(
+                            self._run_timed,
+                            phase_name,
+                            phase_registry.get(phase_name).run,
+                            pdf_path=pdf_path,
+                            model=model,
+                            output_dir=output_dir,
+                            context=pipeline_context,
+                            usage_tracker=self.usage_tracker,
+                            soa_data=self._soa_data,
+                            reuse_unchanged=self._may_reuse(phase_name, rerun),
+                            keep_output=self._start_phase(phase_name),
+                        )
+                    running[future] = phase_name
+                    if len(running) > 1:
+                        others = sorted(name for name in running.values() if name != phase_name)
+                        logger.info(f"  Started {phase_name} alongside {others}")
+                
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    phase_name = running.pop(future)
+                    completed.add(phase_name)
+                    try:
+                        if phase_name == SOA_PHASE:
+                            # Phases started from now on see the SoA data
+                            self._soa_data = future.result()
+                            pipeline_context.update_from_soa(self._soa_data)
+                        else:
+                            results[phase_name] = future.result()
+                            if not results[phase_name].reused:
+                                rerun.add(phase_name)
+                            self._record_phase(phase_name, results[phase_name])
+                    except Exception as e:
+                        logger.error(f"Phase {phase_name} failed: {e}")
+                        if phase_name != SOA_PHASE:
                             results[phase_name] = PhaseResult(success=False, error=str(e))
-                            completed.add(phase_name)
+                            rerun.add(phase_name)
         
+        self._log_reused(results)
+        self._save_phase_durations()
         results['_pipeline_context'] = pipeline_context
         self._results = results
         
         return results
     
-    def _build_execution_waves(self, requested_phases: Set[str]) -> List[Set[str]]:
+    def _run_timed(self, phase_name: str, run: Callable[..., Any], **kwargs) -> Any:
+        """Run a phase and record its duration (unless its saved output was reused)."""
+        start = time.monotonic()
+        result = run(**kwargs)
+        if not getattr(result, 'reused', False):
+            self.phase_durations.record(phase_name, time.monotonic() - start)
+        return result
+    
+    def _may_reuse(self, phase_name: str, rerun: Set[str]) -> bool:
         """
-        Build execution waves based on phase dependencies.
+        True if a phase may keep its saved output when its inputs are unchanged.
         
-        Returns list of sets, where each set contains phases that can run in parallel.
+        Phases depending on one re-run in this invocation re-run too. SoA is
+        re-extracted whenever it runs, so its data is compared by content
+        (part of the fingerprint) instead.
         """
-        waves = []
-        remaining = set(requested_phases)
-        completed: Set[str] = set()
-        
-        while remaining:
-            # Find phases whose dependencies are all satisfied
-            ready = set()
-            for phase in remaining:
-                deps = PHASE_DEPENDENCIES.get(phase, set())
-                # Only consider dependencies that are in requested_phases
-                relevant_deps = deps & requested_phases
-                if relevant_deps <= completed:
-                    ready.add(phase)
-            
-            if not ready:
-                # No phases ready - break dependency cycle by running all remaining
-                logger.warning(f"Breaking dependency cycle, running remaining: {remaining}")
-                ready = remaining.copy()
-            
-            waves.append(ready)
-            completed.update(ready)
-            remaining -= ready
+        return self.incremental and not (PHASE_DEPENDENCIES.get(phase_name, set()) & rerun)
+    
+    def _start_phase(self, phase_name: str) -> bool:
+        """
+        True if a resumed run keeps the phase's saved output; otherwise the
+        phase is marked as running in the manifest.
         
-        return waves
+        A phase is kept when the manifest records it as completed and none
+        of the phases it depends on ran again in this invocation. A completed
+        phase whose saved output cannot be restored (config.reusable False)
+        is extracted again, but is not marked as running: its inputs are
+        unchanged, so the steps building on it stay reusable.
+        """
+        if self.manifest is None:
+            return False
+        if self.manifest.reusable(phase_name, after=PHASE_DEPENDENCIES.get(phase_name, set())):
+            return phase_registry.get(phase_name).config.reusable
+        self.manifest.start(phase_name)
+        return False
+    
+    def _record_phase(self, phase_name: str, result: PhaseResult) -> None:
+        """Record a successful phase in the run manifest."""
+        if self.manifest is not None and result.success:
+            output_filename = phase_registry.get(phase_name).config.output_filename
+            self.manifest.complete(phase_name, outputs=[output_filename])
+    
+    def _log_reused(self, results: Dict[str, PhaseResult]) -> None:
+        reused = sorted(name for name, result in results.items() if result.reused)
+        if reused:
+            logger.info(f"Kept saved output of {len(reused)} phase(s): {', '.join(reused)}")
+    
+    def _save_phase_durations(self) -> None:
+        """Persist phase durations for scheduling later runs."""
+        if self.durations_path is None:
+            return
+        try:
+            self.phase_durations.save(self.durations_path)
+        except OSError as e:
+            logger.warning(f"Could not save phase durations to {self.durations_path}: {e}")
     
     def get_results(self) -> Dict[str, PhaseResult]:
         """Get all phase results."""
@@ -262,6 +353,10 @@ class PipelineOrchestrator:
     def get_pipeline_context(self) -> Optional[PipelineContext]:
         """Get the pipeline context."""
         return self._pipeline_context
+    
+    def get_soa_data(self) -> Optional[dict]:
+        """Get the SoA data phases ran with (from soa_runner, if one was given)."""
+        return self._soa_data
 
 
 def load_previous_extractions(output_dir: str) -> dict:
@@ -0,0 +1,143 @@
+"""
+Dependency-driven scheduling of extraction phases.
+
+PipelineOrchestrator.run_phases_parallel starts each phase as soon as the
+phases it depends on (PHASE_DEPENDENCIES) have finished, instead of waiting
+for a whole dependency level. When more phases are ready than there are
+free workers, the one heading the longest remaining chain of work
+(critical path) goes first. Chain lengths come from phase durations
+recorded by earlier runs, persisted like the LLM latency statistics.
+
+Usage:
+    from pipeline.phase_scheduler import PhaseDurations, critical_path_lengths
+
+    durations = PhaseDurations()
+    durations.load(DEFAULT_PHASE_DURATIONS_PATH)
+    priority = critical_path_lengths({"metadata", "eligibility"}, PHASE_DEPENDENCIES, durations.estimate)
+"""
+
+import json
+import os
+import threading
+import logging
+from collections import deque
+from pathlib import Path
+from typing import Callable, Deque, Dict, Iterable, List, Set
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PHASE_DURATIONS_PATH = Path.home() / ".cache" / "protocol2usdm" / "phase_durations.json"
+
+# Recent durations kept per phase
+DURATION_WINDOW = 10
+# Assumed duration of a phase with no recorded runs
+DEFAULT_PHASE_SECONDS = 60.0
+
+
+class PhaseDurations:
+    """
+    Recent wall-clock durations of extraction phases, persisted across runs.
+
+    The estimate for a phase is the median of its last DURATION_WINDOW runs.
+    """
+
+    def __init__(self, window: int = DURATION_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, phase: str, seconds: float) -> None:
+        """Record the duration of one phase run."""
+        with self._lock:
+            samples = self._samples.get(phase)
+            if samples is None:
+                samples = self._samples[phase] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def estimate(self, phase: str) -> float:
+        """Expected duration of a phase in seconds (DEFAULT_PHASE_SECONDS without history)."""
+        with self._lock:
+            samples = sorted(self._samples.get(phase, ()))
+        if not samples:
+            return DEFAULT_PHASE_SECONDS
+        return samples[len(samples) // 2]
+
+    def load(self, path: Path) -> int:
+        """Merge durations saved by an earlier run; returns the number of phases loaded."""
+        try:
+            data = json.loads(Path(path).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable phase durations {path}: {e}")
+            return 0
+        phases = data.get("phases", {})
+        with self._lock:
+            for phase, samples in phases.items():
+                merged = deque(samples, maxlen=self.window)
+                merged.extend(self._samples.get(phase, ()))
+                self._samples[phase] = merged
+        return len(phases)
+
+    def save(self, path: Path) -> None:
+        """Write all durations to path (atomically)."""
+        path = Path(path)
+        with self._lock:
+            data = {"version": 1, "phases": {phase: list(samples) for phase, samples in self._samples.items()}}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+
+def critical_path_lengths(
+    phases: Set[str],
+    dependencies: Dict[str, Set[str]],
+    estimate: Callable[[str], float],
+) -> Dict[str, float]:
+    """
+    Length of the longest chain of work starting at each phase.
+
+    A phase's length is its own estimated duration plus the longest length
+    among the requested phases that depend on it.
+
+    Args:
+        phases: Phases being run
+        dependencies: phase -> phases it depends on
+        estimate: Expected duration of a phase
+
+    Returns:
+        Dict of phase -> critical path length in seconds
+    """
+    dependents: Dict[str, List[str]] = {phase: [] for phase in phases}
+    for phase in phases:
+        for dep in dependencies.get(phase, set()) & phases:
+            dependents[dep].append(phase)
+
+    lengths: Dict[str, float] = {}
+
+    def length(phase: str, visiting: Set[str]) -> float:
+        if phase in lengths:
+            return lengths[phase]
+        visiting = visiting | {phase}
+        # Dependents already on the current chain form a cycle; ignore them
+        tail = max((length(d, visiting) for d in dependents[phase] if d not in visiting), default=0.0)
+        lengths[phase] = estimate(phase) + tail
+        return lengths[phase]
+
+    for phase in phases:
+        length(phase, set())
+    return lengths
+
+
+def ready_phases(
+    pending: Iterable[str],
+    completed: Set[str],
+    requested: Set[str],
+    dependencies: Dict[str, Set[str]],
+) -> List[str]:
+    """Pending phases whose requested dependencies have all completed."""
+    return [
+        phase for phase in pending
+        if dependencies.get(phase, set()) & requested <= completed
+    ]
@@ -16,6 +16,8 @@ class AdvancedPhase(BasePhase):
             display_name="Advanced Entities",
             phase_number=8,
             output_filename="8_advanced_entities.json",
+            extraction_package="extraction.advanced",
+            llm_tasks=("advanced",),
         )
     
     def extract(
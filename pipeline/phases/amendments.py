@@ -20,6 +20,8 @@ class AmendmentDetailsPhase(BasePhase):
             phase_number=13,
             output_filename="14_amendment_details.json",
             optional=True,
+            extraction_package="extraction.amendments",
+            llm_tasks=("amendments",),
         )
     
     def extract(
@@ -60,11 +62,14 @@ class AmendmentDetailsPhase(BasePhase):
         previous_extractions: dict,
     ) -> None:
         """Add amendment details to combined."""
-        if not (result.success and result.data):
+        if result.success and result.data:
+            data_dict = result.data.to_dict()
+        elif previous_extractions.get('amendmentdetails', {}).get('amendmentdetails'):
+            # Fallback to previously extracted amendment details
+            data_dict = previous_extractions['amendmentdetails']['amendmentdetails']
+        else:
             return
         
-        data_dict = result.data.to_dict()
-        
         if data_dict.get('studyAmendmentImpacts'):
             combined["studyAmendmentImpacts"] = data_dict['studyAmendmentImpacts']
         if data_dict.get('studyAmendmentReasons'):
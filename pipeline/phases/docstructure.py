@@ -20,6 +20,8 @@ class DocStructurePhase(BasePhase):
             phase_number=12,
             output_filename="13_document_structure.json",
             optional=True,
+            extraction_package="extraction.document_structure",
+            llm_tasks=("document_structure",),
         )
     
     def extract(
@@ -60,11 +62,14 @@ class DocStructurePhase(BasePhase):
         previous_extractions: dict,
     ) -> None:
         """Add document structure to combined."""
-        if not (result.success and result.data):
+        if result.success and result.data:
+            data_dict = result.data.to_dict()
+        elif previous_extractions.get('docstructure', {}).get('docstructure'):
+            # Fallback to previously extracted document structure
+            data_dict = previous_extractions['docstructure']['docstructure']
+        else:
             return
         
-        data_dict = result.data.to_dict()
-        
         if data_dict.get('documentContentReferences'):
             combined["documentContentReferences"] = data_dict['documentContentReferences']
         if data_dict.get('commentAnnotations'):
@@ -16,6 +16,8 @@ class EligibilityPhase(BasePhase):
             display_name="Eligibility Criteria",
             phase_number=1,
             output_filename="3_eligibility_criteria.json",
+            extraction_package="extraction.eligibility",
+            llm_tasks=("eligibility",),
         )
     
     def get_context_params(self, context: PipelineContext) -> dict:
@@ -20,6 +20,24 @@ class ExecutionPhase(BasePhase):
             phase_number=14,
             output_filename="11_execution_model.json",
             requires_soa=True,
+            extraction_package="extraction.execution",
+            llm_tasks=(
+                "time_anchor",
+                "repetition",
+                "sampling_density",
+                "execution_type",
+                "crossover",
+                "traversal",
+                "footnote_condition",
+                "endpoint",
+                "derived_variable",
+                "state_machine",
+                "dosing_regimen",
+                "visit_window",
+                "stratification",
+                "entity_resolver",
+            ),
+            reusable=False,  # combine needs the ExecutionModelData object
         )
     
     def extract(
@@ -17,6 +17,8 @@ class InterventionsPhase(BasePhase):
             display_name="Interventions",
             phase_number=5,
             output_filename="6_interventions.json",
+            extraction_package="extraction.interventions",
+            llm_tasks=("interventions",),
         )
     
     def get_context_params(self, context: PipelineContext) -> dict:
@@ -16,6 +16,8 @@ class MetadataPhase(BasePhase):
             display_name="Study Metadata",
             phase_number=2,
             output_filename="2_study_metadata.json",
+            extraction_package="extraction.metadata",
+            llm_tasks=("metadata",),
         )
     
     def extract(
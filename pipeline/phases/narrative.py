@@ -16,6 +16,8 @@ class NarrativePhase(BasePhase):
             display_name="Narrative Structure",
             phase_number=7,
             output_filename="7_narrative_structure.json",
+            extraction_package="extraction.narrative",
+            llm_tasks=("narrative", "abbreviations"),
         )
     
     def extract(
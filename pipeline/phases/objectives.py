@@ -16,6 +16,8 @@ class ObjectivesPhase(BasePhase):
             display_name="Objectives & Endpoints",
             phase_number=3,
             output_filename="4_objectives_endpoints.json",
+            extraction_package="extraction.objectives",
+            llm_tasks=("objectives",),
         )
     
     def get_context_params(self, context: PipelineContext) -> dict:
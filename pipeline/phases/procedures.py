@@ -20,6 +20,8 @@ class ProceduresPhase(BasePhase):
             phase_number=10,
             output_filename="9_procedures_devices.json",
             optional=True,  # Module may not exist
+            extraction_package="extraction.procedures",
+            llm_tasks=("procedures",),
         )
     
     def extract(
@@ -63,10 +65,13 @@ class ProceduresPhase(BasePhase):
         previous_extractions: dict,
     ) -> None:
         """Add procedures to studyDesign and link to activities where possible."""
-        if not (result.success and result.data):
+        if result.success and result.data:
+            data_dict = result.data.to_dict()
+        elif previous_extractions.get('procedures', {}).get('procedures'):
+            # Fallback to previously extracted procedures
+            data_dict = previous_extractions['procedures']['procedures']
+        else:
             return
-        
-        data_dict = result.data.to_dict()
         procedures_list = data_dict.get('procedures', [])
         
         # Always add procedures to studyDesign.procedures first
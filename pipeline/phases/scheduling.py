@@ -20,6 +20,8 @@ class SchedulingPhase(BasePhase):
             phase_number=11,
             output_filename="10_scheduling_logic.json",
             optional=True,
+            extraction_package="extraction.scheduling",
+            llm_tasks=("scheduling",),
         )
     
     def extract(
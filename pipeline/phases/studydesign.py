@@ -17,6 +17,8 @@ class StudyDesignPhase(BasePhase):
             display_name="Study Design",
             phase_number=4,
             output_filename="5_study_design.json",
+            extraction_package="extraction.studydesign",
+            llm_tasks=("studydesign",),
         )
     
     def get_context_params(self, context: PipelineContext) -> dict:
@@ -0,0 +1,200 @@
+"""
+Run manifest for checkpointing and resuming a pipeline run.
+
+Every run records the steps it has completed in run_manifest.json in its
+output directory, as they complete:
+
+- SoA sub-steps: soa_pages, soa_header, soa_text, soa_validation, and soa
+  for the final 9_final_soa.json
+- each expansion phase, under its phase name
+- conditional sources: sap, sites
+- combine, schema_fix, enrichment, conformance
+
+A step is recorded with the output files it wrote (relative to the output
+directory) and any step-specific values. With --resume, a step whose
+record and outputs are present is skipped and its saved outputs are used,
+unless a step it builds on had to run again; the run thus restarts from
+its first incomplete step. A completed phase whose saved output cannot be
+restored (execution) is extracted again without invalidating the steps
+built on it. Resuming requires the same protocol PDF, model and SoA pages;
+otherwise the run starts from scratch.
+
+Usage:
+    from pipeline.run_manifest import RunManifest
+
+    manifest = RunManifest(output_dir, inputs, resume=True)
+    if manifest.reusable("combine"):
+        ...  # load protocol_usdm.json
+    else:
+        manifest.start("combine")
+        ...  # combine, then
+        manifest.complete("combine", outputs=["protocol_usdm.json"])
+"""
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+from .base_phase import PhaseResult, _SavedOutput
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "run_manifest.json"
+
+# SoA pipeline steps, in order (see extraction.pipeline.run_from_files)
+SOA_STEPS = ("soa_pages", "soa_header", "soa_text", "soa_validation", "soa")
+# Steps after the expansion phases, in order
+FINAL_STEPS = ("combine", "schema_fix", "enrichment", "conformance")
+# Steps each final step builds on (None: every step before it). A SoA-only
+# run post-processes 9_final_soa.json without combining, and enriches it
+# before schema validation, so both orders are covered.
+FINAL_STEP_INPUTS = {
+    "combine": None,
+    "schema_fix": ("soa", "combine", "enrichment"),
+    "enrichment": ("soa", "combine", "schema_fix"),
+    "conformance": ("soa", "combine", "schema_fix", "enrichment"),
+}
+
+
+class RunManifest:
+    """
+    Completed steps of a pipeline run, saved to run_manifest.json after each step.
+
+    Steps may complete concurrently (parallel phases); all methods are
+    thread-safe.
+    """
+
+    def __init__(self, output_dir: str, inputs: Optional[Dict[str, Any]] = None, resume: bool = False):
+        """
+        Args:
+            output_dir: Output directory of the run
+            inputs: Values a resumed run must share with the recorded one
+                (e.g. PDF digest, model, SoA pages)
+            resume: Load the steps completed by an earlier run into output_dir
+        """
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, MANIFEST_FILENAME)
+        self.inputs = inputs or {}
+        self.resuming = False
+        self._lock = threading.Lock()
+        self._steps: Dict[str, Dict[str, Any]] = {}
+        self._ran = set()
+        if resume:
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            logger.warning(f"No {MANIFEST_FILENAME} in {self.output_dir}; starting from the beginning")
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable {self.path}: {e}")
+            return
+        if data.get("inputs") != self.inputs:
+            changed = sorted(k for k in self.inputs.keys() | data.get("inputs", {}).keys()
+                             if self.inputs.get(k) != data.get("inputs", {}).get(k))
+            logger.warning(f"Cannot resume: {', '.join(changed)} changed since the recorded run; "
+                           f"starting from the beginning")
+            return
+        self._steps = data.get("steps", {})
+        self.resuming = True
+
+    def _save(self) -> None:
+        """Write the manifest (atomically); caller holds the lock."""
+        data = {"version": 1, "inputs": self.inputs, "steps": self._steps}
+        os.makedirs(self.output_dir, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, default=str)
+        os.replace(tmp_path, self.path)
+
+    def is_complete(self, step: str) -> bool:
+        """True if step is recorded as completed and its outputs still exist."""
+        with self._lock:
+            record = self._steps.get(step)
+        if record is None:
+            return False
+        return all(os.path.exists(os.path.join(self.output_dir, name)) for name in record.get("outputs", []))
+
+    def get(self, step: str) -> Dict[str, Any]:
+        """Values recorded for a completed step (empty if not recorded)."""
+        with self._lock:
+            return dict(self._steps.get(step, {}))
+
+    def reusable(self, step: str, after: Optional[Iterable[str]] = None) -> bool:
+        """
+        True if a resumed run may skip step and use its saved outputs.
+
+        Args:
+            step: Step name
+            after: Steps it builds on; if any of them ran in this invocation,
+                step runs again (default: any step that ran so far)
+        """
+        if not self.resuming or not self.is_complete(step):
+            return False
+        with self._lock:
+            ran = self._ran if after is None else self._ran & set(after)
+        return not ran
+
+    def start(self, step: str) -> None:
+        """Mark step as running in this invocation (drops any earlier completion)."""
+        with self._lock:
+            self._ran.add(step)
+            if self._steps.pop(step, None) is not None:
+                self._save()
+
+    def complete(self, step: str, outputs: Iterable[str] = (), **info: Any) -> None:
+        """
+        Record step as completed.
+
+        Args:
+            step: Step name
+            outputs: Files the step wrote: names in the output directory, or
+                paths including it
+            **info: Step-specific values to keep (JSON-serializable)
+        """
+        record = {
+            "completedAt": datetime.now().isoformat(timespec="seconds"),
+            "outputs": [self._relative(path) for path in outputs],
+            **info,
+        }
+        with self._lock:
+            self._steps[step] = record
+            self._save()
+
+    def _relative(self, path: str) -> str:
+        """Output file name relative to the output directory."""
+        if not os.path.dirname(path):
+            return path
+        return os.path.relpath(os.path.abspath(path), os.path.abspath(self.output_dir))
+
+    def first_incomplete(self, steps: Iterable[str]) -> Optional[str]:
+        """First of the given steps that is not completed (None if all are)."""
+        return next((step for step in steps if not self.is_complete(step)), None)
+
+
+def load_saved_result(output_path: str, data_key: str) -> Optional[PhaseResult]:
+    """
+    Result of a conditional source extraction from its saved output file.
+
+    Args:
+        output_path: Saved output (e.g. 11_sap_populations.json)
+        data_key: Key of the extracted data in the file (e.g. "sapData")
+
+    Returns:
+        PhaseResult whose data.to_dict() is the saved data, or None if the
+        file is missing, unreadable or records a failure
+    """
+    try:
+        with open(output_path, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not saved.get("success") or not isinstance(saved.get(data_key), dict):
+        return None
+    return PhaseResult(success=True, data=_SavedOutput(saved[data_key]), reused=True)
@@ -1,11 +1,29 @@
 #!/usr/bin/env python
-"""Run full pipeline for all trials in input/trial directory."""
+"""
+Run full pipeline for all trials in input/trial directory.
 
+With --batch, LLM calls go through the provider batch endpoints instead of
+online requests (see core/llm_batch.py). Each trial runs in rounds against a
+shared LLM response cache: a round queues the calls the cache cannot answer,
+the queue is submitted as a batch, and once the batch ends its responses
+are cached and the trial's next round continues from there. A trial is done
+when a round queues nothing. All rounds of a trial write to the same output
+directory, <work-dir>/<trial>.
+
+Usage:
+    python scripts/run_all_trials.py
+    python scripts/run_all_trials.py --batch --poll-interval 300
+    python scripts/run_all_trials.py --batch --batch-backend local   # dry run, online calls
+"""
+
+import argparse
 import subprocess
 import sys
 from pathlib import Path
 import time
 
+ROOT = Path(__file__).parent.parent
+
 def find_trial_files(trial_dir: Path) -> tuple[Path | None, Path | None, Path | None]:
     """Find protocol PDF, SAP PDF, and sites CSV for a trial."""
     protocol = None
@@ -34,15 +52,16 @@ def find_trial_files(trial_dir: Path) -> tuple[Path | None, Path | None, Path |
     
     return protocol, sap, sites
 
-def run_trial(trial_dir: Path, model: str = "gemini-3-flash-preview") -> dict:
-    """Run the pipeline for a single trial."""
-    protocol, sap, sites = find_trial_files(trial_dir)
-    
-    if not protocol:
-        return {"trial": trial_dir.name, "status": "skipped", "reason": "No protocol PDF found"}
-    
+def build_command(
+    protocol: Path,
+    sap: Path | None,
+    sites: Path | None,
+    model: str,
+    output_dir: Path | None = None,
+) -> list[str]:
+    """Build the main_v3.py command line for a trial (default output dir: timestamped)."""
     cmd = [
-        sys.executable, "main_v2.py",
+        sys.executable, "main_v3.py",
         str(protocol),
         "--complete",
         "--model", model
@@ -52,6 +71,18 @@ def run_trial(trial_dir: Path, model: str = "gemini-3-flash-preview") -> dict:
         cmd.extend(["--sap", str(sap)])
     if sites:
         cmd.extend(["--sites", str(sites)])
+    if output_dir:
+        cmd.extend(["--output-dir", str(output_dir)])
+    return cmd
+
+def run_trial(trial_dir: Path, model: str = "gemini-3-flash-preview") -> dict:
+    """Run the pipeline for a single trial."""
+    protocol, sap, sites = find_trial_files(trial_dir)
+    
+    if not protocol:
+        return {"trial": trial_dir.name, "status": "skipped", "reason": "No protocol PDF found"}
+    
+    cmd = build_command(protocol, sap, sites, model)
     
     print(f"\n{'='*60}")
     print(f"TRIAL: {trial_dir.name}")
@@ -66,7 +97,7 @@ def run_trial(trial_dir: Path, model: str = "gemini-3-flash-preview") -> dict:
     try:
         result = subprocess.run(
             cmd,
-            cwd=Path(__file__).parent.parent,
+            cwd=ROOT,
             capture_output=False,
             text=True
         )
@@ -85,8 +116,113 @@ def run_trial(trial_dir: Path, model: str = "gemini-3-flash-preview") -> dict:
             "error": str(e)
         }
 
+def run_round(
+    trial_dir: Path,
+    model: str,
+    cache_path: Path,
+    queue_path: Path,
+    output_dir: Path,
+    cache_mode: str = "collect",
+) -> int:
+    """Run one batch-mode round of a trial's pipeline into output_dir; returns the exit code."""
+    protocol, sap, sites = find_trial_files(trial_dir)
+    cmd = build_command(protocol, sap, sites, model, output_dir) + [
+        "--llm-cache", cache_mode,
+        "--llm-cache-path", str(cache_path),
+        "--llm-batch-queue", str(queue_path),
+    ]
+    result = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0 and cache_mode != "collect":
+        print(result.stdout[-2000:])
+    return result.returncode
+
+def run_trials_batched(
+    trials: list[Path],
+    model: str,
+    work_dir: Path,
+    poll_interval: float = 60.0,
+    max_rounds: int = 10,
+    local_url: str | None = None,
+) -> list[dict]:
+    """
+    Run trials in batch mode, resuming each trial as its batches end.
+    
+    Every trial runs a collect round up front, so all of the corpus's
+    independent prompts go out in the first batches. While batches are
+    pending the script only polls; a trial whose batches have all ended
+    gets its results cached and runs its next round straight away.
+    Trials still queueing calls after max_rounds finish with a final
+    online round.
+    """
+    sys.path.insert(0, str(ROOT))
+    from core.llm_batch import BATCH_DONE, BATCH_FAILED, BatchQueue, store_batch_results, submit_batches
+    from core.llm_cache import LLMResponseCache
+    
+    work_dir.mkdir(parents=True, exist_ok=True)
+    cache_path = work_dir / "llm_responses.sqlite"
+    cache = LLMResponseCache(cache_path)
+    start_time = time.time()
+    
+    results = {}
+    states = {}
+    for trial_dir in trials:
+        if find_trial_files(trial_dir)[0] is None:
+            results[trial_dir.name] = {"trial": trial_dir.name, "status": "skipped", "reason": "No protocol PDF found"}
+        else:
+            states[trial_dir.name] = {"dir": trial_dir, "round": 0, "jobs": [],
+                                      "queue": BatchQueue(work_dir / f"{trial_dir.name}.queue.jsonl")}
+    
+    def advance(name: str) -> None:
+        """Run the trial's next round and submit what it queued."""
+        state = states[name]
+        state["queue"].clear()
+        state["round"] += 1
+        final = state["round"] > max_rounds
+        mode = "write" if final else "collect"
+        exit_code = run_round(state["dir"], model, cache_path, state["queue"].path, work_dir / name, mode)
+        requests = state["queue"].load()
+        if final or not requests:
+            status = "success" if exit_code == 0 else "failed"
+            print(f"{'✓' if status == 'success' else '✗'} {name}: {status} after {state['round']} round(s)")
+            results[name] = {"trial": name, "status": status, "exit_code": exit_code,
+                             "rounds": state["round"], "elapsed_seconds": round(time.time() - start_time, 1)}
+            del states[name]
+            return
+        state["jobs"] = submit_batches(requests, local_url=local_url)
+        print(f"  {name}: round {state['round']} queued {len(requests)} call(s) in {len(state['jobs'])} batch(es)")
+    
+    for name in list(states):
+        advance(name)
+    
+    while states:
+        time.sleep(poll_interval)
+        for name in list(states):
+            jobs = states[name]["jobs"]
+            statuses = [job.backend.status(job) for job in jobs]
+            if not all(status in (BATCH_DONE, BATCH_FAILED) for status in statuses):
+                continue
+            stored = sum(
+                store_batch_results(cache, job.backend.results(job))
+                for job, status in zip(jobs, statuses) if status == BATCH_DONE
+            )
+            failed = statuses.count(BATCH_FAILED)
+            print(f"  {name}: {stored} batch response(s) cached" + (f", {failed} batch(es) failed" if failed else ""))
+            advance(name)
+    
+    cache.close()
+    return [results[trial_dir.name] for trial_dir in trials]
+
 def main():
-    input_dir = Path(__file__).parent.parent / "input" / "trial"
+    parser = argparse.ArgumentParser(description="Run the full pipeline for all trials in input/trial")
+    parser.add_argument("--model", default="gemini-3-flash-preview", help="Model for all trials (default: gemini-3-flash-preview)")
+    parser.add_argument("--batch", action="store_true", help="Send LLM calls through the provider batch endpoints")
+    parser.add_argument("--batch-backend", choices=["provider", "local"], default="provider", help="provider: OpenAI/Anthropic/Vertex batch APIs; local: in-process stand-in server that makes online calls")
+    parser.add_argument("--poll-interval", type=float, default=60.0, metavar="SECONDS", help="Seconds between batch status polls (default: 60)")
+    parser.add_argument("--max-rounds", type=int, default=10, help="Batch rounds per trial before finishing online (default: 10)")
+    parser.add_argument("--work-dir", type=str, default=str(ROOT / "output" / "batch_runs"), help="Batch queues, response cache and per-trial outputs (default: output/batch_runs)")
+    args = parser.parse_args()
+    
+    input_dir = ROOT / "input" / "trial"
     
     if not input_dir.exists():
         print(f"Error: {input_dir} does not exist")
@@ -95,16 +231,33 @@ def main():
     trials = sorted([d for d in input_dir.iterdir() if d.is_dir()])
     print(f"Found {len(trials)} trials to process")
     
-    results = []
-    for i, trial_dir in enumerate(trials, 1):
-        print(f"\n[{i}/{len(trials)}] Processing {trial_dir.name}...")
-        result = run_trial(trial_dir)
-        results.append(result)
-        
-        # Print summary after each trial
-        status_icon = "✓" if result["status"] == "success" else "✗" if result["status"] == "failed" else "○"
-        elapsed = result.get("elapsed_seconds", 0)
-        print(f"\n{status_icon} {trial_dir.name}: {result['status']} ({elapsed}s)")
+    if args.batch:
+        server = None
+        if args.batch_backend == "local":
+            sys.path.insert(0, str(ROOT))
+            from core.llm_batch import LocalBatchServer
+            server = LocalBatchServer().start()
+        try:
+            results = run_trials_batched(
+                trials, args.model, Path(args.work_dir),
+                poll_interval=args.poll_interval,
+                max_rounds=args.max_rounds,
+                local_url=server.url if server else None,
+            )
+        finally:
+            if server:
+                server.close()
+    else:
+        results = []
+        for i, trial_dir in enumerate(trials, 1):
+            print(f"\n[{i}/{len(trials)}] Processing {trial_dir.name}...")
+            result = run_trial(trial_dir, args.model)
+            results.append(result)
+            
+            # Print summary after each trial
+            status_icon = "✓" if result["status"] == "success" else "✗" if result["status"] == "failed" else "○"
+            elapsed = result.get("elapsed_seconds", 0)
+            print(f"\n{status_icon} {trial_dir.name}: {result['status']} ({elapsed}s)")
     
     # Final summary
     print(f"\n{'='*60}")
@@ -95,6 +95,72 @@ class TestJsonUtils:
         assert len(timeline["activities"]) == 1
 
 
+class TestStreamingJSONParser:
+    """Tests for core.json_stream module."""
+    
+    def test_parses_chunked_fenced_json(self):
+        """Test JSON fed in small chunks (with fences and escapes) parses fully."""
+        from core.json_stream import StreamingJSONParser
+        
+        data = {"activities": [{"id": "act_1", "name": 'Vitals "BP", {HR} [x] \\'}], "activityTimepoints": []}
+        text = "```json\n" + json.dumps(data) + "\n```"
+        
+        parser = StreamingJSONParser(root="object")
+        for i in range(0, len(text), 3):
+            parser.feed(text[i:i + 3])
+        
+        assert parser.complete
+        assert not parser.truncated
+        assert parser.value() == data
+        assert parser.top_level_keys == ["activities", "activityTimepoints"]
+    
+    def test_detects_truncation_and_recovers_partial_value(self):
+        """Test a cut-off response is flagged and closed at the last complete element."""
+        from core.json_stream import StreamingJSONParser
+        
+        parser = StreamingJSONParser()
+        parser.feed('{"activities": [{"id": "act_1"}, {"id": "act_2"}, {"id": "ac')
+        
+        assert parser.truncated
+        assert parser.value() is None
+        assert parser.partial_value() == {"activities": [{"id": "act_1"}, {"id": "act_2"}]}
+    
+    def test_wrong_shape_raises_early(self):
+        """Test a forbidden top-level key or root type aborts before the value ends."""
+        from core.json_stream import StreamingJSONParser, JSONShapeError
+        
+        parser = StreamingJSONParser(root="object", forbidden_keys=["study"])
+        parser.feed('{"stu')
+        with pytest.raises(JSONShapeError, match="study"):
+            parser.feed('dy": {"versions": [')
+        
+        with pytest.raises(JSONShapeError, match="array"):
+            StreamingJSONParser(root="object").feed('Here you go: [{"id": 1}')
+        
+        # Nested keys with the same name are fine
+        parser = StreamingJSONParser(root="object", forbidden_keys=["study"])
+        parser.feed('{"activities": [{"study": 1}]}')
+        assert parser.complete
+    
+    def test_join_continuation_variants(self):
+        """Test continuations are joined whether exact, overlapping or restarted."""
+        from core.json_stream import join_json_continuation
+        
+        head = '{"activities": [{"id": "act_1"}, {"id": "act_2", "name": "Blood'
+        expected = {"activities": [{"id": "act_1"}, {"id": "act_2", "name": "Blood pressure"}, {"id": "act_3"}]}
+        
+        exact = join_json_continuation(head, ' pressure"}, {"id": "act_3"}]}')
+        assert json.loads(exact) == expected
+        
+        overlapping = join_json_continuation(head, '{"id": "act_2", "name": "Blood pressure"}, {"id": "act_3"}]}')
+        assert json.loads(overlapping) == expected
+        
+        restarted = join_json_continuation(
+            head, '```json\n{"activities": [{"id": "act_2", "name": "Blood pressure"}, {"id": "act_3"}]}\n```'
+        )
+        assert json.loads(restarted) == expected
+
+
 class TestProvenance:
     """Tests for core.provenance module."""
     
@@ -172,6 +238,1320 @@ class TestProvenance:
         assert tracker1.get_entity_source('activities', 'act_2') == 'vision'
 
 
+class TestProtocolDocument:
+    """Tests for core.pdf_document module."""
+    
+    @pytest.fixture(autouse=True)
+    def _isolated_cache(self, tmp_path):
+        from core.pdf_cache import configure_pdf_cache
+        configure_pdf_cache(cache_dir=str(tmp_path / "cache"))
+        yield
+        configure_pdf_cache()
+    
+    @staticmethod
+    def _make_pdf(path, pages):
+        import fitz
+        doc = fitz.open()
+        for text in pages:
+            page = doc.new_page()
+            page.insert_text((72, 72), text)
+        doc.save(str(path))
+        doc.close()
+        return str(path)
+    
+    def test_parallel_prefetch_matches_serial(self, tmp_path):
+        """Test sharded extraction returns pages in order and fills the cache."""
+        from unittest.mock import patch
+        from core.pdf_document import ProtocolDocument
+        
+        texts = [f"Page marker {i}" for i in range(12)]
+        pdf = self._make_pdf(tmp_path / "big.pdf", texts)
+        doc = ProtocolDocument(pdf)
+        try:
+            with patch("core.pdf_document.PARALLEL_MIN_PAGES", 4):
+                assert doc.prefetch_text(workers=3) == 12
+            assert doc.prefetch_text(workers=3) == 0
+            for i, text in enumerate(texts):
+                assert text in doc.get_page_text(i)
+        finally:
+            doc.close()
+        
+        reopened = ProtocolDocument(pdf)
+        try:
+            assert reopened.prefetch_text(workers=3) == 0
+        finally:
+            reopened.close()
+    
+    def test_page_text_cached(self, tmp_path):
+        """Test page text is extracted once and served raw and lowercased."""
+        from core.pdf_document import ProtocolDocument
+        
+        pdf = self._make_pdf(tmp_path / "p.pdf", ["Inclusion Criteria", "Schedule of Activities"])
+        doc = ProtocolDocument(pdf)
+        try:
+            assert doc.page_count == 2
+            assert "Inclusion Criteria" in doc.get_page_text(0)
+            assert "schedule of activities" in doc.get_page_text_lower(1)
+            assert doc.get_page_text(0) is doc.get_page_text(0)
+            pages = [n for n, _ in doc.iter_page_texts(max_pages=1, lower=True)]
+            assert pages == [0]
+            with pytest.raises(IndexError):
+                doc.get_page_text(5)
+        finally:
+            doc.close()
+    
+    def test_get_pages_text_skips_out_of_range(self, tmp_path):
+        """Test joining page text ignores missing pages."""
+        from core.pdf_document import ProtocolDocument
+        
+        pdf = self._make_pdf(tmp_path / "p.pdf", ["Alpha", "Beta"])
+        doc = ProtocolDocument(pdf)
+        try:
+            text = doc.get_pages_text([0, 1, 9], separator="|")
+            assert text.count("|") == 1
+            assert "Alpha" in text and "Beta" in text
+        finally:
+            doc.close()
+    
+    def test_shared_document_reused(self, tmp_path):
+        """Test get_protocol_document returns one instance per file."""
+        from core.pdf_document import get_protocol_document, close_protocol_documents
+        
+        pdf = self._make_pdf(tmp_path / "p.pdf", ["Alpha"])
+        try:
+            first = get_protocol_document(pdf)
+            assert get_protocol_document(os.path.join(str(tmp_path), ".", "p.pdf")) is first
+            
+            # Rewriting the file opens a fresh document
+            self._make_pdf(tmp_path / "p.pdf", ["Alpha", "Beta", "Gamma"])
+            os.utime(pdf, (0, 1))
+            second = get_protocol_document(pdf)
+            assert second is not first
+            assert second.page_count == 3
+            assert first.closed
+        finally:
+            close_protocol_documents()
+
+    def test_reopen_served_from_disk_cache(self, tmp_path):
+        """Test a second open reads page text from the disk cache, not MuPDF."""
+        from core.pdf_document import ProtocolDocument
+        from core.pdf_cache import get_pdf_cache_stats, reset_pdf_cache_stats
+        
+        pdf = self._make_pdf(tmp_path / "p.pdf", ["Alpha", "Beta"])
+        first = ProtocolDocument(pdf)
+        first.get_page_text(0)
+        first.get_page_words(1)
+        first.close()
+        
+        reset_pdf_cache_stats()
+        second = ProtocolDocument(pdf)
+        try:
+            assert second.page_count == 2
+            assert "Alpha" in second.get_page_text(0)
+            assert second.get_page_words(1)[0][4] == "Beta"
+            assert second._doc is None  # MuPDF never opened
+            assert get_pdf_cache_stats()["hits"] == 2
+            
+            second.get_page_text(1)
+            assert get_pdf_cache_stats()["misses"] == 1
+        finally:
+            second.close()
+
+
+class TestPageImages:
+    """Tests for core.page_images module."""
+    
+    @pytest.fixture(autouse=True)
+    def _isolated_cache(self, tmp_path):
+        from core.pdf_cache import configure_pdf_cache
+        from core.page_images import clear_page_images
+        configure_pdf_cache(cache_dir=str(tmp_path / "cache"))
+        yield
+        configure_pdf_cache()
+        clear_page_images()
+    
+    def test_render_in_memory_only(self, tmp_path):
+        """Test pages render to PNG buffers without writing files."""
+        from core.page_images import render_page_images
+        
+        pdf = TestProtocolDocument._make_pdf(tmp_path / "p.pdf", ["One", "Two", "Three"])
+        images = render_page_images(pdf, [2, 0, 9], dpi=50)
+        
+        assert [image.page_num for image in images] == [2, 0]
+        assert all(image.data.startswith(b"\x89PNG") for image in images)
+        assert all(image.path is None for image in images)
+        assert images[0].data_url.startswith("data:image/png;base64,")
+    
+    def test_saved_images_shared_by_path(self, tmp_path):
+        """Test path lookups reuse the rendered buffer instead of re-reading."""
+        from unittest.mock import patch
+        from core.page_images import load_page_image, render_page_images
+        
+        pdf = TestProtocolDocument._make_pdf(tmp_path / "p.pdf", ["One", "Two", "Three", "Four"])
+        out_dir = tmp_path / "3_soa_images"
+        images = render_page_images(pdf, [0, 1, 2, 3], dpi=50, output_dir=str(out_dir), workers=2)
+        
+        assert [os.path.basename(image.path) for image in images] == [
+            "soa_page_001.png", "soa_page_002.png", "soa_page_003.png", "soa_page_004.png",
+        ]
+        with patch("pathlib.Path.read_bytes", side_effect=AssertionError("re-read")):
+            assert load_page_image(images[1].path) is images[1]
+        assert (out_dir / "soa_page_002.png").read_bytes() == images[1].data
+    
+    def test_adaptive_crops_and_reports(self, tmp_path):
+        """Test adaptive mode crops to the text box and reports the saving."""
+        from core.page_images import render_page_images, summarize_page_images
+        
+        pdf = TestProtocolDocument._make_pdf(tmp_path / "p.pdf", ["Schedule of Activities"])
+        fixed = render_page_images(pdf, [0], dpi=150)
+        adaptive = render_page_images(pdf, [0], mode="adaptive")
+        
+        assert adaptive[0].clip is not None
+        assert adaptive[0].size[0] < fixed[0].size[0]
+        assert len(adaptive[0].data) < len(fixed[0].data)
+        
+        report = summarize_page_images(adaptive, model_name="gemini-2.5-pro")
+        assert report['images'][0]['page'] == 1
+        assert report['total_estimated_tokens'] < report['baseline_estimated_tokens']
+    
+    def test_wide_tables_split_into_overlapping_tiles(self):
+        """Test wide regions tile with overlap and narrow ones stay whole."""
+        from core.page_images import _split_tiles
+        
+        tiles = _split_tiles((0, 0, 2000, 600), 150)
+        assert len(tiles) > 1
+        assert tiles[0][0] == 0 and tiles[-1][2] == 2000
+        assert all(a[2] > b[0] for a, b in zip(tiles, tiles[1:]))
+        assert _split_tiles((0, 0, 700, 600), 150) == [(0, 0, 700, 600)]
+    
+    def test_dpi_follows_text_size(self):
+        """Test smaller text gets a higher DPI and sparse pages the minimum."""
+        from core.page_images import MIN_DPI, choose_page_dpi
+        
+        clip = (0, 0, 600, 800)
+        small = [(0, i, 10, i + 7) for i in range(100)]
+        large = [(0, i, 10, i + 14) for i in range(100)]
+        assert choose_page_dpi(small, clip) > choose_page_dpi(large, clip)
+        assert choose_page_dpi(small[:5], clip) == MIN_DPI
+    
+    def test_image_token_estimates(self):
+        """Test provider image token rules."""
+        from core.page_images import estimate_image_tokens
+        
+        assert estimate_image_tokens(300, 300, "gemini-2.5-pro") == 258
+        assert estimate_image_tokens(1650, 1275, "gemini-2.5-pro") == 258 * 3 * 2
+        assert estimate_image_tokens(1024, 1024, "gpt-4o") == 170 * 4 + 85
+        assert estimate_image_tokens(750, 100, "claude-sonnet-4") == 100
+    
+    def test_load_file_once(self, tmp_path):
+        """Test image files are read once and the base64 form is cached."""
+        from core.page_images import load_page_image
+        
+        path = tmp_path / "title.jpg"
+        path.write_bytes(b"\xff\xd8fake")
+        image = load_page_image(str(path))
+        
+        assert image.mime_type == "image/jpeg"
+        assert load_page_image(str(path)) is image
+        assert image.base64 is image.base64
+
+
+class TestPageTextCache:
+    """Tests for core.pdf_cache module."""
+    
+    def test_round_trip(self, tmp_path):
+        """Test text, words and blocks survive a flush and reload."""
+        from core.pdf_cache import PageTextCache
+        
+        cache = PageTextCache("abc123", cache_dir=tmp_path)
+        cache.put_page_count(3)
+        cache.put_text(0, "Schedule of Activities \u2264 5")
+        cache.put_words(0, [(1.0, 2.0, 3.0, 4.0, "Schedule", 0, 0, 0)])
+        cache.put_blocks(2, [(0.0, 0.0, 10.0, 10.0, "Block", 0, 0)])
+        cache.flush()
+        
+        loaded = PageTextCache("abc123", cache_dir=tmp_path)
+        assert loaded.get_page_count() == 3
+        assert loaded.get_text(0) == "Schedule of Activities \u2264 5"
+        assert loaded.get_words(0) == [(1.0, 2.0, 3.0, 4.0, "Schedule", 0, 0, 0)]
+        assert loaded.get_blocks(2)[0][4] == "Block"
+        assert loaded.get_text(1) is None
+    
+    def test_truncated_record_ignored(self, tmp_path):
+        """Test a partially written trailing record does not break loading."""
+        from core.pdf_cache import PageTextCache
+        
+        cache = PageTextCache("abc123", cache_dir=tmp_path)
+        cache.put_text(0, "First page")
+        cache.put_text(1, "Second page")
+        cache.flush()
+        
+        data = cache.path.read_bytes()
+        cache.path.write_bytes(data[:-3])
+        
+        loaded = PageTextCache("abc123", cache_dir=tmp_path)
+        assert loaded.get_text(0) == "First page"
+        assert loaded.get_text(1) is None
+    
+    def test_key_is_content_hash(self, tmp_path):
+        """Test identical PDF bytes at different paths share one cache file."""
+        from core.pdf_cache import PageTextCache
+        
+        a = tmp_path / "a.pdf"
+        b = tmp_path / "b.pdf"
+        a.write_bytes(b"%PDF-1.4 same bytes")
+        b.write_bytes(b"%PDF-1.4 same bytes")
+        
+        assert PageTextCache.for_pdf(str(a), cache_dir=tmp_path).path == \
+            PageTextCache.for_pdf(str(b), cache_dir=tmp_path).path
+
+
+class TestLLMResponseCache:
+    """Tests for core.llm_cache module."""
+    
+    def _provider(self, content='{"ok": true}'):
+        from unittest.mock import Mock
+        from llm_providers import LLMResponse
+        
+        provider = Mock()
+        provider.generate.return_value = LLMResponse(content=content, model="gemini-2.5-pro")
+        provider.generate_with_image.return_value = LLMResponse(content=content, model="gemini-2.5-pro")
+        return provider
+    
+    def test_key_covers_model_messages_config_and_image(self):
+        """Test the cache key changes with every input that affects the output."""
+        from core.llm_cache import compute_cache_key
+        from llm_providers import LLMConfig
+        
+        messages = [{"role": "user", "content": "Extract the SoA"}]
+        base = compute_cache_key("gemini-2.5-pro", messages=messages, config=LLMConfig())
+        
+        assert base == compute_cache_key("gemini-2.5-pro", messages=list(messages), config=LLMConfig())
+        assert base != compute_cache_key("gpt-4o", messages=messages, config=LLMConfig())
+        assert base != compute_cache_key("gemini-2.5-pro", messages=messages, config=LLMConfig(temperature=0.5))
+        assert base != compute_cache_key(
+            "gemini-2.5-pro", messages=[{"role": "user", "content": "Extract the SoA."}], config=LLMConfig()
+        )
+        assert compute_cache_key("m", prompt="p", image_data=b"a") != compute_cache_key("m", prompt="p", image_data=b"b")
+        # Multi-image calls: page order matters, a one-page list keeps its own key
+        pages = compute_cache_key("m", prompt="p", image_data=[b"a", b"b"], mime_type="image/png")
+        assert pages != compute_cache_key("m", prompt="p", image_data=[b"b", b"a"], mime_type="image/png")
+        assert pages != compute_cache_key("m", prompt="p", image_data=b"a", mime_type="image/png")
+    
+    def test_write_then_replay(self, tmp_path):
+        """Test recorded responses replay without calling the provider."""
+        from core.llm_cache import CachedLLMProvider, LLMResponseCache
+        
+        cache = LLMResponseCache(tmp_path / "llm.sqlite")
+        messages = [{"role": "user", "content": "Hello"}]
+        
+        provider = self._provider()
+        writer = CachedLLMProvider("gemini-2.5-pro", lambda: provider, cache, "write")
+        assert writer.generate(messages).content == '{"ok": true}'
+        assert writer.generate_with_image("Describe", b"png").content == '{"ok": true}'
+        assert writer.generate(messages).content == '{"ok": true}'
+        assert provider.generate.call_count == 1
+        
+        reopened = LLMResponseCache(tmp_path / "llm.sqlite")
+        factory_calls = []
+        replayer = CachedLLMProvider("gemini-2.5-pro", lambda: factory_calls.append(1), reopened, "replay")
+        assert replayer.generate(messages).content == '{"ok": true}'
+        assert replayer.generate_with_image("Describe", b"png").content == '{"ok": true}'
+        assert factory_calls == []  # No provider (or API key) needed to replay
+    
+    def test_replay_miss_fails_loudly(self, tmp_path):
+        """Test replay mode raises on a call with no recorded response."""
+        from core.llm_cache import CachedLLMProvider, LLMCacheMissError, LLMResponseCache
+        
+        cache = LLMResponseCache(tmp_path / "llm.sqlite")
+        replayer = CachedLLMProvider("gemini-2.5-pro", self._provider, cache, "replay")
+        
+        with pytest.raises(LLMCacheMissError):
+            replayer.generate([{"role": "user", "content": "Never recorded"}])
+    
+    def test_read_mode_does_not_record(self, tmp_path):
+        """Test read mode calls the provider on a miss without storing it."""
+        from core.llm_cache import CachedLLMProvider, LLMResponseCache
+        
+        cache = LLMResponseCache(tmp_path / "llm.sqlite")
+        provider = self._provider()
+        reader = CachedLLMProvider("gemini-2.5-pro", lambda: provider, cache, "read")
+        
+        reader.generate([{"role": "user", "content": "Hello"}])
+        assert len(cache) == 0
+    
+    def test_lru_eviction(self, tmp_path):
+        """Test least-recently-used entries are evicted past the size bound."""
+        from llm_providers import LLMResponse
+        from core.llm_cache import LLMResponseCache
+        
+        cache = LLMResponseCache(tmp_path / "llm.sqlite", max_bytes=250)
+        for key in ("a", "b"):
+            cache.put(key, LLMResponse(content="x" * 100, model="m"))
+        assert cache.get("a") is not None  # "b" is now least recently used
+        cache.put("c", LLMResponse(content="x" * 100, model="m"))
+        
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+        assert cache.size_bytes <= 250
+    
+    def test_call_llm_propagates_replay_miss(self, tmp_path):
+        """Test call_llm does not swallow replay misses into an error dict."""
+        from core.llm_cache import LLMCacheMissError, configure_llm_cache
+        from core.llm_client import call_llm
+        
+        configure_llm_cache("replay", cache_path=str(tmp_path / "llm.sqlite"))
+        try:
+            with pytest.raises(LLMCacheMissError):
+                call_llm("Never recorded", model_name="gemini-2.5-pro")
+        finally:
+            configure_llm_cache("off")
+    
+    def test_collect_mode_queues_misses(self, tmp_path):
+        """Test collect mode serves hits and queues each miss once without calling the provider."""
+        from llm_providers import LLMResponse
+        from core.llm_cache import (
+            CachedLLMProvider, LLMBatchPendingError, LLMResponseCache, compute_cache_key,
+            configure_llm_cache, get_batch_queue,
+        )
+        
+        configure_llm_cache("collect", cache_path=str(tmp_path / "llm.sqlite"),
+                            batch_queue_path=str(tmp_path / "queue.jsonl"))
+        try:
+            cache = LLMResponseCache(tmp_path / "llm.sqlite")
+            hit = [{"role": "user", "content": "Recorded"}]
+            cache.put(compute_cache_key("gemini-2.5-pro", messages=hit), LLMResponse(content="{}", model="m"))
+            factory_calls = []
+            collector = CachedLLMProvider("gemini-2.5-pro", lambda: factory_calls.append(1), cache, "collect")
+            
+            assert collector.generate(hit).content == "{}"
+            for _ in range(2):
+                with pytest.raises(LLMBatchPendingError):
+                    collector.generate([{"role": "user", "content": "New"}])
+            with pytest.raises(LLMBatchPendingError):
+                collector.generate_with_image("Describe", b"png")
+            
+            queued = get_batch_queue().load()
+            assert [r.is_image for r in queued] == [False, True]
+            assert queued[1].image_data == b"png"
+            assert factory_calls == []
+        finally:
+            configure_llm_cache("off")
+
+
+class TestLLMBatch:
+    """Tests for core.llm_batch module."""
+    
+    def test_local_batch_round_trip_fills_cache(self, tmp_path):
+        """Test queued requests go through the local batch server into the cache."""
+        from llm_providers import LLMConfig
+        from core.llm_batch import (
+            BATCH_DONE, BATCH_PENDING, BatchQueue, BatchRequest, LocalBatchServer,
+            store_batch_results, submit_batches,
+        )
+        from core.llm_cache import CachedLLMProvider, LLMResponseCache, compute_cache_key
+        
+        messages = [{"role": "user", "content": "Extract metadata"}]
+        queue = BatchQueue(tmp_path / "queue.jsonl")
+        for model in ("gemini-2.5-pro", "gpt-4o"):
+            key = compute_cache_key(model, messages=messages, config=LLMConfig())
+            assert queue.add(BatchRequest.for_text(key, model, messages))
+        assert not queue.add(queue.load()[0])
+        
+        cache = LLMResponseCache(tmp_path / "llm.sqlite")
+        with LocalBatchServer(lambda request: f'{{"model": "{request.model}"}}') as server:
+            jobs = submit_batches(BatchQueue(queue.path).load(), local_url=server.url)
+            assert len(jobs) == 2  # One batch per provider
+            assert {job.backend.status(job) for job in jobs} == {BATCH_PENDING}
+            assert {job.backend.status(job) for job in jobs} == {BATCH_DONE}
+            stored = sum(store_batch_results(cache, job.backend.results(job)) for job in jobs)
+        assert stored == 2
+        
+        replayer = CachedLLMProvider("gpt-4o", lambda: None, cache, "replay")
+        assert replayer.generate(messages).content == '{"model": "gpt-4o"}'
+    
+    def test_responder_errors_are_skipped(self, tmp_path):
+        """Test a failed request is left out of the results instead of cached empty."""
+        from core.llm_batch import BatchRequest, LocalBatchBackend, LocalBatchServer
+        
+        def responder(request):
+            raise RuntimeError("quota")
+        
+        with LocalBatchServer(responder, polls_until_done=0) as server:
+            backend = LocalBatchBackend(server.url)
+            job = backend.submit("gpt-4o", [BatchRequest.for_text("k" * 64, "gpt-4o", [])])
+            backend.status(job)
+            assert backend.results(job) == {}
+    
+    def test_gemini_batch_thinking_config_matches_online_calls(self, monkeypatch):
+        """Test batch requests disable thinking only for models whose online calls do (Gemini 3 on Vertex)."""
+        import llm_providers
+        from core.llm_batch import BatchRequest, GeminiBatchBackend
+        
+        monkeypatch.setattr(llm_providers, "HAS_GENAI_SDK", True)
+        backend = object.__new__(GeminiBatchBackend)
+        messages = [{"role": "user", "content": "Extract metadata"}]
+        
+        for use_vertex in (True, False):
+            backend.use_vertex = use_vertex
+            body = backend._request_body(BatchRequest.for_text("k", "gemini-2.5-pro", messages))
+            assert "thinkingConfig" not in body["generationConfig"]
+        
+        backend.use_vertex = True
+        body = backend._request_body(BatchRequest.for_text("k", "gemini-3-flash", messages))
+        assert body["generationConfig"]["thinkingConfig"] == {"thinkingBudget": 0}
+        backend.use_vertex = False
+        body = backend._request_body(BatchRequest.for_text("k", "gemini-3-flash", messages))
+        assert "thinkingConfig" not in body["generationConfig"]
+
+
+class TestVisionCalls:
+    """Tests for multi-image vision calls through core.llm_client."""
+    
+    def test_header_analysis_is_one_provider_call(self):
+        """Test all SoA pages go to the pooled provider in one generate_with_image() call."""
+        from unittest.mock import Mock, patch
+        from llm_providers import LLMResponse
+        from core import llm_client
+        from core.page_images import PageImage
+        from extraction.header_analyzer import analyze_soa_headers
+        
+        content = json.dumps({
+            "columnHierarchy": {
+                "epochs": [{"id": "epoch_1", "name": "Screening"}],
+                "encounters": [{"id": "enc_1", "name": "Visit 1", "epochId": "epoch_1"}],
+            },
+        })
+        client = Mock()
+        client.generate_with_image.return_value = LLMResponse(content=content, model="claude-sonnet-4")
+        pages = [PageImage(data=f"page{n}".encode(), mime_type="image/png") for n in range(3)]
+        
+        with patch.object(llm_client, "get_llm_client", return_value=client) as get_client:
+            result = analyze_soa_headers(pages, model_name="claude-sonnet-4")
+        
+        assert result.success
+        get_client.assert_called_once_with("claude-sonnet-4")
+        prompt, images, mime_types, config = client.generate_with_image.call_args[0]
+        assert images == [b"page0", b"page1", b"page2"]
+        assert mime_types == ["image/png"] * 3
+        assert config.json_mode and config.max_tokens == 8192
+    
+    def test_recitation_block_is_reported(self):
+        """Test a RECITATION finish reason marks the header result as blocked."""
+        from unittest.mock import Mock, patch
+        from llm_providers import LLMResponse
+        from core import llm_client
+        from core.page_images import PageImage
+        from extraction.header_analyzer import analyze_soa_headers
+        
+        client = Mock()
+        client.generate_with_image.return_value = LLMResponse(
+            content="", model="gemini-2.5-pro", finish_reason="RECITATION"
+        )
+        with patch.object(llm_client, "get_llm_client", return_value=client):
+            result = analyze_soa_headers([PageImage(data=b"page", mime_type="image/png")], "gemini-2.5-pro")
+        
+        assert not result.success
+        assert result.recitation_blocked
+    
+    def test_header_call_keeps_provider_settings(self):
+        """Test OpenAI header calls keep their 4096-token budget and 0.1 temperature."""
+        from unittest.mock import Mock, patch
+        from llm_providers import LLMResponse
+        from core import llm_client
+        from core.page_images import PageImage
+        from extraction.header_analyzer import analyze_soa_headers
+        
+        client = Mock()
+        client.generate_with_image.return_value = LLMResponse(content='{"columnHierarchy": {}}', model="gpt-4o")
+        with patch.object(llm_client, "get_llm_client", return_value=client):
+            analyze_soa_headers([PageImage(data=b"page", mime_type="image/png")], "gpt-4o")
+        
+        config = client.generate_with_image.call_args[0][3]
+        assert config.max_tokens == 4096
+        assert config.temperature == 0.1
+    
+    def test_empty_response_fails_header_analysis(self):
+        """Test an empty response is a failed result after the page fallbacks, not a parse error."""
+        from unittest.mock import Mock, patch
+        from llm_providers import LLMResponse
+        from core import llm_client
+        from core.page_images import PageImage
+        from extraction.header_analyzer import analyze_soa_headers
+        
+        client = Mock()
+        client.generate_with_image.return_value = LLMResponse(content="", model="gpt-4o", finish_reason="stop")
+        pages = [PageImage(data=f"page{n}".encode(), mime_type="image/png") for n in range(5)]
+        with patch.object(llm_client, "get_llm_client", return_value=client):
+            result = analyze_soa_headers(pages, "gpt-4o")
+        
+        assert not result.success
+        assert not result.recitation_blocked
+        assert "Empty response" in result.error
+        assert client.generate_with_image.call_count == 3
+
+
+class TestModelRouter:
+    """Tests for core.model_router module."""
+    
+    def test_routes_only_when_enabled(self):
+        """Test routed tasks go to the small model of the run model's provider."""
+        from core.model_router import ModelRouter
+        
+        router = ModelRouter()
+        router.configure(False, {"entity_resolver": {"gemini": "gemini-2.5-flash"}})
+        assert router.route("entity_resolver", "gemini-2.5-pro") == "gemini-2.5-pro"
+        
+        router.configure(True, {"entity_resolver": {"gemini": "gemini-2.5-flash"}})
+        assert router.route("entity_resolver", "gemini-2.5-pro") == "gemini-2.5-flash"
+        assert router.route("entity_resolver", "gpt-4o") == "gpt-4o"
+        assert router.route("text_extractor", "gemini-2.5-pro") == "gemini-2.5-pro"
+        assert router.route(None, "gemini-2.5-pro") == "gemini-2.5-pro"
+    
+    def test_default_table_keeps_soa_on_run_model(self):
+        """Test the shipped routing table covers the cheap tasks only."""
+        from extraction.llm_task_config import get_model_routes
+        
+        routes = get_model_routes()
+        for task in ("entity_resolver", "execution_type", "footnote_condition", "abbreviations"):
+            assert set(routes[task]) == {"gemini", "openai", "claude"}
+        for task in ("text_extractor", "header_analyzer", "soa_finder", "eligibility"):
+            assert task not in routes
+    
+    def test_generate_text_records_route_stats(self):
+        """Test calls are recorded per task and model, with validation pass rates."""
+        from unittest.mock import Mock, patch
+        from llm_providers import LLMResponse
+        from core import llm_client
+        from core.model_router import configure_model_routing, model_router, record_route_validation
+        
+        client = Mock()
+        client.generate.return_value = LLMResponse(
+            content='{"classifications": []}', model="gemini-2.5-flash",
+            usage={"prompt_tokens": 120, "completion_tokens": 8},
+        )
+        configure_model_routing(True, {"execution_type": {"gemini": "gemini-2.5-flash"}})
+        model_router.reset_stats()
+        try:
+            with patch.object(llm_client, "get_llm_client", return_value=client) as get_client:
+                llm_client.generate_text([{"role": "user", "content": "x"}], "gemini-2.5-pro",
+                                         json_mode=True, extractor_name="execution_type")
+            get_client.assert_called_once_with("gemini-2.5-flash")
+            record_route_validation("execution_type", True)
+            
+            stats = model_router.get_summary()["execution_type"]["gemini-2.5-flash"]
+            assert stats["calls"] == 1
+            assert stats["prompt_tokens"] == 120
+            assert stats["json_valid_rate"] == 1.0
+            assert stats["validation_pass_rate"] == 1.0
+        finally:
+            configure_model_routing(False)
+            model_router.reset_stats()
+
+
+class TestPromptCompaction:
+    """Tests for core.prompt_compaction module."""
+
+    @staticmethod
+    def _pages(count):
+        return "\n\n".join(
+            f"--- Page {n} ---\nACME-123 Clinical Study Protocol\n"
+            f"Section {n} body text   with    spaces.\n+------+------+\n| Visit {n} | Day {n * 7} |\n"
+            f"Confidential    Page {n} of {count}"
+            for n in range(1, count + 1)
+        )
+
+    def test_strips_running_headers_and_rulings(self):
+        """Test repeated page headers/footers and table rulings are removed, content kept."""
+        from core.prompt_compaction import compact_text
+
+        text, removed = compact_text(self._pages(6))
+        assert removed == 15
+        assert text.count("ACME-123") == 1
+        assert text.count("Confidential") == 1
+        assert "+------" not in text
+        assert "--- Page 4 ---" in text
+        assert "Section 4 body text with spaces." in text
+        assert "| Visit 4 | Day 28 |" in text
+
+        # Too few pages to tell a running header from content
+        text, removed = compact_text(self._pages(2))
+        assert removed == 0
+        assert text.count("ACME-123") == 2
+
+    def test_keeps_table_rows_repeated_on_each_page(self):
+        """Test a table's column header repeated on every page is not taken for a running header."""
+        from core.prompt_compaction import compact_text
+
+        text, removed = compact_text("\n".join(
+            f"--- Page {n} ---\nACME-123 Clinical Study Protocol\n"
+            f"Procedure Screening Day 1 Week 2 Week 4 Week 8 EOT\n1 2 3 4 5 6\n"
+            f"Activity {n} X X X\n100 200 300 400\n{n}"
+            for n in range(1, 5)
+        ))
+
+        assert removed == 6
+        assert text.count("ACME-123") == 1
+        assert text.count("Procedure Screening Day 1 Week 2 Week 4 Week 8 EOT") == 4
+        assert text.count("1 2 3 4 5 6") == 4
+        assert text.count("100 200 300 400") == 4
+        assert "Activity 4 X X X\n100 200 300 400\n4" not in text
+        assert "Activity 4 X X X\n100 200 300 400" in text
+
+    def test_instructions_are_not_compacted(self):
+        """Test system prompts and instructions keep their indentation and separators."""
+        from core.prompt_compaction import compact_messages
+
+        example = 'Return JSON:\n---\n{\n    "visits": [\n        {"name": "..."}\n    ]\n}'
+        messages = [
+            {"role": "system", "content": example},
+            {"role": "user", "content": "PROTOCOL CONTENT:\n\nVisit   schedule\n-----", "cache": True},
+            {"role": "user", "content": example + "\n\n--- Page 1 ---\nDay    1"},
+            {"role": "user", "content": example},
+        ]
+        compacted, _ = compact_messages(messages, "gemini-2.5-pro")
+
+        assert compacted[0] == messages[0] and compacted[3] == messages[3]
+        assert compacted[1]["content"] == "PROTOCOL CONTENT:\n\nVisit schedule"
+        assert compacted[2]["content"] == example + "\n\n--- Page 1 ---\nDay 1"
+
+    def test_budget_shortens_protocol_text_only(self):
+        """Test the budget cuts the longest message evenly across pages."""
+        from core.prompt_compaction import compact_messages, count_tokens
+
+        pages = "\n".join(f"--- Page {n} ---\n" + f"word{n} " * 2000 for n in range(1, 5))
+        messages = [
+            {"role": "system", "content": "You are an expert."},
+            {"role": "user", "content": pages, "cache": True},
+            {"role": "user", "content": "Extract the visits."},
+        ]
+        compacted, stats = compact_messages(messages, "gemini-2.5-pro", max_input_tokens=2000)
+
+        assert stats.truncated
+        assert stats.tokens_before > 2000 >= stats.tokens_after
+        assert stats.tokens_saved == stats.tokens_before - stats.tokens_after
+        assert compacted[0] == messages[0] and compacted[2] == messages[2]
+        assert compacted[1]["cache"] is True
+        assert all(f"--- Page {n} ---\nword{n}" in compacted[1]["content"] for n in range(1, 5))
+        assert count_tokens(compacted[1]["content"], "gemini-2.5-pro") < 2000
+
+    def test_generate_text_records_tokens_saved(self):
+        """Test compaction runs before dispatch and is logged in the token usage summary."""
+        from unittest.mock import Mock, patch
+        from llm_providers import LLMResponse, usage_tracker
+        from core import llm_client
+
+        client = Mock()
+        client.generate.return_value = LLMResponse(content='{"visits": []}', model="gemini-2.5-pro")
+        usage_tracker.reset()
+        try:
+            with patch.object(llm_client, "get_llm_client", return_value=client):
+                llm_client.generate_text([{"role": "user", "content": self._pages(6)}], "gemini-2.5-pro",
+                                         json_mode=True, extractor_name="metadata")
+            sent = client.generate.call_args[0][0][0]["content"]
+            assert sent.count("Confidential") == 1
+
+            compaction = usage_tracker.get_summary()["prompt_compaction"]
+            assert compaction["calls"] == 1
+            assert compaction["tokens_saved"] > 0
+            assert compaction["by_call"][0]["task"] == "metadata"
+        finally:
+            usage_tracker.reset()
+
+
+class TestPhaseScheduler:
+    """Tests for dependency-driven phase scheduling in pipeline.orchestrator."""
+
+    @staticmethod
+    def _registry(durations, log):
+        """Fake phase registry whose phases sleep and log start/finish."""
+        import time
+        from types import SimpleNamespace
+        from pipeline.base_phase import PhaseResult
+
+        class FakePhase:
+            def __init__(self, name):
+                self.config = SimpleNamespace(name=name)
+
+            def run(self, **kwargs):
+                log.append(("start", self.config.name, kwargs.get("soa_data")))
+                time.sleep(durations[self.config.name])
+                log.append(("end", self.config.name))
+                return PhaseResult(success=True, data={})
+
+        phases = {name: FakePhase(name) for name in durations}
+        return SimpleNamespace(
+            has=lambda name: name in phases,
+            get=phases.get,
+            get_names=lambda: list(phases),
+        )
+
+    def test_critical_path_lengths(self):
+        """Test a phase's priority includes the longest chain of its dependents."""
+        from pipeline.orchestrator import PHASE_DEPENDENCIES
+        from pipeline.phase_scheduler import critical_path_lengths
+
+        estimates = {"metadata": 10, "studydesign": 5, "interventions": 20, "narrative": 25}
+        lengths = critical_path_lengths(set(estimates), PHASE_DEPENDENCIES, estimates.get)
+        assert lengths == {"metadata": 30, "studydesign": 25, "interventions": 20, "narrative": 25}
+
+    def test_phase_starts_when_its_dependencies_finish(self, monkeypatch, tmp_path):
+        """Test a dependent phase does not wait for unrelated slow phases."""
+        from pipeline import orchestrator as orchestrator_module
+        from pipeline.orchestrator import PipelineOrchestrator
+
+        durations = {"metadata": 0.05, "studydesign": 0.05, "interventions": 0.05, "narrative": 0.5}
+        log = []
+        monkeypatch.setattr(orchestrator_module, "phase_registry", self._registry(durations, log))
+
+        orchestrator = PipelineOrchestrator(durations_path=tmp_path / "durations.json")
+        results = orchestrator.run_phases_parallel(
+            pdf_path="protocol.pdf", output_dir=str(tmp_path), model="gemini-2.5-pro",
+            phases_to_run={name: True for name in durations}, max_workers=4,
+        )
+
+        assert all(results[name].success for name in durations)
+        assert log.index(("start", "interventions", None)) > log.index(("end", "metadata"))
+        assert log.index(("start", "interventions", None)) > log.index(("end", "studydesign"))
+        assert log.index(("end", "interventions")) < log.index(("end", "narrative"))
+
+    def test_recorded_durations_prioritize_ready_phases(self, monkeypatch, tmp_path):
+        """Test durations persist across runs and the longest chain starts first."""
+        from pipeline import orchestrator as orchestrator_module
+        from pipeline.orchestrator import PipelineOrchestrator
+
+        durations = {"narrative": 0.01, "advanced": 0.01, "procedures": 0.03}
+        path = tmp_path / "durations.json"
+        log = []
+        monkeypatch.setattr(orchestrator_module, "phase_registry", self._registry(durations, log))
+        run = dict(pdf_path="protocol.pdf", output_dir=str(tmp_path), model="gemini-2.5-pro",
+                   phases_to_run={name: True for name in durations}, max_workers=1)
+
+        PipelineOrchestrator(durations_path=path).run_phases_parallel(**run)
+        assert log[0] == ("start", "narrative", None)  # no history: registry order
+
+        log.clear()
+        orchestrator = PipelineOrchestrator(durations_path=path)
+        assert orchestrator.phase_durations.estimate("procedures") >= 0.03
+        orchestrator.run_phases_parallel(**run)
+        assert log[0] == ("start", "procedures", None)
+
+    def test_soa_runs_alongside_phases_that_do_not_need_it(self, monkeypatch, tmp_path):
+        """Test only SoA-dependent phases wait for the SoA node, and receive its data."""
+        import time
+        from pipeline import orchestrator as orchestrator_module
+        from pipeline.orchestrator import PipelineOrchestrator
+
+        durations = {"metadata": 0.01, "narrative": 0.01, "studydesign": 0.01, "execution": 0.01}
+        log = []
+        monkeypatch.setattr(orchestrator_module, "phase_registry", self._registry(durations, log))
+        soa = {"epochs": [{"id": "epoch_1", "name": "Screening"}]}
+
+        def soa_runner():
+            log.append(("start", "soa", None))
+            time.sleep(0.2)
+            log.append(("end", "soa"))
+            return soa
+
+        orchestrator = PipelineOrchestrator(durations_path=None)
+        results = orchestrator.run_phases_parallel(
+            pdf_path="protocol.pdf", output_dir=str(tmp_path), model="gemini-2.5-pro",
+            phases_to_run={name: True for name in durations}, max_workers=4, soa_runner=soa_runner,
+        )
+
+        soa_end = log.index(("end", "soa"))
+        assert log.index(("end", "metadata")) < soa_end
+        assert log.index(("end", "narrative")) < soa_end
+        assert log.index(("start", "studydesign", soa)) > soa_end
+        assert log.index(("start", "execution", soa)) > soa_end
+        assert "soa" not in results
+        assert orchestrator.get_soa_data() is soa
+        assert results["_pipeline_context"].epochs == soa["epochs"]
+
+
+class TestPipelineContext:
+    """Tests for thread safety of extraction.pipeline_context."""
+
+    def test_snapshot_is_isolated_and_indexes_extend(self):
+        """Test snapshots keep their version and updates swap in extended indexes."""
+        from extraction.pipeline_context import create_pipeline_context
+
+        epochs = [{"id": "e1", "name": "Screening"}]
+        context = create_pipeline_context({"epochs": epochs})
+        snapshot = context.snapshot()
+        old_index = context._epoch_by_id
+
+        context.update_from_soa({"epochs": epochs + [{"id": "e2", "name": "Treatment"}]})
+
+        assert context.version == snapshot.version + 1
+        assert context.find_epoch_by_name("treatment")["id"] == "e2"
+        assert context._epoch_by_id is not old_index
+        assert old_index == {"e1": epochs[0]}
+        assert snapshot.find_epoch_by_id("e2") is None
+        assert snapshot.get_epoch_ids() == ["e1"]
+        with pytest.raises(AttributeError):
+            snapshot.update_from_metadata({"studyTitle": "Other"})
+
+    def test_parallel_phases_never_see_torn_context(self, monkeypatch, tmp_path):
+        """Stress test: phases updating and reading the context in parallel see consistent snapshots."""
+        import itertools
+        from types import SimpleNamespace
+        from pipeline import orchestrator as orchestrator_module
+        from pipeline.base_phase import BasePhase, PhaseConfig, PhaseResult
+        from pipeline.orchestrator import PipelineOrchestrator
+        from extraction.pipeline_context import create_pipeline_context
+
+        generation = itertools.count()
+        torn = []
+
+        def check(snapshot):
+            """Fields written by one update must come from the same generation."""
+            title, study_id = snapshot.study_title, snapshot.study_id
+            if title.split("-")[-1] != study_id.split("-")[-1]:
+                torn.append(("metadata", title, study_id))
+            tags = {item["gen"] for item in snapshot.epochs + snapshot.activities}
+            if len(tags) > 1:
+                torn.append(("soa", tags))
+            for name, index in (("epochs", snapshot._epoch_by_id), ("arms", snapshot._arm_by_id)):
+                items = getattr(snapshot, name)
+                if len(index) != len(items) or any(index.get(item["id"]) is not item for item in items):
+                    torn.append((name, len(index), len(items)))
+
+        def updates(context, n):
+            return {
+                "metadata": lambda: context.update_from_metadata({"studyTitle": f"title-{n}", "studyId": f"id-{n}"}),
+                "studydesign": lambda: context.update_from_studydesign(
+                    {"arms": [{"id": f"arm{i}-{n}", "gen": n} for i in range(n % 7 + 1)]}),
+                "execution": lambda: context.update_from_soa({
+                    "epochs": [{"id": f"ep{i}-{n}", "name": f"Epoch {i}", "gen": n} for i in range(n % 5 + 1)],
+                    "activities": [{"id": f"act{i}-{n}", "name": f"Act {i}", "gen": n} for i in range(n % 9 + 1)],
+                }),
+            }
+
+        class StressPhase(BasePhase):
+            def __init__(self, name):
+                self._config = PhaseConfig(name=name, display_name=name, phase_number=0, output_filename=f"{name}.json")
+
+            @property
+            def config(self):
+                return self._config
+
+            def extract(self, pdf_path, model, output_dir, context, soa_data=None, **kwargs):
+                for _ in range(200):
+                    check(live.snapshot())
+                check(context)
+                return PhaseResult(success=True, data={"n": next(generation)})
+
+            def combine(self, result, study_version, study_design, combined, previous_extractions):
+                pass
+
+            def update_context(self, context, result):
+                for _ in range(20):
+                    updates(context, next(generation)).get(self.config.name, lambda: None)()
+
+            def save_result(self, result, output_path):
+                pass
+
+        names = ["metadata", "eligibility", "objectives", "studydesign", "interventions", "narrative",
+                 "advanced", "procedures", "scheduling", "docstructure", "amendmentdetails", "execution"]
+        phases = {name: StressPhase(name) for name in names}
+        monkeypatch.setattr(orchestrator_module, "phase_registry", SimpleNamespace(
+            has=lambda name: name in phases, get=phases.get, get_names=lambda: names))
+
+        for _ in range(15):
+            live = create_pipeline_context()
+            updates(live, next(generation))["metadata"]()
+            results = PipelineOrchestrator(durations_path=None).run_phases_parallel(
+                pdf_path="protocol.pdf", output_dir=str(tmp_path), model="gemini-2.5-pro",
+                phases_to_run={name: True for name in names}, pipeline_context=live, max_workers=12,
+            )
+            assert all(results[name].success for name in names)
+            check(live.snapshot())
+
+        assert torn == []
+
+
+class TestIncrementalRerun:
+    """Tests for input fingerprints and incremental phase re-runs."""
+
+    def test_fingerprint_detects_changed_inputs(self, tmp_path):
+        """Test a recorded fingerprint matches only the same inputs and a successful output."""
+        import json
+        from pipeline.fingerprint import changed_inputs, outputs_match, save_fingerprint
+
+        output = tmp_path / "2_study_metadata.json"
+        fingerprint = {"pdf": "abc", "model": "gemini-2.5-pro", "context": "123"}
+        assert changed_inputs(str(output), fingerprint) == ("output",)
+
+        output.write_text(json.dumps({"success": True}))
+        assert changed_inputs(str(output), fingerprint) == ("fingerprint",)
+
+        save_fingerprint(str(output), fingerprint)
+        assert (tmp_path / "2_study_metadata.fingerprint.json").exists()
+        assert outputs_match(str(output), fingerprint)
+        assert changed_inputs(str(output), {**fingerprint, "model": "gpt-5.1"}) == ("model",)
+
+        output.write_text(json.dumps({"success": False}))
+        assert changed_inputs(str(output), fingerprint) == ("output",)
+
+    def test_only_changed_phases_and_dependents_rerun(self, monkeypatch, tmp_path):
+        """Test unchanged phases keep their output and restore context; changes re-run dependents."""
+        from types import SimpleNamespace
+        from pipeline import fingerprint as fingerprint_module
+        from pipeline import orchestrator as orchestrator_module
+        from pipeline.base_phase import BasePhase, PhaseConfig, PhaseResult
+        from pipeline.orchestrator import PipelineOrchestrator
+
+        pdf = tmp_path / "protocol.pdf"
+        pdf.write_bytes(b"%PDF-1.4 protocol")
+        prompt_versions = {"metadata": 1, "eligibility": 1, "narrative": 1}
+        monkeypatch.setattr(fingerprint_module, "source_digest",
+                            lambda modules: str([prompt_versions.get(m) for m in modules]))
+        extracted = []
+
+        class FakePhase(BasePhase):
+            def __init__(self, name):
+                self._config = PhaseConfig(name=name, display_name=name, phase_number=0,
+                                           output_filename=f"{name}.json", extraction_package=name)
+
+            @property
+            def config(self):
+                return self._config
+
+            def get_context_params(self, context):
+                return {"study_indication": context.indication} if self.config.name == "eligibility" else {}
+
+            def extract(self, pdf_path, model, output_dir, context, soa_data=None, **kwargs):
+                extracted.append(self.config.name)
+                return PhaseResult(success=True, data={"indication": "Asthma"})
+
+            def update_context(self, context, result):
+                if self.config.name == "metadata":
+                    context.update_from_metadata(result.data)
+
+            def combine(self, result, study_version, study_design, combined, previous_extractions):
+                pass
+
+        phases = {name: FakePhase(name) for name in prompt_versions}
+        monkeypatch.setattr(orchestrator_module, "phase_registry", SimpleNamespace(
+            has=lambda name: name in phases, get=phases.get, get_names=lambda: list(phases)))
+
+        def run():
+            extracted.clear()
+            orchestrator = PipelineOrchestrator(durations_path=None, incremental=True)
+            results = orchestrator.run_phases_parallel(
+                pdf_path=str(pdf), output_dir=str(tmp_path), model="gemini-2.5-pro",
+                phases_to_run={name: True for name in phases}, max_workers=1,
+            )
+            return sorted(extracted), results
+
+        assert run()[0] == ["eligibility", "metadata", "narrative"]
+
+        extracted_now, results = run()
+        assert extracted_now == []
+        assert all(results[name].success and results[name].reused for name in phases)
+        assert results["_pipeline_context"].indication == "Asthma"
+
+        prompt_versions["narrative"] = 2
+        assert run()[0] == ["narrative"]
+
+        prompt_versions["metadata"] = 2
+        assert run()[0] == ["eligibility", "metadata"]
+
+
+class TestRunManifest:
+    """Tests for the run manifest and resuming interrupted runs."""
+
+    def test_resume_reuses_completed_steps(self, tmp_path):
+        """Test completed steps are reusable only when resuming the same inputs with their outputs present."""
+        from pipeline.run_manifest import RunManifest
+
+        inputs = {"pdf": "abc", "soaPages": None}
+        manifest = RunManifest(str(tmp_path), inputs)
+        (tmp_path / "4_header_structure.json").write_text("{}")
+        manifest.start("soa_pages")
+        manifest.complete("soa_pages", pages=[11, 12])
+        manifest.complete("soa_header", outputs=[str(tmp_path / "4_header_structure.json")])
+        manifest.start("soa_text")
+        assert not manifest.reusable("soa_header")
+
+        resumed = RunManifest(str(tmp_path), inputs, resume=True)
+        assert resumed.resuming
+        assert resumed.get("soa_pages")["pages"] == [11, 12]
+        assert resumed.get("soa_header")["outputs"] == ["4_header_structure.json"]
+        assert resumed.first_incomplete(["soa_pages", "soa_header", "soa_text", "soa"]) == "soa_text"
+        assert resumed.reusable("soa_header", after=("soa_pages",))
+
+        resumed.start("soa_pages")
+        assert not resumed.reusable("soa_header", after=("soa_pages",))
+        assert not RunManifest(str(tmp_path), {**inputs, "pdf": "def"}, resume=True).resuming
+
+        (tmp_path / "4_header_structure.json").unlink()
+        assert not RunManifest(str(tmp_path), inputs, resume=True).reusable("soa_header")
+
+    def test_text_extraction_result_round_trip(self, tmp_path):
+        """Test a saved text extraction result (5_raw_text_soa.json) loads back with tick footnotes."""
+        from core.provenance import ProvenanceSource, ProvenanceTracker
+        from core.usdm_types import Activity, ActivityGroup, ActivityTimepoint, Encounter, HeaderStructure
+        from extraction.text_extractor import (
+            TextExtractionResult, load_extraction_result, save_extraction_result,
+        )
+
+        header = HeaderStructure(
+            encounters=[Encounter(id="enc_1", name="Screening"), Encounter(id="enc_2", name="Day 1")],
+            activityGroups=[ActivityGroup(id="grp_1", name="Labs", activity_names=["Hematology"])],
+        )
+        ticks = [
+            ActivityTimepoint(activityId="act_1", encounterId="enc_1", footnoteRefs=["a"]),
+            ActivityTimepoint(activityId="act_1", encounterId="enc_2"),
+        ]
+        provenance = ProvenanceTracker()
+        provenance.metadata['model'] = "gemini-2.5-pro"
+        provenance.tag_cells_from_timepoints([t.to_dict() for t in ticks], ProvenanceSource.TEXT)
+        result = TextExtractionResult(
+            activities=[Activity(id="act_1", name="Hematology")],
+            activity_timepoints=ticks,
+            raw_response="{}",
+            model_used="gemini-2.5-pro",
+            success=True,
+            provenance=provenance,
+        )
+
+        output = str(tmp_path / "5_raw_text_soa.json")
+        provenance_path = str(tmp_path / "5_raw_text_soa_provenance.json")
+        save_extraction_result(result, header, output, provenance_path)
+        loaded = load_extraction_result(output, header, provenance_path)
+
+        assert [(a.id, a.name) for a in loaded.activities] == [("act_1", "Hematology")]
+        assert [t.to_dict() for t in loaded.activity_timepoints] == [t.to_dict() for t in ticks]
+        assert loaded.model_used == "gemini-2.5-pro"
+        assert loaded.provenance.cells == provenance.cells
+
+    def test_resume_reruns_incomplete_phases_and_dependents(self, monkeypatch, tmp_path):
+        """Test a resumed run keeps completed phases and re-runs failed ones and their dependents."""
+        from types import SimpleNamespace
+        from pipeline import orchestrator as orchestrator_module
+        from pipeline.base_phase import BasePhase, PhaseConfig, PhaseResult
+        from pipeline.orchestrator import PipelineOrchestrator
+        from pipeline.run_manifest import RunManifest
+
+        pdf = tmp_path / "protocol.pdf"
+        pdf.write_bytes(b"%PDF-1.4 protocol")
+        failing = {"metadata"}
+        extracted = []
+
+        class FakePhase(BasePhase):
+            def __init__(self, name):
+                self._config = PhaseConfig(name=name, display_name=name, phase_number=0,
+                                           output_filename=f"{name}.json")
+
+            @property
+            def config(self):
+                return self._config
+
+            def extract(self, pdf_path, model, output_dir, context, soa_data=None, **kwargs):
+                extracted.append(self.config.name)
+                if self.config.name in failing:
+                    return PhaseResult(success=False, error="timed out")
+                return PhaseResult(success=True, data={"indication": "Asthma"})
+
+            def update_context(self, context, result):
+                if self.config.name == "metadata":
+                    context.update_from_metadata(result.data)
+
+            def combine(self, result, study_version, study_design, combined, previous_extractions):
+                pass
+
+        phases = {name: FakePhase(name) for name in ("metadata", "eligibility", "narrative")}
+        monkeypatch.setattr(orchestrator_module, "phase_registry", SimpleNamespace(
+            has=lambda name: name in phases, get=phases.get, get_names=lambda: list(phases)))
+
+        def run(resume):
+            extracted.clear()
+            manifest = RunManifest(str(tmp_path), {"pdf": "abc"}, resume=resume)
+            orchestrator = PipelineOrchestrator(durations_path=None, manifest=manifest)
+            results = orchestrator.run_phases_parallel(
+                pdf_path=str(pdf), output_dir=str(tmp_path), model="gemini-2.5-pro",
+                phases_to_run={name: True for name in phases}, max_workers=2,
+            )
+            return sorted(extracted), results
+
+        assert run(resume=False)[0] == ["eligibility", "metadata", "narrative"]
+
+        failing.clear()
+        extracted_now, results = run(resume=True)
+        assert extracted_now == ["eligibility", "metadata"]
+        assert results["narrative"].reused
+        assert results["_pipeline_context"].indication == "Asthma"
+
+        extracted_now, results = run(resume=True)
+        assert extracted_now == []
+        assert all(results[name].success and results[name].reused for name in phases)
+
+    def test_resume_after_conformance_failure_reruns_only_conformance(self, monkeypatch, tmp_path):
+        """Test resuming a full-protocol run that died in conformance keeps combine, schema fix and enrichment."""
+        from types import SimpleNamespace
+        import main_v3
+        from pipeline import orchestrator as orchestrator_module
+        from pipeline.base_phase import BasePhase, PhaseConfig, PhaseResult
+        from pipeline.orchestrator import PipelineOrchestrator
+        from pipeline.run_manifest import FINAL_STEP_INPUTS, RunManifest
+
+        pdf = tmp_path / "protocol.pdf"
+        pdf.write_bytes(b"%PDF-1.4 protocol")
+        usdm_path = tmp_path / "protocol_usdm.json"
+        extracted = []
+        ran = []
+
+        class FakePhase(BasePhase):
+            def __init__(self, name, reusable=True):
+                self._config = PhaseConfig(name=name, display_name=name, phase_number=0,
+                                           output_filename=f"{name}.json", reusable=reusable)
+
+            @property
+            def config(self):
+                return self._config
+
+            def extract(self, pdf_path, model, output_dir, context, soa_data=None, **kwargs):
+                extracted.append(self.config.name)
+                return PhaseResult(success=True, data={"name": self.config.name})
+
+            def combine(self, result, study_version, study_design, combined, previous_extractions):
+                pass
+
+        # Execution's saved output cannot be restored, so it always runs again
+        phases = {"metadata": FakePhase("metadata"), "execution": FakePhase("execution", reusable=False)}
+        monkeypatch.setattr(orchestrator_module, "phase_registry", SimpleNamespace(
+            has=lambda name: name in phases, get=phases.get, get_names=lambda: list(phases)))
+
+        def enrich(path, output_dir):
+            ran.append("enrichment")
+            return {}
+
+        def conform(path, output_dir):
+            ran.append("conformance")
+            if crash:
+                raise RuntimeError("CDISC CORE killed")
+            (tmp_path / "conformance_report.json").write_text("{}")
+            return {"success": True}
+
+        monkeypatch.setattr("enrichment.terminology.enrich_terminology", enrich)
+        monkeypatch.setattr("validation.cdisc_conformance.run_cdisc_conformance", conform)
+        args = SimpleNamespace(enrich=True, soa=True, full_protocol=True, validate_schema=True,
+                               conformance=True, update_evs_cache=False, no_validate=True)
+        config = SimpleNamespace(model_name="gemini-2.5-pro")
+
+        def run(resume, schema_validation_result):
+            extracted.clear()
+            ran.clear()
+            manifest = RunManifest(str(tmp_path), {"pdf": "abc"}, resume=resume)
+            PipelineOrchestrator(durations_path=None, manifest=manifest).run_phases_parallel(
+                pdf_path=str(pdf), output_dir=str(tmp_path), model="gemini-2.5-pro",
+                phases_to_run={name: True for name in phases}, max_workers=2,
+            )
+            if not manifest.reusable("combine", after=FINAL_STEP_INPUTS["combine"]):
+                ran.append("combine")
+                manifest.start("combine")
+                usdm_path.write_text("{}")
+                manifest.complete("combine", outputs=[str(usdm_path)])
+            if not manifest.reusable("schema_fix", after=FINAL_STEP_INPUTS["schema_fix"]):
+                ran.append("schema_fix")
+                manifest.start("schema_fix")
+                (tmp_path / "schema_validation.json").write_text("{}")
+                manifest.complete("schema_fix", outputs=[str(usdm_path), "schema_validation.json"], valid=True)
+            main_v3._run_post_processing(args, str(usdm_path), str(tmp_path), config,
+                                         schema_validation_result, None, manifest)
+            return sorted(extracted), ran
+
+        crash = True
+        with pytest.raises(RuntimeError):
+            run(resume=False, schema_validation_result=SimpleNamespace(valid=True))
+        assert sorted(extracted) == ["execution", "metadata"]
+        assert ran == ["combine", "schema_fix", "enrichment", "conformance"]
+
+        crash = False
+        assert run(resume=True, schema_validation_result=None) == (["execution"], ["conformance"])
+        assert RunManifest(str(tmp_path), {"pdf": "abc"}, resume=True).first_incomplete(
+            ["metadata", "execution", "combine", "schema_fix", "enrichment", "conformance"]) is None
+
+
+class TestPageClassifier:
+    """Tests for core.page_classifier module."""
+    
+    def test_aho_corasick_overlapping(self):
+        """Test every occurrence is reported, including overlaps."""
+        from core.page_classifier import AhoCorasick
+        
+        ac = AhoCorasick(["he", "she", "his", "hers"])
+        found = sorted((start, ac.keyword_length(i)) for start, i in ac.iter_matches("ushers"))
+        assert found == [(1, 3), (2, 2), (2, 4)]
+    
+    def test_count_matches_findall(self):
+        """Test section counts equal findall on the joined alternation."""
+        import random
+        import re
+        from core.page_classifier import PageClassifier
+        
+        patterns = [
+            r'primary\s+objective', r'schedule\s+of\s+(?:activities|assessments)',
+            r'\bvisit\s*\d+', r'infusion', r'infusion\s+pump', r'soa', r'x-ray',
+            r'\+/-\s*\d+\s*days?', r'study\s+arms?', r'arm',
+        ]
+        words = ["primary", "objective", "study", "arm", "arms", "schedule", "of", "activities", "visit", "2",
+                 "infusion", "pump", "soap", "x-ray", "+/-", "3", "days", "the"]
+        classifier = PageClassifier()
+        classifier.register_section("test", patterns=patterns)
+        combined = re.compile('|'.join(patterns), re.IGNORECASE)
+        
+        rng = random.Random(7)
+        for _ in range(500):
+            text = ' '.join(rng.choice(words) for _ in range(rng.randint(0, 40)))
+            features = classifier.classify(text)
+            assert features.count("test") == len(combined.findall(text))
+            assert features.has("test") == bool(combined.search(text))
+    
+    def test_whitespace_semantics(self):
+        """Test \\s+ phrases span line breaks while keywords stay substrings."""
+        from core.page_classifier import PageClassifier
+        
+        classifier = PageClassifier()
+        classifier.register_section("obj", patterns=[r'primary\s+objective'])
+        classifier.register_section("kw", keywords=["inclusion criteria", "exclusion criteria", "visit"])
+        
+        features = classifier.classify("the primary\n   objective\ninclusion\ncriteria\nexclusion criteria")
+        assert features.count("obj") == 1
+        assert features.distinct("kw") == 1
+        assert features.matched_terms("kw") == ["exclusion criteria"]
+    
+    def test_document_features_track_registrations(self, tmp_path):
+        """Test pages are re-classified after a new section is registered."""
+        import fitz
+        from core.pdf_cache import configure_pdf_cache
+        from core.pdf_document import ProtocolDocument
+        from core.page_classifier import register_section_patterns
+        
+        path = tmp_path / "p.pdf"
+        pdf = fitz.open()
+        pdf.new_page().insert_text((72, 72), "Study Design and Randomization")
+        pdf.save(str(path))
+        pdf.close()
+        
+        configure_pdf_cache(enabled=False)
+        doc = ProtocolDocument(str(path))
+        try:
+            register_section_patterns("test.design", [r'study\s+design'])
+            first = doc.get_page_features(0)
+            assert first.has("test.design")
+            assert doc.get_page_features(0) is first
+            
+            register_section_patterns("test.random", [r'randomi[sz]ation'])
+            assert doc.get_page_features(0).has("test.random")
+        finally:
+            doc.close()
+            configure_pdf_cache()
+
+
 class TestUsdmTypes:
     """Tests for core.usdm_types module."""
     
@@ -289,5 +289,900 @@ class TestLLMResponse:
         assert response.finish_reason is None
 
 
+
+class TestAsyncProviders:
+    """Test suite for the async provider interface."""
+    
+    def test_openai_agenerate_uses_async_client(self):
+        """Test OpenAI agenerate awaits AsyncOpenAI and reuses one client per loop."""
+        import asyncio
+        from unittest.mock import AsyncMock
+        
+        mock_response = Mock(output_text='{"result": "test"}', model='gpt-4o', status='completed')
+        mock_response.usage = Mock(input_tokens=10, output_tokens=20, total_tokens=30)
+        
+        async def slow_create(**kwargs):
+            await asyncio.sleep(0.05)
+            return mock_response
+        
+        with patch('llm_providers.OpenAI'), patch('llm_providers.AsyncOpenAI') as mock_async_openai:
+            mock_async_openai.return_value.responses.create = AsyncMock(side_effect=slow_create)
+            provider = OpenAIProvider(model="gpt-4o", api_key="test-key")
+            messages = [{"role": "user", "content": "Test"}]
+            
+            async def run_many():
+                return await asyncio.gather(*(provider.agenerate(messages) for _ in range(20)))
+            
+            import time
+            start = time.perf_counter()
+            responses = asyncio.run(run_many())
+            elapsed = time.perf_counter() - start
+        
+        assert [r.content for r in responses] == ['{"result": "test"}'] * 20
+        assert responses[0].usage['total_tokens'] == 30
+        assert mock_async_openai.call_count == 1
+        assert elapsed < 0.5  # Concurrent, not 20 x 50ms
+    
+    @patch('llm_providers.genai.GenerativeModel')
+    @patch('llm_providers.genai.configure')
+    def test_gemini_agenerate_uses_generate_content_async(self, mock_configure, mock_model_class):
+        """Test Gemini agenerate awaits generate_content_async."""
+        import asyncio
+        from unittest.mock import AsyncMock
+        
+        mock_response = Mock(text='{"result": "test"}', candidates=[Mock(finish_reason='STOP')])
+        mock_response.usage_metadata = Mock(
+            prompt_token_count=10, candidates_token_count=20, total_token_count=30
+        )
+        mock_model = Mock()
+        mock_model.generate_content_async = AsyncMock(return_value=mock_response)
+        mock_model_class.return_value = mock_model
+        
+        provider = GeminiProvider(model="gemini-2.5-pro", api_key="test-key")
+        response = asyncio.run(provider.agenerate([{"role": "user", "content": "Test"}]))
+        
+        assert response.content == '{"result": "test"}'
+        assert response.usage['total_tokens'] == 30
+        mock_model.generate_content.assert_not_called()
+        assert mock_model_class.call_args.kwargs['generation_config'].response_mime_type == "application/json"
+    
+    def test_claude_agenerate_streams_async(self):
+        """Test Claude agenerate streams through AsyncAnthropic."""
+        import asyncio
+        from llm_providers import ClaudeProvider
+        
+        class FakeStream:
+            async def __aenter__(self):
+                return self
+            
+            async def __aexit__(self, *args):
+                return False
+            
+            @property
+            async def text_stream(self):
+                for chunk in ['{"result": ', '"test"}']:
+                    yield chunk
+            
+            async def get_final_message(self):
+                return Mock(stop_reason='end_turn', model='claude-sonnet-4',
+                            usage=Mock(input_tokens=5, output_tokens=7))
+        
+        with patch('llm_providers.anthropic.Anthropic'), \
+             patch('llm_providers.anthropic.AsyncAnthropic') as mock_async_anthropic:
+            mock_async_anthropic.return_value.messages.stream = Mock(return_value=FakeStream())
+            provider = ClaudeProvider(model="claude-sonnet-4", api_key="test-key")
+            response = asyncio.run(provider.agenerate_with_image("Describe", b"png-bytes"))
+        
+        assert response.content == '{"result": "test"}'
+        assert response.usage['total_tokens'] == 12
+        params = mock_async_anthropic.return_value.messages.stream.call_args.kwargs
+        assert params['messages'][0]['content'][0]['type'] == 'image'
+    
+    def test_default_agenerate_runs_sync_generate(self):
+        """Test providers without an async client fall back to a worker thread."""
+        import asyncio
+        from llm_providers import LLMProvider
+        
+        class SyncOnlyProvider(LLMProvider):
+            def _get_api_key_from_env(self):
+                return "key"
+            
+            def supports_json_mode(self):
+                return True
+            
+            def generate(self, messages, config=None):
+                return LLMResponse(content=messages[0]['content'], model=self.model)
+        
+        provider = SyncOnlyProvider(model="local")
+        response = asyncio.run(provider.agenerate([{"role": "user", "content": "echo"}]))
+        assert response.content == "echo"
+
+
+
+class TestProviderPool:
+    """Test suite for the process-wide provider pool."""
+    
+    @patch('llm_providers.OpenAI')
+    def test_reuses_provider_per_model_and_key(self, mock_openai):
+        """Test one provider is shared per (model, api_key, endpoint)."""
+        from llm_providers import ProviderPool
+        
+        pool = ProviderPool()
+        first = pool.get('gpt-4o', api_key='key-a')
+        assert pool.get('gpt-4o', api_key='key-a') is first
+        assert pool.get('gpt-4o', api_key='key-b') is not first
+        assert pool.get('gpt-4o-mini', api_key='key-a') is not first
+        
+        assert mock_openai.call_count == 3
+        stats = pool.get_stats()
+        assert stats['created'] == 3
+        assert stats['reused'] == 1
+        assert stats['pooled'] == 3
+    
+    @patch('llm_providers.OpenAI')
+    def test_endpoint_change_creates_new_provider(self, mock_openai):
+        """Test a different base URL is pooled separately."""
+        from llm_providers import ProviderPool
+        
+        pool = ProviderPool()
+        first = pool.get('gpt-4o', api_key='key-a')
+        with patch.dict('os.environ', {'OPENAI_BASE_URL': 'http://localhost:8000/v1'}):
+            assert pool.get('gpt-4o', api_key='key-a') is not first
+    
+    def test_concurrent_first_use_creates_once(self):
+        """Test concurrent callers racing on a new key share one provider."""
+        import threading
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+        from llm_providers import ProviderPool
+        
+        created = []
+        lock = threading.Lock()
+        
+        def slow_client(**kwargs):
+            time.sleep(0.05)
+            with lock:
+                created.append(kwargs)
+            return Mock()
+        
+        with patch('llm_providers.OpenAI', side_effect=slow_client):
+            pool = ProviderPool()
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                providers = list(executor.map(lambda _: pool.get('gpt-4o', api_key='key'), range(16)))
+        
+        assert len(created) == 1
+        assert all(p is providers[0] for p in providers)
+        assert pool.get_stats()['reused'] == 15
+    
+    @patch('llm_providers.OpenAI')
+    def test_get_llm_client_uses_pool(self, mock_openai):
+        """Test get_llm_client returns the pooled provider."""
+        from core.llm_client import get_llm_client
+        from llm_providers import provider_pool
+        
+        provider_pool.clear()
+        try:
+            assert get_llm_client('gpt-4o', api_key='key') is get_llm_client('gpt-4o', api_key='key')
+            assert mock_openai.call_count == 1
+        finally:
+            provider_pool.clear()
+    
+    @patch('llm_providers.OpenAI')
+    def test_clear_closes_clients(self, mock_openai):
+        """Test clearing the pool closes SDK clients."""
+        from llm_providers import ProviderPool
+        
+        pool = ProviderPool()
+        pool.get('gpt-4o', api_key='key')
+        pool.clear()
+        
+        mock_openai.return_value.close.assert_called_once()
+        assert len(pool) == 0
+
+
+
+class TestRateLimiter:
+    """Test suite for the shared RPM/TPM rate limiter."""
+    
+    def test_requests_are_paced_in_arrival_order(self):
+        """Test requests beyond the RPM budget queue behind earlier ones."""
+        from llm_providers import RateLimiter
+        
+        limiter = RateLimiter()
+        limiter.configure('gpt-4o', requests_per_minute=60, tokens_per_minute=None)
+        
+        waits = [limiter.reserve('openai', 'gpt-4o').wait_seconds for _ in range(62)]
+        assert waits[:60] == [0.0] * 60
+        assert waits[60] == pytest.approx(1.0, abs=0.1)
+        assert waits[61] == pytest.approx(2.0, abs=0.1)
+        
+        # Other models have their own budget
+        assert limiter.reserve('openai', 'gpt-4o-mini').wait_seconds == 0.0
+    
+    def test_token_estimate_corrected_from_usage(self):
+        """Test settle() debits tokens used beyond the pre-send estimate."""
+        from llm_providers import RateLimiter
+        
+        limiter = RateLimiter()
+        limiter.configure('gemini', requests_per_minute=None, tokens_per_minute=600)
+        
+        ticket = limiter.reserve('gemini', 'gemini-2.5-pro', estimated_tokens=600)
+        assert ticket.wait_seconds == 0.0
+        limiter.settle(ticket, 900)
+        
+        # 300 tokens of debt at 10 tokens/s
+        assert limiter.reserve('gemini', 'gemini-2.5-pro').wait_seconds == pytest.approx(30.0, abs=0.5)
+    
+    def test_rejected_attempts_release_their_tokens(self):
+        """Test tokens reserved for a request that was rejected are refunded before retrying."""
+        from llm_providers import RateLimiter
+        
+        limiter = RateLimiter()
+        limiter.configure('gemini', requests_per_minute=None, tokens_per_minute=600)
+        
+        limiter.release(limiter.reserve('gemini', 'gemini-2.5-pro', estimated_tokens=600))
+        assert limiter.reserve('gemini', 'gemini-2.5-pro', estimated_tokens=600).wait_seconds == 0.0
+        
+    def test_pause_holds_back_all_callers(self):
+        """Test a Retry-After pause applies to every caller of that model."""
+        from llm_providers import RateLimiter
+        
+        limiter = RateLimiter()
+        limiter.pause('claude', 'claude-sonnet-4', 5.0)
+        
+        assert limiter.reserve('claude', 'claude-sonnet-4').wait_seconds == pytest.approx(5.0, abs=0.1)
+        assert limiter.reserve('claude', 'claude-opus-4').wait_seconds == 0.0
+        assert limiter.get_stats()['rate_limited'] == 1
+    
+    def test_retry_after_parsing(self):
+        """Test server wait hints are read from headers and Gemini error text."""
+        from llm_providers import _retry_after_seconds
+        
+        header_error = Exception("Error code: 429")
+        header_error.response = Mock(headers={'retry-after': '7'})
+        assert _retry_after_seconds(header_error) == 7.0
+        
+        ms_error = Exception("Error code: 429")
+        ms_error.response = Mock(headers={'retry-after-ms': '1500'})
+        assert _retry_after_seconds(ms_error) == 1.5
+        
+        gemini_error = Exception('429 Resource exhausted. Please retry in 13.5s. "retryDelay": "13s"')
+        assert _retry_after_seconds(gemini_error) == 13.5
+        
+        assert _retry_after_seconds(Exception("Internal error")) is None
+    
+    def test_rate_limit_error_pauses_and_retries(self):
+        """Test a 429 pauses the shared limiter and the request is retried."""
+        from llm_providers import RateLimiter
+        
+        class RateLimitError(Exception):
+            status_code = 429
+            response = Mock(headers={'retry-after-ms': '10'})
+        
+        mock_response = Mock(output_text='{"ok": true}', model='gpt-4o', status='completed')
+        mock_response.usage = Mock(input_tokens=10, output_tokens=5, total_tokens=15)
+        
+        limiter = RateLimiter()
+        with patch('llm_providers.OpenAI') as mock_openai, patch('llm_providers.rate_limiter', limiter):
+            mock_openai.return_value.responses.create.side_effect = [RateLimitError("Too many requests"), mock_response]
+            provider = OpenAIProvider(model="gpt-4o", api_key="test-key")
+            response = provider.generate([{"role": "user", "content": "Test"}])
+        
+        assert response.content == '{"ok": true}'
+        stats = limiter.get_stats()
+        assert stats['rate_limited'] == 1
+        assert stats['requests'] == 2
+    
+    def test_non_rate_limit_errors_are_not_retried(self):
+        """Test errors that merely mention 'generate' are not treated as rate limits."""
+        from llm_providers import _is_rate_limit_error
+        
+        assert not _is_rate_limit_error(Exception("Failed to generate content"))
+        assert _is_rate_limit_error(Exception("Rate limit reached for gpt-4o"))
+        assert _is_rate_limit_error(Exception("429 RESOURCE_EXHAUSTED"))
+
+
+class TestPromptCaching:
+    """Test suite for provider-side prompt caching of a shared protocol prefix."""
+    
+    MESSAGES = [
+        {"role": "user", "content": "PROTOCOL CONTENT:\n\nSection 5 text", "cache": True},
+        {"role": "user", "content": "Extract the eligibility criteria."},
+    ]
+    
+    def test_split_cached_prefix(self):
+        """Test the prefix is the leading run of cache-marked messages."""
+        from llm_providers import split_cached_prefix
+        
+        prefix, rest = split_cached_prefix(self.MESSAGES)
+        assert prefix == self.MESSAGES[:1]
+        assert rest == self.MESSAGES[1:]
+        
+        prefix, rest = split_cached_prefix([{"role": "user", "content": "No cache"}])
+        assert prefix == []
+        assert len(rest) == 1
+    
+    def test_build_prompt_messages_puts_context_first(self):
+        """Test call_llm context goes before the instructions as a cacheable prefix."""
+        from core.llm_client import build_prompt_messages
+        
+        messages = build_prompt_messages("Extract objectives.", context="Protocol text")
+        assert messages[0]["cache"] is True
+        assert "Protocol text" in messages[0]["content"]
+        assert messages[-1]["content"] == "Extract objectives."
+        
+        assert build_prompt_messages("Just a prompt") == [{"role": "user", "content": "Just a prompt"}]
+    
+    def test_claude_marks_prefix_with_cache_control(self):
+        """Test Claude gets a cache_control breakpoint on the prefix in one user turn."""
+        from llm_providers import ClaudeProvider
+        
+        with patch('llm_providers.anthropic.Anthropic'):
+            provider = ClaudeProvider(model="claude-sonnet-4", api_key="test-key")
+            params = provider._build_params(self.MESSAGES, LLMConfig())
+        
+        assert len(params["messages"]) == 1
+        blocks = params["messages"][0]["content"]
+        assert blocks[0]["cache_control"] == {"type": "ephemeral"}
+        assert "cache_control" not in blocks[1]
+        assert blocks[1]["text"] == "Extract the eligibility criteria."
+    
+    @patch('llm_providers.OpenAI')
+    def test_openai_prompt_cache_key_and_cached_usage(self, mock_openai):
+        """Test OpenAI routes by prefix digest and reports cached input tokens."""
+        from llm_providers import TokenUsageTracker
+        
+        mock_response = Mock(output_text='{}', model='gpt-4o', status='completed')
+        mock_response.usage = Mock(input_tokens=5000, output_tokens=10, total_tokens=5010)
+        mock_response.usage.input_tokens_details = Mock(cached_tokens=4096)
+        mock_openai.return_value.responses.create.return_value = mock_response
+        
+        tracker = TokenUsageTracker()
+        with patch('llm_providers.usage_tracker', tracker):
+            provider = OpenAIProvider(model="gpt-4o", api_key="test-key")
+            response = provider.generate(self.MESSAGES)
+            other = provider._build_params(
+                [self.MESSAGES[0], {"role": "user", "content": "Extract objectives."}], LLMConfig()
+            )
+        
+        params = mock_openai.return_value.responses.create.call_args.kwargs
+        assert params["prompt_cache_key"] == other["prompt_cache_key"]
+        assert "cache" not in params["input"][0]
+        assert response.usage["cached_tokens"] == 4096
+        
+        summary = tracker.get_summary()
+        assert summary["total_cached_input_tokens"] == 4096
+        assert summary["total_uncached_input_tokens"] == 904
+    
+    @patch('llm_providers.genai.GenerativeModel')
+    @patch('llm_providers.genai.configure')
+    def test_gemini_small_prefix_is_sent_inline(self, mock_configure, mock_model_class):
+        """Test a prefix below the cache minimum is sent inline, first."""
+        mock_response = Mock(text='{}', candidates=[Mock(finish_reason='STOP')])
+        mock_response.usage_metadata = Mock(prompt_token_count=10, candidates_token_count=2, total_token_count=12)
+        mock_model_class.return_value.generate_content.return_value = mock_response
+        
+        with patch.object(GeminiProvider, '_prefix_caches', {}):
+            provider = GeminiProvider(model="gemini-2.5-pro", api_key="test-key")
+            with patch.object(provider, '_create_cached_content') as mock_create:
+                provider.generate(self.MESSAGES)
+        
+        mock_create.assert_not_called()
+        prompt = mock_model_class.return_value.generate_content.call_args.args[0]
+        assert prompt.index("Section 5 text") < prompt.index("Extract the eligibility")
+    
+    @patch('llm_providers.genai.GenerativeModel')
+    @patch('llm_providers.genai.configure')
+    def test_gemini_large_prefix_uses_cached_content(self, mock_configure, mock_model_class):
+        """Test a large prefix is cached once and reused across calls."""
+        from llm_providers import CHARS_PER_TOKEN
+        
+        large = "x" * (GeminiProvider.MIN_CACHED_PREFIX_TOKENS * CHARS_PER_TOKEN + 100)
+        messages = [{"role": "user", "content": large, "cache": True}, {"role": "user", "content": "Task"}]
+        
+        mock_response = Mock(text='{}', candidates=[Mock(finish_reason='STOP')])
+        mock_response.usage_metadata = Mock(prompt_token_count=5000, candidates_token_count=2, total_token_count=5002)
+        cached_model = mock_model_class.from_cached_content.return_value
+        cached_model.generate_content.return_value = mock_response
+        
+        with patch.object(GeminiProvider, '_prefix_caches', {}):
+            provider = GeminiProvider(model="gemini-2.5-pro", api_key="test-key")
+            with patch.object(provider, '_create_cached_content', return_value="cachedContents/abc") as mock_create:
+                provider.generate(messages)
+                provider.generate(messages)
+        
+        mock_create.assert_called_once()
+        assert mock_model_class.from_cached_content.call_args.args[0] == "cachedContents/abc"
+        assert cached_model.generate_content.call_args.args[0].strip() == "Task"
+
+
+class TestLazySDKImports:
+    """Test suite for deferred provider SDK imports (CLI startup time)."""
+    
+    SDK_MODULES = ("openai", "anthropic", "google.generativeai", "google.genai", "vertexai")
+    
+    # Budget for `import main_v3` (cumulative, microseconds). Loading all
+    # provider SDKs eagerly took ~2.4s; without them startup is ~0.3s.
+    MAIN_IMPORT_BUDGET_US = 1_500_000
+    
+    @staticmethod
+    def _importtime(code: str) -> dict:
+        """Run code under `python -X importtime`, returning cumulative us per module."""
+        import subprocess
+        
+        repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=repo_root, capture_output=True, text=True, timeout=120,
+        )
+        assert proc.returncode == 0, proc.stderr[-2000:]
+        
+        timings = {}
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|")
+            timings[name.strip()] = int(cumulative)
+        return timings
+    
+    def test_main_import_within_budget_without_sdks(self):
+        """Test importing the CLI loads no provider SDK and stays within budget."""
+        timings = self._importtime("import main_v3")
+        
+        loaded = [m for m in self.SDK_MODULES if m in timings]
+        assert loaded == [], f"Provider SDKs imported at startup: {loaded}"
+        assert timings["main_v3"] < self.MAIN_IMPORT_BUDGET_US, (
+            f"import main_v3 took {timings['main_v3'] / 1e6:.2f}s"
+        )
+    
+    def test_provider_imports_only_its_sdk(self):
+        """Test building a provider imports that provider's SDK only."""
+        timings = self._importtime(
+            "import llm_providers; llm_providers.OpenAIProvider(model='gpt-4o', api_key='test-key')"
+        )
+        
+        assert "openai" in timings
+        assert "anthropic" not in timings
+        assert "google.generativeai" not in timings
+    
+    def test_sdk_names_resolve_as_module_attributes(self):
+        """Test SDK names (patched by tests) resolve lazily on attribute access."""
+        import llm_providers
+        
+        assert llm_providers.AsyncOpenAI.__name__ == "AsyncOpenAI"
+        assert hasattr(llm_providers.anthropic, "Anthropic")
+        with pytest.raises(AttributeError):
+            llm_providers.not_an_sdk_name
+
+
+class TestStreamingValidation:
+    """Test suite for early JSON shape validation of streamed responses."""
+    
+    def test_claude_stream_aborts_on_wrong_shape(self):
+        """Test Claude stops reading the stream once a forbidden top-level key appears."""
+        from llm_providers import ClaudeProvider
+        from core.json_stream import JSONShapeError
+        
+        consumed = []
+        
+        def text_stream():
+            for chunk in ['{"study": ', '{"versions": [', '{"id": 1}', ']}}']:
+                consumed.append(chunk)
+                yield chunk
+        
+        stream = MagicMock()
+        stream.__enter__.return_value.text_stream = text_stream()
+        
+        with patch('llm_providers.anthropic.Anthropic') as mock_anthropic:
+            mock_anthropic.return_value.messages.stream.return_value = stream
+            provider = ClaudeProvider(model="claude-sonnet-4", api_key="test-key")
+            config = LLMConfig(json_root="object", json_forbidden_keys=["study"])
+            with pytest.raises(JSONShapeError):
+                provider.generate([{"role": "user", "content": "Extract"}], config)
+        
+        assert consumed == ['{"study": ']
+    
+    def test_claude_stream_joins_chunks(self):
+        """Test Claude builds the content from streamed chunks."""
+        from llm_providers import ClaudeProvider
+        
+        stream = MagicMock()
+        stream.__enter__.return_value.text_stream = iter(['{"activities": ', '[1, 2', ']}'])
+        stream.__enter__.return_value.get_final_message.return_value = Mock(
+            stop_reason='end_turn', model='claude-sonnet-4', usage=Mock(input_tokens=5, output_tokens=7)
+        )
+        
+        with patch('llm_providers.anthropic.Anthropic') as mock_anthropic:
+            mock_anthropic.return_value.messages.stream.return_value = stream
+            provider = ClaudeProvider(model="claude-sonnet-4", api_key="test-key")
+            response = provider.generate([{"role": "user", "content": "Extract"}])
+        
+        assert response.content == '{"activities": [1, 2]}'
+    
+    @patch('llm_providers.OpenAI')
+    def test_openai_streams_only_when_shape_is_validated(self, mock_openai):
+        """Test OpenAI streams Responses API events when a JSON shape is configured."""
+        final = Mock(output_text='{"activities": []}', model='gpt-4o', status='completed')
+        final.usage = Mock(input_tokens=10, output_tokens=5, total_tokens=15)
+        events = [
+            Mock(type='response.output_text.delta', delta='{"activities": '),
+            Mock(type='response.output_text.delta', delta='[]}'),
+            Mock(type='response.completed', response=final),
+        ]
+        stream = MagicMock()
+        stream.__enter__.return_value = iter(events)
+        mock_openai.return_value.responses.create.return_value = stream
+        
+        provider = OpenAIProvider(model="gpt-4o", api_key="test-key")
+        response = provider.generate(
+            [{"role": "user", "content": "Extract"}],
+            LLMConfig(json_root="object", json_forbidden_keys=["study"]),
+        )
+        
+        assert response.content == '{"activities": []}'
+        assert mock_openai.return_value.responses.create.call_args.kwargs["stream"] is True
+        assert not LLMConfig().validates_json_shape
+
+
+class TestContinuation:
+    """Test suite for automatic continuation of truncated responses."""
+    
+    def _scripted_provider(self, responses):
+        """Provider returning the given LLMResponses in order, recording messages."""
+        from llm_providers import LLMProvider
+        
+        class ScriptedProvider(LLMProvider):
+            def _get_api_key_from_env(self):
+                return "key"
+            
+            def supports_json_mode(self):
+                return True
+            
+            def generate(self, messages, config=None):
+                from llm_providers import _json_stream_parser
+                
+                self.calls.append(messages)
+                response = responses.pop(0)
+                if config is not None and config.validates_json_shape:
+                    # Streaming providers check the shape as the text arrives
+                    _json_stream_parser(config).feed(response.content)
+                return response
+        
+        provider = ScriptedProvider(model="scripted")
+        provider.calls = []
+        return provider
+    
+    def test_truncated_finish_reasons(self):
+        """Test each provider's length finish reason marks the response truncated."""
+        for reason in ('length', 'max_output_tokens', 'max_tokens', 'MAX_TOKENS'):
+            assert LLMResponse(content="", model="m", finish_reason=reason).truncated
+        assert not LLMResponse(content="", model="m", finish_reason="STOP").truncated
+    
+    def test_continues_and_merges_truncated_json(self):
+        """Test a truncated response is continued with the prefix kept first."""
+        import json
+        from llm_providers import generate_with_continuation
+        
+        provider = self._scripted_provider([
+            LLMResponse(content='{"criteria": [{"id": "c1"}, {"id": "c2", "text": "Age', model="m",
+                        finish_reason="max_tokens", usage={"prompt_tokens": 100, "completion_tokens": 50}),
+            LLMResponse(content=' >= 18"}]}', model="m", finish_reason="end_turn",
+                        usage={"prompt_tokens": 160, "completion_tokens": 5}),
+        ])
+        messages = [
+            {"role": "user", "content": "PROTOCOL CONTENT", "cache": True},
+            {"role": "user", "content": "Extract criteria"},
+        ]
+        
+        response = generate_with_continuation(provider, messages, LLMConfig(json_mode=True))
+        
+        assert json.loads(response.content) == {"criteria": [{"id": "c1"}, {"id": "c2", "text": "Age >= 18"}]}
+        assert response.usage == {"prompt_tokens": 260, "completion_tokens": 55}
+        follow_up = provider.calls[1]
+        assert follow_up[0]["cache"] is True
+        assert follow_up[-2]["role"] == "assistant"
+    
+    def test_shape_check_applies_to_joined_response(self):
+        """Test a continuation starting mid-document passes the JSON shape check of the joined response."""
+        import json
+        from core.json_stream import JSONShapeError
+        from llm_providers import generate_with_continuation
+        
+        config = LLMConfig(json_mode=True, json_root="object", json_forbidden_keys=["study"])
+        provider = self._scripted_provider([
+            LLMResponse(content='{"activities": [{"id": "act_1", "name": "Hematology"}], '
+                                '"activityTimepoints": [{"id": "at_1", "activityId": "act_',
+                        model="m", finish_reason="length"),
+            LLMResponse(content='1"}], "footnotes": ["a"]}', model="m", finish_reason="stop"),
+        ])
+        
+        response = generate_with_continuation(provider, [{"role": "user", "content": "x"}], config)
+        
+        assert json.loads(response.content) == {
+            "activities": [{"id": "act_1", "name": "Hematology"}],
+            "activityTimepoints": [{"id": "at_1", "activityId": "act_1"}],
+            "footnotes": ["a"],
+        }
+        
+        provider = self._scripted_provider([
+            LLMResponse(content='{"activities": [], "', model="m", finish_reason="length"),
+            LLMResponse(content='study": {"id": "s1"}}', model="m", finish_reason="stop"),
+        ])
+        with pytest.raises(JSONShapeError):
+            generate_with_continuation(provider, [{"role": "user", "content": "x"}], config)
+    
+    def test_still_truncated_keeps_complete_elements(self):
+        """Test exhausting continuations returns valid JSON of the complete elements."""
+        import json
+        from llm_providers import generate_with_continuation
+        
+        provider = self._scripted_provider([
+            LLMResponse(content='{"items": [1, 2, ', model="m", finish_reason="length"),
+            LLMResponse(content='3, 4', model="m", finish_reason="length"),
+        ])
+        
+        response = generate_with_continuation(provider, [{"role": "user", "content": "x"}], max_continuations=1)
+        
+        assert json.loads(response.content) == {"items": [1, 2, 3]}
+        assert len(provider.calls) == 2
+    
+    def test_complete_response_is_not_continued(self):
+        """Test no continuation is requested for a complete response."""
+        from llm_providers import generate_with_continuation
+        
+        provider = self._scripted_provider([LLMResponse(content='{"a": 1}', model="m", finish_reason="stop")])
+        response = generate_with_continuation(provider, [{"role": "user", "content": "x"}])
+        
+        assert response.content == '{"a": 1}'
+        assert len(provider.calls) == 1
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
+
+
+class TestHedgedRequests:
+    """Test suite for hedged requests and per-task latency learning."""
+    
+    def _slow_first_provider(self, delays):
+        """Provider whose n-th call sleeps delays[n] and answers with its call number."""
+        import threading
+        import time
+        from llm_providers import LLMProvider
+        
+        class SlowProvider(LLMProvider):
+            def _get_api_key_from_env(self):
+                return "key"
+            
+            def supports_json_mode(self):
+                return True
+            
+            def generate(self, messages, config=None):
+                with self.lock:
+                    call = len(self.calls)
+                    self.calls.append(call)
+                time.sleep(delays[call])
+                return LLMResponse(content=str(call), model=self.model)
+            
+            async def agenerate(self, messages, config=None):
+                import asyncio
+                with self.lock:
+                    call = len(self.calls)
+                    self.calls.append(call)
+                try:
+                    await asyncio.sleep(delays[call])
+                except asyncio.CancelledError:
+                    self.cancelled.append(call)
+                    raise
+                return LLMResponse(content=str(call), model=self.model)
+        
+        provider = SlowProvider(model="slow")
+        provider.lock = threading.Lock()
+        provider.calls = []
+        provider.cancelled = []
+        return provider
+    
+    def _seed(self, task, seconds=0.02, count=10):
+        from llm_providers import latency_stats
+        
+        latency_stats.reset()
+        for _ in range(count):
+            latency_stats.record(task, seconds)
+    
+    def test_percentile_needs_min_samples(self):
+        """Test tasks without enough history are not hedged."""
+        from llm_providers import LatencyStats
+        
+        stats = LatencyStats()
+        for seconds in range(1, 10):
+            stats.record("t", float(seconds))
+        assert stats.percentile("t", 0.9, min_samples=10) is None
+        stats.record("t", 10.0)
+        assert stats.percentile("t", 0.9, min_samples=10) == 10.0
+        assert stats.percentile("t", 0.5, min_samples=10) == 6.0
+    
+    def test_stats_persist_across_runs(self, tmp_path):
+        """Test latency samples saved by one run are learned by the next."""
+        from llm_providers import LatencyStats
+        
+        first = LatencyStats()
+        first.record("SoA_Extraction/image/m", 4.0)
+        first.save(tmp_path / "latency.json")
+        
+        second = LatencyStats()
+        second.record("SoA_Extraction/image/m", 6.0)
+        assert second.load(tmp_path / "latency.json") == 1
+        assert second.summary()["SoA_Extraction/image/m"]["count"] == 2
+        assert LatencyStats().load(tmp_path / "missing.json") == 0
+    
+    def test_slow_call_is_hedged(self):
+        """Test a call past its p90 gets a duplicate and the first response wins."""
+        import time
+        from llm_providers import HedgedProvider, configure_hedging, hedging_policy, latency_task
+        
+        provider = self._slow_first_provider([2.0, 0.01])
+        self._seed(latency_task("slow", "text"))
+        configure_hedging(enabled=True)
+        try:
+            start = time.monotonic()
+            response = HedgedProvider(provider).generate([{"role": "user", "content": "x"}])
+            assert time.monotonic() - start < 1.0
+            assert response.content == "1"
+            assert hedging_policy.get_stats() == {"hedged": 1, "hedge_wins": 1}
+        finally:
+            configure_hedging()
+    
+    def test_fast_call_is_not_hedged(self):
+        """Test a call finishing within its p90 sends no duplicate and is recorded."""
+        from llm_providers import HedgedProvider, configure_hedging, latency_stats, latency_task
+        
+        provider = self._slow_first_provider([0.0, 0.0])
+        task = latency_task("slow", "text")
+        self._seed(task, seconds=1.0)
+        configure_hedging(enabled=True)
+        try:
+            assert HedgedProvider(provider).generate([]).content == "0"
+            assert provider.calls == [0]
+            assert latency_stats.summary()[task]["count"] == 11
+        finally:
+            configure_hedging()
+    
+    def test_async_loser_is_cancelled(self):
+        """Test the slower side of a hedged async call is cancelled."""
+        import asyncio
+        from llm_providers import HedgedProvider, configure_hedging, latency_task
+        
+        provider = self._slow_first_provider([2.0, 0.01])
+        self._seed(latency_task("slow", "text"))
+        configure_hedging(enabled=True)
+        try:
+            response = asyncio.run(HedgedProvider(provider).agenerate([]))
+            assert response.content == "1"
+            assert provider.cancelled == [0]
+        finally:
+            configure_hedging()
+
+
+class TestMultiImage:
+    """Test suite for multi-image generate_with_image() requests."""
+    
+    def test_image_inputs_normalizes_arguments(self):
+        """Test one image or a list of images map to (bytes, mime type) pairs."""
+        from llm_providers import image_inputs
+        
+        assert image_inputs(b"a") == [(b"a", "image/png")]
+        assert image_inputs([b"a", b"b"], "image/jpeg") == [(b"a", "image/jpeg"), (b"b", "image/jpeg")]
+        assert image_inputs([b"a", b"b"], ["image/png", "image/jpeg"])[1] == (b"b", "image/jpeg")
+        with pytest.raises(ValueError):
+            image_inputs([b"a", b"b"], ["image/png"])
+        with pytest.raises(ValueError):
+            image_inputs([])
+    
+    @patch('llm_providers.OpenAI')
+    def test_openai_sends_all_pages_in_one_request(self, mock_openai):
+        """Test every page becomes an image part of a single Chat Completions call."""
+        mock_response = Mock()
+        mock_response.choices = [Mock(message=Mock(content='{"epochs": []}'), finish_reason='stop')]
+        mock_response.model = 'gpt-5'
+        mock_response.usage = Mock(prompt_tokens=10, completion_tokens=20, total_tokens=30)
+        mock_openai.return_value.chat.completions.create.return_value = mock_response
+        
+        provider = OpenAIProvider(model="gpt-5", api_key="test-key")
+        provider.generate_with_image("Headers", [b"page1", b"page2", b"page3"], config=LLMConfig(max_tokens=8192))
+        
+        params = mock_openai.return_value.chat.completions.create.call_args.kwargs
+        content = params['messages'][0]['content']
+        assert content[0] == {"type": "text", "text": "Headers"}
+        assert [part['type'] for part in content[1:]] == ['image_url'] * 3
+        assert params['max_completion_tokens'] == 8192
+        assert 'max_tokens' not in params
+    
+    def test_claude_puts_images_before_prompt(self):
+        """Test Claude image messages keep page order and end with the prompt."""
+        from llm_providers import ClaudeProvider
+        
+        messages = ClaudeProvider._image_messages("Headers", [b"p1", b"p2"], ["image/png", "image/jpeg"])
+        content = messages[0]['content']
+        assert [block['type'] for block in content] == ['image', 'image', 'text']
+        assert content[1]['source']['media_type'] == "image/jpeg"
+
+
+class TestCallMetrics:
+    """Test suite for per-call latency and throughput telemetry."""
+    
+    def test_call_records_retries_bytes_and_extractor(self):
+        """Test a retried call is one record with its retries, payload size and extractor."""
+        from llm_providers import CallMetrics, RateLimiter, call_extractor
+        
+        class RateLimitError(Exception):
+            status_code = 429
+            response = Mock(headers={'retry-after-ms': '10'})
+        
+        mock_response = Mock(output_text='{"ok": true}', model='gpt-4o', status='completed')
+        mock_response.usage = Mock(input_tokens=10, output_tokens=5, total_tokens=15)
+        
+        metrics = CallMetrics()
+        with patch('llm_providers.OpenAI') as mock_openai, \
+             patch('llm_providers.rate_limiter', RateLimiter()), \
+             patch('llm_providers.call_metrics', metrics):
+            mock_openai.return_value.responses.create.side_effect = [RateLimitError("Too many requests"), mock_response]
+            provider = OpenAIProvider(model="gpt-4o", api_key="test-key")
+            with call_extractor("eligibility"):
+                provider.generate([{"role": "user", "content": "x" * 1000}])
+        
+        summary = metrics.get_summary()
+        assert summary["overall"]["calls"] == 1
+        assert summary["overall"]["retries"] == 1
+        record = summary["slowest_calls"][0]
+        assert record["extractor"] == "eligibility"
+        assert record["finish_reason"] == "completed"
+        assert record["bytes_sent"] >= 1000
+        assert record["time_to_first_token_seconds"] is None  # Not streamed
+        assert set(summary["by_extractor"]) == {"eligibility"}
+    
+    def test_streamed_call_records_time_to_first_token(self):
+        """Test streaming providers time the first chunk of text."""
+        from llm_providers import CallMetrics, ClaudeProvider
+        
+        final = Mock(stop_reason='end_turn', model='claude-sonnet-4')
+        final.usage = Mock(input_tokens=5, output_tokens=7, cache_read_input_tokens=0, cache_creation_input_tokens=0)
+        stream = MagicMock()
+        stream.__enter__.return_value = stream
+        stream.text_stream = iter(['{"a": ', '1}'])
+        stream.get_final_message.return_value = final
+        
+        metrics = CallMetrics()
+        with patch('llm_providers.anthropic.Anthropic') as mock_anthropic, \
+             patch('llm_providers.call_metrics', metrics):
+            mock_anthropic.return_value.messages.stream.return_value = stream
+            provider = ClaudeProvider(model="claude-sonnet-4", api_key="test-key")
+            assert provider.generate_with_image("Describe", [b"p1", b"p2"]).content == '{"a": 1}'
+        
+        record = metrics.get_summary()["slowest_calls"][0]
+        assert record["time_to_first_token_seconds"] is not None
+        assert record["time_to_first_token_seconds"] <= record["latency_seconds"]
+        assert record["finish_reason"] == "end_turn"
+    
+    def test_summary_percentiles_by_phase(self):
+        """Test p50/p95/max are computed per phase and failed calls are counted."""
+        from llm_providers import CallMetrics, usage_tracker
+        
+        metrics = CallMetrics()
+        usage_tracker.set_phase("Metadata")
+        try:
+            for seconds in range(1, 21):
+                record = metrics.start("gemini", "gemini-2.5-pro", "prompt")
+                record.started -= seconds
+                metrics.finish(record, LLMResponse(content="{}", model="gemini-2.5-pro", finish_reason="STOP"))
+            failed = metrics.start("gemini", "gemini-2.5-pro", "prompt")
+            metrics.finish(failed, error=RuntimeError("boom"))
+        finally:
+            usage_tracker.set_phase("unknown")
+        
+        phase = metrics.get_summary()["by_phase"]["Metadata"]
+        assert phase["calls"] == 21
+        assert phase["errors"] == 1
+        assert phase["finish_reasons"] == {"STOP": 20, "error": 1}
+        assert phase["latency_seconds"]["p50"] == pytest.approx(10.0, abs=0.5)
+        assert phase["latency_seconds"]["p95"] == pytest.approx(19.0, abs=0.5)
+        assert phase["latency_seconds"]["max"] == pytest.approx(20.0, abs=0.5)